@@ -12,6 +12,9 @@ import json
 from datetime import datetime
 import time
 import re
+import sqlite3
+import threading
+from contextlib import contextmanager
 
 # ===== 加载环境变量（在导入其他模块之前） =====
 def load_env_file():
@@ -83,17 +86,303 @@ class LogCollector:
         return ""
 
 
+_EVALUATION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    question TEXT NOT NULL DEFAULT '',
+    question_fingerprint TEXT NOT NULL DEFAULT '',
+    run_number INTEGER NOT NULL DEFAULT 1,
+    standard_answer TEXT,
+    actual_answer TEXT,
+    is_correct INTEGER NOT NULL DEFAULT 0,
+    comparison_reason TEXT,
+    agent_type TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_evaluations_fp_agent_ts ON evaluations(question_fingerprint, agent_type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_evaluations_agent_ts ON evaluations(agent_type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_evaluations_ts ON evaluations(timestamp);
+
+-- 完整响应单独存放，表格/统计扫描 evaluations 时不读取长文本
+CREATE TABLE IF NOT EXISTS evaluation_responses (
+    evaluation_id INTEGER PRIMARY KEY,
+    full_response TEXT
+);
+
+-- 每个 问题×Agent 的最新一条记录（看板、失败分析、导出只看最新结果）
+CREATE TABLE IF NOT EXISTS latest_evaluations (
+    question_fingerprint TEXT NOT NULL,
+    agent_type TEXT NOT NULL,
+    evaluation_id INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    PRIMARY KEY (question_fingerprint, agent_type)
+);
+CREATE INDEX IF NOT EXISTS idx_latest_agent_ts ON latest_evaluations(agent_type, timestamp);
+
+-- 按Agent累计的记录数和正确数
+CREATE TABLE IF NOT EXISTS agent_totals (
+    agent_type TEXT PRIMARY KEY,
+    total INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- 聚合表由触发器维护（问题指纹、Agent类型、时间写入后不再修改）
+CREATE TRIGGER IF NOT EXISTS trg_evaluations_insert AFTER INSERT ON evaluations BEGIN
+    INSERT INTO agent_totals (agent_type, total, correct) VALUES (NEW.agent_type, 1, NEW.is_correct)
+        ON CONFLICT (agent_type) DO UPDATE SET total = total + 1, correct = correct + NEW.is_correct;
+    INSERT INTO latest_evaluations (question_fingerprint, agent_type, evaluation_id, timestamp)
+        VALUES (NEW.question_fingerprint, NEW.agent_type, NEW.id, NEW.timestamp)
+        ON CONFLICT (question_fingerprint, agent_type) DO UPDATE
+        SET evaluation_id = excluded.evaluation_id, timestamp = excluded.timestamp
+        WHERE excluded.timestamp > latest_evaluations.timestamp
+           OR (excluded.timestamp = latest_evaluations.timestamp
+               AND excluded.evaluation_id > latest_evaluations.evaluation_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_evaluations_delete AFTER DELETE ON evaluations BEGIN
+    UPDATE agent_totals SET total = total - 1, correct = correct - OLD.is_correct
+        WHERE agent_type = OLD.agent_type;
+    DELETE FROM evaluation_responses WHERE evaluation_id = OLD.id;
+    DELETE FROM latest_evaluations WHERE evaluation_id = OLD.id;
+    INSERT OR IGNORE INTO latest_evaluations (question_fingerprint, agent_type, evaluation_id, timestamp)
+        SELECT question_fingerprint, agent_type, id, timestamp FROM evaluations
+        WHERE question_fingerprint = OLD.question_fingerprint AND agent_type = OLD.agent_type
+        ORDER BY timestamp DESC, id DESC LIMIT 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_evaluations_update_correct AFTER UPDATE OF is_correct ON evaluations BEGIN
+    UPDATE agent_totals SET correct = correct - OLD.is_correct + NEW.is_correct
+        WHERE agent_type = NEW.agent_type;
+END;
+"""
+
+
+class EvaluationStore:
+    """评估记录的SQLite存储
+
+    按ID更新/删除、按问题指纹和Agent查询都走索引；按Agent的总数/正确数和每个问题的最新记录
+    由触发器增量维护，统计和看板不需要扫描全部记录。Gradio回调在线程池中执行，连接由锁保护。
+    """
+
+    COLUMNS = ('timestamp', 'question', 'question_fingerprint', 'run_number', 'standard_answer',
+               'actual_answer', 'is_correct', 'comparison_reason', 'agent_type')
+    # 带完整响应的记录
+    FULL_SELECT = "e.*, r.full_response FROM evaluations e LEFT JOIN evaluation_responses r ON r.evaluation_id = e.id"
+    UPDATABLE_FIELDS = ('standard_answer', 'actual_answer', 'is_correct', 'comparison_reason')
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_EVALUATION_SCHEMA)
+        # 每次写入递增，供上层缓存判断是否失效；rewrite_version 为最近一次非追加写入（更新/删除/导入）的版本，
+        # 其后只有 add 时缓存可以只补读新ID（AUTOINCREMENT 保证ID递增）
+        self.version = 0
+        self.rewrite_version = 0
+
+    @staticmethod
+    def to_dict(row: sqlite3.Row) -> dict:
+        record = dict(row)
+        if 'is_correct' in record:
+            record['is_correct'] = bool(record['is_correct'])
+        return record
+
+    @contextmanager
+    def _transaction(self, rewrite: bool = True):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.version += 1
+            if rewrite:
+                self.rewrite_version = self.version
+
+    def _query(self, sql: str, params=()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _insert(self, conn, record: dict, keep_id: bool = False) -> int:
+        values = {column: record.get(column) for column in self.COLUMNS}
+        values['question'] = values['question'] or ''
+        values['question_fingerprint'] = values['question_fingerprint'] or ''
+        values['run_number'] = values['run_number'] or 1
+        values['is_correct'] = bool(values['is_correct'])
+        values['id'] = record.get('id') if keep_id else None
+        evaluation_id = conn.execute(
+            f"INSERT INTO evaluations (id, {', '.join(self.COLUMNS)}) "
+            f"VALUES (:id, {', '.join(':' + column for column in self.COLUMNS)})",
+            values
+        ).lastrowid
+        conn.execute("INSERT OR REPLACE INTO evaluation_responses (evaluation_id, full_response) VALUES (?, ?)",
+                     (evaluation_id, record.get('full_response')))
+        return evaluation_id
+
+    def add(self, evaluation: dict) -> dict:
+        """插入一条记录，run_number 为该问题在该Agent中的第几次运行，返回带ID的记录"""
+        with self._transaction(rewrite=False) as conn:
+            runs = conn.execute(
+                "SELECT COUNT(*) FROM evaluations WHERE question_fingerprint = ? AND agent_type = ?",
+                (evaluation['question_fingerprint'], evaluation['agent_type'])
+            ).fetchone()[0]
+            evaluation = dict(evaluation, run_number=runs + 1)
+            evaluation_id = self._insert(conn, evaluation)
+        return {'id': evaluation_id, **evaluation}
+
+    def import_records(self, records) -> int:
+        """导入已有记录（保留原ID和运行次数，ID重复时重新分配），返回导入条数"""
+        imported = 0
+        with self._transaction() as conn:
+            for record in records:
+                keep_id = record.get('id') is not None and not conn.execute(
+                    "SELECT 1 FROM evaluations WHERE id = ?", (record['id'],)
+                ).fetchone()
+                self._insert(conn, record, keep_id)
+                imported += 1
+        return imported
+
+    def get(self, evaluation_id: int):
+        rows = self._query(f"SELECT {self.FULL_SELECT} WHERE e.id = ?", (evaluation_id,))
+        return self.to_dict(rows[0]) if rows else None
+
+    def update(self, evaluation_id: int, fields: dict) -> bool:
+        fields = {key: value for key, value in fields.items() if key in self.UPDATABLE_FIELDS}
+        if not fields:
+            return False
+        assignments = ', '.join(f"{key} = :{key}" for key in fields)
+        with self._transaction() as conn:
+            cursor = conn.execute(f"UPDATE evaluations SET {assignments} WHERE id = :id",
+                                  {**fields, 'id': evaluation_id})
+        return cursor.rowcount > 0
+
+    def delete(self, evaluation_ids) -> int:
+        ids = list(dict.fromkeys(int(i) for i in evaluation_ids))
+        if not ids:
+            return 0
+        deleted = 0
+        with self._transaction() as conn:
+            # 分批避免超过SQLite参数个数上限
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                deleted += conn.execute(
+                    f"DELETE FROM evaluations WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                ).rowcount
+        return deleted
+
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM evaluations")
+            conn.execute("DELETE FROM evaluation_responses")
+            conn.execute("DELETE FROM latest_evaluations")
+            conn.execute("DELETE FROM agent_totals")
+
+    def backup(self, path: Path):
+        """在线备份到另一个SQLite文件"""
+        target = sqlite3.connect(str(path))
+        try:
+            with self._lock:
+                self._conn.backup(target)
+        finally:
+            target.close()
+
+    def count(self) -> int:
+        return self._query("SELECT COUNT(*) FROM evaluations")[0][0]
+
+    def totals(self) -> dict:
+        """{agent_type: {'total': n, 'correct': n}}"""
+        return {
+            row['agent_type']: {'total': row['total'], 'correct': row['correct']}
+            for row in self._query("SELECT agent_type, total, correct FROM agent_totals WHERE total > 0")
+        }
+
+    def latest(self, agent_type: str = None, limit: int = None) -> list:
+        """每个 问题×Agent 的最新记录，按时间倒序"""
+        sql = "SELECT e.* FROM latest_evaluations l JOIN evaluations e ON e.id = l.evaluation_id"
+        params = []
+        if agent_type:
+            sql += " WHERE l.agent_type = ?"
+            params.append(agent_type)
+        sql += " ORDER BY l.timestamp DESC, l.evaluation_id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self.to_dict(row) for row in self._query(sql, params)]
+
+    def latest_totals(self, agent_type: str, limit: int) -> dict:
+        """最新 limit 个问题的总数和正确数"""
+        row = self._query(
+            """SELECT COUNT(*) AS total, COALESCE(SUM(e.is_correct), 0) AS correct
+               FROM (SELECT evaluation_id FROM latest_evaluations WHERE agent_type = ?
+                     ORDER BY timestamp DESC, evaluation_id DESC LIMIT ?) l
+               JOIN evaluations e ON e.id = l.evaluation_id""",
+            (agent_type, limit)
+        )[0]
+        return {'total': row['total'], 'correct': row['correct']}
+
+    def all(self) -> list:
+        """全部记录（含完整响应），按ID顺序"""
+        return [self.to_dict(row) for row in self._query(f"SELECT {self.FULL_SELECT} ORDER BY e.id")]
+
+    def select(self, columns: str, where: str = "", params=(), order_by: str = "id") -> list:
+        sql = f"SELECT {columns} FROM evaluations"
+        if where:
+            sql += f" WHERE {where}"
+        return self._query(f"{sql} ORDER BY {order_by}", params)
+
+    def get_meta(self, key: str):
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def set_meta(self, key: str, value: str):
+        with self._transaction(rewrite=False) as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
 class EvaluationManager:
-    """评估管理器，用于记录和评估Agent查询结果"""
-    def __init__(self):
-        self.evaluations = []  # 评估记录列表
-        self.evaluation_dir = Path(__file__).parent / "test" / "result"
+    """评估管理器，用于记录和评估Agent查询结果
+
+    记录保存在 test/result/evaluations.db（SQLite）。首次启动时导入旧的 evaluations.jsonl。
+    """
+
+    # 表格列（与导出、编辑保存的列名一致）
+    TABLE_COLUMNS = ['id', 'time', 'run_number', 'question', 'standard_answer', 'actual_answer',
+                     'is_correct_str', 'comparison_reason', 'agent_type']
+    _TABLE_SELECT = """id, replace(substr(timestamp, 1, 19), 'T', ' ') AS time, run_number, question,
+        standard_answer, actual_answer,
+        CASE WHEN is_correct THEN '✓ 正确' ELSE '✗ 错误' END AS is_correct_str,
+        comparison_reason, agent_type"""
+
+    def __init__(self, evaluation_dir: Path = None):
+        self.evaluation_dir = Path(evaluation_dir) if evaluation_dir else Path(__file__).parent / "test" / "result"
         self.evaluation_dir.mkdir(parents=True, exist_ok=True)
-        # 使用固定文件名，不再每次重启创建新文件
-        self.current_evaluation_file = self.evaluation_dir / "evaluations.jsonl"
-        # 启动时加载已有的评估数据
+        self.store = EvaluationStore(self.evaluation_dir / "evaluations.db")
+        # 旧版本的JSONL文件（只在首次启动时导入）
+        self.legacy_evaluation_file = self.evaluation_dir / "evaluations.jsonl"
+        # 表格缓存：{(agent_filter, keyword): (store.version, DataFrame)}
+        self._frame_cache = {}
         self._load_existing_evaluations()
 
+    @property
+    def evaluations(self) -> list:
+        """全部评估记录（按ID顺序；会读取全表，界面和统计不使用）"""
+        return self.store.all()
+
     def extract_answer(self, response_text: str) -> str:
         """从AI响应中提取答案 - 优化版
         
@@ -228,15 +517,10 @@ class EvaluationManager:
         # 生成问题指纹（用于识别同一问题）
         question_fingerprint = self._generate_fingerprint(question)
 
-        # 计算运行次数
-        run_number = self._get_run_number(question_fingerprint, agent_type)
-
         evaluation = {
-            'id': len(self.evaluations) + 1,
             'timestamp': datetime.now().isoformat(),
             'question': question,
             'question_fingerprint': question_fingerprint,  # 问题指纹
-            'run_number': run_number,  # 运行次数
             'standard_answer': standard_answer,
             'actual_answer': actual_answer,
             'is_correct': is_correct,
@@ -245,11 +529,13 @@ class EvaluationManager:
             'full_response': actual_response
         }
 
-        self.evaluations.append(evaluation)
-        print(f"[EVALUATION] 记录 #{evaluation['id']} [{agent_type}] 第{run_number}次: {question[:50]}... -> {'✓ 正确' if is_correct else '✗ 错误'}")
-
-        # 持久化保存
-        self._save_evaluation(evaluation)
+        # 持久化保存（ID和运行次数由存储分配）
+        try:
+            evaluation = self.store.add(evaluation)
+        except sqlite3.Error as e:
+            print(f"[EVALUATION] 保存失败: {e}")
+            return evaluation
+        print(f"[EVALUATION] 记录 #{evaluation['id']} [{agent_type}] 第{evaluation['run_number']}次: {question[:50]}... -> {'✓ 正确' if is_correct else '✗ 错误'}")
 
         return evaluation
 
@@ -273,36 +559,29 @@ class EvaluationManager:
 
     def _get_run_number(self, question_fingerprint: str, agent_type: str) -> int:
         """获取该问题在该Agent中的运行次数"""
-        count = 0
-        for eval in self.evaluations:
-            if (eval.get('question_fingerprint') == question_fingerprint and
-                eval.get('agent_type') == agent_type):
-                count += 1
-        return count + 1
+        rows = self.store.select("COUNT(*)", "question_fingerprint = ? AND agent_type = ?",
+                                 (question_fingerprint, agent_type), order_by="1")
+        return rows[0][0] + 1
 
     def _load_existing_evaluations(self):
-        """启动时加载已有的评估数据"""
-        if not self.current_evaluation_file.exists():
-            print(f"[EVALUATION] 无已有评估数据")
+        """启动时导入旧版本的JSONL评估数据（只导入一次）"""
+        count = self.store.count()
+        if self.store.get_meta('legacy_jsonl_imported') or not self.legacy_evaluation_file.exists():
+            print(f"[EVALUATION] 已加载 {count} 条评估记录" if count else "[EVALUATION] 无已有评估数据")
             return
-        
-        try:
-            with open(self.current_evaluation_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        evaluation = json.loads(line)
-                        self.evaluations.append(evaluation)
-            print(f"[EVALUATION] 已加载 {len(self.evaluations)} 条评估记录")
-        except Exception as e:
-            print(f"[EVALUATION] 加载失败: {e}")
 
-    def _save_evaluation(self, evaluation: dict):
-        """保存评估记录到文件（追加到固定文件）"""
         try:
-            with open(self.current_evaluation_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(evaluation, ensure_ascii=False) + '\n')
+            with open(self.legacy_evaluation_file, 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            imported = self.store.import_records(records)
+            self.store.set_meta('legacy_jsonl_imported', str(self.legacy_evaluation_file))
+            print(f"[EVALUATION] 已从 {self.legacy_evaluation_file.name} 导入 {imported} 条评估记录")
         except Exception as e:
-            print(f"[EVALUATION] 保存失败: {e}")
+            print(f"[EVALUATION] 导入失败: {e}")
+
+    def get_evaluation(self, evaluation_id: int):
+        """按ID获取评估记录，不存在时返回None"""
+        return self.store.get(evaluation_id)
 
     def get_evaluation_dataframe(self, agent_filter: str = "全部", question_keyword: str = None) -> pd.DataFrame:
         """获取评估结果的DataFrame
@@ -314,30 +593,39 @@ class EvaluationManager:
         Returns:
             评估结果的DataFrame
         """
-        if not self.evaluations:
+        cache_key = (agent_filter, question_keyword or None)
+        cached = self._frame_cache.get(cache_key)
+        if cached and cached[0] == self.store.version:
+            return cached[1].copy()
+
+        conditions, params = [], []
+        # 缓存之后只有新增记录：只读取新ID的行追加到缓存
+        appending = cached is not None and cached[0] >= self.store.rewrite_version
+        if appending:
+            conditions.append("id > ?")
+            params.append(int(cached[1]['id'].max()) if len(cached[1]) else 0)
+        if agent_filter != "全部":
+            conditions.append("agent_type = ?")
+            params.append(agent_filter)
+        if question_keyword:
+            conditions.append("instr(lower(question), ?) > 0")
+            params.append(question_keyword.lower())
+
+        version = self.store.version
+        rows = self.store.select(self._TABLE_SELECT, " AND ".join(conditions), params)
+        if not rows and not conditions:
             return pd.DataFrame(columns=[
                 'ID', '时间', '运行次数', '问题', '标准答案', '实际答案',
                 '是否正确', '比较原因', 'Agent类型'
             ])
 
-        # 过滤评估记录
-        filtered = self.evaluations
-
-        if agent_filter != "全部":
-            filtered = [e for e in filtered if e['agent_type'] == agent_filter]
-
-        if question_keyword:
-            keyword = question_keyword.lower()
-            filtered = [e for e in filtered if keyword in e['question'].lower()]
-
-        df = pd.DataFrame(filtered)
-        df['time'] = pd.to_datetime(df['timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S')
-        df['id'] = df['id']
-        df['run_number'] = df.get('run_number', 1)
-        df['is_correct_str'] = df['is_correct'].map({True: '✓ 正确', False: '✗ 错误'})
-
-        return df[['id', 'time', 'run_number', 'question', 'standard_answer', 'actual_answer',
-                   'is_correct_str', 'comparison_reason', 'agent_type']]
+        df = pd.DataFrame.from_records(rows, columns=self.TABLE_COLUMNS)
+        if appending and rows:
+            df = pd.concat([cached[1], df], ignore_index=True)
+        elif appending:
+            df = cached[1]
+        self._frame_cache[cache_key] = (version, df)
+        return df.copy()
 
     def get_question_details(self, question_fingerprint: str, agent_type: str = None) -> pd.DataFrame:
         """获取某个问题的所有运行记录
@@ -349,20 +637,16 @@ class EvaluationManager:
         Returns:
             该问题的所有运行记录
         """
-        filtered = [e for e in self.evaluations if e.get('question_fingerprint') == question_fingerprint]
-
+        where, params = "question_fingerprint = ?", [question_fingerprint]
         if agent_type:
-            filtered = [e for e in filtered if e['agent_type'] == agent_type]
+            where += " AND agent_type = ?"
+            params.append(agent_type)
 
-        df = pd.DataFrame(filtered)
-        if len(df) == 0:
+        rows = self.store.select(self._TABLE_SELECT, where, params)
+        if not rows:
             return pd.DataFrame(columns=['ID', '时间', 'Agent类型', '运行次数', '实际答案', '是否正确'])
 
-        df['time'] = pd.to_datetime(df['timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S')
-        df['id'] = df['id']
-        df['run_number'] = df.get('run_number', 1)
-        df['is_correct_str'] = df['is_correct'].map({True: '✓ 正确', False: '✗ 错误'})
-
+        df = pd.DataFrame.from_records(rows, columns=self.TABLE_COLUMNS)
         return df[['id', 'time', 'agent_type', 'run_number', 'actual_answer', 'is_correct_str']]
 
     def search_questions(self, keyword: str) -> list[dict]:
@@ -377,29 +661,21 @@ class EvaluationManager:
         if not keyword:
             return []
 
-        keyword_lower = keyword.lower()
-        seen = {}
-
-        results = []
-        for eval in self.evaluations:
-            question = eval['question']
-            fingerprint = eval.get('question_fingerprint', '')
-
-            if keyword_lower in question.lower():
-                # 去重（同一个问题只返回一次）
-                if fingerprint not in seen:
-                    seen[fingerprint] = True
-                    results.append({
-                        'fingerprint': fingerprint,
-                        'question': question,
-                        'count': sum(1 for e in self.evaluations if e.get('question_fingerprint') == fingerprint)
-                    })
-
-        return results
+        # 同一个问题只返回一次（取最早一条匹配记录的问题文本），count 为该问题的全部运行次数
+        rows = self.store.select(
+            """question_fingerprint AS fingerprint, question, MIN(id) AS first_id,
+               (SELECT COUNT(*) FROM evaluations c WHERE c.question_fingerprint = evaluations.question_fingerprint) AS count""",
+            "instr(lower(question), ?) > 0 GROUP BY question_fingerprint",
+            (keyword.lower(),),
+            order_by="first_id"
+        )
+        return [{'fingerprint': row['fingerprint'], 'question': row['question'], 'count': row['count']}
+                for row in rows]
 
     def get_statistics(self) -> dict:
         """获取统计信息（所有记录）"""
-        if not self.evaluations:
+        totals = self.store.totals()
+        if not totals:
             return {
                 'total': 0,
                 'correct': 0,
@@ -407,20 +683,18 @@ class EvaluationManager:
                 'by_agent': {}
             }
 
-        total = len(self.evaluations)
-        correct = sum(1 for e in self.evaluations if e['is_correct'])
+        total = sum(t['total'] for t in totals.values())
+        correct = sum(t['correct'] for t in totals.values())
         accuracy = correct / total * 100 if total > 0 else 0.0
 
         # 按Agent类型统计
         by_agent = {}
         for agent in ['NL2SQL', 'Baseline']:
-            agent_evals = [e for e in self.evaluations if e['agent_type'] == agent]
-            if agent_evals:
-                agent_correct = sum(1 for e in agent_evals if e['is_correct'])
+            if agent in totals:
                 by_agent[agent] = {
-                    'total': len(agent_evals),
-                    'correct': agent_correct,
-                    'accuracy': agent_correct / len(agent_evals) * 100
+                    'total': totals[agent]['total'],
+                    'correct': totals[agent]['correct'],
+                    'accuracy': totals[agent]['correct'] / totals[agent]['total'] * 100
                 }
 
         return {
@@ -440,34 +714,12 @@ class EvaluationManager:
                 'winner': 'NL2SQL'
             }
         """
-        if not self.evaluations:
-            return {
-                'NL2SQL': {'total': 0, 'correct': 0, 'accuracy': 0.0},
-                'Baseline': {'total': 0, 'correct': 0, 'accuracy': 0.0},
-                'winner': None
-            }
-
-        # 按问题-Agent组合分组，取最新
-        results = {'NL2SQL': {}, 'Baseline': {}}
-
-        for eval in self.evaluations:
-            fp = eval.get('question_fingerprint', '')
-            agent = eval['agent_type']
-            timestamp = eval['timestamp']
-
-            # 如果该问题-Agent组合不存在，或当前记录更新
-            if fp not in results[agent] or timestamp > results[agent][fp]['timestamp']:
-                results[agent][fp] = eval
-
-        # 计算每个Agent的正确率
+        # 每个问题-Agent组合的最新记录由存储维护，按时间倒序取最新100条
         stats = {}
         for agent in ['NL2SQL', 'Baseline']:
-            # 按时间倒序排列，取最新100条（从后往前）
-            agent_evals = sorted(results[agent].values(), key=lambda x: x['timestamp'], reverse=True)
-            agent_evals = agent_evals[:100]
-
-            correct = sum(1 for e in agent_evals if e['is_correct'])
-            total = len(agent_evals)
+            latest = self.store.latest_totals(agent, 100)
+            correct = latest['correct']
+            total = latest['total']
             stats[agent] = {
                 'total': total,
                 'correct': correct,
@@ -500,7 +752,7 @@ class EvaluationManager:
         Returns:
             导出信息（包含统计）
         """
-        if not self.evaluations:
+        if not self.store.count():
             return "⚠️ 没有评估记录可导出"
 
         if not export_path:
@@ -508,15 +760,7 @@ class EvaluationManager:
             export_path = self.evaluation_dir / f"evaluation_export_{timestamp}.csv"
 
         # 按问题-Agent组合去重，只保留最新记录
-        latest_records = {}
-        for eval in self.evaluations:
-            key = (eval.get('question_fingerprint', ''), eval['agent_type'])
-            timestamp = eval['timestamp']
-            if key not in latest_records or timestamp > latest_records[key]['timestamp']:
-                latest_records[key] = eval
-        
-        # 转换为DataFrame
-        filtered_evals = list(latest_records.values())
+        filtered_evals = sorted(self.store.latest(), key=lambda e: e['id'])
         if not filtered_evals:
             return "⚠️ 没有评估记录可导出"
             
@@ -546,7 +790,7 @@ class EvaluationManager:
         Returns:
             导出信息（包含统计）
         """
-        if not self.evaluations:
+        if not self.store.count():
             return "⚠️ 没有评估记录可导出"
 
         if not export_path:
@@ -554,14 +798,7 @@ class EvaluationManager:
             export_path = self.evaluation_dir / f"evaluation_export_{timestamp}.xlsx"
 
         # 按问题-Agent组合去重，只保留最新记录
-        latest_records = {}
-        for eval in self.evaluations:
-            key = (eval.get('question_fingerprint', ''), eval['agent_type'])
-            timestamp = eval['timestamp']
-            if key not in latest_records or timestamp > latest_records[key]['timestamp']:
-                latest_records[key] = eval
-        
-        filtered_evals = list(latest_records.values())
+        filtered_evals = sorted(self.store.latest(), key=lambda e: e['id'])
         if not filtered_evals:
             return "⚠️ 没有评估记录可导出"
         
@@ -706,11 +943,7 @@ class EvaluationManager:
             (success, message): 是否成功和消息
         """
         # 查找评估记录
-        eval_record = None
-        for eval in self.evaluations:
-            if eval['id'] == evaluation_id:
-                eval_record = eval
-                break
+        eval_record = self.store.get(evaluation_id)
         
         if not eval_record:
             return False, f"未找到ID为{evaluation_id}的评估记录"
@@ -732,11 +965,9 @@ class EvaluationManager:
             updated_fields.append(f"is_correct: -> {is_correct}")
             updated_fields.append(f"comparison_reason: -> {reason}")
         
+        self.store.update(evaluation_id, eval_record)
         print(f"[EVALUATION] 更新记录 #{evaluation_id}: {', '.join(updated_fields)}")
         
-        # 重新保存到文件（覆盖原文件）
-        self._rewrite_evaluation_file()
-        
         return True, f"✓ 已更新记录 #{evaluation_id}"
 
     def delete_evaluation(self, evaluation_id: int):
@@ -748,19 +979,11 @@ class EvaluationManager:
         Returns:
             (success, message): 是否成功和消息
         """
-        # 查找并删除评估记录
-        deleted_record = None
-        self.evaluations = [e for e in self.evaluations if e['id'] != evaluation_id]
-        
-        # 检查是否删除成功
-        if len(self.evaluations) == deleted_record:
+        if not self.store.delete([evaluation_id]):
             return False, f"未找到ID为{evaluation_id}的评估记录"
         
         print(f"[EVALUATION] 删除记录 #{evaluation_id}")
         
-        # 重新保存到文件
-        self._rewrite_evaluation_file()
-        
         return True, f"✓ 已删除记录 #{evaluation_id}"
 
     def delete_evaluations(self, evaluation_ids: list):
@@ -772,42 +995,24 @@ class EvaluationManager:
         Returns:
             (success, message, count): 是否成功、消息、删除数量
         """
-        original_count = len(self.evaluations)
-        self.evaluations = [e for e in self.evaluations if e['id'] not in evaluation_ids]
-        deleted_count = original_count - len(self.evaluations)
+        deleted_count = self.store.delete(evaluation_ids)
         
         if deleted_count == 0:
             return False, "未找到可删除的记录", 0
         
         print(f"[EVALUATION] 批量删除 {deleted_count} 条记录")
         
-        # 重新保存到文件
-        self._rewrite_evaluation_file()
-        
         return True, f"✓ 已删除 {deleted_count} 条记录", deleted_count
 
-    def _rewrite_evaluation_file(self):
-        """重写评估文件（删除或更新后调用）"""
-        try:
-            # 备份原文件
-            if self.current_evaluation_file.exists():
-                backup_path = self.current_evaluation_file.with_suffix('.jsonl.bak')
-                import shutil
-                shutil.copy2(self.current_evaluation_file, backup_path)
-            
-            # 重写文件
-            with open(self.current_evaluation_file, 'w', encoding='utf-8') as f:
-                for eval in self.evaluations:
-                    f.write(json.dumps(eval, ensure_ascii=False) + '\n')
-            
-            print(f"[EVALUATION] 已重写文件: {self.current_evaluation_file}")
-        except Exception as e:
-            print(f"[EVALUATION] 重写文件失败: {e}")
-
     def clear(self):
-        """清空评估记录（仅清空内存，不删除文件）"""
-        self.evaluations = []
-        print(f"[EVALUATION] 已清空内存中的评估记录")
+        """清空评估记录（清空前备份到 evaluations.db.bak）"""
+        try:
+            self.store.backup(self.store.path.with_suffix('.db.bak'))
+        except sqlite3.Error as e:
+            print(f"[EVALUATION] 备份失败，未清空: {e}")
+            return
+        self.store.clear()
+        print(f"[EVALUATION] 已清空评估记录（备份: {self.store.path.with_suffix('.db.bak')}）")
 
     def analyze_baseline_failures(self):
         """分析 Baseline 的失败原因（按时间从后往前，每个问题只取最新，最多100条）
@@ -825,20 +1030,8 @@ class EvaluationManager:
                 'failed_questions': [失败问题列表]
             }
         """
-        # 获取 Baseline 的最新记录（每个问题只取最新）
-        baseline_latest = {}
-        for eval in self.evaluations:
-            if eval['agent_type'] == 'Baseline':
-                fp = eval.get('question_fingerprint', '')
-                timestamp = eval['timestamp']
-                if fp not in baseline_latest or timestamp > baseline_latest[fp]['timestamp']:
-                    baseline_latest[fp] = eval
-
-        # 转换为列表并按时间倒序排列（从后往前）
-        latest_evals = sorted(baseline_latest.values(), key=lambda x: x['timestamp'], reverse=True)
-
-        # 限制为100条记录（从后往前取）
-        latest_evals = latest_evals[:100]
+        # 获取 Baseline 的最新记录（每个问题只取最新，按时间倒序，最多100条）
+        latest_evals = self.store.latest('Baseline', 100)
 
         # 统计
         total = len(latest_evals)
@@ -1027,7 +1220,9 @@ class EvaluationManager:
                 'failed_questions': [...]
             }
         """
-        if not self.evaluations:
+        # 找出 NL2SQL 的最新评估结果（按时间倒序，取最新100条）
+        latest_evals = self.store.latest('NL2SQL', 100)
+        if not latest_evals and not self.store.count():
             return {
                 'total': 0,
                 'correct': 0,
@@ -1037,19 +1232,6 @@ class EvaluationManager:
                 'failed_questions': []
             }
         
-        # 找出 NL2SQL 的最新评估结果
-        nl2sql_latest = {}
-        for eval in self.evaluations:
-            if eval.get('agent_type') == 'NL2SQL':
-                fp = eval.get('question_fingerprint', '')
-                timestamp = eval['timestamp']
-                if fp not in nl2sql_latest or timestamp > nl2sql_latest[fp]['timestamp']:
-                    nl2sql_latest[fp] = eval
-        
-        # 按时间倒序排列，取最新100条
-        latest_evals = sorted(nl2sql_latest.values(), key=lambda x: x['timestamp'], reverse=True)
-        latest_evals = latest_evals[:100]
-        
         total = len(latest_evals)
         correct = sum(1 for e in latest_evals if e['is_correct'])
         failed = total - correct
@@ -1365,7 +1547,7 @@ class DbRheoWebApp:
                                 data = result.get("data", [])
                                 columns = result.get("columns", [])
                                 if data and columns:
-                                    df = pd.DataFrame(data, columns=columns)
+                                    df = pd.DataFrame(data.tuples(), columns=columns)
                                     return df, f"✓ 查询成功（{database}），返回 {len(data)} 行数据"
                                 else:
                                     return None, f"✓ 查询成功（{database}），但无数据返回"
@@ -1386,7 +1568,7 @@ class DbRheoWebApp:
                         data = result.get("data", [])
                         columns = result.get("columns", [])
                         if data and columns:
-                            df = pd.DataFrame(data, columns=columns)
+                            df = pd.DataFrame(data.tuples(), columns=columns)
                             return df, f"✓ 查询成功（默认数据库），返回 {len(data)} 行数据"
                         else:
                             return None, "✓ 查询成功（默认数据库），但无数据返回"
@@ -2519,8 +2701,6 @@ class DbRheoWebApp:
                             return "⚠️ 没有可保存的修改"
 
                         try:
-                            # 获取当前所有评估记录
-                            current_evals = self.evaluation_manager.evaluations
                             updated_count = 0
                             errors = []
 
@@ -2541,23 +2721,20 @@ class DbRheoWebApp:
                                         continue
 
                                     # 查找对应的评估记录
-                                    eval_record = None
-                                    for e in current_evals:
-                                        if e['id'] == eval_id:
-                                            eval_record = e
-                                            break
+                                    eval_record = self.evaluation_manager.get_evaluation(eval_id)
 
                                     if eval_record:
+                                        row_updates = 0
                                         # 更新字段
                                         # 标准答案
                                         if not pd.isna(row[standard_col]) and row[standard_col] != eval_record.get('standard_answer'):
                                             eval_record['standard_answer'] = row[standard_col]
-                                            updated_count += 1
+                                            row_updates += 1
 
                                         # 实际答案
                                         if not pd.isna(row[actual_col]) and row[actual_col] != eval_record.get('actual_answer'):
                                             eval_record['actual_answer'] = row[actual_col]
-                                            updated_count += 1
+                                            row_updates += 1
 
                                         # 是否正确
                                         is_correct_str = row[correct_col]
@@ -2570,25 +2747,23 @@ class DbRheoWebApp:
 
                                         if is_correct != eval_record.get('is_correct'):
                                             eval_record['is_correct'] = is_correct
-                                            updated_count += 1
+                                            row_updates += 1
 
-                                        # 如果修改了标准答案或实际答案，重新计算比较原因
-                                        if 'standard_answer' in eval_record or 'actual_answer' in eval_record:
-                                            standard_answer = eval_record['standard_answer']
-                                            actual_answer = eval_record['actual_answer']
+                                        # 有修改时重新计算比较结果，只写回该条记录
+                                        if row_updates:
                                             is_correct_new, reason = self.evaluation_manager.compare_answers(
-                                                standard_answer, actual_answer
+                                                eval_record['standard_answer'], eval_record['actual_answer']
                                             )
                                             eval_record['is_correct'] = is_correct_new
                                             eval_record['comparison_reason'] = reason
+                                            self.evaluation_manager.store.update(eval_id, eval_record)
+                                            updated_count += row_updates
 
                                 except Exception as e:
                                     eval_id_str = str(eval_id) if eval_id is not None else "未知"
                                     errors.append(f"记录ID {eval_id_str}: {str(e)}")
 
-                            # 保存到文件
                             if updated_count > 0:
-                                self.evaluation_manager._rewrite_evaluation_file()
                                 dashboard = self._get_dashboard_display()
 
                                 status_msg = f"✓ 成功保存 {updated_count} 条记录"
@@ -0,0 +1,401 @@
+"""
+并发批量测试 NL2SQL Agent 脚本（可断点续跑）
+与 batch_test.py 使用相同的答案比较和输出格式（evaluations.jsonl）
+
+核心设计：
+- N 个并发会话：每个问题一个独立的 DatabaseClient 和配置，在独立线程的事件循环中运行
+  （LLM 服务以同步生成器读取流式响应，同一事件循环内的协程无法并行等待网络）
+- 限流感知：可设每分钟最多启动的问题数（--rpm）；响应中出现限流/服务不可用错误时，
+  所有会话暂停并指数退避，该问题重新排队（不计入重试次数）
+- 单个写入任务：结果经队列交给一个任务写入，文件只打开一次，队列空闲时 flush
+- 按问题指纹断点续跑：启动时读取输出文件，已成功的指纹跳过；超时/异常的问题会重跑
+- 实时进度：完成数、准确率、吞吐（题/分钟）、预计剩余时间
+
+用法:
+    python concurrent_batch_test.py -c 4                         # 全部问题，4个并发会话
+    python concurrent_batch_test.py -c 8 --rpm 30 -o evaluations_run.jsonl   # 中断后用同一输出文件重新运行即可续跑
+    python concurrent_batch_test.py --indices 1-20,35
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# 设置标准输出编码为 UTF-8，避免 Windows GBK 编码问题
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+script_dir = Path(__file__).parent
+sys.path.insert(0, str(script_dir))
+
+# batch_test 负责 .env 加载和 sys.path 设置
+from batch_test import (
+    AnswerComparator,
+    extract_answer,
+    generate_fingerprint,
+    load_questions_and_answers,
+    project_root,
+)
+
+from dbrheo.config.base import DatabaseConfig
+
+# 错误文本中出现这些内容时视为服务端限流/暂时不可用
+RATE_LIMIT_MARKERS = (
+    '429', 'rate limit', 'ratelimit', 'too many requests', 'throttl',
+    'temporarily unavailable', 'quota', '限流',
+)
+MAX_RATE_LIMIT_REQUEUES = 10
+
+
+def parse_indices(spec: str) -> List[int]:
+    """解析 "1-20,35" 形式的序号"""
+    indices = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            indices.extend(range(int(start), int(end) + 1))
+        else:
+            indices.append(int(part))
+    return indices
+
+
+def is_rate_limited(response: str) -> bool:
+    """只检查错误文本（服务层错误chunk以 "Error:" 开头），避免答案里的数字误判为429"""
+    response = response or ''
+    if response.startswith('[ERROR]'):
+        errors = [response]
+    else:
+        errors = [line for line in response.splitlines() if line.lstrip().startswith('Error:')]
+    return any(marker in error.lower() for error in errors for marker in RATE_LIMIT_MARKERS)
+
+
+def load_checkpoint(output_file: Path) -> Set[str]:
+    """输出文件中已成功完成的问题指纹（旧格式没有 status 字段的记录也视为完成）"""
+    done = set()
+    if not output_file.exists():
+        return done
+    with open(output_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('status', 'ok') == 'ok' and record.get('question_fingerprint'):
+                done.add(record['question_fingerprint'])
+    return done
+
+
+class RateLimiter:
+    """
+    启动速率限制 + 限流退避
+    - rpm > 0 时相邻两次启动至少间隔 60/rpm 秒
+    - report_rate_limited() 后所有调用方暂停，连续限流时退避时间翻倍（上限60秒）
+    """
+
+    def __init__(self, rpm: float = 0, base_backoff: float = 5.0, max_backoff: float = 60.0):
+        self.interval = 60.0 / rpm if rpm and rpm > 0 else 0.0
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+        self._pause_until = 0.0
+        self._backoff = base_backoff
+        self.rate_limited = 0
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = max(self._next_start, self._pause_until) - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                now = time.monotonic()
+            self._next_start = now + self.interval
+
+    def report_rate_limited(self) -> float:
+        self.rate_limited += 1
+        delay = self._backoff
+        self._pause_until = max(self._pause_until, time.monotonic() + delay)
+        self._backoff = min(self._backoff * 2, self.max_backoff)
+        return delay
+
+    def report_success(self):
+        self._backoff = self.base_backoff
+
+
+class ResultWriter:
+    """单个写入任务：文件只打开一次，队列空闲时 flush"""
+
+    def __init__(self, output_file: Path):
+        self.output_file = output_file
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.written = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.output_file, 'a', encoding='utf-8') as f:
+            while True:
+                record = await self.queue.get()
+                if record is None:
+                    f.flush()
+                    return
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                self.written += 1
+                if self.queue.empty():
+                    f.flush()
+
+    async def write(self, record: dict):
+        await self.queue.put(record)
+
+    async def close(self):
+        await self.queue.put(None)
+        if self._task:
+            await self._task
+
+
+class Progress:
+    """实时吞吐和ETA"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.correct = 0
+        self.failed = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.started = time.monotonic()
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        eta = remaining / rate if rate > 0 else float('inf')
+        eta_str = f"{int(eta // 60)}m{int(eta % 60):02d}s" if eta != float('inf') else '--'
+        accuracy = self.correct / self.done * 100 if self.done else 0.0
+        return (
+            f"[{self.done}/{self.total}] 正确 {self.correct} | 错误 {self.failed} | 异常 {self.errors} | "
+            f"准确率 {accuracy:.1f}% | {rate * 60:.1f} 题/分钟 | 进行中 {self.in_flight} | "
+            f"已用 {int(elapsed)}s | ETA {eta_str}"
+        )
+
+
+def _query_in_thread(config_factory: Callable[[], DatabaseConfig], question: str, index: int, timeout: int) -> str:
+    """在当前线程新建事件循环和独立会话，执行一个问题"""
+    from dbrheo.core.client import DatabaseClient
+    from dbrheo.types.core_types import SimpleAbortSignal
+
+    async def run() -> str:
+        client = DatabaseClient(config=config_factory())
+        signal = SimpleAbortSignal()
+        session_id = f"nl2sql_test_{index}_{datetime.now().strftime('%H%M%S_%f')}"
+        parts = []
+
+        async def collect():
+            async for chunk in client.send_message_stream(
+                request=question, signal=signal, prompt_id=session_id, turns=10
+            ):
+                if chunk.get("type") == "Content" and chunk.get("value"):
+                    parts.append(chunk["value"])
+            return "".join(parts)
+
+        try:
+            return await asyncio.wait_for(collect(), timeout=timeout)
+        except asyncio.TimeoutError:
+            signal.abort()
+            return f"[TIMEOUT] 查询超时({timeout}秒)"
+
+    try:
+        return asyncio.run(run())
+    except Exception as e:
+        return f"[ERROR] 查询出错: {str(e)}"
+
+
+async def run_concurrent_batch_test(
+    questions_file: str,
+    answers_file: str,
+    output_file: str,
+    concurrency: int = 4,
+    question_indices: Optional[List[int]] = None,
+    timeout: int = 60,
+    max_retries: int = 3,
+    rpm: float = 0,
+    progress_interval: float = 10.0,
+    config_factory: Optional[Callable[[], DatabaseConfig]] = None,
+) -> Dict[str, int]:
+    """并发批量测试 NL2SQL Agent，返回统计"""
+    if config_factory is None:
+        os.chdir(str(project_root))
+        config_factory = lambda: DatabaseConfig(workspace_root=project_root)
+
+    output_path = Path(output_file)
+    qa_pairs = load_questions_and_answers(questions_file, answers_file)
+    indexed = list(enumerate(qa_pairs, 1))
+    if question_indices:
+        wanted = set(question_indices)
+        indexed = [(i, qa) for i, qa in indexed if i in wanted]
+
+    done = load_checkpoint(output_path)
+    pending = [(i, q, a) for i, (q, a) in indexed if generate_fingerprint(q) not in done]
+
+    print("=" * 80)
+    print("并发批量测试 NL2SQL Agent")
+    print("=" * 80)
+    print(f"输出文件: {output_path}")
+    print(f"问题数: {len(indexed)} | 已完成(跳过): {len(indexed) - len(pending)} | 待测试: {len(pending)}")
+    print(f"并发会话: {concurrency} | 超时: {timeout}s | 重试: {max_retries} | 限速: {rpm or '不限'} 题/分钟")
+    print("=" * 80)
+
+    progress = Progress(len(pending))
+    if not pending:
+        return {"total": 0, "correct": 0, "failed": 0, "errors": 0}
+
+    comparator = AnswerComparator()
+    limiter = RateLimiter(rpm)
+    writer = ResultWriter(output_path)
+    writer.start()
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in pending:
+        queue.put_nowait((item, 1, 0))
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="nl2sql")
+    print_lock = threading.Lock()
+
+    def report(message: str):
+        with print_lock:
+            print(message, flush=True)
+
+    async def worker():
+        while True:
+            try:
+                (index, question, standard_answer), attempt, requeues = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await limiter.acquire()
+            progress.in_flight += 1
+            started = time.monotonic()
+            try:
+                response = await loop.run_in_executor(
+                    executor, _query_in_thread, config_factory, question, index, timeout
+                )
+            finally:
+                progress.in_flight -= 1
+            elapsed = time.monotonic() - started
+
+            if is_rate_limited(response) and requeues < MAX_RATE_LIMIT_REQUEUES:
+                delay = limiter.report_rate_limited()
+                report(f"  [RATE LIMIT] Q{index} 触发限流，全部会话暂停 {delay:.0f}s 后重新排队")
+                queue.put_nowait(((index, question, standard_answer), attempt, requeues + 1))
+                continue
+
+            failed_run = response.startswith("[TIMEOUT]") or response.startswith("[ERROR]")
+            if failed_run and attempt < max_retries:
+                report(f"  [RETRY {attempt + 1}/{max_retries}] Q{index}: {response[:60]}")
+                queue.put_nowait(((index, question, standard_answer), attempt + 1, requeues))
+                continue
+            limiter.report_success()
+
+            actual_answer = extract_answer(response)
+            is_correct, reason = comparator.compare_answers(standard_answer, actual_answer)
+            status = 'ok' if not failed_run else ('timeout' if response.startswith("[TIMEOUT]") else 'error')
+            await writer.write({
+                'id': index,
+                'timestamp': datetime.now().isoformat(),
+                'question': question,
+                'question_fingerprint': generate_fingerprint(question),
+                'run_number': attempt,
+                'standard_answer': standard_answer,
+                'actual_answer': actual_answer,
+                'is_correct': is_correct,
+                'comparison_reason': reason,
+                'agent_type': 'NL2SQL',
+                'full_response': response,
+                'status': status,
+                'execution_time': round(elapsed, 2),
+            })
+
+            progress.done += 1
+            if status != 'ok':
+                progress.errors += 1
+                tag = f"[{status.upper()}]"
+            elif is_correct:
+                progress.correct += 1
+                tag = "[OK]"
+            else:
+                progress.failed += 1
+                tag = "[FAIL]"
+            report(f"  {tag} Q{index} {elapsed:.1f}s | {question[:40]} | {reason}")
+            report("  " + progress.line())
+
+    async def ticker():
+        while True:
+            await asyncio.sleep(progress_interval)
+            report("  " + progress.line())
+
+    ticker_task = asyncio.create_task(ticker()) if progress_interval > 0 else None
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        if ticker_task:
+            ticker_task.cancel()
+        await writer.close()
+        executor.shutdown(wait=False)
+
+    print("-" * 80)
+    print(progress.line())
+    if limiter.rate_limited:
+        print(f"限流次数: {limiter.rate_limited}")
+    print(f"结果已保存到: {output_path}（重新运行同一输出文件即可续跑未完成的问题）")
+    return {
+        "total": progress.done,
+        "correct": progress.correct,
+        "failed": progress.failed,
+        "errors": progress.errors,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='并发批量测试 NL2SQL Agent（可断点续跑）')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='并发会话数 (默认: 4)')
+    parser.add_argument('-o', '--output', help='输出JSONL文件；已存在时跳过其中已成功的问题')
+    parser.add_argument('-q', '--questions', default=str(project_root / 'test' / 'question' / 'automotive_questions_list_100.csv'))
+    parser.add_argument('-a', '--answers', default=str(project_root / 'test' / 'answer' / 'automotive_answers_100.csv'))
+    parser.add_argument('--indices', help='测试序号，如 "1-20,35"（默认全部）')
+    parser.add_argument('--timeout', type=int, default=60, help='单题超时秒数 (默认: 60)')
+    parser.add_argument('--retries', type=int, default=3, help='超时/异常时的最大尝试次数 (默认: 3)')
+    parser.add_argument('--rpm', type=float, default=0, help='每分钟最多启动的问题数（0为不限）')
+    parser.add_argument('--progress-interval', type=float, default=10.0, help='定时打印进度的间隔秒数')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    output_file = args.output or str(script_dir / f"evaluations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+    asyncio.run(run_concurrent_batch_test(
+        questions_file=args.questions,
+        answers_file=args.answers,
+        output_file=output_file,
+        concurrency=args.concurrency,
+        question_indices=parse_indices(args.indices) if args.indices else None,
+        timeout=args.timeout,
+        max_retries=args.retries,
+        rpm=args.rpm,
+        progress_interval=args.progress_interval,
+    ))
@@ -317,6 +317,10 @@ class DbRheoCLI:
             self._handle_model_command(cmd)
         elif cmd in COMMANDS['TOKEN']:
             self._handle_token_command()
+        elif cmd.startswith(COMMANDS['USAGE'][0]):
+            self._handle_usage_command(cmd)
+        elif cmd.startswith(COMMANDS['PROFILE'][0]):
+            self._handle_profile_command(cmd)
         elif cmd in COMMANDS['DATABASE']:
             self._handle_database_command()
         elif cmd.startswith(COMMANDS['MCP'][0]):
@@ -456,6 +460,108 @@ class DbRheoCLI:
         else:
             console.print(f"[yellow]{_('token_statistics_unavailable')}[/yellow]")
     
+    def _handle_usage_command(self, cmd: str):
+        """处理调用账本命令：/usage [分组] [天数]"""
+        from rich.markup import escape
+        from rich.table import Table
+        from dbrheo.core.usage_ledger import GROUP_BY
+        
+        ledger = getattr(self.client, 'usage_ledger', None)
+        if ledger is None:
+            console.print(f"[yellow]{_('usage_ledger_unavailable')}[/yellow]")
+            return
+        
+        group_by, since_days = 'model', None
+        for arg in cmd.split()[1:]:
+            if arg in GROUP_BY:
+                group_by = arg
+            else:
+                try:
+                    since_days = float(arg)
+                except ValueError:
+                    console.print(f"[yellow]{escape(_('usage_ledger_usage'))}[/yellow]")
+                    return
+        
+        totals = ledger.totals(since_days)
+        if not totals['calls']:
+            console.print(f"[dim]{_('usage_ledger_empty')}[/dim]")
+            return
+        
+        period = _('usage_ledger_all_time') if since_days is None else _('usage_ledger_last_days', days=f"{since_days:g}")
+        table = Table(title=_('usage_ledger_title', group=group_by, period=period), show_header=True, header_style="bold")
+        # 按消息汇总时显示消息文本，消息ID对用户没有意义
+        table.add_column("prompt" if group_by == 'message' else group_by,
+                         max_width=40, overflow="ellipsis", no_wrap=True)
+        for column in ("calls", "input", "output", "tools", "avg TTFT", "tok/s", "cost $"):
+            table.add_column(column, justify="right", no_wrap=True)
+        
+        for row in ledger.rollup(group_by, since_days=since_days):
+            cells = [
+                (row['prompt'] or row['key']) if group_by == 'message' else str(row['key']),
+                str(row['calls']),
+                f"{row['prompt_tokens'] - row['cached_tokens']:,}",
+                f"{row['completion_tokens']:,}",
+                str(row['tool_calls']),
+                f"{row['avg_ttft_ms']:.0f} ms" if row['avg_ttft_ms'] is not None else "-",
+                f"{row['avg_tokens_per_second']:.1f}" if row['avg_tokens_per_second'] is not None else "-",
+                f"{row['cost_usd']:.4f}" if row['cost_usd'] is not None else "-",
+            ]
+            table.add_row(*cells)
+        
+        console.print(table)
+        console.print(_('usage_ledger_totals',
+                        calls=totals['calls'],
+                        messages=totals['messages'],
+                        prompt=totals['prompt_tokens'] - totals['cached_tokens'],
+                        completion=totals['completion_tokens'],
+                        cost=totals['cost_usd']))
+        console.print(f"[dim]{_('usage_ledger_file', path=ledger.path)}[/dim]")
+    
+    def _handle_profile_command(self, cmd: str):
+        """处理采样分析命令：/profile [on|off|summary [次数]]"""
+        from rich.markup import escape
+        from rich.table import Table
+        from dbrheo.telemetry.profiler import get_profiler, summarize_profiles
+        
+        profiler = get_profiler()
+        parts = cmd.split()
+        action = parts[1] if len(parts) > 1 else ''
+        
+        if action == 'on':
+            profiler.enabled = True
+            console.print(f"[green]{_('profile_enabled', path=profiler.output_dir)}[/green]")
+        elif action == 'off':
+            profiler.enabled = False
+            console.print(f"[green]{_('profile_disabled')}[/green]")
+        elif action == 'summary':
+            recent = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 10
+            summary = summarize_profiles(str(profiler.output_dir), recent=recent)
+            if not summary['profiles']:
+                console.print(f"[dim]{_('profile_no_data', path=profiler.output_dir)}[/dim]")
+                return
+            table = Table(
+                title=_('profile_summary_title', count=len(summary['profiles']),
+                        samples=summary['samples'], idle=summary['idle_samples']),
+                show_header=True, header_style="bold"
+            )
+            table.add_column("function", overflow="fold")
+            for column in ("self", "self %", "total %"):
+                table.add_column(column, justify="right", no_wrap=True)
+            for item in summary['functions']:
+                table.add_row(escape(item['function']), str(item['self']),
+                              f"{item['self_pct']:.1f}", f"{item['total_pct']:.1f}")
+            console.print(table)
+        elif not action:
+            if profiler.enabled:
+                console.print(_('profile_status_on', path=profiler.output_dir))
+            else:
+                console.print(_('profile_status_off'))
+            last = profiler.last_result
+            if last:
+                console.print(f"[dim]{_('profile_last', label=last['label'], duration=last['duration_s'], samples=last['samples'], file=last.get('files', {}).get('collapsed', '-'))}[/dim]")
+        else:
+            console.print(f"[yellow]{escape(_('profile_usage'))}[/yellow]")
+    
     async def _handle_mcp_command(self, cmd: str):
         """处理 MCP 命令"""
         parts = cmd.split()
@@ -521,7 +627,8 @@ class DbRheoCLI:
                         'connected': '🟢',
                         'connecting': '🔄',
                         'disconnected': '🔴',
-                        'error': '❌'
+                        'error': '❌',
+                        'cached': '⚪'
                     }.get(status.value, '❓')
                     
                     tools = mcp_registry.get_server_tools(name)
@@ -748,6 +855,8 @@ class DbRheoCLI:
   /lang \\[code] • {_('help_lang')}
   /model \\[name] • {_('help_model')}
   /token       • {_('help_token')}
+  /usage       • {_('help_usage')}
+  /profile     • {_('help_profile')}
   /database    • {_('help_database', default='数据库连接帮助')}
   ``` 或 <<<   • {_('help_multiline')}
   ESC         • {_('help_esc')}
@@ -976,6 +1085,26 @@ class DbRheoCLI:
                 except:
                     pass
         
+        # 关闭共享HTTP连接池
+        try:
+            import asyncio
+            from dbrheo.utils.http_client import close_http_client
+            if asyncio.get_event_loop().is_running():
+                asyncio.create_task(close_http_client())
+        except:
+            pass
+        
+        # 关闭代码执行的常驻Python内核（事件循环已停止时同步杀掉）
+        try:
+            import asyncio
+            from dbrheo.tools.python_kernel import shutdown_kernel_pools, terminate_kernel_pools
+            if asyncio.get_event_loop().is_running():
+                asyncio.create_task(shutdown_kernel_pools())
+            else:
+                terminate_kernel_pools()
+        except:
+            pass
+        
         # 清理数据库客户端
         if hasattr(self, 'client') and self.client:
             # 清理工具调度器回调
@@ -41,6 +41,8 @@ COMMANDS = {
     'LANG': ['/lang', '/language'],
     'MODEL': ['/model'],  # 模型切换
     'TOKEN': ['/token'],  # Token 统计
+    'USAGE': ['/usage'],  # 跨会话调用账本
+    'PROFILE': ['/profile'],  # 采样分析
     'DATABASE': ['/database', '/db'],  # 数据库连接
     'MCP': ['/mcp']  # MCP 服务器管理
 }
@@ -191,6 +191,24 @@ class I18n:
             'help_database': '数据库连接帮助',
             'token_statistics_unavailable': 'Token 统计功能不可用',
             'no_token_usage_yet': '暂无 Token 使用记录',
+            'help_usage': '跨会话的调用账本：按模型/消息/工具/会话/天汇总 tokens、延迟和成本',
+            'usage_ledger_unavailable': '调用账本未启用（usage_ledger_enabled=false）',
+            'usage_ledger_empty': '账本中暂无记录',
+            'usage_ledger_title': '调用账本 - 按{group}汇总（{period}）',
+            'usage_ledger_all_time': '全部时间',
+            'usage_ledger_last_days': '最近 {days} 天',
+            'usage_ledger_totals': '合计：{calls} 次调用，{messages} 条消息，输入 {prompt} / 输出 {completion} tokens，约 ${cost:.4f}',
+            'usage_ledger_usage': '用法: /usage [model|message|tool|session|day] [天数]',
+            'usage_ledger_file': '账本文件：{path}',
+            'help_profile': '采样分析每条消息的调用栈和内存分配（on/off/summary）',
+            'profile_enabled': '采样分析已开启，结果写入 {path}',
+            'profile_disabled': '采样分析已关闭',
+            'profile_status_on': '采样分析：开启（{path}）',
+            'profile_status_off': '采样分析：关闭',
+            'profile_last': '最近一次：{label}，{duration:.2f}s，{samples} 个样本 → {file}',
+            'profile_usage': '用法: /profile [on|off|summary [次数]]',
+            'profile_no_data': '{path} 中暂无分析结果',
+            'profile_summary_title': '最近 {count} 次分析中最热的函数（{samples} 个样本，空闲 {idle}）',
             
             # 数据库命令相关
             'database_help_title': '数据库连接帮助',
@@ -593,6 +611,24 @@ class I18n:
             'help_database': 'データベース接続ヘルプ',
             'token_statistics_unavailable': 'Token 統計機能は使用できません',
             'no_token_usage_yet': 'まだ Token 使用記録がありません',
+            'help_usage': 'セッションをまたぐ呼び出し台帳：モデル/メッセージ/ツール/セッション/日別に tokens・遅延・コストを集計',
+            'usage_ledger_unavailable': '呼び出し台帳は無効です（usage_ledger_enabled=false）',
+            'usage_ledger_empty': '台帳に記録がありません',
+            'usage_ledger_title': '呼び出し台帳 - {group}別（{period}）',
+            'usage_ledger_all_time': '全期間',
+            'usage_ledger_last_days': '直近 {days} 日',
+            'usage_ledger_totals': '合計：{calls} 回呼び出し、{messages} メッセージ、入力 {prompt} / 出力 {completion} tokens、約 ${cost:.4f}',
+            'usage_ledger_usage': '使用法: /usage [model|message|tool|session|day] [日数]',
+            'usage_ledger_file': '台帳ファイル：{path}',
+            'help_profile': 'メッセージごとのコールスタックとメモリ割り当てをサンプリング（on/off/summary）',
+            'profile_enabled': 'サンプリング分析を有効にしました。結果は {path} に保存されます',
+            'profile_disabled': 'サンプリング分析を無効にしました',
+            'profile_status_on': 'サンプリング分析：有効（{path}）',
+            'profile_status_off': 'サンプリング分析：無効',
+            'profile_last': '直近：{label}、{duration:.2f}s、{samples} サンプル → {file}',
+            'profile_usage': '使用法: /profile [on|off|summary [回数]]',
+            'profile_no_data': '{path} に分析結果がありません',
+            'profile_summary_title': '直近 {count} 回の分析で最も時間を使った関数（{samples} サンプル、アイドル {idle}）',
             
             # データベースコマンド関連
             'database_help_title': 'データベース接続ヘルプ',
@@ -781,6 +817,8 @@ class I18n:
             'code_exec_context_comment': '# 自動注入されたコンテキスト',
             'code_exec_sql_result_comment': '# SQLクエリ結果',
             'code_exec_dataframe_comment': '# テーブルデータの場合、自動的にDataFrameに変換',
+            'code_exec_sql_handoff_comment': '# SQLクエリ結果（{rows}行）、受け渡しファイルから df として読み込み',
+            'code_exec_unknown_handle': '不明または期限切れのクエリ結果ハンドル: {handle}。クエリを再実行するか sql_result を直接渡してください',
             'code_exec_user_code_sep': '\n\n# ユーザーコード\n',
             'code_exec_js_context_comment': '// 自動注入されたコンテキスト',
             'code_exec_js_sql_comment': '// SQLクエリ結果',
@@ -973,6 +1011,7 @@ class I18n:
             'web_fetch_no_urls': 'URLを指定してください',
             'web_fetch_no_urls_error': 'URLリストが空です',
             'web_fetch_too_many_urls': 'URLが多すぎます（最大{max}個）',
+            'web_fetch_progress_start': '{total}個のURLを並行取得中...',
             'web_fetch_progress': 'URL {current}/{total} を取得中...',
             'web_fetch_all_failed': 'すべてのURL取得に失敗しました',
             'web_fetch_success_count': '{count}個のURL取得成功',
@@ -1196,6 +1235,24 @@ class I18n:
             'help_database': 'Database connection help',
             'token_statistics_unavailable': 'Token statistics not available',
             'no_token_usage_yet': 'No token usage recorded yet',
+            'help_usage': 'Cross-session call ledger: tokens, latency and cost by model/message/tool/session/day',
+            'usage_ledger_unavailable': 'Usage ledger is disabled (usage_ledger_enabled=false)',
+            'usage_ledger_empty': 'No calls recorded in the ledger yet',
+            'usage_ledger_title': 'Usage ledger - by {group} ({period})',
+            'usage_ledger_all_time': 'all time',
+            'usage_ledger_last_days': 'last {days} days',
+            'usage_ledger_totals': 'Total: {calls} calls, {messages} messages, input {prompt} / output {completion} tokens, ~${cost:.4f}',
+            'usage_ledger_usage': 'Usage: /usage [model|message|tool|session|day] [days]',
+            'usage_ledger_file': 'Ledger file: {path}',
+            'help_profile': 'Sample call stacks and allocations per message (on/off/summary)',
+            'profile_enabled': 'Profiling enabled, results are written to {path}',
+            'profile_disabled': 'Profiling disabled',
+            'profile_status_on': 'Profiling: on ({path})',
+            'profile_status_off': 'Profiling: off',
+            'profile_last': 'Last: {label}, {duration:.2f}s, {samples} samples → {file}',
+            'profile_usage': 'Usage: /profile [on|off|summary [count]]',
+            'profile_no_data': 'No profiles found in {path}',
+            'profile_summary_title': 'Hottest functions across the last {count} profiles ({samples} samples, {idle} idle)',
             
             # Database command related
             'database_help_title': 'Database Connection Help',
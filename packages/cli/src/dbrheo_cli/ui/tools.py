@@ -72,7 +72,8 @@ def show_tool_result(tool_name: str, result: Any):
     if isinstance(result, dict):
         # JSON格式化显示
         try:
-            result_str = json.dumps(result, indent=2, ensure_ascii=False)
+            from dbrheo.utils.type_converter import json_default
+            result_str = json.dumps(result, indent=2, ensure_ascii=False, default=json_default)
             console.print(result_str)
         except:
             console.print(str(result))
@@ -5,8 +5,15 @@
 
 from .base import DatabaseAdapter
 from .connection_manager import DatabaseConnectionManager
+from .result_set import ResultSet
+from .query_plan import QueryPlan, PlanNode
+from .statement_cache import PreparedStatementCache
 
 __all__ = [
     "DatabaseAdapter",
-    "DatabaseConnectionManager"
+    "DatabaseConnectionManager",
+    "ResultSet",
+    "QueryPlan",
+    "PlanNode",
+    "PreparedStatementCache"
 ]
@@ -7,12 +7,17 @@
 import asyncio
 import importlib
 import inspect
-from typing import Optional, Dict, Any, Type, Union, Callable
+import threading
+import time
+import weakref
+from typing import Optional, Dict, Any, Type, Union, Callable, List
 from ..config.base import DatabaseConfig
 from .base import DatabaseAdapter
 from .sqlite_adapter import SQLiteAdapter
 from .connection_string import ConnectionStringParser
 from ..utils.debug_logger import log_info
+from ..utils.loop_hooks import on_loop_shutdown
+from ..telemetry.metrics import get_metrics
 
 
 # 适配器注册表（避免硬编码）
@@ -21,12 +26,35 @@ _adapter_registry: Dict[str, Type[DatabaseAdapter]] = {}
 # 适配器实例缓存
 _adapter_cache: Dict[str, DatabaseAdapter] = {}
 
+# 适配器最近使用时间（monotonic秒），用于跳过空闲窗口内的健康检查
+_adapter_last_used: Dict[str, float] = {}
+
+# 每个缓存键的创建锁（singleflight），避免并发未命中时重复创建适配器和连接
+_adapter_locks: Dict[str, asyncio.Lock] = {}
+
+# 缓存键所属的事件循环（弱引用）。适配器的连接和创建锁都绑定在事件循环上，
+# 不同事件循环（并发评测的工作线程、Gradio每次请求的 asyncio.run）各自缓存，互不共享
+_adapter_loops: Dict[str, "weakref.ref"] = {}
+
+# 每个事件循环的关闭钩子句柄：循环关闭前断开该循环缓存的适配器连接
+_loop_shutdown_hooks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+# 上面几个缓存字典会被多个工作线程（各自的事件循环）同时读写，所有访问都要持有此锁。
+# 锁内只做字典操作，不跨越 await
+_cache_guard = threading.Lock()
+
+# 最近使用过的适配器在此时间窗口内不再做 SELECT 1 健康检查
+HEALTH_CHECK_IDLE_SECONDS = 30.0
+
 # 活动连接缓存（供database_connect_tool使用）
 _active_connections: Dict[str, DatabaseAdapter] = {}
 
 # 驱动检测函数注册表
 _driver_checkers: Dict[str, Callable[[], bool]] = {}
 
+# 适配器缓存命中统计（/metrics）
+_adapter_cache_stats = {"hits": 0, "misses": 0}
+
 
 def register_adapter(db_type: str, adapter_class: Type[DatabaseAdapter], 
                     driver_checker: Optional[Callable[[], bool]] = None):
@@ -144,15 +172,7 @@ async def get_adapter(
             try:
                 parser = ConnectionStringParser()
                 connection_config = parser.parse(database_name)
-                # 创建新的适配器
-                db_type = connection_config.get('type', 'sqlite').lower()
-                available, error_msg = _check_driver_available(db_type)
-                if not available:
-                    raise RuntimeError(f"数据库驱动不可用: {error_msg}")
-                adapter = await _create_adapter(db_type, connection_config)
-                # 缓存适配器
-                _adapter_cache[database_name] = adapter
-                return adapter
+                return await _get_or_create_adapter(database_name, connection_config)
             except Exception as e:
                 # 如果解析失败，继续原来的逻辑
                 pass
@@ -173,33 +193,161 @@ async def get_adapter(
         connection_config = _get_connection_config(config, database_name)
         cache_key = f"{database_name or 'default'}:{connection_config.get('type')}:{connection_config.get('database')}"
     
-    # 2. 检查缓存
-    if cache_key in _adapter_cache:
-        adapter = _adapter_cache[cache_key]
-        # 验证连接是否仍然有效
-        try:
-            if hasattr(adapter, 'health_check'):
-                await adapter.health_check()
+    return await _get_or_create_adapter(cache_key, connection_config)
+
+
+async def _get_or_create_adapter(cache_key: str, connection_config: Dict[str, Any]) -> DatabaseAdapter:
+    """
+    从缓存获取适配器，未命中时创建
+    同一缓存键同时只有一个协程执行创建，其余协程等待后直接复用结果
+    """
+    cache_key, orphans = _loop_scoped_key(cache_key)
+    for orphan in orphans:
+        await _close_orphaned_adapter(orphan)
+    
+    # 快速路径：缓存命中且无需健康检查时不获取协程锁
+    with _cache_guard:
+        adapter = _adapter_cache.get(cache_key)
+        if adapter is not None and _recently_used(cache_key):
+            _adapter_last_used[cache_key] = time.monotonic()
+            _adapter_cache_stats["hits"] += 1
             return adapter
-        except Exception:
+        lock = _adapter_locks.setdefault(cache_key, asyncio.Lock())
+        
+    async with lock:
+        # 2. 检查缓存（可能已由等待期间的其他协程创建）
+        with _cache_guard:
+            adapter = _adapter_cache.get(cache_key)
+        if adapter is not None:
+            if await _is_adapter_healthy(cache_key, adapter):
+                with _cache_guard:
+                    _adapter_last_used[cache_key] = time.monotonic()
+                    _adapter_cache_stats["hits"] += 1
+                return adapter
             # 连接失效，删除缓存
-            del _adapter_cache[cache_key]
-    
-    # 3. 确定数据库类型
-    db_type = connection_config.get('type', 'sqlite').lower()
-    
-    # 4. 检查驱动可用性
-    available, error_msg = _check_driver_available(db_type)
-    if not available:
-        raise RuntimeError(f"数据库驱动不可用: {error_msg}")
-    
-    # 5. 创建适配器
-    adapter = await _create_adapter(db_type, connection_config)
-    
-    # 6. 缓存适配器
-    _adapter_cache[cache_key] = adapter
-    
-    return adapter
+            log_info("AdapterFactory", f"Cached adapter for {cache_key} failed health check, recreating")
+            await _evict_adapter(cache_key)
+        
+        # 3. 确定数据库类型
+        db_type = connection_config.get('type', 'sqlite').lower()
+        
+        # 4. 检查驱动可用性
+        available, error_msg = _check_driver_available(db_type)
+        if not available:
+            raise RuntimeError(f"数据库驱动不可用: {error_msg}")
+        
+        # 5. 创建适配器
+        with _cache_guard:
+            _adapter_cache_stats["misses"] += 1
+        adapter = await _create_adapter(db_type, connection_config)
+        
+        # 6. 缓存适配器
+        with _cache_guard:
+            _adapter_cache[cache_key] = adapter
+            _adapter_last_used[cache_key] = time.monotonic()
+        
+        return adapter
+
+
+def _loop_scoped_key(cache_key: str) -> tuple[str, List[DatabaseAdapter]]:
+    """
+    按当前事件循环区分缓存键
+    同时移除已关闭（或已回收）事件循环留下的缓存项，返回其中的适配器，由调用方关闭连接
+    """
+    loop = asyncio.get_running_loop()
+    scoped_key = f"{cache_key}@{id(loop)}"
+    orphans: List[DatabaseAdapter] = []
+    with _cache_guard:
+        owner = _adapter_loops.get(scoped_key)
+        if owner is None or owner() is not loop:
+            # 新的事件循环（或旧循环回收后id被复用）
+            for key, ref in list(_adapter_loops.items()):
+                owner_loop = ref()
+                if key == scoped_key or owner_loop is None or owner_loop.is_closed():
+                    adapter = _drop_cache_entry(key)
+                    if adapter is not None:
+                        orphans.append(adapter)
+            _adapter_loops[scoped_key] = weakref.ref(loop)
+            if loop not in _loop_shutdown_hooks:
+                suffix = f"@{id(loop)}"
+                _loop_shutdown_hooks[loop] = on_loop_shutdown(lambda: _close_loop_adapters(suffix))
+    return scoped_key, orphans
+
+
+async def _close_loop_adapters(suffix: str) -> None:
+    """事件循环关闭前断开该循环缓存的适配器（SQL工具在调用间保持连接，由缓存负责关闭）"""
+    with _cache_guard:
+        adapters = [_drop_cache_entry(key) for key in list(_adapter_cache) if key.endswith(suffix)]
+    for adapter in adapters:
+        if adapter is not None:
+            await _shutdown_adapter(adapter)
+
+
+def _drop_cache_entry(cache_key: str) -> Optional[DatabaseAdapter]:
+    """移除缓存项并返回其适配器（调用方持有 _cache_guard）"""
+    _adapter_last_used.pop(cache_key, None)
+    _adapter_locks.pop(cache_key, None)
+    _adapter_loops.pop(cache_key, None)
+    return _adapter_cache.pop(cache_key, None)
+
+
+async def _close_orphaned_adapter(adapter: DatabaseAdapter) -> None:
+    """
+    关闭事件循环已不可用的适配器
+    - 连接池类适配器（asyncpg/aiomysql）的连接绑定在原事件循环上，用同步的 terminate 强制关闭
+    - 其余适配器（如aiosqlite，在自己的线程中执行）可以在当前事件循环中正常 disconnect
+    """
+    if hasattr(adapter, 'terminate'):
+        try:
+            adapter.terminate()
+        except Exception as e:
+            log_info("AdapterFactory", f"Error while terminating orphaned adapter: {e}")
+    else:
+        await _shutdown_adapter(adapter)
+
+
+def _recently_used(cache_key: str) -> bool:
+    """适配器是否在空闲窗口内被使用过（调用方持有 _cache_guard）"""
+    last_used = _adapter_last_used.get(cache_key)
+    return last_used is not None and time.monotonic() - last_used < HEALTH_CHECK_IDLE_SECONDS
+
+
+async def _is_adapter_healthy(cache_key: str, adapter: DatabaseAdapter) -> bool:
+    """
+    检查缓存的适配器是否可用
+    - 空闲窗口内使用过的适配器直接视为健康
+    - 未连接的适配器由调用方负责connect，无需往返数据库
+    - 其余情况执行一次health_check
+    """
+    with _cache_guard:
+        if _recently_used(cache_key):
+            return True
+    if getattr(adapter, 'connection', None) is None:
+        return True
+    if not hasattr(adapter, 'health_check'):
+        return True
+    try:
+        return bool(await adapter.health_check())
+    except Exception:
+        return False
+
+
+async def _evict_adapter(cache_key: str) -> None:
+    """从缓存移除适配器并关闭其连接"""
+    with _cache_guard:
+        adapter = _adapter_cache.pop(cache_key, None)
+        _adapter_last_used.pop(cache_key, None)
+    if adapter is not None:
+        await _shutdown_adapter(adapter)
+
+
+async def _shutdown_adapter(adapter: DatabaseAdapter) -> None:
+    """关闭适配器连接，忽略关闭过程中的错误"""
+    try:
+        if hasattr(adapter, 'disconnect'):
+            await adapter.disconnect()
+    except Exception as e:
+        log_info("AdapterFactory", f"Error while disconnecting adapter: {e}")
 
 
 async def _create_adapter(db_type: str, connection_config: Dict[str, Any]) -> DatabaseAdapter:
@@ -279,21 +427,18 @@ def _get_connection_config(config: DatabaseConfig, database_name: Optional[str])
     return connection_config
 
 
-def clear_adapter_cache():
-    """清除适配器缓存"""
-    global _adapter_cache
-    # 尝试优雅关闭所有连接
-    for adapter in _adapter_cache.values():
-        try:
-            if hasattr(adapter, 'disconnect'):
-                # 同步关闭，避免异步上下文问题
-                import asyncio
-                if asyncio.iscoroutinefunction(adapter.disconnect):
-                    asyncio.create_task(adapter.disconnect())
-        except Exception:
-            pass
+async def clear_adapter_cache():
+    """清除适配器缓存，并等待所有连接关闭完成"""
+    with _cache_guard:
+        adapters = list(_adapter_cache.values())
+        _adapter_cache.clear()
+        _adapter_last_used.clear()
+        _adapter_locks.clear()
+        _adapter_loops.clear()
     
-    _adapter_cache = {}
+    # 并发关闭所有连接，等待全部完成后再返回
+    if adapters:
+        await asyncio.gather(*(_shutdown_adapter(adapter) for adapter in adapters))
 
 
 def list_supported_databases() -> Dict[str, Dict[str, Any]]:
@@ -359,4 +504,48 @@ try:
     register_adapter('postgres', PostgreSQLAdapter, check_pg_driver)
     register_adapter('pg', PostgreSQLAdapter, check_pg_driver)
 except ImportError:
-    pass
\ No newline at end of file
+    pass
+
+
+def _collect_adapter_metrics():
+    """/metrics 采集：缓存的适配器数量、连接池使用率、适配器和语句缓存命中率（按方言汇总）"""
+    pools: Dict[str, Dict[str, int]] = {}
+    statements: Dict[str, Dict[str, int]] = {}
+    counts: Dict[str, int] = {}
+    with _cache_guard:
+        adapters = list(_adapter_cache.values())
+        adapter_stats = dict(_adapter_cache_stats)
+    for adapter in adapters:
+        dialect = adapter.get_dialect()
+        counts[dialect] = counts.get(dialect, 0) + 1
+        pool = adapter.get_pool_stats()
+        if pool:
+            totals = pools.setdefault(dialect, {"size": 0, "in_use": 0, "max_size": 0})
+            for key in totals:
+                totals[key] += pool.get(key, 0)
+        cache = adapter.get_statement_cache_stats()
+        if cache:
+            totals = statements.setdefault(dialect, {"hits": 0, "misses": 0})
+            totals["hits"] += cache.get("hits", 0)
+            totals["misses"] += cache.get("misses", 0)
+            
+    for dialect, count in counts.items():
+        yield "dbrheo_db_adapters", "gauge", {"dialect": dialect}, count
+    for dialect, pool in pools.items():
+        labels = {"dialect": dialect}
+        yield "dbrheo_db_pool_connections", "gauge", labels, pool["size"]
+        yield "dbrheo_db_pool_in_use", "gauge", labels, pool["in_use"]
+        yield "dbrheo_db_pool_max_connections", "gauge", labels, pool["max_size"]
+        yield "dbrheo_db_pool_utilization", "gauge", labels, pool["in_use"] / pool["max_size"] if pool["max_size"] else 0.0
+        
+    caches = [("adapter", adapter_stats)]
+    caches.extend((f"prepared_statement_{dialect}", stats) for dialect, stats in statements.items())
+    for name, stats in caches:
+        hits, misses = stats["hits"], stats["misses"]
+        labels = {"cache": name}
+        yield "dbrheo_cache_hits_total", "counter", labels, hits
+        yield "dbrheo_cache_misses_total", "counter", labels, misses
+        yield "dbrheo_cache_hit_ratio", "gauge", labels, hits / (hits + misses) if hits + misses else 0.0
+
+
+get_metrics().register_collector("adapters", _collect_adapter_metrics)
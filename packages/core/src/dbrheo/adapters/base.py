@@ -3,13 +3,52 @@ DatabaseAdapter基类 - 数据库适配器基础接口
 提供统一的数据库操作接口，支持多数据库方言
 """
 
+import time
 from abc import ABC, abstractmethod
+from functools import wraps
 from typing import Any, Dict, List, Optional, AsyncIterator, TYPE_CHECKING
 from ..types.core_types import AbortSignal
 from .dialect_parser import SQLDialectParser, DatabaseDialect
+from ..telemetry.tracer import traced
+from ..telemetry.metrics import get_metrics
 
 if TYPE_CHECKING:
     from .transaction_manager import DatabaseTransactionManager
+    from .query_plan import QueryPlan
+
+
+def _statement_span_attributes(adapter: "DatabaseAdapter", sql: str, *args, **kwargs) -> Dict[str, Any]:
+    return {"db.dialect": adapter.get_dialect(), "db.statement": sql[:200]}
+
+
+def traced_statement(span_name: str):
+    """
+    execute_query/execute_command 的追踪装饰器
+    - span 记录方言和语句前200个字符
+    - 耗时计入 dbrheo_db_statement_duration_seconds{dialect, operation, status}
+    """
+    operation = span_name.rsplit(".", 1)[-1]
+
+    def decorator(func):
+        traced_func = traced(span_name, attributes_from=_statement_span_attributes)(func)
+
+        @wraps(func)
+        async def wrapper(self, sql, *args, **kwargs):
+            started = time.perf_counter()
+            status = "error"
+            try:
+                result = await traced_func(self, sql, *args, **kwargs)
+                if not isinstance(result, dict) or result.get("success", True):
+                    status = "ok"
+                return result
+            finally:
+                get_metrics().histogram(
+                    "dbrheo_db_statement_duration_seconds", "SQL statement latency by dialect"
+                ).record(time.perf_counter() - started, {
+                    "dialect": self.get_dialect(), "operation": operation, "status": status
+                })
+        return wrapper
+    return decorator
 
 
 class DatabaseAdapter(ABC):
@@ -116,6 +155,27 @@ class DatabaseAdapter(ABC):
         sql = sql.rstrip().rstrip(';')
         return f"{sql} LIMIT {limit}"
         
+    async def explain_query(self, sql: str) -> Optional["QueryPlan"]:
+        """
+        获取标准化的执行计划（不实际执行查询）
+        默认实现返回None，表示该方言不支持代价估计
+        """
+        return None
+        
+    def get_statement_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        获取预编译语句缓存的命中率统计
+        默认实现返回None，表示该适配器不缓存预编译语句
+        """
+        return None
+        
+    def get_pool_stats(self) -> Optional[Dict[str, int]]:
+        """
+        获取连接池使用情况 {"size", "in_use", "max_size"}
+        默认实现返回None，表示该适配器不使用连接池
+        """
+        return None
+        
     async def health_check(self) -> bool:
         """连接健康检查"""
         try:
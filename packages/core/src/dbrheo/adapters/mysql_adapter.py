@@ -6,9 +6,13 @@ MySQL数据库适配器 - 支持MySQL和MariaDB
 
 import aiomysql
 from typing import Any, Dict, List, Optional
-from .base import DatabaseAdapter
+from .base import DatabaseAdapter, traced_statement
 from ..types.core_types import AbortSignal
-from ..utils.type_converter import convert_rows_to_serializable
+from .result_set import ResultSet
+from .query_plan import QueryPlan, normalize_mysql_plan
+from .statement_cache import (
+    DEFAULT_STATEMENT_CACHE_SIZE, PreparedStatement, PreparedStatementCache, translate_named_params
+)
 from ..utils.debug_logger import log_info, DebugLogger
 
 
@@ -32,6 +36,10 @@ class MySQLAdapter(DatabaseAdapter):
         self.connection = None
         self.pool = None
         self.dialect_parser = None  # 初始化为None，需要时才创建
+        # 参数化语句的占位符转换缓存（不含服务端状态，随适配器实例保留，重连后仍然有效），statement_cache_size=0 时不缓存
+        self.statement_cache = PreparedStatementCache(
+            config.get('statement_cache_size', DEFAULT_STATEMENT_CACHE_SIZE)
+        )
         
         # 提取连接参数（支持多种配置格式）
         self.connection_params = self._prepare_connection_params(config)
@@ -79,7 +87,9 @@ class MySQLAdapter(DatabaseAdapter):
         return params
         
     async def connect(self) -> None:
-        """建立MySQL连接"""
+        """建立MySQL连接（已连接时直接返回）"""
+        if self.connection is not None:
+            return
         try:
             # 记录连接参数（隐藏密码）
             debug_params = self.connection_params.copy()
@@ -123,6 +133,16 @@ class MySQLAdapter(DatabaseAdapter):
             self.connection = None
             self.pool = None
             
+    def terminate(self) -> None:
+        """同步强制关闭连接和连接池（所属事件循环已关闭、无法await disconnect时使用）"""
+        if self.pool:
+            self.pool.terminate()
+        elif self.connection:
+            self.connection.close()
+        self.connection = None
+        self.pool = None
+        
+    @traced_statement("db.execute_query")
     async def execute_query(
         self, 
         sql: str, 
@@ -133,7 +153,8 @@ class MySQLAdapter(DatabaseAdapter):
         if not self.connection:
             raise Exception("Database not connected")
             
-        async with self.connection.cursor(aiomysql.DictCursor) as cursor:
+        # 使用普通游标获取行元组，列名只保存一次
+        async with self.connection.cursor() as cursor:
             try:
                 # 检查中止信号
                 if signal and signal.aborted:
@@ -141,7 +162,8 @@ class MySQLAdapter(DatabaseAdapter):
                 
                 # MySQL使用%s作为参数占位符
                 if params:
-                    await cursor.execute(sql, list(params.values()))
+                    statement = self._prepare(sql, params)
+                    await cursor.execute(statement.sql, statement.bind(params))
                 else:
                     await cursor.execute(sql)
                 
@@ -151,18 +173,57 @@ class MySQLAdapter(DatabaseAdapter):
                 # 获取列信息
                 columns = [desc[0] for desc in cursor.description] if cursor.description else []
                 
-                # 转换为可序列化的类型
-                serializable_rows = convert_rows_to_serializable(rows)
+                # 转换为紧凑结果集（可序列化类型）
+                result_set = ResultSet.from_records(columns, list(rows))
                 
                 return {
                     "columns": columns,
-                    "rows": serializable_rows,
-                    "row_count": len(rows)
+                    "result_set": result_set,
+                    "rows": result_set,  # 惰性字典视图，兼容旧格式
+                    "row_count": len(result_set)
                 }
                 
             except Exception as e:
                 raise Exception(f"Query execution failed: {str(e)}")
             
+    def _prepare(self, sql: str, params: Optional[Dict[str, Any]]) -> PreparedStatement:
+        """
+        获取缓存的语句，命名参数只在首次使用时转换为%s
+        aiomysql只支持文本协议，无法使用服务端预编译，这里缓存占位符转换和绑定顺序
+        """
+        key = self.statement_cache.make_key(sql, params)
+        statement = self.statement_cache.get(key)
+        if statement is None:
+            translated, param_order = translate_named_params(sql, params, "format")
+            statement = PreparedStatement(translated, param_order)
+            self.statement_cache.put(key, statement)
+        return statement
+        
+    def get_statement_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """语句缓存的命中率统计"""
+        return self.statement_cache.stats()
+        
+    def get_pool_stats(self) -> Optional[Dict[str, int]]:
+        """aiomysql连接池使用情况（适配器自身长期占用一个连接）"""
+        if not self.pool:
+            return None
+        return {
+            "size": self.pool.size,
+            "in_use": self.pool.size - self.pool.freesize,
+            "max_size": self.pool.maxsize
+        }
+        
+    async def explain_query(self, sql: str) -> Optional[QueryPlan]:
+        """使用 EXPLAIN FORMAT=JSON 获取执行计划（不执行查询）"""
+        if not self.connection:
+            raise Exception("Database not connected")
+            
+        async with self.connection.cursor() as cursor:
+            await cursor.execute(f"EXPLAIN FORMAT=JSON {sql.strip().rstrip(';')}")
+            row = await cursor.fetchone()
+        return normalize_mysql_plan(row[0]) if row else None
+        
+    @traced_statement("db.execute_command")
     async def execute_command(
         self, 
         sql: str, 
@@ -179,7 +240,8 @@ class MySQLAdapter(DatabaseAdapter):
                     raise Exception("Command aborted")
                 
                 if params:
-                    await cursor.execute(sql, list(params.values()))
+                    statement = self._prepare(sql, params)
+                    await cursor.execute(statement.sql, statement.bind(params))
                 else:
                     await cursor.execute(sql)
                 
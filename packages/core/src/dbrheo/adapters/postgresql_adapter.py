@@ -7,9 +7,13 @@ PostgreSQL数据库适配器 - 支持PostgreSQL及其衍生版本
 import asyncpg
 import json
 from typing import Any, Dict, List, Optional, Union
-from .base import DatabaseAdapter
+from .base import DatabaseAdapter, traced_statement
 from ..types.core_types import AbortSignal
-from ..utils.type_converter import convert_to_serializable
+from .result_set import ResultSet
+from .query_plan import QueryPlan, normalize_postgres_plan
+from .statement_cache import (
+    DEFAULT_STATEMENT_CACHE_SIZE, PreparedStatement, PreparedStatementCache, translate_named_params
+)
 
 
 class PostgreSQLAdapter(DatabaseAdapter):
@@ -19,6 +23,7 @@ class PostgreSQLAdapter(DatabaseAdapter):
     - 支持PostgreSQL高级特性（JSON、数组、自定义类型等）
     - 智能连接池管理
     - 完整的元数据查询
+    - 按连接缓存预编译语句，重复的元数据查询跳过解析和规划
     """
     
     def __init__(self, config: Dict[str, Any]):
@@ -32,6 +37,10 @@ class PostgreSQLAdapter(DatabaseAdapter):
         self.connection = None
         self.pool = None
         self.dialect_parser = None  # 初始化为None，需要时才创建
+        # 预编译语句与连接绑定，statement_cache_size=0 时不使用
+        self.statement_cache = PreparedStatementCache(
+            config.get('statement_cache_size', DEFAULT_STATEMENT_CACHE_SIZE)
+        )
         
         # 准备连接参数
         self.connection_params = self._prepare_connection_params(config)
@@ -85,7 +94,9 @@ class PostgreSQLAdapter(DatabaseAdapter):
         return params
         
     async def connect(self) -> None:
-        """建立PostgreSQL连接"""
+        """建立PostgreSQL连接（已连接时直接返回）"""
+        if self.connection is not None:
+            return
         try:
             # 判断是否使用连接池
             if 'max_size' in self.connection_params:
@@ -124,6 +135,8 @@ class PostgreSQLAdapter(DatabaseAdapter):
             
     async def disconnect(self) -> None:
         """关闭PostgreSQL连接"""
+        # 预编译语句随连接失效（SQL工具在调用间保持连接，缓存在整个连接生命周期内有效）
+        self.statement_cache.clear()
         if self.connection:
             if self.pool:
                 # 释放连接回池
@@ -134,6 +147,17 @@ class PostgreSQLAdapter(DatabaseAdapter):
             self.connection = None
             self.pool = None
             
+    def terminate(self) -> None:
+        """同步强制关闭连接和连接池（所属事件循环已关闭、无法await disconnect时使用）"""
+        self.statement_cache.clear()
+        if self.pool:
+            self.pool.terminate()
+        elif self.connection:
+            self.connection.terminate()
+        self.connection = None
+        self.pool = None
+        
+    @traced_statement("db.execute_query")
     async def execute_query(
         self, 
         sql: str, 
@@ -149,42 +173,73 @@ class PostgreSQLAdapter(DatabaseAdapter):
             if signal and signal.aborted:
                 raise Exception("Query aborted")
             
-            # PostgreSQL使用$1, $2等作为参数占位符
-            if params:
-                # 转换参数格式
-                values = list(params.values())
-                # 替换SQL中的参数占位符
-                for i, (key, value) in enumerate(params.items(), 1):
-                    sql = sql.replace(f":{key}", f"${i}")
-                    sql = sql.replace(f"%({key})s", f"${i}")
-                
-                rows = await self.connection.fetch(sql, *values)
+            if self.statement_cache.capacity:
+                # 使用缓存的预编译语句，跳过重复的解析和规划
+                statement = await self._prepare(sql, params)
+                try:
+                    rows = await statement.handle.fetch(*statement.bind(params))
+                except asyncpg.exceptions.InvalidCachedStatementError:
+                    # 表结构变化导致缓存的语句失效，重新准备一次
+                    self.statement_cache.discard(self.statement_cache.make_key(sql, params))
+                    statement = await self._prepare(sql, params)
+                    rows = await statement.handle.fetch(*statement.bind(params))
+                # 空结果也能拿到列名
+                columns = [attr.name for attr in statement.handle.get_attributes()]
             else:
-                rows = await self.connection.fetch(sql)
-            
-            # asyncpg返回Record对象，需要转换
-            result_rows = []
-            columns = []
+                # PostgreSQL使用$1, $2等作为参数占位符
+                translated, param_order = translate_named_params(sql, params, "numeric")
+                values = PreparedStatement(translated, param_order).bind(params)
+                rows = await self.connection.fetch(translated, *values)
+                columns = list(rows[0].keys()) if rows else []
             
-            if rows:
-                # 获取列名
-                columns = list(rows[0].keys())
-                # 转换每一行
-                for row in rows:
-                    result_rows.append(dict(row))
-            
-            # 转换为可序列化的类型
-            serializable_rows = [convert_to_serializable(row) for row in result_rows]
+            # asyncpg返回Record对象，转换为紧凑的行元组
+            result_set = ResultSet.from_records(columns, rows)
             
             return {
                 "columns": columns,
-                "rows": serializable_rows,
-                "row_count": len(result_rows)
+                "result_set": result_set,
+                "rows": result_set,  # 惰性字典视图，兼容旧格式
+                "row_count": len(result_set)
             }
             
         except Exception as e:
             raise Exception(f"Query execution failed: {str(e)}")
             
+    async def _prepare(self, sql: str, params: Optional[Dict[str, Any]]) -> PreparedStatement:
+        """获取预编译语句，命名参数只在首次准备时转换"""
+        key = self.statement_cache.make_key(sql, params)
+        statement = self.statement_cache.get(key)
+        if statement is None:
+            translated, param_order = translate_named_params(sql, params, "numeric")
+            handle = await self.connection.prepare(translated)
+            statement = PreparedStatement(translated, param_order, handle)
+            self.statement_cache.put(key, statement)
+        return statement
+        
+    def get_statement_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """预编译语句缓存的命中率统计"""
+        return self.statement_cache.stats()
+        
+    def get_pool_stats(self) -> Optional[Dict[str, int]]:
+        """asyncpg连接池使用情况（适配器自身长期占用一个连接）"""
+        if not self.pool:
+            return None
+        size = self.pool.get_size()
+        return {
+            "size": size,
+            "in_use": size - self.pool.get_idle_size(),
+            "max_size": self.pool.get_max_size()
+        }
+        
+    async def explain_query(self, sql: str) -> Optional[QueryPlan]:
+        """使用 EXPLAIN (FORMAT JSON) 获取执行计划（不执行查询）"""
+        if not self.connection:
+            raise Exception("Database not connected")
+            
+        raw = await self.connection.fetchval(f"EXPLAIN (FORMAT JSON) {sql.strip().rstrip(';')}")
+        return normalize_postgres_plan(raw)
+        
+    @traced_statement("db.execute_command")
     async def execute_command(
         self, 
         sql: str, 
@@ -201,12 +256,9 @@ class PostgreSQLAdapter(DatabaseAdapter):
             
             # 参数处理
             if params:
-                values = list(params.values())
-                for i, (key, value) in enumerate(params.items(), 1):
-                    sql = sql.replace(f":{key}", f"${i}")
-                    sql = sql.replace(f"%({key})s", f"${i}")
-                
-                result = await self.connection.execute(sql, *values)
+                translated, param_order = translate_named_params(sql, params, "numeric")
+                values = PreparedStatement(translated, param_order).bind(params)
+                result = await self.connection.execute(translated, *values)
             else:
                 result = await self.connection.execute(sql)
             
@@ -282,14 +334,14 @@ class PostgreSQLAdapter(DatabaseAdapter):
             # 处理表信息
             for table in tables_result["rows"]:
                 table_name = table["name"]
-                # 获取表的行数估计
-                count_query = f"""
+                # 获取表的行数估计（参数化后所有表共用一条预编译语句）
+                count_query = """
                     SELECT reltuples::BIGINT as estimated_rows
                     FROM pg_class
-                    WHERE oid = '{schema_name}.{table_name}'::regclass
+                    WHERE oid = $1::regclass
                 """
                 try:
-                    count_result = await self.execute_query(count_query)
+                    count_result = await self.execute_query(count_query, {"table": f"{schema_name}.{table_name}"})
                     estimated_rows = count_result["rows"][0]["estimated_rows"] if count_result["rows"] else 0
                 except:
                     estimated_rows = 0
@@ -0,0 +1,358 @@
+"""
+执行计划标准化 - 将各方言的EXPLAIN输出转换为统一的计划树
+PostgreSQL: EXPLAIN (FORMAT JSON)，MySQL: EXPLAIN FORMAT=JSON，SQLite: EXPLAIN QUERY PLAN
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+
+# SQLite没有统计信息时，索引等值查找的行数估计（与SQLite查询规划器的默认假设一致）
+SQLITE_INDEX_LOOKUP_ROWS = 10
+# 主键/唯一索引的等值查找最多返回一行
+SQLITE_UNIQUE_LOOKUP_ROWS = 1
+
+
+@dataclass
+class PlanNode:
+    """计划树节点"""
+    operation: str
+    relation: Optional[str] = None
+    estimated_rows: Optional[float] = None
+    estimated_cost: Optional[float] = None
+    full_scan: bool = False
+    detail: Optional[str] = None
+    children: List["PlanNode"] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"operation": self.operation}
+        if self.relation:
+            result["relation"] = self.relation
+        if self.estimated_rows is not None:
+            result["estimated_rows"] = self.estimated_rows
+        if self.estimated_cost is not None:
+            result["estimated_cost"] = self.estimated_cost
+        if self.full_scan:
+            result["full_scan"] = True
+        if self.detail:
+            result["detail"] = self.detail
+        if self.children:
+            result["children"] = [child.to_dict() for child in self.children]
+        return result
+
+    def walk(self):
+        """深度优先遍历所有节点"""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+@dataclass
+class QueryPlan:
+    """标准化后的执行计划"""
+    dialect: str
+    root: PlanNode
+    estimated_rows: Optional[float] = None
+    estimated_cost: Optional[float] = None
+    warnings: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "dialect": self.dialect,
+            "estimated_rows": self.estimated_rows,
+            "estimated_cost": self.estimated_cost,
+            "warnings": self.warnings,
+            "plan": self.root.to_dict()
+        }
+
+    def format_tree(self, max_lines: int = 30) -> str:
+        """格式化为缩进的文本树，用于显示"""
+        lines: List[str] = []
+
+        def _visit(node: PlanNode, depth: int):
+            if len(lines) >= max_lines:
+                return
+            text = node.operation
+            if node.relation:
+                text += f" {node.relation}"
+            extras = []
+            if node.estimated_rows is not None:
+                extras.append(f"rows≈{node.estimated_rows:,.0f}")
+            if node.estimated_cost is not None:
+                extras.append(f"cost≈{node.estimated_cost:,.2f}")
+            if extras:
+                text += f" ({', '.join(extras)})"
+            lines.append("  " * depth + text)
+            for child in node.children:
+                _visit(child, depth + 1)
+
+        _visit(self.root, 0)
+        return "\n".join(lines)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _collect_warnings(root: PlanNode, full_scan_rows: float = 10000) -> List[str]:
+    """根据计划树生成通用的风险提示"""
+    warnings = []
+    for node in root.walk():
+        if node.full_scan and node.relation and (node.estimated_rows or 0) >= full_scan_rows:
+            warnings.append(f"Full scan on {node.relation} (~{node.estimated_rows:,.0f} rows)")
+    return warnings
+
+
+# ---- PostgreSQL ----
+
+def normalize_postgres_plan(raw: Any) -> QueryPlan:
+    """标准化 EXPLAIN (FORMAT JSON) 的输出"""
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    if isinstance(raw, list):
+        raw = raw[0] if raw else {}
+    plan = raw.get("Plan", raw)
+    cartesian: List[str] = []
+
+    def _convert(node: Dict[str, Any]) -> PlanNode:
+        node_type = node.get("Node Type", "Unknown")
+        converted = PlanNode(
+            operation=node_type,
+            relation=node.get("Relation Name"),
+            estimated_rows=_to_float(node.get("Plan Rows")),
+            estimated_cost=_to_float(node.get("Total Cost")),
+            full_scan=node_type == "Seq Scan",
+            detail=node.get("Join Type") or node.get("Index Name")
+        )
+        converted.children = [_convert(child) for child in node.get("Plans", [])]
+        # 没有连接条件的嵌套循环即笛卡尔积
+        if node_type == "Nested Loop" and not node.get("Join Filter") and not any(
+            "Index" in child.operation for child in converted.children
+        ):
+            cartesian.append(f"Nested loop without join condition (~{converted.estimated_rows or 0:,.0f} rows, possible cartesian product)")
+        return converted
+
+    root = _convert(plan)
+    warnings = _collect_warnings(root) + cartesian
+    return QueryPlan(
+        dialect="postgresql",
+        root=root,
+        estimated_rows=root.estimated_rows,
+        estimated_cost=root.estimated_cost,
+        warnings=warnings
+    )
+
+
+# ---- MySQL ----
+
+def normalize_mysql_plan(raw: Any) -> QueryPlan:
+    """标准化 EXPLAIN FORMAT=JSON 的输出"""
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    query_block = raw.get("query_block", raw)
+
+    def _table_node(table: Dict[str, Any]) -> PlanNode:
+        access_type = table.get("access_type", "")
+        cost_info = table.get("cost_info", {})
+        return PlanNode(
+            operation=f"Table access ({access_type})" if access_type else "Table access",
+            relation=table.get("table_name"),
+            estimated_rows=_to_float(table.get("rows_produced_per_join", table.get("rows_examined_per_scan"))),
+            estimated_cost=_to_float(cost_info.get("prefix_cost") or cost_info.get("read_cost")),
+            full_scan=access_type == "ALL",
+            detail=table.get("key")
+        )
+
+    def _convert(name: str, block: Any) -> Optional[PlanNode]:
+        if name == "table" and isinstance(block, dict):
+            node = _table_node(block)
+            # 物化子查询等嵌套结构
+            for key, value in block.items():
+                if isinstance(value, dict) and key != "cost_info":
+                    child = _convert(key, value)
+                    if child:
+                        node.children.append(child)
+            return node
+        if name == "nested_loop" and isinstance(block, list):
+            node = PlanNode(operation="Nested Loop")
+            for item in block:
+                for key, value in item.items():
+                    child = _convert(key, value)
+                    if child:
+                        node.children.append(child)
+            if node.children:
+                node.estimated_rows = node.children[-1].estimated_rows
+                node.estimated_cost = node.children[-1].estimated_cost
+            return node
+        if isinstance(block, dict):
+            node = PlanNode(operation=name.replace("_", " ").title())
+            for key, value in block.items():
+                child = _convert(key, value)
+                if child:
+                    node.children.append(child)
+            if not node.children:
+                return None
+            node.estimated_rows = node.children[-1].estimated_rows
+            node.estimated_cost = node.children[-1].estimated_cost
+            return node
+        if isinstance(block, list):
+            children = [c for c in (_convert(name, item) for item in block) if c]
+            if not children:
+                return None
+            return PlanNode(operation=name.replace("_", " ").title(), children=children)
+        return None
+
+    root = _convert("query_block", query_block) or PlanNode(operation="Query Block")
+    cost = _to_float(query_block.get("cost_info", {}).get("query_cost"))
+    if cost is not None:
+        root.estimated_cost = cost
+    return QueryPlan(
+        dialect="mysql",
+        root=root,
+        estimated_rows=root.estimated_rows,
+        estimated_cost=root.estimated_cost,
+        warnings=_collect_warnings(root)
+    )
+
+
+# ---- SQLite ----
+
+_SQLITE_LOOP_PATTERN = re.compile(r'^(SCAN|SEARCH)\s+(?:TABLE\s+)?("[^"]+"|\S+)', re.IGNORECASE)
+
+
+# FROM子句：到 WHERE/GROUP/ORDER/LIMIT 等子句、右括号或下一个SELECT为止（不包含SELECT列表中的逗号）
+_SQLITE_FROM_CLAUSE_PATTERN = re.compile(
+    r'\bFROM\b(.*?)(?=\b(?:WHERE|GROUP|ORDER|LIMIT|HAVING|UNION|EXCEPT|INTERSECT|WINDOW|SELECT|FROM)\b|[();]|$)',
+    re.IGNORECASE | re.DOTALL
+)
+_SQLITE_ALIAS_PATTERN = re.compile(
+    r'(?:^|,|\bJOIN)\s*("[^"]+"|[\w.]+)\s+(?:AS\s+)?("[^"]+"|\w+)', re.IGNORECASE
+)
+_SQL_KEYWORDS = frozenset({
+    "WHERE", "ON", "USING", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "NATURAL",
+    "OUTER", "GROUP", "ORDER", "LIMIT", "HAVING", "UNION", "EXCEPT", "INTERSECT", "WINDOW",
+    "INDEXED", "NOT", "AS", "SELECT", "FROM", "VALUES"
+})
+_SQLITE_SEARCH_TERMS_PATTERN = re.compile(r'\(([^()]*)\)\s*$')
+
+
+def sqlite_table_aliases(sql: str) -> Dict[str, str]:
+    """
+    解析 FROM/JOIN 中的表别名（新版SQLite的计划只输出别名，如 "SCAN c"）
+    只解析FROM子句；基于正则的近似解析，无法识别的别名会被忽略
+    """
+    aliases = {}
+    for clause in _SQLITE_FROM_CLAUSE_PATTERN.findall(sql):
+        for table, alias in _SQLITE_ALIAS_PATTERN.findall(clause.strip()):
+            if alias.upper() in _SQL_KEYWORDS or table.upper() in _SQL_KEYWORDS:
+                continue
+            aliases[alias.strip('"')] = table.strip('"')
+    return aliases
+
+
+def _sqlite_equality_columns(detail: str) -> set:
+    """SEARCH步骤中等值匹配的列，如 "(region=? AND code=?)" -> {"region", "code"}"""
+    match = _SQLITE_SEARCH_TERMS_PATTERN.search(detail)
+    if not match:
+        return set()
+    columns = set()
+    for term in match.group(1).split(" AND "):
+        column, _, value = term.strip().partition("=")
+        if value == "?" and column:
+            columns.add(column.lower())
+    return columns
+
+
+def sqlite_plan_tables(rows: Sequence[Sequence[Any]]) -> List[str]:
+    """提取 EXPLAIN QUERY PLAN 中被扫描的表名"""
+    tables = []
+    for row in rows:
+        match = _SQLITE_LOOP_PATTERN.match(str(row[-1]))
+        if match:
+            name = match.group(2).strip('"')
+            if name not in tables:
+                tables.append(name)
+    return tables
+
+
+def normalize_sqlite_plan(rows: Sequence[Sequence[Any]], table_rows: Optional[Dict[str, int]] = None,
+                          unique_keys: Optional[Dict[str, List[Sequence[str]]]] = None) -> QueryPlan:
+    """
+    标准化 EXPLAIN QUERY PLAN 的输出（id, parent, notused, detail）
+    SQLite不提供行数估计：全表扫描使用表的行数估计（table_rows），
+    rowid或唯一键（unique_keys，计划中的表名 -> 唯一键列）等值查找按1行，其他索引查找按固定选择性估计，
+    同一层级的循环按嵌套循环连接相乘
+    """
+    table_rows = table_rows or {}
+    unique_keys = unique_keys or {}
+    root = PlanNode(operation="Query")
+    nodes: Dict[int, PlanNode] = {0: root}
+
+    for row in rows:
+        node_id, parent_id, detail = row[0], row[1], str(row[-1])
+        node = PlanNode(operation=detail)
+        match = _SQLITE_LOOP_PATTERN.match(detail)
+        if match:
+            kind = match.group(1).upper()
+            relation = match.group(2).strip('"')
+            total = table_rows.get(relation)
+            node.operation = kind
+            node.relation = relation
+            # "SCAN t USING COVERING INDEX" 仍然读取全部行
+            if kind == "SCAN":
+                node.full_scan = True
+                node.estimated_rows = float(total) if total is not None else None
+            else:
+                lookup = total
+                if " USING " in detail.upper():
+                    equality = _sqlite_equality_columns(detail)
+                    unique = "rowid" in equality or any(
+                        key and {column.lower() for column in key} <= equality
+                        for key in unique_keys.get(relation, [])
+                    )
+                    lookup = SQLITE_UNIQUE_LOOKUP_ROWS if unique else SQLITE_INDEX_LOOKUP_ROWS
+                if total is not None and lookup is not None:
+                    lookup = min(lookup, total)
+                node.estimated_rows = float(lookup) if lookup is not None else None
+        nodes[node_id] = node
+        nodes.get(parent_id, root).children.append(node)
+
+    def _estimate(node: PlanNode) -> Optional[float]:
+        # 同一层级的SCAN/SEARCH按嵌套循环连接相乘，其余子树取最大值
+        product: Optional[float] = None
+        other: Optional[float] = None
+        for child in node.children:
+            child_rows = _estimate(child)
+            if child.operation in ("SCAN", "SEARCH"):
+                if child.estimated_rows is not None:
+                    product = child.estimated_rows if product is None else product * child.estimated_rows
+            elif child_rows is not None:
+                other = child_rows if other is None else max(other, child_rows)
+        if node.operation in ("SCAN", "SEARCH"):
+            return node.estimated_rows
+        estimate = product if product is not None else other
+        if node.estimated_rows is None:
+            node.estimated_rows = estimate
+        return estimate
+
+    _estimate(root)
+    warnings = _collect_warnings(root)
+    full_scans = [c for c in root.children if c.full_scan]
+    if len(full_scans) > 1:
+        warnings.append(
+            "Nested full scans on " + ", ".join(c.relation or "?" for c in full_scans)
+            + " (possible cartesian product)"
+        )
+    return QueryPlan(
+        dialect="sqlite",
+        root=root,
+        estimated_rows=root.estimated_rows,
+        # SQLite没有代价单位，使用估计扫描行数作为代价
+        estimated_cost=root.estimated_rows,
+        warnings=warnings
+    )
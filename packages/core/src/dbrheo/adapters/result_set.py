@@ -0,0 +1,159 @@
+"""
+ResultSet - 紧凑的查询结果表示
+列名只保存一次，行数据以元组存储；按需提供字典视图和列数组，兼容旧的rows字典列表格式
+"""
+
+from array import array
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence as SequenceType, Union
+from ..utils.type_converter import convert_to_serializable
+
+
+# 无需转换即可JSON序列化的基础类型（按type精确匹配，避免bool/int子类歧义）
+_PLAIN_TYPES = frozenset({int, float, str, bool, type(None)})
+
+
+def _to_plain_row(row: SequenceType[Any]) -> tuple:
+    """将一行数据转换为只包含可序列化值的元组"""
+    for value in row:
+        if type(value) not in _PLAIN_TYPES:
+            return tuple(convert_to_serializable(v) for v in row)
+    return row if type(row) is tuple else tuple(row)
+
+
+class ResultSet(Sequence):
+    """
+    紧凑的查询结果集
+    - 列名只保存一次，行以元组保存（相比字典列表内存占用小得多）
+    - 作为序列访问时返回惰性构造的行字典，兼容 result['rows'][0]['col'] 等旧用法
+    - column() 在类型允许时返回 NumPy/array 支持的列数组
+    """
+
+    __slots__ = ("columns", "_rows", "_column_index", "_column_cache")
+
+    def __init__(self, columns: List[str], rows: Optional[List[tuple]] = None):
+        self.columns: List[str] = list(columns)
+        self._rows: List[tuple] = rows if rows is not None else []
+        self._column_index: Dict[str, int] = {name: i for i, name in enumerate(self.columns)}
+        self._column_cache: Dict[str, Any] = {}
+
+    @classmethod
+    def from_records(cls, columns: List[str], records: Iterable[SequenceType[Any]]) -> "ResultSet":
+        """
+        从驱动返回的记录（元组、asyncpg.Record等）构建结果集
+        传入list时原地转换，避免额外复制一份全量数据
+        """
+        if isinstance(records, list):
+            for i, record in enumerate(records):
+                records[i] = _to_plain_row(record)
+            return cls(columns, records)
+        return cls(columns, [_to_plain_row(record) for record in records])
+
+    @classmethod
+    def from_dicts(cls, rows: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> "ResultSet":
+        """从字典列表构建结果集（兼容仍返回字典行的适配器）"""
+        if columns is None:
+            columns = list(rows[0].keys()) if rows else []
+        return cls(columns, [_to_plain_row([row.get(col) for col in columns]) for row in rows])
+
+    # ---- 基本访问 ----
+
+    @property
+    def row_count(self) -> int:
+        return len(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __bool__(self) -> bool:
+        return bool(self._rows)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], "ResultSet"]:
+        """整数下标返回行字典视图，切片返回共享行数据的新结果集"""
+        if isinstance(index, slice):
+            return ResultSet(self.columns, self._rows[index])
+        return dict(zip(self.columns, self._rows[index]))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        columns = self.columns
+        for row in self._rows:
+            yield dict(zip(columns, row))
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ResultSet):
+            return self.columns == other.columns and self._rows == other._rows
+        if isinstance(other, list):
+            return len(other) == len(self._rows) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        # 与字典列表的repr保持一致，工具结果转为文本交给LLM时格式不变
+        return "[" + ", ".join(repr(row) for row in self) + "]"
+
+    # ---- 行/列访问 ----
+
+    def row(self, index: int) -> tuple:
+        """获取原始行元组"""
+        return self._rows[index]
+
+    def tuples(self) -> List[tuple]:
+        """获取全部行元组（不复制）"""
+        return self._rows
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        """逐行生成字典，不会一次性物化全部行"""
+        return iter(self)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """物化为字典列表（仅在确实需要时使用）"""
+        return list(self)
+
+    def to_lists(self) -> List[List[Any]]:
+        """物化为列表的列表，适合 columns + rows 的紧凑JSON输出"""
+        return [list(row) for row in self._rows]
+
+    def column(self, name: str) -> Union[array, List[Any], Any]:
+        """
+        获取整列数据
+        纯整数/浮点列在安装了NumPy时返回ndarray，否则返回array.array；其他类型返回list
+        """
+        if name in self._column_cache:
+            return self._column_cache[name]
+
+        idx = self._column_index[name]
+        values = [row[idx] for row in self._rows]
+        column = self._pack_column(values)
+        self._column_cache[name] = column
+        return column
+
+    @staticmethod
+    def _pack_column(values: List[Any]) -> Union[array, List[Any], Any]:
+        """尝试将列值打包为紧凑的数值数组"""
+        if not values:
+            return values
+        value_types = {type(v) for v in values}
+        if value_types == {int}:
+            typecode = 'q'
+        elif value_types <= {int, float}:
+            typecode = 'd'
+        else:
+            return values
+
+        try:
+            import numpy as np
+            return np.asarray(values, dtype=np.int64 if typecode == 'q' else np.float64)
+        except ImportError:
+            pass
+        try:
+            return array(typecode, values)
+        except OverflowError:
+            # 超出int64范围的整数保持为list
+            return values
+
+    def to_dict(self) -> Dict[str, Any]:
+        """紧凑的可序列化表示：列名一次 + 行数组"""
+        return {
+            "columns": self.columns,
+            "rows": self.to_lists(),
+            "row_count": len(self._rows)
+        }
@@ -6,9 +6,10 @@ SQLite数据库适配器 - MVP阶段的主要数据库支持
 import sqlite3
 import aiosqlite
 from typing import Any, Dict, List, Optional
-from .base import DatabaseAdapter
+from .base import DatabaseAdapter, traced_statement
 from ..types.core_types import AbortSignal
-from ..utils.type_converter import convert_to_serializable
+from .result_set import ResultSet
+from .query_plan import QueryPlan, normalize_sqlite_plan, sqlite_plan_tables, sqlite_table_aliases
 
 
 class SQLiteAdapter(DatabaseAdapter):
@@ -37,7 +38,9 @@ class SQLiteAdapter(DatabaseAdapter):
         self._in_transaction = False
         
     async def connect(self) -> None:
-        """建立SQLite连接"""
+        """建立SQLite连接（已连接时直接返回）"""
+        if self.connection is not None:
+            return
         try:
             self.connection = await aiosqlite.connect(self.db_path)
             # 启用外键约束
@@ -52,6 +55,7 @@ class SQLiteAdapter(DatabaseAdapter):
             await self.connection.close()
             self.connection = None
             
+    @traced_statement("db.execute_query")
     async def execute_query(
         self, 
         sql: str, 
@@ -73,20 +77,16 @@ class SQLiteAdapter(DatabaseAdapter):
             # 获取列名
             columns = [description[0] for description in cursor.description] if cursor.description else []
             
-            # 转换为字典列表
-            result_data = []
-            for row in rows:
-                result_data.append(dict(zip(columns, row)))
-            
-            # 转换为可序列化的类型
-            serializable_data = [convert_to_serializable(row) for row in result_data]
+            # 列名只保存一次，行元组原地转换为可序列化类型，不再额外复制字典列表
+            result_set = ResultSet.from_records(columns, rows)
                 
             return {
                 "success": True,
                 "columns": columns,
-                "data": serializable_data,
-                "rows": serializable_data,  # 兼容旧格式
-                "row_count": len(result_data)
+                "result_set": result_set,
+                "data": result_set,
+                "rows": result_set,  # 兼容旧格式（惰性字典视图）
+                "row_count": len(result_set)
             }
             
         except Exception as e:
@@ -95,6 +95,50 @@ class SQLiteAdapter(DatabaseAdapter):
                 "error": str(e)
             }
             
+    async def explain_query(self, sql: str) -> Optional[QueryPlan]:
+        """使用 EXPLAIN QUERY PLAN 获取执行计划，并用表的rowid上界估计扫描行数"""
+        if not self.connection:
+            raise Exception("Database not connected")
+            
+        cursor = await self.connection.execute(f"EXPLAIN QUERY PLAN {sql.strip().rstrip(';')}")
+        plan_rows = await cursor.fetchall()
+        
+        # MAX(rowid) 通过B树直接定位，代价为O(log n)，可作为表行数的上界估计
+        aliases = sqlite_table_aliases(sql)
+        table_rows = {}
+        unique_keys = {}
+        for table in sqlite_plan_tables(plan_rows):
+            escaped = aliases.get(table, table).replace('"', '""')
+            try:
+                unique_keys[table] = await self._unique_keys(escaped)
+            except Exception:
+                pass
+            try:
+                cursor = await self.connection.execute(f'SELECT MAX(rowid) FROM "{escaped}"')
+                row = await cursor.fetchone()
+                table_rows[table] = int(row[0] or 0)
+            except Exception:
+                # WITHOUT ROWID表、视图等无法估计
+                continue
+                
+        return normalize_sqlite_plan(plan_rows, table_rows, unique_keys)
+        
+    async def _unique_keys(self, escaped_table: str) -> List[List[str]]:
+        """表的唯一键（主键和非部分唯一索引的列），用于判断索引查找是否最多返回一行"""
+        cursor = await self.connection.execute(f'PRAGMA index_list("{escaped_table}")')
+        keys = []
+        for _, name, unique, _, partial in await cursor.fetchall():
+            if not unique or partial:
+                continue
+            escaped_index = name.replace('"', '""')
+            cursor = await self.connection.execute(f'PRAGMA index_info("{escaped_index}")')
+            columns = [row[2] for row in await cursor.fetchall()]
+            # 表达式索引的列名为NULL
+            if columns and all(columns):
+                keys.append(columns)
+        return keys
+        
+    @traced_statement("db.execute_command")
     async def execute_command(
         self, 
         sql: str, 
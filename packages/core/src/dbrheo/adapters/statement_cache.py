@@ -0,0 +1,136 @@
+"""
+预编译语句缓存 - 按连接维护的LRU缓存
+命名参数（:name、%(name)s）只在首次准备时转换为方言占位符，之后直接复用转换结果和驱动层句柄
+"""
+
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Tuple
+
+
+DEFAULT_STATEMENT_CACHE_SIZE = 128
+
+# %(name)s 或 :name（排除 ::type 类型转换和 10:30 这类文本）
+_NAMED_PARAM_PATTERN = re.compile(r"%\((\w+)\)s|(?<![:\w]):(\w+)")
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    生成缓存键使用的规范化SQL
+    只去掉首尾空白和末尾分号，不改写语句内部（字符串字面量中的空白有语义）
+    """
+    return sql.strip().rstrip(";").rstrip()
+
+
+def translate_named_params(
+    sql: str,
+    param_names: Optional[Mapping[str, Any]],
+    style: str
+) -> Tuple[str, Optional[Tuple[str, ...]]]:
+    """
+    将命名参数转换为方言占位符
+
+    参数:
+        sql: 原始SQL
+        param_names: 参数名集合，只转换其中出现的名称
+        style: "numeric"（PostgreSQL的$1, $2）或 "format"（MySQL的%s）
+
+    返回:
+        (转换后的SQL, 绑定顺序)；SQL中没有命名参数时绑定顺序为None，表示按传入顺序绑定
+    """
+    if not param_names:
+        return sql, None
+
+    names: List[str] = []
+
+    def _replace(match: "re.Match") -> str:
+        name = match.group(1) or match.group(2)
+        if name not in param_names:
+            return match.group(0)
+        if style == "numeric":
+            # 同名参数复用同一个位置
+            if name not in names:
+                names.append(name)
+            return f"${names.index(name) + 1}"
+        names.append(name)
+        return "%s"
+
+    translated = _NAMED_PARAM_PATTERN.sub(_replace, sql)
+    if not names:
+        return sql, None
+    return translated, tuple(names)
+
+
+@dataclass
+class PreparedStatement:
+    """已准备的语句"""
+    sql: str                                  # 转换后的SQL
+    param_order: Optional[Tuple[str, ...]]    # 参数绑定顺序，None表示按传入顺序
+    handle: Any = None                        # 驱动层句柄（如asyncpg.PreparedStatement）
+
+    def bind(self, params: Optional[Mapping[str, Any]]) -> List[Any]:
+        """按绑定顺序生成参数值列表"""
+        if not params:
+            return []
+        if self.param_order is None:
+            return list(params.values())
+        return [params[name] for name in self.param_order]
+
+
+class PreparedStatementCache:
+    """
+    预编译语句的LRU缓存
+    与具体连接绑定：连接关闭或重建时必须clear()
+    """
+
+    def __init__(self, capacity: int = DEFAULT_STATEMENT_CACHE_SIZE):
+        self.capacity = max(0, int(capacity))
+        self._entries: "OrderedDict[Hashable, PreparedStatement]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(sql: str, params: Optional[Mapping[str, Any]] = None) -> Hashable:
+        """缓存键：规范化SQL + 参数名（参数名决定占位符转换结果）"""
+        return (normalize_sql(sql), tuple(params) if params else ())
+
+    def get(self, key: Hashable) -> Optional[PreparedStatement]:
+        statement = self._entries.get(key)
+        if statement is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return statement
+
+    def put(self, key: Hashable, statement: PreparedStatement) -> None:
+        if not self.capacity:
+            return
+        self._entries[key] = statement
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率统计"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
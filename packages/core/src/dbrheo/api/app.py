@@ -4,6 +4,7 @@ FastAPI应用创建和配置
 """
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
@@ -13,6 +14,8 @@ from pathlib import Path
 
 from ..config.base import DatabaseConfig
 from ..core.client import DatabaseClient
+from ..telemetry.metrics import get_metrics
+from ..tools.python_kernel import shutdown_kernel_pools
 from .dependencies import set_app_state
 
 
@@ -55,7 +58,8 @@ async def lifespan(app: FastAPI):
     
     # 关闭时清理
     # TODO: 实现客户端清理逻辑
-    pass
+    # 关闭代码执行的常驻Python内核
+    await shutdown_kernel_pools()
         
     logging.info("DbRheo API server stopped")
 
@@ -94,6 +98,14 @@ def create_app() -> FastAPI:
     async def health_check():
         return {"status": "healthy", "service": "DbRheo API"}
     
+    # Prometheus指标（文本格式）
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return PlainTextResponse(
+            get_metrics().render_prometheus(),
+            media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+    
     # 根路径
     @app.get("/")
     async def root():
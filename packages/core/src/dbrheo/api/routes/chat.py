@@ -11,6 +11,7 @@ import json
 import asyncio
 
 from ...types.core_types import SimpleAbortSignal
+from ...utils.type_converter import json_default
 from ..dependencies import get_client, get_config
 
 chat_router = APIRouter()
@@ -121,7 +122,7 @@ async def stream_chat(
             
             async for chunk in response_stream:
                 # 转换为SSE格式
-                data = json.dumps(chunk, ensure_ascii=False)
+                data = json.dumps(chunk, ensure_ascii=False, default=json_default)
                 yield f"data: {data}\n\n"
                 
             # 发送结束标记
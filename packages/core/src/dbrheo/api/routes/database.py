@@ -26,6 +26,7 @@ class SQLRequest(BaseModel):
     sql: str
     database: Optional[str] = None
     params: Optional[Dict[str, Any]] = None
+    compact: bool = False  # True时返回 columns + 行数组，不再逐行重复列名
 
 
 class SchemaRequest(BaseModel):
@@ -113,9 +114,18 @@ async def execute_sql(
                 request.params
             )
             
+        # 查询结果使用紧凑结果集，按请求格式物化一次
+        result_set = result.get("result_set")
+        if result_set is None:
+            data = result.get("data", result.get("rows", []))
+        elif request.compact:
+            data = result_set.to_lists()
+        else:
+            data = result_set.to_dicts()
+            
         return {
-            "success": result["success"],
-            "data": result.get("data", []),
+            "success": result.get("success", "error" not in result),
+            "data": data,
             "columns": result.get("columns", []),
             "row_count": result.get("row_count", 0),
             "affected_rows": result.get("affected_rows", 0),
@@ -9,6 +9,7 @@ import asyncio
 from typing import Dict, Set
 
 from ...types.core_types import SimpleAbortSignal
+from ...utils.type_converter import json_default
 from ..dependencies import get_client
 
 websocket_router = APIRouter()
@@ -39,7 +40,7 @@ class ConnectionManager:
         if connection_id in self.active_connections:
             websocket = self.active_connections[connection_id]
             try:
-                await websocket.send_text(json.dumps(message, ensure_ascii=False))
+                await websocket.send_text(json.dumps(message, ensure_ascii=False, default=json_default))
             except:
                 # 连接已断开，清理
                 self.disconnect(connection_id)
@@ -209,6 +209,11 @@ class EnvironmentConfig(ConfigSource):
             "OTEL_SERVICE_NAME": "service_name",
             "ENABLE_CODE_EXECUTION": "enable_code_execution",
             "DBRHEO_ENABLE_CODE_EXECUTION": "enable_code_execution",
+            "DBRHEO_LLM_REPLAY_MODE": "llm_replay_mode",
+            "DBRHEO_LLM_REPLAY_FILE": "llm_replay_file",
+            "DBRHEO_TRACE_DIR": "trace_export_dir",
+            "DBRHEO_USAGE_LEDGER_FILE": "usage_ledger_file",
+            "DBRHEO_PROFILE": "profile_enabled",
         }
         
     def get(self, key: str) -> Optional[Any]:
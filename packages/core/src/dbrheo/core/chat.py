@@ -3,11 +3,14 @@ DatabaseChat - 对话管理
 实现双历史机制、历史过滤和验证，完全对齐Gemini CLI的GeminiChat
 """
 
+import time
 from ..utils.content_helper import get_parts, get_role, get_text
 from typing import List, Dict, Any, Optional, AsyncIterator
 from ..types.core_types import Content, PartListUnion
 from ..config.base import DatabaseConfig
 from ..utils.debug_logger import DebugLogger, log_info
+from ..telemetry.tracer import get_tracer
+from ..telemetry.metrics import get_metrics
 from .prompts import DatabasePromptManager
 from ..tools.registry import DatabaseToolRegistry
 
@@ -22,6 +25,9 @@ if os.getenv('DBRHEO_ENABLE_REALTIME_LOG') == 'true':
 else:
     REALTIME_LOG_ENABLED = False
 
+# 输出速度直方图的桶上界（tokens/秒）
+TOKENS_PER_SECOND_BUCKETS = (1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500, 1000)
+
 
 class DatabaseChat:
     """
@@ -45,6 +51,8 @@ class DatabaseChat:
         self._llm_service = None
         self._tools = None  # 缓存工具声明
         self._system_prompt = None  # 缓存系统提示词
+        # 最近一次模型调用的耗时（ttft_ms、stream_ms），供调用账本使用
+        self.last_call_timing: Optional[Dict[str, Optional[float]]] = None
         
         # 记录已保存的历史数量
         self._saved_history_count = 0
@@ -285,6 +293,34 @@ class DatabaseChat:
             log_info("Chat", f"无法克隆对象 {type(obj).__name__}: {str(e)}, 使用字符串表示")
             return f"<{type(obj).__name__}: {str(obj)[:100]}...>"
         
+    def _record_llm_metrics(self, model: str, timing: Dict[str, Optional[float]],
+                            token_usage: Optional[Dict[str, Any]]):
+        """
+        TTFT、输出速度和token计数（按模型）
+        输出速度 = completion tokens / 首个chunk到流结束的时间（含下游处理chunk的时间，偏保守）
+        """
+        metrics = get_metrics()
+        labels = {"model": model}
+        metrics.counter("dbrheo_llm_requests_total", "LLM streaming requests").increment(1, labels)
+        if timing["ttft_ms"] is None:
+            return
+        metrics.histogram("dbrheo_llm_ttft_seconds", "Time to first streamed chunk").record(
+            timing["ttft_ms"] / 1000, labels
+        )
+        if not token_usage:
+            return
+        tokens = metrics.counter("dbrheo_llm_tokens_total", "LLM tokens by kind")
+        prompt_tokens = token_usage.get('prompt_tokens') or 0
+        completion_tokens = token_usage.get('completion_tokens') or 0
+        tokens.increment(prompt_tokens, {"model": model, "kind": "prompt"})
+        tokens.increment(completion_tokens, {"model": model, "kind": "completion"})
+        stream_seconds = timing["stream_ms"] / 1000
+        if completion_tokens and stream_seconds > 0:
+            metrics.histogram(
+                "dbrheo_llm_tokens_per_second", "Completion tokens per second after the first chunk",
+                buckets=TOKENS_PER_SECOND_BUCKETS
+            ).record(completion_tokens / stream_seconds, labels)
+        
     async def send_message_stream(self, request: PartListUnion, prompt_id: str):
         """
         发送消息 API并返回流式响应
@@ -341,7 +377,9 @@ class DatabaseChat:
                     log_conversation("User", user_text)
         
         # 发送消息并获取流式响应
-        full_history = self.get_history()
+        tracer = get_tracer()
+        with tracer.span("chat.history_clone", {"messages": len(self.history)}):
+            full_history = self.get_history()
         
         # 调试：显示历史总体信息
         total_history_chars = sum(
@@ -379,10 +417,24 @@ class DatabaseChat:
         
         # 将同步生成器转换为异步生成器
         # 使用简单的yield来逐个处理chunk，保持异步特性
+        # 首个chunk之前为 llm.ttft，之后到流结束为 llm.stream（包含下游处理每个chunk的时间）
         chunk_count = 0
+        model = self.config.get_model()
+        self.last_call_timing = None
+        ttft_span = tracer.start_span("llm.ttft", {"model": model, "messages": len(full_history)})
+        stream_span = None
+        request_started = time.perf_counter()
+        first_chunk_at = None
+        token_usage = None
         try:
             for chunk in sync_generator:
                 chunk_count += 1
+                if stream_span is None:
+                    first_chunk_at = time.perf_counter()
+                    ttft_span.end()
+                    stream_span = tracer.start_span("llm.stream")
+                if chunk.get('token_usage'):
+                    token_usage = chunk['token_usage']
                 # 使用优化的日志记录
                 if DebugLogger.get_rules()["show_chunk_details"]:
                     # 只在需要时显示块详情
@@ -404,6 +456,17 @@ class DatabaseChat:
                             }
                         })
         finally:
+            if stream_span is None:
+                ttft_span.end()
+            else:
+                stream_span.set_attribute("chunks", chunk_count)
+                stream_span.end()
+            ended = time.perf_counter()
+            self.last_call_timing = {
+                "ttft_ms": (first_chunk_at - request_started) * 1000 if first_chunk_at is not None else None,
+                "stream_ms": (ended - first_chunk_at) * 1000 if first_chunk_at is not None else None,
+            }
+            self._record_llm_metrics(model, self.last_call_timing, token_usage)
             # 使用finally确保历史记录总是被更新，即使生成器被提前中断
             # 将模型响应添加到历史
             # 使用优化的日志总结
@@ -4,15 +4,21 @@ DatabaseClient - 主控制器
 """
 
 import asyncio
+import uuid
 from typing import AsyncIterator, Optional, List
 from typing import List, Dict, Any
 from ..types.core_types import PartListUnion, AbortSignal, Content
 from ..config.base import DatabaseConfig
 from .chat import DatabaseChat
 from ..utils.debug_logger import DebugLogger, log_info
+from ..telemetry.tracer import get_tracer, traced
+from ..telemetry.metrics import get_metrics
+from ..telemetry.profiler import get_profiler, profiled
 from .turn import DatabaseTurn
 from .scheduler import DatabaseToolScheduler
 from .token_statistics import TokenStatistics
+from .usage_ledger import UsageLedger
+from ..utils.content_helper import get_text
 
 
 class DatabaseClient:
@@ -27,6 +33,10 @@ class DatabaseClient:
     
     def __init__(self, config: DatabaseConfig):
         self.config = config
+        # 进程内共享追踪器，第一个客户端的配置决定是否导出瀑布图
+        self.tracer = get_tracer(config)
+        self.metrics = get_metrics(config)
+        self.profiler = get_profiler(config)
         self.chat = DatabaseChat(config)
         # 保存已完成的工具调用
         self.completed_tool_calls = []
@@ -47,6 +57,11 @@ class DatabaseClient:
         
         self.session_turn_count = 0
         self.token_statistics = TokenStatistics()  # Token 使用统计
+        # 跨会话的调用账本（每次模型调用一行）
+        self.session_id = uuid.uuid4().hex[:12]
+        self.usage_ledger = UsageLedger.from_config(config)
+        self._message_id = None
+        self._message_text = None
         # 缓存的JSON生成服务（最小侵入性优化）
         self._json_llm_service = None
         
@@ -120,6 +135,28 @@ class DatabaseClient:
                 if history:
                     log_info("Client", f"Latest history entry: {history[-1]}")
                     
+    def _record_usage(self, model: str, prompt_id: str, token_usage: Optional[Dict[str, Any]], turn: DatabaseTurn):
+        """把本次模型调用写入账本；账本写入失败不影响对话"""
+        if self.usage_ledger is None:
+            return
+        try:
+            self.usage_ledger.record(
+                session_id=self.session_id,
+                message_id=self._message_id or prompt_id,
+                model=model,
+                usage=token_usage,
+                timing=self.chat.last_call_timing,
+                tools=[call.name for call in turn.pending_tool_calls],
+                prompt_id=prompt_id,
+                prompt=self._message_text
+            )
+        except Exception as e:
+            log_info("Client", f"Failed to record usage: {e}")
+            
+    @profiled("turn", attributes_from=lambda self, request, signal, prompt_id, *args, **kwargs: (
+        prompt_id, {"prompt_id": prompt_id}
+    ))
+    @traced("client.send_message_stream")
     async def send_message_stream(
         self, 
         request: PartListUnion, 
@@ -131,13 +168,25 @@ class DatabaseClient:
         """
         核心递归逻辑 - 与Gemini CLI完全一致
         处理用户消息并返回流式响应
+        递归调用形成嵌套span，最外层一次调用即一条用户消息的瀑布图
         """
+        self.tracer.set_attribute("prompt_id", prompt_id)
+        self.tracer.set_attribute("turns_left", turns)
+        
         # 在开始新的消息流之前，确保之前的function response被处理
         # 这解决了确认流程和ESC终止可能导致的function response丢失问题
         self._process_completed_tools()
         
         self.session_turn_count += 1
         
+        # 最外层调用即一条用户消息，递归调用（Please continue.）记在同一条消息下
+        if original_model is None:
+            self._message_id = uuid.uuid4().hex[:12]
+            parts = request if isinstance(request, list) else [request]
+            self._message_text = " ".join(
+                part if isinstance(part, str) else get_text(part) for part in parts
+            ).strip()
+        
         # 1. 会话级别限制检查
         max_session_turns = self.config.get("max_session_turns", 50)
         if max_session_turns > 0 and self.session_turn_count > max_session_turns:
@@ -159,30 +208,29 @@ class DatabaseClient:
             
         # 3. 执行当前Turn（只收集工具调用）
         turn = DatabaseTurn(self.chat, prompt_id)
+        current_model = self.config.get_model() or "gemini-2.5-flash"
+        token_usage = None
         async for event in turn.run(request, signal):
             # 拦截 TokenUsage 事件进行统计
             if event.get('type') == 'TokenUsage':
-                # 详细调试
-                from ..utils.debug_logger import log_info
-                log_info("Client", f"📊 TOKEN STATISTICS - Adding usage to statistics:")
-                log_info("Client", f"   - Turn count: {self.session_turn_count}")
-                log_info("Client", f"   - Prompt ID: {prompt_id}")
-                log_info("Client", f"   - prompt_tokens: {event['value'].get('prompt_tokens', 0)}")
-                log_info("Client", f"   - completion_tokens: {event['value'].get('completion_tokens', 0)}")
-                log_info("Client", f"   - total_tokens: {event['value'].get('total_tokens', 0)}")
-                
-                current_model = self.config.get_model() or "gemini-2.5-flash"
-                self.token_statistics.add_usage(current_model, event['value'])
+                token_usage = event['value']
+                log_info("Client", f"📊 TOKEN STATISTICS - turn {self.session_turn_count}, prompt {prompt_id}: "
+                                   f"prompt={token_usage.get('prompt_tokens', 0)} "
+                                   f"completion={token_usage.get('completion_tokens', 0)} "
+                                   f"total={token_usage.get('total_tokens', 0)}")
+                self.token_statistics.add_usage(current_model, token_usage)
                 # 不向上传递 TokenUsage 事件，保持向后兼容
             else:
                 yield event
+        self._record_usage(current_model, prompt_id, token_usage, turn)
             
         # 4. 工具执行（如果有待执行的工具）
         if turn.pending_tool_calls:
             DebugLogger.log_client_event("tools_found", len(turn.pending_tool_calls))
             
             # 执行工具（异步，不等待完成）
-            await self.tool_scheduler.schedule(turn.pending_tool_calls, signal)
+            with self.tracer.span("scheduler.schedule", {"tool_calls": len(turn.pending_tool_calls)}):
+                await self.tool_scheduler.schedule(turn.pending_tool_calls, signal)
             
             # 工具执行是异步的，这里只是启动了执行
             # 真正的完成处理在 _on_tools_complete 回调中
@@ -213,9 +261,10 @@ class DatabaseClient:
             poll_interval = 0.1
             waited = 0
             
-            while waited < max_wait and not self.completed_tool_calls:
-                await asyncio.sleep(poll_interval)
-                waited += poll_interval
+            with self.tracer.span("client.wait_tools"):
+                while waited < max_wait and not self.completed_tool_calls:
+                    await asyncio.sleep(poll_interval)
+                    waited += poll_interval
                 
             if waited >= max_wait and not self.completed_tool_calls:
                 log_info("Client", f"Warning: Waited {max_wait}s but no tools completed")
@@ -228,7 +277,8 @@ class DatabaseClient:
             
             # 尝试处理已完成的工具（新增的灵活处理机制）
             # 这确保即使在等待期间有新的工具完成，也会被处理
-            self._process_completed_tools()
+            with self.tracer.span("client.process_tool_responses"):
+                self._process_completed_tools()
             
             # 如果_process_completed_tools已经处理了工具，我们需要继续对话
             if has_completed_tools:
@@ -317,7 +367,9 @@ class DatabaseClient:
                 
             # AI自主判断下一步
             from .next_speaker import check_next_speaker
-            next_speaker_check = await check_next_speaker(self.chat, self, signal)
+            with self.tracer.span("client.next_speaker") as span:
+                next_speaker_check = await check_next_speaker(self.chat, self, signal)
+                span.set_attribute("next_speaker", (next_speaker_check or {}).get('next_speaker'))
             if next_speaker_check and next_speaker_check.get('next_speaker') == 'model':
                 # 递归调用：添加"Please continue."并继续
                 next_request = [{'text': 'Please continue.'}]
@@ -5,6 +5,7 @@ DatabaseMemoryManager - 分层记忆管理系统
 
 import os
 import json
+import sqlite3
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, Any, List, Set
@@ -14,6 +15,7 @@ from ..config.base import DatabaseConfig
 from ..types.core_types import Part
 from ..tools.base import DatabaseTool
 from ..types.tool_types import ToolResult
+from .memory_index import MemoryIndex
 
 
 class MemoryScope(Enum):
@@ -41,6 +43,28 @@ class DatabaseMemoryManager:
         global_dir = self.memory_files[MemoryScope.GLOBAL].parent
         global_dir.mkdir(parents=True, exist_ok=True)
         
+        # 全文索引延迟创建；不可用时回退到逐文件扫描
+        self._index: Optional[MemoryIndex] = None
+        self._index_unavailable = False
+        
+    def _get_index(self) -> Optional[MemoryIndex]:
+        """获取记忆索引（memory_index_enabled 关闭或SQLite出错时返回None）"""
+        if self._index is None and not self._index_unavailable:
+            enabled = self.config.get("memory_index_enabled", True)
+            if isinstance(enabled, str):
+                enabled = enabled.lower() not in ("0", "false", "no", "off")
+            if not enabled:
+                self._index_unavailable = True
+                return None
+            index_path = self.config.get("memory_index_path", None) or (
+                self.memory_files[MemoryScope.GLOBAL].parent / "memory_index.db"
+            )
+            try:
+                self._index = MemoryIndex(Path(index_path))
+            except (sqlite3.Error, OSError):
+                self._index_unavailable = True
+        return self._index
+        
     async def load_hierarchical_memory(self) -> str:
         """
         加载分层记忆 - 参考Gemini CLI的loadServerHierarchicalMemory
@@ -91,11 +115,9 @@ class DatabaseMemoryManager:
             # 确保目录存在
             memory_file.parent.mkdir(parents=True, exist_ok=True)
             
-            # 读取现有记忆
-            existing_memory = ""
-            if memory_file.exists():
-                with open(memory_file, 'r', encoding='utf-8') as f:
-                    existing_memory = f.read()
+            # 追加前索引是否与文件一致（一致时只需增量写入新条目）
+            index = self._get_index()
+            index_current = index.is_current(memory_file) if index else False
                     
             # 构建新的记忆条目
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -103,20 +125,30 @@ class DatabaseMemoryManager:
             
             # 添加元数据（如果有）
             if metadata:
-                # 安全地序列化元数据，处理不可序列化的对象
+                # 安全地序列化元数据，处理不可序列化的对象（单行写入，解析时按行识别）
                 try:
-                    metadata_str = json.dumps(metadata, ensure_ascii=False, indent=2)
+                    metadata_str = json.dumps(metadata, ensure_ascii=False)
                 except (TypeError, ValueError):
                     # 如果无法直接序列化，尝试转换为可序列化的格式
                     safe_metadata = self._make_json_serializable(metadata)
-                    metadata_str = json.dumps(safe_metadata, ensure_ascii=False, indent=2)
+                    metadata_str = json.dumps(safe_metadata, ensure_ascii=False)
                 new_entry += f"<!-- metadata: {metadata_str} -->\n"
                 
             new_entry += f"{information}\n"
             
-            # 保存更新的记忆
-            with open(memory_file, 'w', encoding='utf-8') as f:
-                f.write(existing_memory + new_entry)
+            # 追加到文件末尾，不重写已有内容
+            with open(memory_file, 'a', encoding='utf-8') as f:
+                f.write(new_entry)
+                
+            if index:
+                try:
+                    if index_current:
+                        index.append(memory_file, self._parse_memory_entries(new_entry)[0])
+                    else:
+                        index.sync(memory_file, self._parse_memory_entries)
+                except sqlite3.Error:
+                    # 索引出错不影响保存，下次搜索时按mtime重建
+                    pass
                 
             return True
             
@@ -140,13 +172,51 @@ class DatabaseMemoryManager:
             category: 限定类别（None表示不限制）
             
         Returns:
-            匹配的记忆条目列表
+            匹配的记忆条目列表（使用索引时按相关度排序）
         """
-        results = []
-        
         # 确定要搜索的范围
         scopes_to_search = [scope] if scope else list(MemoryScope)
         
+        index = self._get_index()
+        if index:
+            try:
+                return self._search_index(index, query, scopes_to_search, category)
+            except sqlite3.Error:
+                pass
+        return self._scan_memory_files(query, scopes_to_search, category)
+        
+    def _search_index(
+        self,
+        index: MemoryIndex,
+        query: str,
+        scopes: List[MemoryScope],
+        category: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """通过全文索引搜索；变化过的文件先重建索引"""
+        scope_by_path = {}
+        for search_scope in scopes:
+            memory_file = self.memory_files[search_scope]
+            index.sync(memory_file, self._parse_memory_entries)
+            if memory_file.exists():
+                scope_by_path[MemoryIndex.file_key(memory_file)] = (search_scope, memory_file)
+                
+        results = []
+        for entry in index.search(query, [f for _, f in scope_by_path.values()], category):
+            entry_scope, memory_file = scope_by_path[entry.pop("path")]
+            entry["scope"] = entry_scope.value
+            entry["file"] = str(memory_file)
+            results.append(entry)
+        return results
+        
+    def _scan_memory_files(
+        self,
+        query: str,
+        scopes_to_search: List[MemoryScope],
+        category: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """逐文件读取解析并做子串匹配（索引不可用时使用）"""
+        results = []
+        
         for search_scope in scopes_to_search:
             memory_file = self.memory_files[search_scope]
             
@@ -277,6 +347,12 @@ class DatabaseMemoryManager:
                 session_file.unlink()
             except Exception:
                 pass
+        index = self._get_index()
+        if index:
+            try:
+                index.sync(session_file, self._parse_memory_entries)
+            except sqlite3.Error:
+                pass
                 
     def get_memory_summary(self) -> Dict[str, Dict[str, Any]]:
         """获取记忆系统的摘要信息"""
@@ -288,16 +364,24 @@ class DatabaseMemoryManager:
             if memory_file.exists():
                 try:
                     stat = memory_file.stat()
-                    with open(memory_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        entries = self._parse_memory_entries(content)
+                    index = self._get_index()
+                    if index:
+                        # 文件未变化时直接使用索引中的统计
+                        index.sync(memory_file, self._parse_memory_entries)
+                        file_summary = index.file_summary(memory_file)
+                    else:
+                        with open(memory_file, 'r', encoding='utf-8') as f:
+                            entries = self._parse_memory_entries(f.read())
+                        file_summary = {
+                            "entries": len(entries),
+                            "categories": list(set(e["category"] for e in entries))
+                        }
                         
                     summary[scope.value] = {
                         "file": str(memory_file),
                         "size": stat.st_size,
                         "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                        "entries": len(entries),
-                        "categories": list(set(e["category"] for e in entries))
+                        **file_summary
                     }
                 except Exception:
                     summary[scope.value] = {"error": "Failed to read"}
@@ -0,0 +1,231 @@
+"""
+MemoryIndex - 记忆文件的SQLite全文索引
+Markdown记忆文件仍是唯一的数据源，索引只是它的缓存：
+- 按文件的 mtime/大小 判断是否需要重建，未变化的文件不再读取和解析
+- save_memory 追加条目时增量写入索引，不重新解析整个文件
+- FTS5（trigram分词，支持中文子串）提供按相关度排序的搜索；SQLite不支持FTS5时退化为LIKE
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# FTS5 trigram 分词器只能匹配至少3个字符的词，更短的词用LIKE
+_MIN_FTS_TERM = 3
+
+
+class MemoryIndex:
+    """
+    多个记忆文件共享的索引库
+    条目按文件的绝对路径归属，不同项目的记忆文件互不影响
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self.fts_enabled = False
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS memory_files ("
+                "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS memory_entries ("
+                "id INTEGER PRIMARY KEY, path TEXT NOT NULL, category TEXT, "
+                "timestamp TEXT, content TEXT, metadata TEXT)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_memory_entries_path ON memory_entries(path, category)"
+            )
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5("
+                    "content, tokenize='trigram')"
+                )
+                self.fts_enabled = True
+            except sqlite3.OperationalError:
+                # SQLite 低于3.34或未编译FTS5
+                self.fts_enabled = False
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def file_key(path: Path) -> str:
+        return str(Path(path).resolve())
+
+    @staticmethod
+    def _stat(path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _stored_stat(self, key: str) -> Optional[Tuple[int, int]]:
+        row = self._conn.execute(
+            "SELECT mtime_ns, size FROM memory_files WHERE path = ?", (key,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def is_current(self, path: Path, stat: Optional[Tuple[int, int]] = None) -> bool:
+        """索引中记录的文件状态是否与给定状态（默认当前状态）一致"""
+        stat = stat if stat is not None else self._stat(path)
+        with self._lock:
+            return stat is not None and self._stored_stat(self.file_key(path)) == stat
+
+    def sync(self, path: Path, parse: Callable[[str], List[Dict[str, Any]]]) -> bool:
+        """
+        文件变化时重建该文件的索引
+        返回是否发生了重建
+        """
+        key = self.file_key(path)
+        stat = self._stat(path)
+        with self._lock:
+            stored = self._stored_stat(key)
+            if stat == stored:
+                return False
+            if stat is None:
+                with self._conn:
+                    self._delete_file(key)
+                return True
+
+        # 在锁外读取和解析文件
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = parse(f.read())
+        except OSError:
+            return False
+
+        with self._lock, self._conn:
+            self._delete_file(key)
+            for entry in entries:
+                self._insert_entry(key, entry)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO memory_files (path, mtime_ns, size) VALUES (?, ?, ?)",
+                (key, stat[0], stat[1])
+            )
+        return True
+
+    def append(self, path: Path, entry: Dict[str, Any]):
+        """记录追加到文件末尾的一个条目，并更新文件状态"""
+        key = self.file_key(path)
+        stat = self._stat(path)
+        if stat is None:
+            return
+        with self._lock, self._conn:
+            self._insert_entry(key, entry)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO memory_files (path, mtime_ns, size) VALUES (?, ?, ?)",
+                (key, stat[0], stat[1])
+            )
+
+    def _delete_file(self, key: str):
+        if self.fts_enabled:
+            self._conn.execute(
+                "DELETE FROM memory_fts WHERE rowid IN (SELECT id FROM memory_entries WHERE path = ?)", (key,)
+            )
+        self._conn.execute("DELETE FROM memory_entries WHERE path = ?", (key,))
+        self._conn.execute("DELETE FROM memory_files WHERE path = ?", (key,))
+
+    def _insert_entry(self, key: str, entry: Dict[str, Any]):
+        metadata = entry.get("metadata")
+        cursor = self._conn.execute(
+            "INSERT INTO memory_entries (path, category, timestamp, content, metadata) VALUES (?, ?, ?, ?, ?)",
+            (
+                key,
+                entry.get("category"),
+                entry.get("timestamp"),
+                entry.get("content", ""),
+                json.dumps(metadata, ensure_ascii=False, default=str) if metadata is not None else None
+            )
+        )
+        if self.fts_enabled:
+            self._conn.execute(
+                "INSERT INTO memory_fts (rowid, content) VALUES (?, ?)",
+                (cursor.lastrowid, entry.get("content", ""))
+            )
+
+    def search(
+        self,
+        query: str,
+        paths: List[Path],
+        category: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        在指定文件的条目中搜索
+        查询按空白拆分为多个词，所有词都须出现在内容中（不区分大小写）；
+        可用FTS5时按bm25相关度排序，否则按保存时间倒序
+        """
+        keys = [self.file_key(p) for p in paths]
+        if not keys:
+            return []
+        terms = query.split() or [query]
+        fts_terms = [t for t in terms if len(t) >= _MIN_FTS_TERM] if self.fts_enabled else []
+        like_terms = [t for t in terms if t not in fts_terms and t]
+
+        conditions = [f"e.path IN ({','.join('?' * len(keys))})"]
+        params: List[Any] = list(keys)
+        if category:
+            conditions.append("e.category = ?")
+            params.append(category)
+        for term in like_terms:
+            conditions.append("e.content LIKE ? ESCAPE '\\'")
+            escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f"%{escaped}%")
+
+        if fts_terms:
+            match = " AND ".join('"' + t.replace('"', '""') + '"' for t in fts_terms)
+            sql = (
+                "SELECT e.path, e.category, e.timestamp, e.content, e.metadata, bm25(memory_fts) AS rank "
+                "FROM memory_fts JOIN memory_entries e ON e.id = memory_fts.rowid "
+                f"WHERE memory_fts MATCH ? AND {' AND '.join(conditions)} ORDER BY rank"
+            )
+            params.insert(0, match)
+        else:
+            sql = (
+                "SELECT e.path, e.category, e.timestamp, e.content, e.metadata, NULL AS rank "
+                f"FROM memory_entries e WHERE {' AND '.join(conditions)} ORDER BY e.id DESC"
+            )
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        results = []
+        for path, entry_category, timestamp, content, metadata, rank in rows:
+            results.append({
+                "category": entry_category,
+                "timestamp": timestamp,
+                "content": content,
+                "metadata": json.loads(metadata) if metadata else None,
+                "path": path,
+                "rank": rank
+            })
+        return results
+
+    def file_summary(self, path: Path) -> Dict[str, Any]:
+        """文件的条目数和类别（需先 sync）"""
+        key = self.file_key(path)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT category, COUNT(*) FROM memory_entries WHERE path = ? GROUP BY category", (key,)
+            ).fetchall()
+        return {
+            "entries": sum(count for _, count in rows),
+            "categories": [category for category, _ in rows]
+        }
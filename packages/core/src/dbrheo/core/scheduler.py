@@ -5,7 +5,8 @@ DatabaseToolScheduler - 工具调度器
 
 import asyncio
 import time
-from typing import List, Optional, Dict, Any, Callable
+from collections import Counter, deque
+from typing import List, Optional, Dict, Any, Callable, Deque
 from ..types.core_types import AbortSignal
 from ..types.tool_types import (
     ToolCallRequestInfo, ToolCall, ToolCallResponseInfo,
@@ -14,6 +15,9 @@ from ..types.tool_types import (
 )
 from ..config.base import DatabaseConfig
 from ..utils.debug_logger import DebugLogger, log_info
+from ..telemetry.tracer import get_tracer
+from ..telemetry.metrics import get_metrics
+from ..telemetry.profiler import profiled
 
 # 导入实时日志系统（如果启用）
 import os
@@ -27,6 +31,10 @@ else:
     REALTIME_LOG_ENABLED = False
 
 
+TERMINAL_STATUSES = frozenset({'success', 'error', 'cancelled'})
+DEFAULT_HISTORY_SIZE = 200
+
+
 class DatabaseToolScheduler:
     """
     数据库工具调度器 - 完全对齐Gemini CLI设计
@@ -34,11 +42,22 @@ class DatabaseToolScheduler:
     - 并发工具执行控制
     - 确认流程协调
     - UI回调接口
+    
+    状态结构：当前批次按call_id索引（状态转换O(1)），
+    批次完成后移入有界的历史环形缓冲区，不随会话长度增长
+    
+    追踪：每个调用有一个 tool.call span（创建到终止状态），状态转换记为该span的事件；
+    验证、执行、结果转换各自是嵌套在当前span下的子span
     """
     
     def __init__(self, config: DatabaseConfig, **callbacks):
         self.config = config
-        self.tool_calls: List[ToolCall] = []
+        self._active_calls: Dict[str, ToolCall] = {}
+        self._status_counts: Counter = Counter()
+        self._call_spans: Dict[str, Any] = {}
+        self.history: Deque[ToolCall] = deque(
+            maxlen=int(config.get("scheduler_history_size", DEFAULT_HISTORY_SIZE))
+        )
         self.tool_registry = None  # 将在初始化时设置
         
         # UI回调接口
@@ -46,6 +65,42 @@ class DatabaseToolScheduler:
         self.on_all_tools_complete = callbacks.get('on_all_tools_complete')
         self.on_tool_calls_update = callbacks.get('on_tool_calls_update')
         
+    @property
+    def tool_calls(self) -> List[ToolCall]:
+        """当前批次的工具调用快照（按调度顺序）"""
+        return list(self._active_calls.values())
+        
+    def get_tool_call(self, call_id: str) -> Optional[ToolCall]:
+        """按call_id获取当前批次中的工具调用"""
+        return self._active_calls.get(call_id)
+        
+    def _add_call(self, tool_call: ToolCall):
+        """加入当前批次"""
+        call_id = tool_call.request.call_id
+        previous = self._active_calls.get(call_id)
+        if previous is not None:
+            log_info("Scheduler", f"Duplicate call_id {call_id}, replacing previous call")
+            self._status_counts[previous.status] -= 1
+            self._end_call_span(call_id, 'replaced')
+        self._active_calls[call_id] = tool_call
+        self._status_counts[tool_call.status] += 1
+        
+        span = get_tracer().start_span("tool.call", {"tool": tool_call.request.name, "call_id": call_id})
+        span.add_event(tool_call.status)
+        self._call_spans[call_id] = span
+        if tool_call.status in TERMINAL_STATUSES:
+            self._end_call_span(call_id, tool_call.status)
+        
+    def _end_call_span(self, call_id: str, status: str):
+        span = self._call_spans.pop(call_id, None)
+        if span is not None:
+            span.set_attribute("status", status)
+            span.end()
+        
+    def _pending_count(self) -> int:
+        """非终止状态的调用数量"""
+        return sum(count for status, count in self._status_counts.items() if status not in TERMINAL_STATUSES)
+        
     async def schedule(self, requests: List[ToolCallRequestInfo], signal: AbortSignal):
         """
         调度工具执行 - 与Gemini CLI完全一致
@@ -97,7 +152,8 @@ class DatabaseToolScheduler:
             )
             new_tool_calls.append(validating_call)
             
-        self.tool_calls.extend(new_tool_calls)
+        for new_call in new_tool_calls:
+            self._add_call(new_call)
         self._notify_tool_calls_update()
         
         # 2. 验证和确认流程
@@ -107,9 +163,10 @@ class DatabaseToolScheduler:
                 
             try:
                 # 检查是否需要确认
-                confirmation_details = await tool_call.tool.should_confirm_execute(
-                    tool_call.request.args, signal
-                )
+                with get_tracer().span("tool.validate", parent=self._call_spans.get(tool_call.request.call_id)):
+                    confirmation_details = await tool_call.tool.should_confirm_execute(
+                        tool_call.request.args, signal
+                    )
                 
                 if confirmation_details:
                     # 需要确认，设置为等待状态
@@ -142,110 +199,135 @@ class DatabaseToolScheduler:
         """
         尝试执行所有已调度的工具调用
         """
-        DebugLogger.log_scheduler_event("execution_start", len(self.tool_calls))
-        log_info("Scheduler", f"_attempt_execution_of_scheduled_calls: {len(self.tool_calls)} tools total")
+        DebugLogger.log_scheduler_event("execution_start", len(self._active_calls))
+        log_info("Scheduler", f"_attempt_execution_of_scheduled_calls: {len(self._active_calls)} tools in batch")
         
-        # 调试：打印所有工具的状态
-        for idx, tc in enumerate(self.tool_calls):
-            log_info("Scheduler", f"  Tool[{idx}] {tc.request.name} - {tc.request.call_id} - status: {tc.status}")
+        # 调试：打印当前批次的工具状态
+        if DebugLogger.should_log("DEBUG"):
+            for idx, tc in enumerate(self._active_calls.values()):
+                log_info("Scheduler", f"  Tool[{idx}] {tc.request.name} - {tc.request.call_id} - status: {tc.status}")
         
-        scheduled_count = sum(1 for tc in self.tool_calls if tc.status == 'scheduled')
-        log_info("Scheduler", f"Found {scheduled_count} scheduled tools to execute")
+        # 取快照：执行过程中批次完成会清空当前索引
+        scheduled_calls = [tc for tc in self._active_calls.values() if tc.status == 'scheduled']
+        log_info("Scheduler", f"Found {len(scheduled_calls)} scheduled tools to execute")
         
-        for tool_call in self.tool_calls:
-            if tool_call.status == 'scheduled':
-                # 工具执行开始日志在VERBOSE模式显示
-                if DebugLogger.get_rules()["show_tool_calls"]:
-                    log_info("Scheduler", f"执行工具: {tool_call.request.name}")
-                
-                # 实时日志记录工具调用
-                if REALTIME_LOG_ENABLED:
-                    log_tool_call(tool_call.request.name, tool_call.request.args, tool_call.request.call_id)
-                
-                try:
-                    # 设置为执行状态
-                    self._set_status(tool_call.request.call_id, 'executing')
-                    
-                    # 执行工具
-                    result = await tool_call.tool.execute(
-                        tool_call.request.args,
-                        signal,
-                        self._create_output_updater(tool_call.request.call_id)
-                    )
-                    
-                    # 使用统一的结果处理，确保Agent收到完整信息
-                    from ..utils.function_response import convert_to_function_response
-                    log_info("Scheduler", f"🔍 DEBUG: 即将调用convert_to_function_response")
-                    log_info("Scheduler", f"🔍 DEBUG: tool_name={tool_call.request.name}")
-                    log_info("Scheduler", f"🔍 DEBUG: call_id={tool_call.request.call_id}")
-                    log_info("Scheduler", f"🔍 DEBUG: result类型: {type(result)}")
-                    log_info("Scheduler", f"🔍 DEBUG: result内容概览: {repr(str(result)[:200])}")
-                    
-                    function_response = convert_to_function_response(
-                        tool_call.request.name,
-                        tool_call.request.call_id,
-                        result  # 传递完整的ToolResult对象
-                    )
-                    log_info("Scheduler", f"🔍 DEBUG: convert_to_function_response返回: {repr(function_response)}")
-                    
-                    # 检查执行结果是否包含错误
-                    if result.error:
-                        # 有错误但仍然传递完整的工具结果
-                        error_response = ToolCallResponseInfo(
-                            call_id=tool_call.request.call_id,
-                            response_parts=function_response,
-                            result_display=result.return_display,
-                            error=Exception(result.error)
-                        )
-                        self._set_status(tool_call.request.call_id, 'error', error_response)
-                        
-                        # 实时日志记录工具失败
-                        if REALTIME_LOG_ENABLED:
-                            log_tool_result(tool_call.request.name, result.error, False, tool_call.request.call_id)
-                    else:
-                        # 创建成功响应
-                        response = ToolCallResponseInfo(
-                            call_id=tool_call.request.call_id,
-                            response_parts=function_response,  # 使用转换后的格式
-                            result_display=result.return_display
-                        )
-                        
-                        DebugLogger.log_scheduler_event("tool_complete", {
-                            "name": tool_call.request.name,
-                            "response": function_response
-                        })
-                        
-                        self._set_status(tool_call.request.call_id, 'success', response)
-                        
-                        # 实时日志记录工具成功
-                        if REALTIME_LOG_ENABLED:
-                            log_tool_result(tool_call.request.name, result.summary or result.llm_content, True, tool_call.request.call_id)
-                    
-                except Exception as e:
-                    # 执行失败，设置为错误状态
-                    # 创建错误的functionResponse
-                    error_function_response = {
-                        'functionResponse': {
-                            'id': tool_call.request.call_id,
-                            'name': tool_call.request.name,
-                            'response': {'error': str(e)}
-                        }
-                    }
-                    
-                    error_response = ToolCallResponseInfo(
-                        call_id=tool_call.request.call_id,
-                        response_parts=error_function_response,
-                        error=e
-                    )
-                    self._set_status(tool_call.request.call_id, 'error', error_response)
-                    
-                    # 实时日志记录工具失败
-                    if REALTIME_LOG_ENABLED:
-                        log_tool_result(tool_call.request.name, str(e), False, tool_call.request.call_id)
+        # 相邻的可并发工具（如MCP调用）一起执行，其余按顺序执行
+        index = 0
+        while index < len(scheduled_calls):
+            group = [scheduled_calls[index]]
+            index += 1
+            if getattr(group[0].tool, 'concurrent_safe', False):
+                while index < len(scheduled_calls) and getattr(scheduled_calls[index].tool, 'concurrent_safe', False):
+                    group.append(scheduled_calls[index])
+                    index += 1
+            if len(group) > 1:
+                log_info("Scheduler", f"Executing {len(group)} tools concurrently")
+                await asyncio.gather(*(self._execute_tool_call(tc, signal) for tc in group))
+            else:
+                await self._execute_tool_call(group[0], signal)
                     
         # 移除这里的检查，让 _set_status 中的检查负责
         # 这里调用太早了，工具可能还在执行中
                 
+    @profiled("tool", attributes_from=lambda self, tool_call, signal: (
+        tool_call.request.name, {"tool": tool_call.request.name, "call_id": tool_call.request.call_id}
+    ))
+    async def _execute_tool_call(self, tool_call: ToolCall, signal: AbortSignal):
+        """执行单个已调度的工具调用并记录结果"""
+        if tool_call.status != 'scheduled':
+            return
+        # 工具执行开始日志在VERBOSE模式显示
+        if DebugLogger.get_rules()["show_tool_calls"]:
+            log_info("Scheduler", f"执行工具: {tool_call.request.name}")
+
+        # 实时日志记录工具调用
+        if REALTIME_LOG_ENABLED:
+            log_tool_call(tool_call.request.name, tool_call.request.args, tool_call.request.call_id)
+
+        try:
+            # 设置为执行状态
+            self._set_status(tool_call.request.call_id, 'executing')
+
+            # 执行工具
+            tracer = get_tracer()
+            with tracer.span("tool.execute", parent=self._call_spans.get(tool_call.request.call_id)):
+                result = await tool_call.tool.execute(
+                    tool_call.request.args,
+                    signal,
+                    self._create_output_updater(tool_call.request.call_id)
+                )
+
+            # 使用统一的结果处理，确保Agent收到完整信息
+            from ..utils.function_response import convert_to_function_response
+            log_info("Scheduler", f"🔍 DEBUG: 即将调用convert_to_function_response")
+            log_info("Scheduler", f"🔍 DEBUG: tool_name={tool_call.request.name}")
+            log_info("Scheduler", f"🔍 DEBUG: call_id={tool_call.request.call_id}")
+            log_info("Scheduler", f"🔍 DEBUG: result类型: {type(result)}")
+            log_info("Scheduler", f"🔍 DEBUG: result内容概览: {repr(str(result)[:200])}")
+
+            with tracer.span("tool.convert_response", parent=self._call_spans.get(tool_call.request.call_id)):
+                function_response = convert_to_function_response(
+                    tool_call.request.name,
+                    tool_call.request.call_id,
+                    result  # 传递完整的ToolResult对象
+                )
+            log_info("Scheduler", f"🔍 DEBUG: convert_to_function_response返回: {repr(function_response)}")
+
+            # 检查执行结果是否包含错误
+            if result.error:
+                # 有错误但仍然传递完整的工具结果
+                error_response = ToolCallResponseInfo(
+                    call_id=tool_call.request.call_id,
+                    response_parts=function_response,
+                    result_display=result.return_display,
+                    error=Exception(result.error)
+                )
+                self._set_status(tool_call.request.call_id, 'error', error_response)
+
+                # 实时日志记录工具失败
+                if REALTIME_LOG_ENABLED:
+                    log_tool_result(tool_call.request.name, result.error, False, tool_call.request.call_id)
+            else:
+                # 创建成功响应
+                response = ToolCallResponseInfo(
+                    call_id=tool_call.request.call_id,
+                    response_parts=function_response,  # 使用转换后的格式
+                    result_display=result.return_display
+                )
+
+                DebugLogger.log_scheduler_event("tool_complete", {
+                    "name": tool_call.request.name,
+                    "response": function_response
+                })
+
+                self._set_status(tool_call.request.call_id, 'success', response)
+
+                # 实时日志记录工具成功
+                if REALTIME_LOG_ENABLED:
+                    log_tool_result(tool_call.request.name, result.summary or result.llm_content, True, tool_call.request.call_id)
+
+        except Exception as e:
+            # 执行失败，设置为错误状态
+            # 创建错误的functionResponse
+            error_function_response = {
+                'functionResponse': {
+                    'id': tool_call.request.call_id,
+                    'name': tool_call.request.name,
+                    'response': {'error': str(e)}
+                }
+            }
+
+            error_response = ToolCallResponseInfo(
+                call_id=tool_call.request.call_id,
+                response_parts=error_function_response,
+                error=e
+            )
+            self._set_status(tool_call.request.call_id, 'error', error_response)
+
+            # 实时日志记录工具失败
+            if REALTIME_LOG_ENABLED:
+                log_tool_result(tool_call.request.name, str(e), False, tool_call.request.call_id)
+
     def _create_output_updater(self, call_id: str):
         """
         创建输出更新器，用于流式输出
@@ -257,13 +339,12 @@ class DatabaseToolScheduler:
         
     def _is_running(self) -> bool:
         """检查是否有工具正在运行"""
-        return any(call.status in ['executing', 'awaiting_approval'] 
-                  for call in self.tool_calls)
+        return self._status_counts['executing'] > 0 or self._status_counts['awaiting_approval'] > 0
                   
     def _notify_tool_calls_update(self):
         """通知UI工具调用状态更新"""
         from ..utils.debug_logger import log_info
-        log_info("Scheduler", f"🔄 _notify_tool_calls_update - Scheduler ID: {id(self)}, tool_calls ID: {id(self.tool_calls)}, count: {len(self.tool_calls)}")
+        log_info("Scheduler", f"🔄 _notify_tool_calls_update - Scheduler ID: {id(self)}, count: {len(self._active_calls)}")
         if self.on_tool_calls_update:
             self.on_tool_calls_update(self.tool_calls)
             
@@ -288,20 +369,11 @@ class DatabaseToolScheduler:
         from ..utils.debug_logger import log_info
         log_info("Scheduler", f"🔍 handle_confirmation_response called for {call_id} with outcome: {outcome}")
         log_info("Scheduler", f"🔍 Scheduler instance ID: {id(self)}")
-        log_info("Scheduler", f"🔍 Current tool_calls count: {len(self.tool_calls)}")
-        log_info("Scheduler", f"🔍 tool_calls list ID: {id(self.tool_calls)}")
+        log_info("Scheduler", f"🔍 Current batch size: {len(self._active_calls)}")
         
-        for idx, call in enumerate(self.tool_calls):
-            log_info("Scheduler", f"  Tool[{idx}]: {call.request.name} - {call.request.call_id} - status: {call.status}")
-        
-        tool_call = None
-        for call in self.tool_calls:
-            if call.request.call_id == call_id and call.status == 'awaiting_approval':
-                tool_call = call
-                break
-                
-        if not tool_call:
-            log_info("Scheduler", f"Tool call {call_id} not found or not awaiting approval in {len(self.tool_calls)} tools")
+        tool_call = self._active_calls.get(call_id)
+        if tool_call is None or tool_call.status != 'awaiting_approval':
+            log_info("Scheduler", f"Tool call {call_id} not found or not awaiting approval in {len(self._active_calls)} tools")
             return
             
         log_info("Scheduler", f"Found tool {tool_call.request.name} for confirmation")
@@ -350,12 +422,7 @@ class DatabaseToolScheduler:
         
         while waited < max_wait:
             # 检查是否所有工具都完成了
-            all_complete = all(
-                call.status in ['success', 'error', 'cancelled']
-                for call in self.tool_calls
-            )
-            
-            if all_complete or len(self.tool_calls) == 0:
+            if self._pending_count() == 0:
                 # 所有工具已完成或没有工具
                 return
                 
@@ -364,108 +431,55 @@ class DatabaseToolScheduler:
             waited += poll_interval
             
         # 超时警告
-        if self.tool_calls:
-            from ..utils.debug_logger import log_info
-            log_info("Scheduler", f"Warning: Waited {max_wait}s but {len(self.tool_calls)} tools still not complete")
+        if self._active_calls:
+            log_info("Scheduler", f"Warning: Waited {max_wait}s but {self._pending_count()} tools still not complete")
     
     def _check_and_notify_completion(self):
         """
-        检查所有工具调用是否完成，如果完成则清理状态并通知
+        检查当前批次是否全部完成，如果完成则移入历史并通知
         参考 Gemini CLI 的 checkAndNotifyCompletion 实现
         """
-        from ..utils.debug_logger import log_info
-        log_info("Scheduler", f"_check_and_notify_completion called with {len(self.tool_calls)} tools")
-        
-        if len(self.tool_calls) == 0:
-            log_info("Scheduler", "No tools to check")
+        if not self._active_calls:
             return
             
-        # 打印所有工具的状态
-        for idx, call in enumerate(self.tool_calls):
-            log_info("Scheduler", f"  Tool[{idx}]: {call.request.name} - status: {call.status}")
-        
-        # 检查是否所有调用都处于终止状态
-        all_calls_terminal = all(
-            call.status in ['success', 'error', 'cancelled']
-            for call in self.tool_calls
-        )
-        
-        # 检查是否有工具正在等待确认
-        has_awaiting_approval = any(
-            call.status == 'awaiting_approval'
-            for call in self.tool_calls
-        )
-        
-        # 添加额外的检查：是否有执行中的工具
-        has_executing = any(
-            call.status == 'executing'
-            for call in self.tool_calls
-        )
+        # 状态计数随转换维护，无需遍历批次
+        pending = self._pending_count()
+        if pending:
+            log_info("Scheduler", f"⭕ Batch not complete: {pending}/{len(self._active_calls)} pending, counts={dict(self._status_counts)}")
+            return
+            
+        # 所有调用都处于终止状态：清空当前批次，移入有界历史
+        completed_calls = list(self._active_calls.values())
+        self._active_calls = {}
+        self._status_counts.clear()
+        self.history.extend(completed_calls)
+        log_info("Scheduler", f"All {len(completed_calls)} tool calls completed, clearing state")
         
-        log_info("Scheduler", f"all_calls_terminal: {all_calls_terminal}, has_awaiting_approval: {has_awaiting_approval}, has_executing: {has_executing}")
+        # 在VERBOSE模式下显示清理前的工具响应
+        if DebugLogger.should_log("DEBUG") and DebugLogger.get_rules()["show_raw_chunks"]:
+            for call in completed_calls:
+                if hasattr(call, 'response') and call.response:
+                    log_info("Scheduler", f"Completed tool {call.request.name} response: {call.response.response_parts}")
         
-        # 只有当所有工具都完成且没有等待确认或执行中的工具时才清理
-        if len(self.tool_calls) > 0 and all_calls_terminal and not has_awaiting_approval and not has_executing:
-            # 保存完成的调用列表
-            completed_calls = list(self.tool_calls)
+        # 执行完成回调
+        if self.on_all_tools_complete:
+            self.on_all_tools_complete(completed_calls)
             
-            # 清空工具调用列表 - 这是关键！
-            import traceback
-            log_info("Scheduler", "🚨 CLEARING tool_calls - conditions met:")
-            log_info("Scheduler", f"  len(tool_calls): {len(self.tool_calls)}")
-            log_info("Scheduler", f"  all_calls_terminal: {all_calls_terminal}")
-            log_info("Scheduler", f"  has_awaiting_approval: {has_awaiting_approval}")
-            log_info("Scheduler", f"  has_executing: {has_executing}")
-            log_info("Scheduler", "🚨 CLEARING tool_calls - stack trace:")
-            for line in traceback.format_stack():
-                log_info("Scheduler", f"  {line.strip()}")
-            self.tool_calls = []
-        else:
-            # 添加不清理的原因日志
-            log_info("Scheduler", "⭕ NOT clearing tool_calls - conditions:")
-            log_info("Scheduler", f"  len(tool_calls): {len(self.tool_calls)}")
-            log_info("Scheduler", f"  all_calls_terminal: {all_calls_terminal}")
-            log_info("Scheduler", f"  has_awaiting_approval: {has_awaiting_approval}")
-            log_info("Scheduler", f"  has_executing: {has_executing}")
-            log_info("Scheduler", f"  condition result: {len(self.tool_calls) > 0 and all_calls_terminal and not has_awaiting_approval and not has_executing}")
-            
-        # 继续原有逻辑（只有清理时才执行）
-        if len(self.tool_calls) == 0 and 'completed_calls' in locals():
-            # 记录日志  
-            from ..utils.debug_logger import DebugLogger, log_info
-            log_info("Scheduler", f"All {len(completed_calls)} tool calls completed, clearing state")
-            
-            # 在VERBOSE模式下显示清理前的工具响应
-            if DebugLogger.should_log("DEBUG") and DebugLogger.get_rules()["show_raw_chunks"]:
-                for call in completed_calls:
-                    if hasattr(call, 'response') and call.response:
-                        log_info("Scheduler", f"Completed tool {call.request.name} response: {call.response.response_parts}")
-            
-            # 执行完成回调
-            if self.on_all_tools_complete:
-                self.on_all_tools_complete(completed_calls)
-                
-            # 通知状态更新
-            self._notify_tool_calls_update()
+        # 通知状态更新
+        self._notify_tool_calls_update()
             
     def _set_status(self, call_id: str, status: str, details: Any = None):
         """
         更新工具调用状态 - 实现状态机转换
         """
-        import time
-        
         log_info("Scheduler", f"_set_status: {call_id} -> {status}")
         
-        for i, tool_call in enumerate(self.tool_calls):
-            if tool_call.request.call_id != call_id:
-                continue
-                
-            log_info("Scheduler", f"Found tool at index {i}: {tool_call.request.name} - current status: {tool_call.status}")
-                
-            # 不允许从终止状态转换
-            if tool_call.status in ['success', 'error', 'cancelled']:
-                continue
-                
+        tool_call = self._active_calls.get(call_id)
+        new_call = None
+        # 不允许从终止状态转换
+        if tool_call is not None and tool_call.status not in TERMINAL_STATUSES:
+            log_info("Scheduler", f"Found tool {tool_call.request.name} - current status: {tool_call.status}")
+            
             # 获取已有属性
             existing_start_time = getattr(tool_call, 'start_time', None)
             existing_tool = getattr(tool_call, 'tool', None)
@@ -519,12 +533,21 @@ class DatabaseToolScheduler:
                     status='cancelled',
                     duration_ms=duration * 1000
                 )
-            else:
-                continue
                 
-            # 更新数组
-            self.tool_calls[i] = new_call
-            break
+        if new_call is not None:
+            # 原位替换（保持调度顺序）并更新状态计数
+            self._active_calls[call_id] = new_call
+            self._status_counts[tool_call.status] -= 1
+            self._status_counts[new_call.status] += 1
+            
+            span = self._call_spans.get(call_id)
+            if span is not None:
+                span.add_event(status)
+            if status in TERMINAL_STATUSES:
+                self._end_call_span(call_id, status)
+                get_metrics().histogram(
+                    "dbrheo_tool_duration_seconds", "Tool call latency from validation to completion"
+                ).record(new_call.duration_ms / 1000, {"tool": tool_call.request.name, "status": status})
             
         self._notify_tool_calls_update()
         
@@ -9,6 +9,33 @@ from datetime import datetime
 from ..utils.debug_logger import log_info, DebugLogger
 
 
+# 2025年1月的参考价格（每1M tokens）
+MODEL_PRICING = {
+    'gemini-2.5-flash': {'input': 0.075, 'output': 0.30},  # $0.075/$0.30 per 1M
+    'gemini-1.5-pro': {'input': 1.25, 'output': 5.00},     # $1.25/$5.00 per 1M
+    'claude-3.5-sonnet': {'input': 3.00, 'output': 15.00}, # $3/$15 per 1M
+    'gpt-4.1': {'input': 2.50, 'output': 10.00},           # $2.50/$10 per 1M
+    'gpt-5-mini': {'input': 0.25, 'output': 2.00}          # $0.25/$2.00 per 1M
+}
+
+
+def find_pricing(model: str) -> Optional[Dict[str, float]]:
+    """查找价格（支持模型别名）"""
+    for key, pricing in MODEL_PRICING.items():
+        if key in (model or '').lower():
+            return pricing
+    return None
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> Optional[float]:
+    """单次调用的估算成本（美元），缓存的输入tokens不计费；未知模型返回None"""
+    pricing = find_pricing(model)
+    if pricing is None:
+        return None
+    billable_prompt = max(0, (prompt_tokens or 0) - (cached_tokens or 0))
+    return (billable_prompt / 1_000_000) * pricing['input'] + ((completion_tokens or 0) / 1_000_000) * pricing['output']
+
+
 @dataclass
 class TokenUsageRecord:
     """单次 API 调用的 token 使用记录"""
@@ -112,26 +139,11 @@ class TokenStatistics:
     
     def get_cost_estimate(self) -> Dict[str, float]:
         """获取成本估算（基于公开价格）"""
-        # 2025年1月的参考价格（每1M tokens）
-        pricing = {
-            'gemini-2.5-flash': {'input': 0.075, 'output': 0.30},  # $0.075/$0.30 per 1M
-            'gemini-1.5-pro': {'input': 1.25, 'output': 5.00},     # $1.25/$5.00 per 1M
-            'claude-3.5-sonnet': {'input': 3.00, 'output': 15.00}, # $3/$15 per 1M
-            'gpt-4.1': {'input': 2.50, 'output': 10.00},           # $2.50/$10 per 1M
-            'gpt-5-mini': {'input': 0.25, 'output': 2.00}          # $0.25/$2.00 per 1M
-        }
-        
         total_cost = 0.0
         cost_by_model = {}
         
         for model, stats in self.get_summary()['by_model'].items():
-            # 查找价格（支持模型别名）
-            model_pricing = None
-            for key in pricing:
-                if key in model.lower():
-                    model_pricing = pricing[key]
-                    break
-            
+            model_pricing = find_pricing(model)
             if model_pricing:
                 # 使用已经减去缓存的实际计费tokens
                 input_cost = (stats['prompt_tokens'] / 1_000_000) * model_pricing['input']
@@ -10,6 +10,7 @@ from ..types.tool_types import ToolCallRequestInfo
 from .chat import DatabaseChat
 from ..utils.debug_logger import DebugLogger
 from ..utils.debug_logger import log_info, DebugLogger
+from ..telemetry.tracer import get_tracer, traced
 
 
 class DatabaseTurn:
@@ -26,6 +27,7 @@ class DatabaseTurn:
         self.prompt_id = prompt_id
         self.pending_tool_calls: List[ToolCallRequestInfo] = []  # 只收集
         
+    @traced("turn.run")
     async def run(self, request: PartListUnion, signal: AbortSignal) -> AsyncIterator[dict]:
         """
         执行Turn - 收集工具调用但不执行
@@ -85,6 +87,9 @@ class DatabaseTurn:
                 yield {'type': 'TokenUsage', 'value': chunk['token_usage']}
         
         DebugLogger.log_turn_event("summary", chunk_count)
+        tracer = get_tracer()
+        tracer.set_attribute("chunks", chunk_count)
+        tracer.set_attribute("tool_calls", len(self.pending_tool_calls))
         
         # 3. Turn结束，pending_tool_calls留给调度器处理
         # 绝不在Turn中执行工具！
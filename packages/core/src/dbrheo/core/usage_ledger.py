@@ -0,0 +1,242 @@
+"""
+LLM 调用账本 - 每次模型调用一行，持久化到本地SQLite，跨会话累计
+用于找出哪些问题、哪些工具带来了主要的成本和延迟
+
+记录：模型、prompt/completion/cached tokens、TTFT、流式耗时、输出速度、
+本次调用请求的工具、估算成本，以及所属会话和用户消息（消息文本截断保存）。
+
+文件：usage_ledger_file（DBRHEO_USAGE_LEDGER_FILE），默认 ~/.dbrheo/usage_ledger.db；
+usage_ledger_enabled=false 时不记录。
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..config.base import DatabaseConfig
+from ..utils.debug_logger import log_info
+from .token_statistics import estimate_cost
+
+
+DEFAULT_LEDGER_FILE = Path.home() / ".dbrheo" / "usage_ledger.db"
+PROMPT_PREVIEW_CHARS = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    session_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    prompt_id TEXT,
+    prompt TEXT,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    ttft_ms REAL,
+    stream_ms REAL,
+    tokens_per_second REAL,
+    tool_calls INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_ts ON llm_calls(ts);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_message ON llm_calls(message_id);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_session ON llm_calls(session_id);
+CREATE TABLE IF NOT EXISTS call_tools (
+    call_id INTEGER NOT NULL REFERENCES llm_calls(id),
+    tool TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_call_tools_tool ON call_tools(tool, call_id);
+"""
+
+# rollup 分组方式 → (分组表达式, 额外的JOIN)
+GROUP_BY = {
+    "model": ("c.model", ""),
+    "message": ("c.message_id", ""),
+    "session": ("c.session_id", ""),
+    "day": ("date(c.ts, 'unixepoch', 'localtime')", ""),
+    "tool": ("t.tool", "JOIN call_tools t ON t.call_id = c.id"),
+}
+
+SORT_BY = {
+    "cost": "cost_usd",
+    "tokens": "total_tokens",
+    "calls": "calls",
+    "ttft": "avg_ttft_ms",
+    "latency": "total_stream_ms",
+    "recent": "last_ts",
+}
+
+
+class UsageLedger:
+    """SQLite账本，同一路径在进程内共享一个实例"""
+
+    _instances: Dict[str, "UsageLedger"] = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: Path) -> "UsageLedger":
+        key = str(Path(path).expanduser().resolve())
+        with cls._instances_lock:
+            ledger = cls._instances.get(key)
+            if ledger is None:
+                ledger = cls._instances[key] = cls(Path(key))
+            return ledger
+
+    @classmethod
+    def from_config(cls, config: DatabaseConfig) -> Optional["UsageLedger"]:
+        """按配置打开账本；关闭或无法打开时返回None（不影响对话）"""
+        enabled = config.get("usage_ledger_enabled", True)
+        if str(enabled).lower() in ("false", "0", "no", "off"):
+            return None
+        try:
+            return cls.open(config.get("usage_ledger_file") or DEFAULT_LEDGER_FILE)
+        except (OSError, sqlite3.Error) as e:
+            log_info("UsageLedger", f"Ledger disabled: {e}")
+            return None
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 写入在事件循环线程，查询可能来自其他线程（API）
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def record(
+        self,
+        session_id: str,
+        message_id: str,
+        model: str,
+        usage: Optional[Dict[str, Any]] = None,
+        timing: Optional[Dict[str, Any]] = None,
+        tools: Optional[List[str]] = None,
+        prompt_id: Optional[str] = None,
+        prompt: Optional[str] = None
+    ) -> int:
+        """记录一次模型调用，返回行ID"""
+        usage = usage or {}
+        timing = timing or {}
+        tools = tools or []
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        cached_tokens = int(usage.get("cached_tokens") or 0)
+        cost = estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens) if usage else None
+        stream_ms = timing.get("stream_ms")
+        tokens_per_second = (
+            completion_tokens / (stream_ms / 1000) if completion_tokens and stream_ms else None
+        )
+        if prompt and len(prompt) > PROMPT_PREVIEW_CHARS:
+            prompt = prompt[:PROMPT_PREVIEW_CHARS] + "…"
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cursor = self._conn.execute(
+                    "INSERT INTO llm_calls (ts, session_id, message_id, prompt_id, prompt, model, "
+                    "prompt_tokens, completion_tokens, cached_tokens, ttft_ms, stream_ms, "
+                    "tokens_per_second, tool_calls, cost_usd) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (time.time(), session_id, message_id, prompt_id, prompt, model,
+                     prompt_tokens, completion_tokens, cached_tokens, timing.get("ttft_ms"), stream_ms,
+                     tokens_per_second, len(tools), cost)
+                )
+                call_id = cursor.lastrowid
+                if tools:
+                    self._conn.executemany(
+                        "INSERT INTO call_tools (call_id, tool) VALUES (?, ?)",
+                        [(call_id, tool) for tool in tools]
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return call_id
+
+    def rollup(
+        self,
+        group_by: str = "model",
+        since_days: Optional[float] = None,
+        session_id: Optional[str] = None,
+        sort: str = "cost",
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        按模型/用户消息/会话/天/工具汇总
+        tool 分组时一次调用请求多个工具，则该调用计入每个工具
+        """
+        if group_by not in GROUP_BY:
+            raise ValueError(f"Unknown group_by: {group_by} (expected one of {', '.join(GROUP_BY)})")
+        if sort not in SORT_BY:
+            raise ValueError(f"Unknown sort: {sort} (expected one of {', '.join(SORT_BY)})")
+        key_expr, join = GROUP_BY[group_by]
+
+        where, params = [], []
+        if since_days is not None:
+            where.append("c.ts >= ?")
+            params.append(time.time() - since_days * 86400)
+        if session_id:
+            where.append("c.session_id = ?")
+            params.append(session_id)
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+        sql = f"""
+            SELECT {key_expr} AS key,
+                   COUNT(*) AS calls,
+                   COUNT(DISTINCT c.message_id) AS messages,
+                   SUM(c.prompt_tokens) AS prompt_tokens,
+                   SUM(c.completion_tokens) AS completion_tokens,
+                   SUM(c.cached_tokens) AS cached_tokens,
+                   SUM(c.prompt_tokens - c.cached_tokens + c.completion_tokens) AS total_tokens,
+                   SUM(c.tool_calls) AS tool_calls,
+                   SUM(c.cost_usd) AS cost_usd,
+                   AVG(c.ttft_ms) AS avg_ttft_ms,
+                   MAX(c.ttft_ms) AS max_ttft_ms,
+                   SUM(c.stream_ms) AS total_stream_ms,
+                   AVG(c.tokens_per_second) AS avg_tokens_per_second,
+                   MAX(c.prompt) AS prompt,
+                   MIN(c.ts) AS first_ts,
+                   MAX(c.ts) AS last_ts
+            FROM llm_calls c {join}
+            {where_sql}
+            GROUP BY key
+            ORDER BY {SORT_BY[sort]} DESC
+            LIMIT ?
+        """
+        params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def totals(self, since_days: Optional[float] = None, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """全部调用的汇总（一行）"""
+        where, params = [], []
+        if since_days is not None:
+            where.append("ts >= ?")
+            params.append(time.time() - since_days * 86400)
+        if session_id:
+            where.append("session_id = ?")
+            params.append(session_id)
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS calls, COUNT(DISTINCT message_id) AS messages, "
+                "COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens, "
+                "COALESCE(SUM(completion_tokens), 0) AS completion_tokens, "
+                "COALESCE(SUM(cached_tokens), 0) AS cached_tokens, "
+                "COALESCE(SUM(cost_usd), 0) AS cost_usd, AVG(ttft_ms) AS avg_ttft_ms "
+                f"FROM llm_calls {where_sql}",
+                params
+            ).fetchone()
+        return dict(row)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        with self._instances_lock:
+            if self._instances.get(str(self.path)) is self:
+                del self._instances[str(self.path)]
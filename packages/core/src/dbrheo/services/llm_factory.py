@@ -37,6 +37,11 @@ class LLMServiceFactory:
             "module": "openai_service",  # 阿里百炼兼容 OpenAI，直接使用 OpenAI 服务
             "class": "OpenAIService",
             "prefixes": ["qwen", "ali", "dashscope"]
+        },
+        "mock": {
+            "module": "mock_service",  # 脚本回放，用于离线测试和基准测试
+            "class": "MockLLMService",
+            "prefixes": ["mock"]
         }
     }
     
@@ -54,6 +59,20 @@ class LLMServiceFactory:
         Raises:
             ValueError: 当模型不被支持时
         """
+        # 录制/回放模式：包装实际服务，回放时不创建实际服务
+        replay_mode = config.get("llm_replay_mode")
+        if replay_mode and str(replay_mode).lower() not in ("off", "false", "none", ""):
+            from .replay_service import RecordReplayLLMService
+            return RecordReplayLLMService(
+                config,
+                LLMServiceFactory._create_base_service,
+                mode=str(replay_mode).lower()
+            )
+        return LLMServiceFactory._create_base_service(config)
+    
+    @staticmethod
+    def _create_base_service(config: DatabaseConfig):
+        """根据模型名称创建实际的 LLM 服务"""
         model_name = config.get_model()
         
         # 查找匹配的服务
@@ -0,0 +1,154 @@
+"""
+Mock LLM 服务 - 按脚本回放流式响应，不访问网络
+用于离线测试和Agent循环基准测试，保持与 GeminiService 相同的接口
+
+脚本格式（dict，或JSON文件路径）:
+    {
+        "responses": [
+            # 简写：文本按 mock_llm_chunk_size 切分成多个chunk，usage缺省时按字符数估算
+            {"text": "让我查询一下。", "function_calls": [{"name": "sql_execute", "args": {"sql": "SELECT 1"}}]},
+            # 原始chunk列表：原样逐个产出
+            [{"text": "结果是 1"}, {"token_usage": {"prompt_tokens": 10, "completion_tokens": 3, "total_tokens": 13}}]
+        ],
+        "json_responses": [{"next_speaker": "user", "reasoning": "done"}],
+        "loop": true
+    }
+
+配置项:
+    mock_llm_script       脚本（dict/list/JSON文件路径），缺省时每次回复 "OK"
+    mock_llm_token_delay  相邻chunk之间的等待秒数（默认0）
+    mock_llm_chunk_size   简写文本切分的字符数（默认4，约一个token）
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Union
+
+from ..types.core_types import Content, AbortSignal
+from ..config.base import DatabaseConfig
+from ..utils.content_helper import get_parts, get_text
+from ..utils.debug_logger import log_info
+
+
+DEFAULT_RESPONSE = {"text": "OK"}
+DEFAULT_JSON_RESPONSE = {"next_speaker": "user", "reasoning": "mock response"}
+
+
+class MockLLMService:
+    """
+    脚本回放的 LLM 服务
+    - 响应按调用顺序取自脚本，loop=true 时循环，否则用完后重复最后一条
+    - 函数调用ID、token统计都是确定的，同一脚本每次运行产出完全相同的chunk序列
+    """
+
+    def __init__(self, config: DatabaseConfig, script: Optional[Union[Dict[str, Any], List[Any], str]] = None):
+        self.config = config
+        self.model_name = config.get_model()
+        self.token_delay = float(config.get("mock_llm_token_delay", 0) or 0)
+        self.chunk_size = max(1, int(config.get("mock_llm_chunk_size", 4) or 4))
+        self.set_script(script if script is not None else config.get("mock_llm_script"))
+        log_info("MockLLM", f"Using mock model: {self.model_name} ({len(self.responses)} scripted responses)")
+
+    def set_script(self, script: Optional[Union[Dict[str, Any], List[Any], str]]):
+        """替换脚本并重置调用计数"""
+        if isinstance(script, (str, Path)):
+            with open(script, 'r', encoding='utf-8') as f:
+                script = json.load(f)
+        if script is None:
+            script = {}
+        if isinstance(script, list):
+            script = {"responses": script}
+
+        self.responses: List[Any] = list(script.get("responses") or [DEFAULT_RESPONSE])
+        self.json_responses: List[Dict[str, Any]] = list(script.get("json_responses") or [DEFAULT_JSON_RESPONSE])
+        self.loop = bool(script.get("loop", False))
+        self.call_count = 0
+        self.json_call_count = 0
+
+    def _pick(self, items: List[Any], index: int) -> Any:
+        if self.loop:
+            return items[index % len(items)]
+        return items[min(index, len(items) - 1)]
+
+    @staticmethod
+    def _count_chars(contents: List[Content], system_instruction: Optional[str]) -> int:
+        chars = len(system_instruction or "")
+        for content in contents:
+            for part in get_parts(content):
+                text = get_text(part)
+                if text:
+                    chars += len(text)
+                elif isinstance(part, dict):
+                    chars += len(json.dumps(part, ensure_ascii=False, default=str))
+        return chars
+
+    def _expand(self, response: Any, prompt_chars: int) -> List[Dict[str, Any]]:
+        """把简写响应展开为chunk列表"""
+        if isinstance(response, list):
+            return [dict(chunk) for chunk in response]
+        if isinstance(response, str):
+            response = {"text": response}
+
+        chunks: List[Dict[str, Any]] = []
+        text = response.get("text", "")
+        for start in range(0, len(text), self.chunk_size):
+            chunks.append({"text": text[start:start + self.chunk_size]})
+
+        calls = response.get("function_calls") or []
+        if calls:
+            chunks.append({"function_calls": [
+                {
+                    "id": call.get("id") or f"mock_call_{self.call_count}_{i}",
+                    "name": call["name"],
+                    "args": call.get("args", {})
+                }
+                for i, call in enumerate(calls)
+            ]})
+
+        usage = response.get("usage")
+        if usage is None:
+            # 粗略按4个字符一个token估算，保证确定性
+            prompt_tokens = prompt_chars // 4
+            completion_chars = len(text) + (len(json.dumps(calls, ensure_ascii=False)) if calls else 0)
+            completion_tokens = completion_chars // 4
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "cached_tokens": 0
+            }
+        if usage:
+            chunks.append({"token_usage": dict(usage)})
+        return chunks
+
+    def send_message_stream(
+        self,
+        contents: List[Content],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        system_instruction: Optional[str] = None,
+        signal: Optional[AbortSignal] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """按脚本产出下一条响应的chunk（同步生成器）"""
+        response = self._pick(self.responses, self.call_count)
+        chunks = self._expand(response, self._count_chars(contents, system_instruction))
+        self.call_count += 1
+
+        for i, chunk in enumerate(chunks):
+            if signal and signal.aborted:
+                break
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            yield chunk
+
+    async def generate_json(
+        self,
+        contents: List[Content],
+        schema: Dict[str, Any],
+        signal: Optional[AbortSignal] = None,
+        system_instruction: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """按脚本返回下一条JSON响应"""
+        response = self._pick(self.json_responses, self.json_call_count)
+        self.json_call_count += 1
+        return dict(response)
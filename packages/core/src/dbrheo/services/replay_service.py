@@ -0,0 +1,270 @@
+"""
+LLM 录制/回放服务 - 包装任意 LLM 服务，按请求内容缓存响应
+用于评测：第一次运行录制，之后回放，只修改评分逻辑时不再调用模型
+
+模式（llm_replay_mode / DBRHEO_LLM_REPLAY_MODE）:
+    record  总是调用模型并追加记录
+    replay  只从文件回放，未命中时返回错误chunk（不调用模型，不需要API Key）
+    auto    命中则回放，否则调用模型并记录
+
+请求键 = sha256(类型, 模型, 系统提示词, 工具声明, 历史)，其中：
+- 文本中的时间戳（如系统提示词里的当前时间）替换为占位符
+- 函数调用只取名称和参数，不取ID；函数响应只取名称（查询耗时、结果句柄等每次都不同）
+同一个键可以有多条记录（同一问题多次运行），按进程内出现次序依次回放，超出时重复最后一条。
+
+文件为追加写的JSONL（llm_replay_file，默认 ~/.dbrheo/llm_replay.jsonl），每行一条记录，
+打开时只建立 键 → 行偏移 的索引，回放时按需读取。
+"""
+
+import hashlib
+import json
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from ..types.core_types import AbortSignal, Content
+from ..config.base import DatabaseConfig
+from ..utils.content_helper import get_parts, get_role, get_text
+from ..utils.debug_logger import log_info
+from ..telemetry.metrics import register_cache
+
+
+REPLAY_MODES = ("record", "replay", "auto")
+DEFAULT_REPLAY_FILE = Path.home() / ".dbrheo" / "llm_replay.jsonl"
+
+_TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?")
+
+
+def _normalize_text(text: str) -> str:
+    return _TIMESTAMP_RE.sub("<ts>", text)
+
+
+def _normalize_part(part: Any) -> Any:
+    if not isinstance(part, dict):
+        text = get_text(part)
+        return {"text": _normalize_text(text)} if text else str(part)
+    if "text" in part:
+        return {"text": _normalize_text(part.get("text") or "")}
+    call = part.get("function_call") or part.get("functionCall")
+    if call:
+        return {"function_call": {"name": call.get("name"), "args": call.get("args")}}
+    response = part.get("function_response") or part.get("functionResponse")
+    if response:
+        return {"function_response": {"name": response.get("name")}}
+    return part
+
+
+def request_key(
+    kind: str,
+    model: str,
+    contents: List[Content],
+    system_instruction: Optional[str] = None,
+    tools: Optional[List[Dict[str, Any]]] = None,
+    extra: Any = None
+) -> str:
+    """计算请求键（见模块说明）"""
+    normalized = {
+        "kind": kind,
+        "model": model,
+        "system": _normalize_text(system_instruction or ""),
+        "tools": tools or [],
+        "contents": [
+            {"role": get_role(content), "parts": [_normalize_part(p) for p in get_parts(content)]}
+            for content in contents
+        ],
+        "extra": extra,
+    }
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMReplayStore:
+    """追加写的记录文件，同一路径在进程内共享一个实例"""
+
+    _instances: Dict[str, "LLMReplayStore"] = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: Path) -> "LLMReplayStore":
+        key = str(Path(path).expanduser().resolve())
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                store = cls._instances[key] = cls(Path(key))
+                register_cache("llm_replay", store)
+            return store
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._offsets: Dict[str, List[int]] = {}
+        self._replayed: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._needs_newline = False
+        self._load_index()
+
+    def _load_index(self):
+        if not self.path.exists():
+            return
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self._offsets.setdefault(record["k"], []).append(offset)
+                except (ValueError, KeyError):
+                    # 写入中断留下的不完整行
+                    pass
+                offset += len(line)
+        # 上次写入中断时补一个换行，避免新记录接在残行后面
+        self._needs_newline = offset > 0 and not line.endswith(b"\n")
+
+    def _read_at(self, offset: int) -> Dict[str, Any]:
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def next_record(self, key: str) -> Optional[Dict[str, Any]]:
+        """该键的下一条记录（按出现次序，用完后重复最后一条）"""
+        with self._lock:
+            offsets = self._offsets.get(key)
+            if not offsets:
+                self.misses += 1
+                return None
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+            self.hits += 1
+            offset = offsets[min(index, len(offsets) - 1)]
+        return self._read_at(offset)
+
+    def has_unreplayed(self, key: str) -> bool:
+        with self._lock:
+            return len(self._offsets.get(key, ())) > self._replayed.get(key, 0)
+
+    def append(self, key: str, kind: str, model: str, payload: Dict[str, Any]):
+        record = {"k": key, "kind": kind, "model": model, "ts": datetime.now().isoformat(timespec="seconds")}
+        record.update(payload)
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+        with self._lock:
+            with open(self.path, "ab") as f:
+                if self._needs_newline:
+                    f.write(b"\n")
+                    self._needs_newline = False
+                offset = f.tell()
+                f.write(line)
+            self._offsets.setdefault(key, []).append(offset)
+            # 录制的记录视为已回放过，避免 auto 模式在同一进程里把刚录的响应再回放一次
+            self._replayed[key] = self._replayed.get(key, 0) + 1
+            self.recorded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "keys": len(self._offsets),
+                "records": sum(len(v) for v in self._offsets.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "recorded": self.recorded,
+            }
+
+
+class RecordReplayLLMService:
+    """
+    录制/回放包装器，接口与被包装的服务一致
+    被包装的服务延迟创建：纯回放时不需要API Key
+    """
+
+    def __init__(
+        self,
+        config: DatabaseConfig,
+        create_inner: Callable[[DatabaseConfig], Any],
+        mode: str = "auto",
+        store: Optional[LLMReplayStore] = None
+    ):
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Unknown llm_replay_mode: {mode}")
+        self.config = config
+        self.mode = mode
+        self.model_name = config.get_model()
+        self.store = store or LLMReplayStore.open(config.get("llm_replay_file") or DEFAULT_REPLAY_FILE)
+        self._create_inner = create_inner
+        self._inner = None
+        log_info("LLMReplay", f"{mode} mode, file: {self.store.path}")
+
+    @property
+    def inner(self):
+        if self._inner is None:
+            self._inner = self._create_inner(self.config)
+        return self._inner
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.mode == "record":
+            return None
+        if self.mode == "auto" and not self.store.has_unreplayed(key):
+            return None
+        return self.store.next_record(key)
+
+    def send_message_stream(
+        self,
+        contents: List[Content],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        system_instruction: Optional[str] = None,
+        signal: Optional[AbortSignal] = None
+    ) -> Iterator[Dict[str, Any]]:
+        key = request_key("stream", self.model_name, contents, system_instruction, tools)
+        record = self._lookup(key)
+        if record is not None:
+            for chunk in record.get("chunks", []):
+                if signal and signal.aborted:
+                    break
+                yield chunk
+            return
+
+        if self.mode == "replay":
+            yield {
+                "type": "error",
+                "error": f"No recorded LLM response for request {key[:12]} (replay mode)",
+                "text": f"Error: no recorded LLM response for request {key[:12]}"
+            }
+            return
+
+        chunks = []
+        complete = False
+        try:
+            for chunk in self.inner.send_message_stream(contents, tools, system_instruction, signal):
+                chunks.append(chunk)
+                yield chunk
+            complete = not (signal and signal.aborted)
+        finally:
+            # 只记录完整且没有错误的响应
+            if complete and not any(c.get("type") == "error" for c in chunks):
+                self.store.append(key, "stream", self.model_name, {"chunks": chunks})
+
+    async def generate_json(
+        self,
+        contents: List[Content],
+        schema: Dict[str, Any],
+        signal: Optional[AbortSignal] = None,
+        system_instruction: Optional[str] = None
+    ) -> Dict[str, Any]:
+        key = request_key("json", self.model_name, contents, system_instruction, extra=schema)
+        record = self._lookup(key)
+        if record is not None:
+            return record.get("result", {})
+
+        if self.mode == "replay":
+            return {
+                "next_speaker": "user",
+                "reasoning": f"No recorded LLM response for request {key[:12]} (replay mode)"
+            }
+
+        result = await self.inner.generate_json(contents, schema, signal, system_instruction)
+        if not (isinstance(result, dict) and str(result.get("reasoning", "")).startswith("Error")):
+            self.store.append(key, "json", self.model_name, {"result": result})
+        return result
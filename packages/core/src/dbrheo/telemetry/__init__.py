@@ -3,12 +3,19 @@
 提供OpenTelemetry集成、性能监控、错误追踪等功能
 """
 
-from .tracer import DatabaseTracer
+from .tracer import DatabaseTracer, get_tracer, traced
 from .metrics import DatabaseMetrics
+from .profiler import TurnProfiler, get_profiler, profiled, summarize_profiles
 from .logger import DatabaseLogger
 
 __all__ = [
     "DatabaseTracer",
+    "get_tracer",
+    "traced",
     "DatabaseMetrics", 
+    "TurnProfiler",
+    "get_profiler",
+    "profiled",
+    "summarize_profiles",
     "DatabaseLogger"
 ]
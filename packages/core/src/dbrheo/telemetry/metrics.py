@@ -1,12 +1,23 @@
 """
 DatabaseMetrics - 性能指标收集系统
 基于OpenTelemetry Metrics实现，完全对齐Gemini CLI的指标机制
+
+内存存储（不依赖OpenTelemetry，/metrics 端点从这里读取）：
+- 直方图按固定桶边界计数，以 Prometheus histogram（_bucket/_sum/_count）导出：
+  累计计数可以用 histogram_quantile(rate(...[5m])) 计算任意时间窗口内的分位数，
+  近期的延迟回退不会被进程启动以来的全部样本稀释
+- 同时保留 DDSketch 风格的对数分桶草图（分位数相对误差有界，默认1%），
+  供 get_metrics_summary 和进程内分析使用；同一指标的草图可以合并
+- 指标按 (名称, 标签) 存储；抓取时再调用已登记的采集函数（连接池、缓存命中率等）
 """
 
-import time
+import bisect
+import math
 import logging
-from typing import Optional, Dict, Any, List
-from collections import defaultdict, deque
+import threading
+import weakref
+from typing import Optional, Dict, Any, List, Callable, Iterable, Tuple
+from collections import defaultdict
 from dataclasses import dataclass, field
 
 # 有条件导入OpenTelemetry Metrics
@@ -22,6 +33,18 @@ except ImportError:
 from ..config.base import DatabaseConfig
 
 
+LabelKey = Tuple[Tuple[str, str], ...]
+SeriesKey = Tuple[str, LabelKey]
+
+# 草图摘要（get_metrics_summary）中的分位数
+EXPORTED_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+# 直方图默认桶上界（秒），覆盖数据库语句到LLM调用的延迟范围
+DEFAULT_HISTOGRAM_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+
+
 @dataclass
 class MetricPoint:
     """指标数据点"""
@@ -30,35 +53,144 @@ class MetricPoint:
     labels: Dict[str, str] = field(default_factory=dict)
 
 
+def _label_key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+    if not labels:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+class QuantileSketch:
+    """
+    DDSketch风格的分位数草图
+    - 值 v 落入第 ceil(log_gamma(v)) 个桶，gamma = (1+alpha)/(1-alpha)，
+      返回桶的中点时相对误差不超过 alpha
+    - 桶数超过 max_buckets 时合并最小的桶（只影响最低端的分位数，尾部保持精确）
+    - 不大于 min_value 的值（含0和负值）计入零桶
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048, min_value: float = 1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self._buckets: Dict[int, int] = defaultdict(int)
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1):
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= self.min_value:
+            self.zero_count += count
+            return
+        self._buckets[math.ceil(math.log(value) / self._log_gamma)] += count
+        if len(self._buckets) > self.max_buckets:
+            self._collapse_lowest()
+
+    def _collapse_lowest(self):
+        keys = sorted(self._buckets)
+        excess = len(keys) - self.max_buckets
+        target = keys[excess]
+        for key in keys[:excess]:
+            self._buckets[target] += self._buckets.pop(key)
+
+    def merge(self, other: "QuantileSketch"):
+        """合并另一个相同精度的草图"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, count in other._buckets.items():
+            self._buckets[key] += count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self._buckets) > self.max_buckets:
+            self._collapse_lowest()
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return min(0.0, self.min)
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: Iterable[float] = EXPORTED_QUANTILES) -> Dict[float, Optional[float]]:
+        return {q: self.quantile(q) for q in qs}
+
+    @property
+    def bucket_count(self) -> int:
+        return len(self._buckets)
+
+
 class DatabaseMetrics:
     """
     数据库Agent性能指标收集系统
     - 完全对齐Gemini CLI的指标机制
     - 支持OpenTelemetry Metrics集成
-    - 提供内存缓存和批量导出
-    - 支持降级模式（未安装OpenTelemetry时）
+    - 内存存储：计数器、仪表盘、分位数草图，按 (名称, 标签) 索引
+    - 抓取时采集函数补充即时值（register_collector）
     """
-    
-    def __init__(self, config: DatabaseConfig):
+
+    def __init__(self, config: Optional[DatabaseConfig] = None):
         self.config = config
-        self.service_name = config.get("service_name", "database-agent")
-        self.enabled = config.get("metrics_enabled", True)
-        
-        # 内存指标存储（降级模式）
-        self.counters: Dict[str, float] = defaultdict(float)
-        self.histograms: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
-        self.gauges: Dict[str, float] = {}
-        
-        # 初始化OpenTelemetry指标
-        self.meter = self._setup_meter() if self.enabled else None
+        self._lock = threading.Lock()
+
+        # 内存指标存储
+        self.counters: Dict[SeriesKey, float] = defaultdict(float)
+        self.histograms: Dict[SeriesKey, QuantileSketch] = {}
+        # 每个直方图的桶上界和每个序列的分桶计数（非累计，导出时累加）
+        self.histogram_buckets: Dict[str, Tuple[float, ...]] = {}
+        self.bucket_counts: Dict[SeriesKey, List[int]] = {}
+        self.gauges: Dict[SeriesKey, float] = {}
+        self.descriptions: Dict[str, str] = {}
+        self.relative_accuracy = 0.01
+
+        self._instruments: Dict[Tuple[str, str], Any] = {}
         self._otel_instruments = {}
-        
+        self._collectors: Dict[str, Callable[[], Iterable[Tuple[str, str, Dict[str, Any], float]]]] = {}
+        self.enabled = True
+        self.meter = None
+        if config is not None:
+            self.configure(config)
+
+    def configure(self, config: DatabaseConfig):
+        """应用配置（共享实例先于配置创建时，保留已记录的数据）"""
+        self.config = config
+        self.service_name = config.get("service_name", "database-agent")
+        self.enabled = str(config.get("metrics_enabled", True)).lower() not in ("false", "0", "no")
+        self.relative_accuracy = float(config.get("metrics_relative_accuracy", 0.01))
+        # 只在配置了OTLP端点时创建OpenTelemetry指标，否则数据没有去处
+        if self.enabled and config.get("otel_exporter_otlp_endpoint"):
+            self.meter = self._setup_meter()
+            # 之前创建的指标对象没有对应的OpenTelemetry仪表，重新创建
+            self._instruments.clear()
+
     def _setup_meter(self):
         """设置OpenTelemetry指标收集器"""
         if not OTEL_METRICS_AVAILABLE:
             logging.warning("OpenTelemetry Metrics not available, using memory storage")
             return None
-            
+
         try:
             # 设置指标提供者
             otlp_endpoint = self.config.get("otel_exporter_otlp_endpoint")
@@ -67,106 +199,241 @@ class DatabaseMetrics:
                 reader = PeriodicExportingMetricReader(exporter, export_interval_millis=5000)
                 provider = MeterProvider(metric_readers=[reader])
                 metrics.set_meter_provider(provider)
-                
+
             # 创建指标收集器
             return metrics.get_meter(self.service_name)
-            
+
         except Exception as e:
             logging.error(f"Failed to setup metrics: {e}")
             return None
-            
+
+    def _instrument(self, cls, kind: str, name: str, description: str, *args):
+        instrument = self._instruments.get((kind, name))
+        if instrument is None:
+            if description:
+                self.descriptions.setdefault(name, description)
+            instrument = self._instruments[(kind, name)] = cls(self, name, description, *args)
+        return instrument
+
     def counter(self, name: str, description: str = "") -> 'Counter':
-        """创建计数器指标"""
-        return Counter(self, name, description)
-        
-    def histogram(self, name: str, description: str = "") -> 'Histogram':
-        """创建直方图指标"""
-        return Histogram(self, name, description)
-        
+        """创建计数器指标（同名复用）"""
+        return self._instrument(Counter, "counter", name, description)
+
+    def histogram(self, name: str, description: str = "",
+                  buckets: Optional[Iterable[float]] = None) -> 'Histogram':
+        """
+        创建直方图指标（同名复用）
+        buckets: 桶上界，默认 DEFAULT_HISTOGRAM_BUCKETS；同名指标以第一次创建时的桶为准
+        """
+        with self._lock:
+            bounds = self.histogram_buckets.setdefault(
+                name, tuple(sorted(float(b) for b in (buckets or DEFAULT_HISTOGRAM_BUCKETS)))
+            )
+        return self._instrument(Histogram, "histogram", name, description, bounds)
+
     def gauge(self, name: str, description: str = "") -> 'Gauge':
-        """创建仪表盘指标"""
-        return Gauge(self, name, description)
-        
+        """创建仪表盘指标（同名复用）"""
+        return self._instrument(Gauge, "gauge", name, description)
+
+    def register_collector(self, name: str, collect: Callable[[], Iterable[Tuple[str, str, Dict[str, Any], float]]]):
+        """
+        登记抓取时调用的采集函数，产出 (指标名, 类型gauge/counter, 标签, 值)
+        同名登记会替换之前的函数
+        """
+        with self._lock:
+            self._collectors[name] = collect
+
     def _get_or_create_counter(self, name: str, description: str):
         """获取或创建OpenTelemetry计数器"""
         if not self.meter:
             return None
-            
+
         if name not in self._otel_instruments:
             self._otel_instruments[name] = self.meter.create_counter(
                 name=name,
                 description=description
             )
         return self._otel_instruments[name]
-        
+
     def _get_or_create_histogram(self, name: str, description: str):
         """获取或创建OpenTelemetry直方图"""
         if not self.meter:
             return None
-            
+
         if name not in self._otel_instruments:
             self._otel_instruments[name] = self.meter.create_histogram(
                 name=name,
                 description=description
             )
         return self._otel_instruments[name]
-        
+
+    def get_sketch(self, name: str, labels: Optional[Dict[str, Any]] = None) -> Optional[QuantileSketch]:
+        return self.histograms.get((name, _label_key(labels)))
+
+    def merged_sketch(self, name: str, **label_filter) -> QuantileSketch:
+        """合并某个直方图所有（或匹配标签的）序列的草图"""
+        merged = QuantileSketch(self.relative_accuracy)
+        with self._lock:
+            for (series_name, labels), sketch in self.histograms.items():
+                if series_name != name:
+                    continue
+                label_dict = dict(labels)
+                if all(label_dict.get(k) == str(v) for k, v in label_filter.items()):
+                    merged.merge(sketch)
+        return merged
+
+    def _collect(self) -> List[Tuple[str, str, LabelKey, float]]:
+        with self._lock:
+            collectors = list(self._collectors.items())
+        samples = []
+        for collector_name, collect in collectors:
+            try:
+                for name, kind, labels, value in collect():
+                    samples.append((name, kind, _label_key(labels), float(value)))
+            except Exception as e:
+                logging.debug(f"Metrics collector {collector_name} failed: {e}")
+        return samples
+
+    def render_prometheus(self) -> str:
+        """Prometheus 文本格式（0.0.4）；直方图导出累计的 _bucket（含 le="+Inf"）、_sum、_count"""
+        families: Dict[str, Tuple[str, List[str]]] = {}
+
+        def family(name: str, kind: str) -> List[str]:
+            if name not in families:
+                families[name] = (kind, [])
+            return families[name][1]
+
+        with self._lock:
+            counters = list(self.counters.items())
+            gauges = list(self.gauges.items())
+            histograms = [(key, self.histogram_buckets[key[0]], list(self.bucket_counts[key]), sketch.sum, sketch.count)
+                          for key, sketch in self.histograms.items()]
+
+        for (name, labels), value in counters:
+            family(name, "counter").append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), value in gauges:
+            family(name, "gauge").append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, kind, labels, value in self._collect():
+            family(name, kind).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), bounds, counts, total, count in histograms:
+            lines = family(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        output = []
+        for name in sorted(families):
+            kind, lines = families[name]
+            description = self.descriptions.get(name)
+            if description:
+                output.append(f"# HELP {name} {_escape_help(description)}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(lines)
+        return "\n".join(output) + "\n"
+
     def get_metrics_summary(self) -> Dict[str, Any]:
         """获取指标摘要（用于健康检查和调试）"""
-        return {
-            "counters": dict(self.counters),
-            "gauges": dict(self.gauges),
-            "histogram_counts": {k: len(v) for k, v in self.histograms.items()},
-            "enabled": self.enabled,
-            "otel_available": OTEL_METRICS_AVAILABLE and self.meter is not None
-        }
+        with self._lock:
+            return {
+                "counters": {_series_name(key): value for key, value in self.counters.items()},
+                "gauges": {_series_name(key): value for key, value in self.gauges.items()},
+                "histogram_counts": {_series_name(key): sketch.count for key, sketch in self.histograms.items()},
+                "histograms": {
+                    _series_name(key): {f"p{int(q * 100)}": value for q, value in sketch.quantiles().items()}
+                    for key, sketch in self.histograms.items()
+                },
+                "enabled": self.enabled,
+                "otel_available": OTEL_METRICS_AVAILABLE and self.meter is not None
+            }
+
+
+def _series_name(key: SeriesKey) -> str:
+    name, labels = key
+    return f"{name}{_format_labels(labels)}"
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value: Optional[float]) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
 
 
 class Counter:
     """计数器指标"""
-    
+
     def __init__(self, metrics: DatabaseMetrics, name: str, description: str):
         self.metrics = metrics
         self.name = name
         self.description = description
         self._otel_counter = metrics._get_or_create_counter(name, description)
-        
+
     def increment(self, value: float = 1.0, labels: Optional[Dict[str, str]] = None):
         """增加计数器值"""
         if not self.metrics.enabled:
             return
-            
+
         # 内存存储
-        key = f"{self.name}:{labels}" if labels else self.name
-        self.metrics.counters[key] += value
-        
+        key = (self.name, _label_key(labels))
+        with self.metrics._lock:
+            self.metrics.counters[key] += value
+
         # OpenTelemetry
         if self._otel_counter:
             self._otel_counter.add(value, labels or {})
 
 
 class Histogram:
-    """直方图指标"""
-    
-    def __init__(self, metrics: DatabaseMetrics, name: str, description: str):
+    """直方图指标（内存中为固定桶计数和分位数草图）"""
+
+    def __init__(self, metrics: DatabaseMetrics, name: str, description: str, buckets: Tuple[float, ...]):
         self.metrics = metrics
         self.name = name
         self.description = description
+        self.buckets = buckets
         self._otel_histogram = metrics._get_or_create_histogram(name, description)
-        
+
     def record(self, value: float, labels: Optional[Dict[str, str]] = None):
         """记录直方图值"""
         if not self.metrics.enabled:
             return
-            
+
         # 内存存储
-        key = f"{self.name}:{labels}" if labels else self.name
-        self.metrics.histograms[key].append(MetricPoint(
-            timestamp=time.time(),
-            value=value,
-            labels=labels or {}
-        ))
-        
+        key = (self.name, _label_key(labels))
+        with self.metrics._lock:
+            sketch = self.metrics.histograms.get(key)
+            if sketch is None:
+                sketch = self.metrics.histograms[key] = QuantileSketch(self.metrics.relative_accuracy)
+                self.metrics.bucket_counts[key] = [0] * len(self.buckets)
+            sketch.add(value)
+            # 桶上界含等号（le）；超过最大上界的值只计入 +Inf（即 _count）
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                self.metrics.bucket_counts[key][index] += 1
+
         # OpenTelemetry
         if self._otel_histogram:
             self._otel_histogram.record(value, labels or {})
@@ -174,19 +441,86 @@ class Histogram:
 
 class Gauge:
     """仪表盘指标"""
-    
+
     def __init__(self, metrics: DatabaseMetrics, name: str, description: str):
         self.metrics = metrics
         self.name = name
         self.description = description
-        
+
     def set(self, value: float, labels: Optional[Dict[str, str]] = None):
         """设置仪表盘值"""
         if not self.metrics.enabled:
             return
-            
+
         # 内存存储
-        key = f"{self.name}:{labels}" if labels else self.name
-        self.metrics.gauges[key] = value
-        
+        with self.metrics._lock:
+            self.metrics.gauges[(self.name, _label_key(labels))] = value
+
         # 注意：OpenTelemetry的Gauge需要通过回调函数实现，这里简化处理
+
+
+_default_metrics: Optional[DatabaseMetrics] = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_metrics(config: Optional[DatabaseConfig] = None) -> DatabaseMetrics:
+    """
+    进程内共享的指标实例（/metrics 端点读取的就是它）
+    无配置时也记录内存指标；第一次传入配置时应用该配置
+    """
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = DatabaseMetrics(config)
+            _default_metrics.register_collector("caches", _collect_caches)
+        elif config is not None and _default_metrics.config is None:
+            _default_metrics.configure(config)
+        return _default_metrics
+
+
+# 有 hits/misses 实例属性的缓存，按名称分组：id(缓存) -> 缓存的 __dict__。
+# 持有 __dict__ 不会延长缓存的生命周期，缓存回收时再从中读出最终计数
+_caches: Dict[str, Dict[int, Dict[str, Any]]] = defaultdict(dict)
+# 已回收缓存的命中/未命中次数，保证 _total 计数器不因缓存回收而下降
+_retired_cache_counts: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+# 回收回调可能在持锁期间由同一线程的GC触发，用可重入锁
+_caches_lock = threading.RLock()
+
+
+def register_cache(name: str, cache: Any):
+    """登记缓存，/metrics 抓取时汇总同名缓存（包括已回收的）的命中、未命中次数和命中率"""
+    with _caches_lock:
+        if id(cache) in _caches[name]:
+            return
+        _caches[name][id(cache)] = vars(cache)
+    weakref.finalize(cache, _retire_cache, name, id(cache))
+
+
+def _retire_cache(name: str, key: int):
+    """缓存被回收：计数并入已回收部分（与抓取互斥，计数不会短暂消失）"""
+    with _caches_lock:
+        state = _caches[name].pop(key, None)
+        if state is not None:
+            counts = _retired_cache_counts[name]
+            counts[0] += state.get("hits", 0)
+            counts[1] += state.get("misses", 0)
+
+
+def _collect_caches():
+    with _caches_lock:
+        groups = []
+        for name in sorted(set(_caches) | set(_retired_cache_counts)):
+            retired_hits, retired_misses = _retired_cache_counts.get(name, (0, 0))
+            states = _caches.get(name, {}).values()
+            if not states and not retired_hits and not retired_misses:
+                continue
+            groups.append((
+                name,
+                retired_hits + sum(state.get("hits", 0) for state in states),
+                retired_misses + sum(state.get("misses", 0) for state in states)
+            ))
+    for name, hits, misses in groups:
+        labels = {"cache": name}
+        yield "dbrheo_cache_hits_total", "counter", labels, hits
+        yield "dbrheo_cache_misses_total", "counter", labels, misses
+        yield "dbrheo_cache_hit_ratio", "gauge", labels, hits / (hits + misses) if hits + misses else 0.0
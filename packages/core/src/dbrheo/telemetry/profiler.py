@@ -0,0 +1,340 @@
+"""
+采样分析器 - 按用户消息（及确认后单独执行的工具调用）采样调用栈和内存分配
+
+开启：profile_enabled / DBRHEO_PROFILE=true，或CLI中 /profile on。
+每次分析写出三个文件到 profile_dir（默认 logs/profiles/）：
+    <时间>_<标签>.collapsed   折叠栈（"根;...;叶 次数"），可直接用 flamegraph.pl 或 speedscope 打开
+    <时间>_<标签>.alloc.txt   tracemalloc 分析期间新增内存最多的代码行
+    <时间>_<标签>.json        元数据和按函数汇总的采样数，summarize_profiles() 用它汇总最近几次
+
+采样在后台线程中用 sys._current_frames() 读取调用栈（默认每5ms一次），不插桩被分析的代码：
+事件循环线程全部采样，其他线程只在栈中有本包代码时采样（如 to_thread 中执行的数据库调用）。
+叶子在 selectors 中的样本是事件循环空闲（等待模型或网络），单独计数，汇总时默认排除。
+同一时间只有一个分析会话，嵌套调用（递归的 send_message_stream、轮内的工具执行）计入外层会话。
+"""
+
+import inspect
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.debug_logger import log_info
+
+
+DEFAULT_PROFILE_DIR = "logs/profiles"
+DEFAULT_INTERVAL_MS = 5.0
+MAX_STACK_DEPTH = 128
+TOP_ALLOCATIONS = 25
+IDLE_FRAME = "<idle>"
+
+_PACKAGE_DIR = str(Path(__file__).resolve().parent.parent)
+_PROFILER_FILE = __file__
+_SELECTORS_FILE = os.path.basename(getattr(sys.modules.get("selectors"), "__file__", "selectors.py"))
+
+
+def _frame_label(code) -> str:
+    """函数标签：函数名 (文件名:首行)，文件名相对本包或只取文件名"""
+    filename = code.co_filename
+    if filename.startswith(_PACKAGE_DIR):
+        filename = "dbrheo" + filename[len(_PACKAGE_DIR):].replace(os.sep, "/")
+    else:
+        filename = os.path.basename(filename)
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})"
+
+
+class _Sampler:
+    """后台采样线程，累计 调用栈 → 次数"""
+
+    def __init__(self, interval: float, target_thread: int):
+        self.interval = interval
+        self.target_thread = target_thread
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self._labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="dbrheo-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                codes = []
+                package_leaf = None
+                while frame is not None and len(codes) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    codes.append(code)
+                    if package_leaf is None and code.co_filename.startswith(_PACKAGE_DIR):
+                        package_leaf = code
+                    frame = frame.f_back
+                if not codes or (package_leaf is None and thread_id != self.target_thread):
+                    continue
+                # 分析器自身（启动/停止采样线程）
+                if package_leaf is not None and package_leaf.co_filename == _PROFILER_FILE:
+                    continue
+                self.samples += 1
+                leaf = codes[0]
+                if leaf.co_name == "select" and leaf.co_filename.endswith(_SELECTORS_FILE):
+                    self.idle_samples += 1
+                    self.stacks[(IDLE_FRAME,)] += 1
+                    continue
+                self.stacks[tuple(self._label(code) for code in reversed(codes))] += 1
+
+
+class ProfileSession:
+    """一次分析会话（一条用户消息或一次工具执行）"""
+
+    def __init__(self, profiler: "TurnProfiler", label: str, attributes: Optional[Dict[str, Any]] = None):
+        self.profiler = profiler
+        self.label = label
+        self.attributes = dict(attributes or {})
+        self.started_wall = time.time()
+        self.started = time.perf_counter()
+        self.depth = 1
+        self.sampler = _Sampler(profiler.interval, threading.get_ident())
+        self._started_tracemalloc = False
+        self._baseline = None
+        if profiler.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            self._baseline = tracemalloc.take_snapshot()
+        self.sampler.start()
+
+    def finish(self) -> Dict[str, Any]:
+        self.sampler.stop()
+        duration = time.perf_counter() - self.started
+        allocations = self._top_allocations()
+        return self.profiler._write(self, duration, allocations)
+
+    def _top_allocations(self) -> List[Tuple[str, int, int]]:
+        if self._baseline is None:
+            return []
+        try:
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, _PROFILER_FILE),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            ))
+            stats = snapshot.compare_to(self._baseline, "lineno")
+        finally:
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        top = [stat for stat in stats if stat.size_diff > 0][:TOP_ALLOCATIONS]
+        return [(str(stat.traceback[0]), stat.size_diff, stat.count_diff) for stat in top]
+
+
+class TurnProfiler:
+    """
+    进程内共享的分析器
+    - profile(label) 上下文管理器：没有进行中的会话时开始一个，否则计入当前会话
+    - enabled 可在运行时切换（/profile on|off）
+    """
+
+    def __init__(self, config=None):
+        self.config = config
+        get = config.get if config is not None else (lambda key, default=None: default)
+        self.enabled = str(get("profile_enabled", False)).lower() in ("true", "1", "yes", "on")
+        self.output_dir = Path(get("profile_dir", None) or DEFAULT_PROFILE_DIR)
+        self.interval = float(get("profile_interval_ms", DEFAULT_INTERVAL_MS)) / 1000
+        self.trace_memory = str(get("profile_memory", True)).lower() not in ("false", "0", "no", "off")
+        self._lock = threading.Lock()
+        self._session: Optional[ProfileSession] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+
+    @contextmanager
+    def profile(self, label: str, attributes: Optional[Dict[str, Any]] = None):
+        if not self.enabled:
+            yield None
+            return
+        with self._lock:
+            session = self._session
+            if session is not None:
+                session.depth += 1
+            else:
+                session = self._session = ProfileSession(self, label, attributes)
+        try:
+            yield session
+        finally:
+            with self._lock:
+                session.depth -= 1
+                done = session.depth == 0
+                if done:
+                    self._session = None
+            if done:
+                self.last_result = session.finish()
+
+    def _write(self, session: ProfileSession, duration: float,
+               allocations: List[Tuple[str, int, int]]) -> Dict[str, Any]:
+        sampler = session.sampler
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in sampler.stacks.items():
+            self_counts[stack[-1]] += count
+            for label in set(stack):
+                total_counts[label] += count
+
+        stamp = datetime.fromtimestamp(session.started_wall).strftime("%Y%m%d_%H%M%S_%f")
+        name = f"{stamp}_{re.sub(r'[^A-Za-z0-9_.-]+', '_', session.label)[:60]}"
+        result = {
+            "label": session.label,
+            "attributes": session.attributes,
+            "started_at": datetime.fromtimestamp(session.started_wall).isoformat(),
+            "duration_s": round(duration, 4),
+            "interval_ms": self.interval * 1000,
+            "samples": sampler.samples,
+            "idle_samples": sampler.idle_samples,
+            "functions": {
+                label: [self_counts.get(label, 0), total]
+                for label, total in total_counts.most_common()
+            },
+            "allocations": [
+                {"location": location, "size_diff": size, "count_diff": count}
+                for location, size, count in allocations
+            ],
+        }
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            base = self.output_dir / name
+            with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+                for stack, count in sampler.stacks.most_common():
+                    f.write(f"{';'.join(label.replace(';', ',') for label in stack)} {count}\n")
+            with open(f"{base}.alloc.txt", "w", encoding="utf-8") as f:
+                f.write(f"# {session.label}  {duration:.3f}s  top {len(allocations)} allocations since start\n")
+                for location, size, count in allocations:
+                    f.write(f"{size / 1024:>10.1f} KiB  {count:>+8} blocks  {location}\n")
+            result["files"] = {
+                "collapsed": f"{base}.collapsed",
+                "allocations": f"{base}.alloc.txt",
+            }
+            with open(f"{base}.json", "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2, default=str)
+        except OSError as e:
+            log_info("Profiler", f"Failed to write profile: {e}")
+        return result
+
+
+def summarize_profiles(profile_dir: Optional[str] = None, recent: int = 10, top: int = 20,
+                       include_idle: bool = False) -> Dict[str, Any]:
+    """
+    汇总最近 recent 次分析中最热的函数
+    self = 位于栈顶的样本数，total = 出现在栈中的样本数；百分比相对（非空闲）样本总数
+    """
+    directory = Path(profile_dir or DEFAULT_PROFILE_DIR)
+    files = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime)[-recent:] if directory.exists() else []
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    profiles, samples, idle = [], 0, 0
+    for path in files:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        profiles.append({"label": data.get("label"), "started_at": data.get("started_at"),
+                         "duration_s": data.get("duration_s"), "file": str(path)})
+        samples += data.get("samples", 0)
+        idle += data.get("idle_samples", 0)
+        for label, (self_count, total_count) in data.get("functions", {}).items():
+            if label == IDLE_FRAME and not include_idle:
+                continue
+            if self_count:
+                self_counts[label] += self_count
+            total_counts[label] += total_count
+
+    busy = samples if include_idle else samples - idle
+    return {
+        "profiles": profiles,
+        "samples": samples,
+        "idle_samples": idle,
+        "functions": [
+            {
+                "function": label,
+                "self": count,
+                "total": total_counts[label],
+                "self_pct": round(count / busy * 100, 2) if busy else 0.0,
+                "total_pct": round(total_counts[label] / busy * 100, 2) if busy else 0.0,
+            }
+            for label, count in self_counts.most_common(top)
+        ],
+    }
+
+
+_default_profiler: Optional[TurnProfiler] = None
+_default_profiler_lock = threading.Lock()
+
+
+def get_profiler(config=None) -> TurnProfiler:
+    """进程内共享的分析器，第一次传入配置时按该配置创建（与 get_tracer 相同）"""
+    global _default_profiler
+    with _default_profiler_lock:
+        if _default_profiler is None or (config is not None and _default_profiler.config is None):
+            _default_profiler = TurnProfiler(config)
+        return _default_profiler
+
+
+def profiled(label: str, attributes_from=None):
+    """
+    分析装饰器（支持异步生成器和协程），调用时才取分析器
+    attributes_from(*args, **kwargs) 返回 (标签后缀, 属性)
+    """
+    def resolve(args, kwargs):
+        if attributes_from is None:
+            return label, None
+        try:
+            suffix, attributes = attributes_from(*args, **kwargs)
+            return f"{label}-{suffix}", attributes
+        except Exception:
+            return label, None
+
+    def decorator(func):
+        if inspect.isasyncgenfunction(func):
+            @wraps(func)
+            async def asyncgen_wrapper(*args, **kwargs):
+                profiler = get_profiler()
+                if not profiler.enabled:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                    return
+                name, attributes = resolve(args, kwargs)
+                with profiler.profile(name, attributes):
+                    async for item in func(*args, **kwargs):
+                        yield item
+            return asyncgen_wrapper
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            profiler = get_profiler()
+            if not profiler.enabled:
+                return await func(*args, **kwargs)
+            name, attributes = resolve(args, kwargs)
+            with profiler.profile(name, attributes):
+                return await func(*args, **kwargs)
+        return async_wrapper
+    return decorator
@@ -1,13 +1,24 @@
 """
 DatabaseTracer - 分布式追踪系统
 基于OpenTelemetry实现，完全对齐Gemini CLI的追踪机制
+
+除OpenTelemetry外，span也在进程内记录：配置 trace_export_dir（或 DBRHEO_TRACE_DIR）后，
+每条用户消息（根span）结束时把整棵span树写成一个瀑布图JSON，不需要OTLP收集器。
+当前span通过 contextvars 传递；退出span时恢复为父span而不是 reset(token)，
+因为跨 yield 的span可能在另一个上下文中结束（如被丢弃的异步生成器）。
 """
 
-import os
+import asyncio
+import inspect
+import itertools
 import logging
-from typing import Optional, Dict, Any, Callable
-from functools import wraps
+import threading
+import time
+import uuid
 from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional, Dict, Any, Callable, List, Tuple
 
 # 有条件导入OpenTelemetry，允许在没有安装的情况下降级
 try:
@@ -19,10 +30,105 @@ try:
     OTEL_AVAILABLE = True
 except ImportError:
     OTEL_AVAILABLE = False
-    
+
 from ..config.base import DatabaseConfig
 
 
+_current_span: ContextVar[Optional["Span"]] = ContextVar("dbrheo_current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """一个追踪区间：进程内记录，同时对应一个OpenTelemetry span（如可用）"""
+
+    __slots__ = (
+        "tracer", "name", "trace_id", "span_id", "parent_id", "start", "start_wall",
+        "end_time", "attributes", "events", "status", "error", "otel_span"
+    )
+
+    def __init__(self, tracer: "DatabaseTracer", name: str, parent: Optional["Span"],
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.perf_counter()
+        self.start_wall = time.time()
+        self.end_time: Optional[float] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.events: List[Tuple[float, str, Dict[str, Any]]] = []
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.otel_span = None
+        if tracer.tracer is not None:
+            context = trace.set_span_in_context(parent.otel_span) if parent and parent.otel_span else None
+            self.otel_span = tracer.tracer.start_span(name, context=context, attributes=_otel_attributes(attributes))
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_time is None:
+            return None
+        return (self.end_time - self.start) * 1000
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+        if self.otel_span is not None:
+            self.otel_span.set_attributes(_otel_attributes({key: value}))
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.events.append((time.perf_counter(), name, dict(attributes or {})))
+        if self.otel_span is not None:
+            self.otel_span.add_event(name, attributes=_otel_attributes(attributes))
+
+    def record_exception(self, exception: BaseException):
+        # 生成器被关闭、任务被取消不算错误
+        if isinstance(exception, (GeneratorExit, asyncio.CancelledError)):
+            self.status = "cancelled"
+            return
+        self.status = "error"
+        self.error = f"{type(exception).__name__}: {exception}"
+        if self.otel_span is not None:
+            self.otel_span.record_exception(exception)
+
+    def end(self):
+        if self.end_time is not None:
+            return
+        self.end_time = time.perf_counter()
+        if self.otel_span is not None:
+            self.otel_span.end()
+        self.tracer._on_end(self)
+
+
+class _NoopSpan:
+    """追踪关闭时返回的占位span，调用方无需判断"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        pass
+
+    def record_exception(self, exception: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _otel_attributes(attributes: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """OpenTelemetry属性只接受基本类型"""
+    if not attributes:
+        return None
+    return {
+        key: value if isinstance(value, (str, bool, int, float)) else str(value)
+        for key, value in attributes.items() if value is not None
+    }
+
+
 class DatabaseTracer:
     """
     数据库Agent分布式追踪系统
@@ -30,102 +136,190 @@ class DatabaseTracer:
     - 支持OpenTelemetry集成
     - 提供装饰器和上下文管理器API
     - 支持降级模式（未安装OpenTelemetry时）
+    - 进程内span记录和瀑布图导出（trace_export_dir）
     """
-    
-    def __init__(self, config: DatabaseConfig):
+
+    def __init__(self, config: Optional[DatabaseConfig] = None):
         self.config = config
-        self.service_name = config.get("service_name", "database-agent")
-        self.enabled = config.get("telemetry_enabled", True)
-        
-        # 初始化追踪器
-        self.tracer = self._setup_tracer() if self.enabled else None
-        
+        get = config.get if config is not None else (lambda key, default=None: default)
+        self.service_name = get("service_name", "database-agent")
+        # 没有配置时（如单独使用适配器）不追踪
+        self.enabled = config is not None and bool(get("telemetry_enabled", True))
+
+        # 初始化追踪器：只在配置了OTLP端点时创建，否则span没有去处，只是额外开销
+        otlp_endpoint = get("otel_exporter_otlp_endpoint", None)
+        self.tracer = self._setup_tracer() if self.enabled and otlp_endpoint else None
+
+        # 进程内瀑布图导出
+        self.exporter = None
+        export_dir = get("trace_export_dir", None)
+        if self.enabled and export_dir:
+            from .waterfall import WaterfallExporter
+            self.exporter = WaterfallExporter(export_dir)
+
+        self.recording = self.tracer is not None or self.exporter is not None
+
     def _setup_tracer(self):
         """设置OpenTelemetry追踪器"""
         if not OTEL_AVAILABLE:
             logging.warning("OpenTelemetry not available, tracing disabled")
             return None
-            
+
         try:
             # 设置追踪提供者
             provider = TracerProvider()
             trace.set_tracer_provider(provider)
-            
+
             # 配置导出器
             otlp_endpoint = self.config.get("otel_exporter_otlp_endpoint")
             if otlp_endpoint:
                 otlp_exporter = OTLPSpanExporter(endpoint=otlp_endpoint)
                 span_processor = BatchSpanProcessor(otlp_exporter)
                 provider.add_span_processor(span_processor)
-                
+
             # 创建追踪器
             return trace.get_tracer(self.service_name)
-            
+
         except Exception as e:
             logging.error(f"Failed to setup tracer: {e}")
             return None
-            
+
+    def _on_end(self, span: Span):
+        if self.exporter is not None:
+            self.exporter.on_end(span)
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+                   parent: Optional[Span] = None):
+        """
+        开始一个不成为当前span的span，需要调用方 end()
+        用于跨越多个调用的区间（如工具调用从验证到完成的生命周期）
+        """
+        if not self.recording:
+            return NOOP_SPAN
+        if not isinstance(parent, Span):
+            parent = _current_span.get()
+        span = Span(self, name, parent, attributes)
+        if self.exporter is not None:
+            self.exporter.on_start(span)
+        return span
+
     def trace(self, name: str, attributes: Optional[Dict[str, Any]] = None):
         """
         追踪装饰器 - 完全对齐Gemini CLI的trace装饰器
         用于追踪函数执行
         """
-        def decorator(func):
-            @wraps(func)
-            async def async_wrapper(*args, **kwargs):
-                if not self.enabled or not self.tracer:
-                    return await func(*args, **kwargs)
-                    
-                with self.tracer.start_as_current_span(name, attributes=attributes):
-                    return await func(*args, **kwargs)
-                    
-            @wraps(func)
-            def sync_wrapper(*args, **kwargs):
-                if not self.enabled or not self.tracer:
-                    return func(*args, **kwargs)
-                    
-                with self.tracer.start_as_current_span(name, attributes=attributes):
-                    return func(*args, **kwargs)
-                    
-            return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
-        return decorator
-        
+        return _trace_decorator(lambda: self, name, attributes)
+
     @contextmanager
-    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, parent: Optional[Span] = None):
         """
         追踪上下文管理器 - 完全对齐Gemini CLI的withSpan
-        用于追踪代码块执行
+        用于追踪代码块执行；parent 缺省为当前span
         """
-        if not self.enabled or not self.tracer:
-            yield
+        if not self.recording:
+            yield NOOP_SPAN
             return
-            
-        with self.tracer.start_as_current_span(name, attributes=attributes):
-            yield
-            
+
+        previous = _current_span.get()
+        span = self.start_span(name, attributes, parent)
+        _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.set(previous)
+            span.end()
+
+    def current_span(self):
+        """当前span（没有时返回占位span）"""
+        return _current_span.get() or NOOP_SPAN
+
     def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
         """向当前span添加事件"""
-        if not self.enabled or not self.tracer:
-            return
-            
-        current_span = trace.get_current_span()
-        if current_span:
-            current_span.add_event(name, attributes=attributes)
-            
+        self.current_span().add_event(name, attributes)
+
     def set_attribute(self, key: str, value: Any):
         """设置当前span的属性"""
-        if not self.enabled or not self.tracer:
-            return
-            
-        current_span = trace.get_current_span()
-        if current_span:
-            current_span.set_attribute(key, value)
-            
+        self.current_span().set_attribute(key, value)
+
     def record_exception(self, exception: Exception):
         """记录异常"""
-        if not self.enabled or not self.tracer:
-            return
-            
-        current_span = trace.get_current_span()
-        if current_span:
-            current_span.record_exception(exception)
+        self.current_span().record_exception(exception)
+
+
+def _trace_decorator(get_tracer_fn: Callable[[], DatabaseTracer], name: str,
+                     attributes: Optional[Dict[str, Any]] = None,
+                     attributes_from: Optional[Callable[..., Dict[str, Any]]] = None):
+    """
+    支持普通函数、协程函数和异步生成器
+    attributes_from(*args, **kwargs) 在调用时计算额外属性
+    """
+    def span_attributes(args, kwargs):
+        if attributes_from is None:
+            return attributes
+        merged = dict(attributes or {})
+        try:
+            merged.update(attributes_from(*args, **kwargs))
+        except Exception:
+            pass
+        return merged
+
+    def decorator(func):
+        if inspect.isasyncgenfunction(func):
+            @wraps(func)
+            async def asyncgen_wrapper(*args, **kwargs):
+                tracer = get_tracer_fn()
+                if not tracer.recording:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                    return
+                with tracer.span(name, span_attributes(args, kwargs)):
+                    async for item in func(*args, **kwargs):
+                        yield item
+            return asyncgen_wrapper
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            tracer = get_tracer_fn()
+            if not tracer.recording:
+                return await func(*args, **kwargs)
+
+            with tracer.span(name, span_attributes(args, kwargs)):
+                return await func(*args, **kwargs)
+
+        @wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            tracer = get_tracer_fn()
+            if not tracer.recording:
+                return func(*args, **kwargs)
+
+            with tracer.span(name, span_attributes(args, kwargs)):
+                return func(*args, **kwargs)
+
+        return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
+    return decorator
+
+
+_default_tracer: Optional[DatabaseTracer] = None
+_default_tracer_lock = threading.Lock()
+
+
+def get_tracer(config: Optional[DatabaseConfig] = None) -> DatabaseTracer:
+    """
+    进程内共享的追踪器
+    第一次传入配置时按该配置创建（OpenTelemetry的TracerProvider只能设置一次），
+    之前的无配置调用得到的是不追踪的实例
+    """
+    global _default_tracer
+    with _default_tracer_lock:
+        if _default_tracer is None or (config is not None and _default_tracer.config is None):
+            _default_tracer = DatabaseTracer(config)
+        return _default_tracer
+
+
+def traced(name: str, attributes: Optional[Dict[str, Any]] = None,
+           attributes_from: Optional[Callable[..., Dict[str, Any]]] = None):
+    """使用共享追踪器的装饰器，调用时才取追踪器，可用于类定义中的方法"""
+    return _trace_decorator(get_tracer, name, attributes, attributes_from)
@@ -0,0 +1,149 @@
+"""
+瀑布图导出 - 把一次用户消息的span树写成JSON，离线分析每个阶段的耗时
+
+文件内容:
+    {
+        "trace_id", "name", "started_at", "duration_ms", "attributes",
+        "phases": {span名称: {"count", "total_ms", "self_ms"}},   # self_ms 不含子span
+        "spans": [{"id", "parent_id", "name", "depth", "start_ms", "duration_ms",
+                   "status", "attributes", "events": [{"name", "at_ms", ...}]}]
+    }
+start_ms/at_ms 相对根span开始时间；根span结束时仍未结束的span（如等待确认的工具调用）
+标记 "open": true，耗时截止到根span结束。
+"""
+
+import json
+import threading
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from ..utils.debug_logger import log_info
+
+
+# 未结束的trace最多缓存数量（根span被丢弃、从未结束时防止无限增长）
+MAX_PENDING_TRACES = 100
+
+
+class WaterfallExporter:
+    """按trace缓存span，根span结束时写出瀑布图"""
+
+    def __init__(self, output_dir: str, keep_recent: int = 20):
+        self.output_dir = Path(output_dir).expanduser()
+        self._pending: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=keep_recent)
+        self.last_path: Optional[Path] = None
+
+    def on_start(self, span) -> None:
+        with self._lock:
+            if span.parent_id is None:
+                self._pending[span.trace_id] = [span]
+                while len(self._pending) > MAX_PENDING_TRACES:
+                    self._pending.popitem(last=False)
+                return
+            spans = self._pending.get(span.trace_id)
+            # trace已导出时忽略（如用户确认后才执行的工具调用）
+            if spans is not None:
+                spans.append(span)
+
+    def on_end(self, span) -> None:
+        if span.parent_id is not None:
+            return
+        with self._lock:
+            spans = self._pending.pop(span.trace_id, None)
+        if spans is None:
+            return
+
+        waterfall = build_waterfall(spans)
+        self.recent.append(waterfall)
+        self._write(waterfall)
+
+    def _write(self, waterfall: Dict[str, Any]) -> None:
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.fromtimestamp(waterfall["started_wall"]).strftime("%Y%m%d_%H%M%S_%f")
+            path = self.output_dir / f"trace_{stamp}_{waterfall['trace_id']}.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(waterfall, f, ensure_ascii=False, indent=2, default=str)
+            self.last_path = path
+        except OSError as e:
+            log_info("Tracer", f"Failed to write trace waterfall: {e}")
+
+
+def build_waterfall(spans: List[Any]) -> Dict[str, Any]:
+    """由同一trace的span列表（第一个为根span）构建瀑布图"""
+    root = spans[0]
+    root_end = root.end_time if root.end_time is not None else max(
+        (s.end_time for s in spans if s.end_time is not None), default=root.start
+    )
+    ordered = sorted(spans, key=lambda s: (s.start, s.span_id))
+
+    # 按开始时间排序后，父span总在子span之前
+    depth: Dict[int, int] = {}
+    children_ms: Dict[int, float] = defaultdict(float)
+    items = []
+    for span in ordered:
+        depth[span.span_id] = depth.get(span.parent_id, -1) + 1
+        end = span.end_time if span.end_time is not None else root_end
+        duration = max(0.0, (end - span.start) * 1000)
+        if span.parent_id is not None:
+            children_ms[span.parent_id] += duration
+        item = {
+            "id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "depth": depth[span.span_id],
+            "start_ms": round((span.start - root.start) * 1000, 3),
+            "duration_ms": round(duration, 3),
+            "status": span.status,
+        }
+        if span.end_time is None:
+            item["open"] = True
+        if span.error:
+            item["error"] = span.error
+        if span.attributes:
+            item["attributes"] = span.attributes
+        if span.events:
+            item["events"] = [
+                dict(attrs, name=name, at_ms=round((at - root.start) * 1000, 3))
+                for at, name, attrs in span.events
+            ]
+        items.append(item)
+
+    phases: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        phase = phases.setdefault(item["name"], {"count": 0, "total_ms": 0.0, "self_ms": 0.0})
+        phase["count"] += 1
+        phase["total_ms"] += item["duration_ms"]
+        # 并发的子span可能重叠，自身耗时不小于0
+        phase["self_ms"] += max(0.0, item["duration_ms"] - children_ms.get(item["id"], 0.0))
+    for phase in phases.values():
+        phase["total_ms"] = round(phase["total_ms"], 3)
+        phase["self_ms"] = round(phase["self_ms"], 3)
+
+    return {
+        "trace_id": root.trace_id,
+        "name": root.name,
+        "started_at": datetime.fromtimestamp(root.start_wall).isoformat(),
+        "started_wall": root.start_wall,
+        "duration_ms": round((root_end - root.start) * 1000, 3),
+        "status": root.status,
+        "attributes": root.attributes,
+        "phases": dict(sorted(phases.items(), key=lambda kv: kv[1]["self_ms"], reverse=True)),
+        "spans": items,
+    }
+
+
+def format_waterfall(waterfall: Dict[str, Any], width: int = 40) -> str:
+    """文本瀑布图，便于在终端查看"""
+    total = waterfall["duration_ms"] or 1.0
+    lines = [f"{waterfall['name']}  {waterfall['duration_ms']:.1f} ms  ({waterfall['started_at']})"]
+    for item in waterfall["spans"]:
+        offset = min(int(item["start_ms"] / total * width), width - 1)
+        length = min(max(1, int(item["duration_ms"] / total * width)), width - offset)
+        bar = " " * offset + "█" * length
+        label = "  " * item["depth"] + item["name"]
+        lines.append(f"{label:<40.40} {bar:<{width}} {item['duration_ms']:>9.1f} ms")
+    return "\n".join(lines)
@@ -20,6 +20,9 @@ class DatabaseTool(ABC, Generic[TParams, TResult]):
     - 确认机制接口定义（DatabaseConfirmationOutcome）
     """
     
+    # 同一批次中相邻的此类调用由调度器并发执行（仅适用于无本地共享状态的外部调用）
+    concurrent_safe = False
+    
     def __init__(
         self,
         name: str,                          # 工具内部名称
@@ -216,6 +219,7 @@ class DatabaseTool(ABC, Generic[TParams, TResult]):
             'file_write_progress': '📝 正在写入{format}文件...\n📁 路径: {path}\n📊 大小: {size}',
             'file_write_failed': 'Failed to write file: {error}',
             'file_write_failed_llm': 'Error writing to {path}: {error}\nType: {type}',
+            'file_write_encoding_error': 'Cannot encode content as {encoding} (existing file encoding or requested encoding): {error}. The file was not modified.',
             'file_write_diff_current': '{filename} (当前)',
             'file_write_diff_proposed': '{filename} (提议)',
             'file_write_content_truncated': '\n... [剩余内容省略]',
@@ -469,6 +473,12 @@ class DatabaseTool(ABC, Generic[TParams, TResult]):
             'file_read_start_from': '📖 从第 {line} 行开始',
             'file_read_lines_count': '📏 读取了 {lines} 行',
             'file_read_encoding': '🔤 编码: {encoding}',
+            'file_read_analyzing': '🔍 正在分析 {filename} ({size})...',
+            'file_read_structure_failed': '⚠️ 结构分析失败: {error}',
+            'file_read_structure_csv': '📊 整个文件: {rows} 行 × {cols} 列',
+            'file_read_structure_json': '📊 整个文件: {layout}, {count} 个元素',
+            'file_read_structure_sql': '📊 整个文件: {count} 条语句',
+            'file_read_structure_llm': '\n\n[整个文件的结构摘要]\n{summary}',
             
             # database_connect_tool补充的硬编码文本
             'db_connect_unknown_action': '未知操作: {action}',
@@ -549,6 +559,8 @@ class DatabaseTool(ABC, Generic[TParams, TResult]):
             'code_exec_context_comment': '# 自动注入的上下文',
             'code_exec_sql_result_comment': '# SQL查询结果',
             'code_exec_dataframe_comment': '# 如果是表格数据，自动转换为DataFrame',
+            'code_exec_sql_handoff_comment': '# SQL查询结果（{rows}行），从交接文件加载为 df',
+            'code_exec_unknown_handle': '未知或已过期的查询结果句柄: {handle}，请重新执行查询或直接传入 sql_result',
             'code_exec_user_code_sep': '\n\n# 用户代码\n',
             'code_exec_js_context_comment': '// 自动注入的上下文',
             'code_exec_js_sql_comment': '// SQL查询结果',
@@ -606,6 +618,7 @@ class DatabaseTool(ABC, Generic[TParams, TResult]):
             'web_fetch_confirm_private': '访问内网地址需要确认',
             'web_fetch_risk_private': '访问内部网络资源',
             'web_fetch_no_urls_error': 'No URLs found to fetch',
+            'web_fetch_progress_start': '🌐 并发获取 {total} 个网页...',
             'web_fetch_progress': '🌐 获取网页 {current}/{total}: {url}',
             'web_fetch_all_failed': 'Failed to fetch any content',
             'web_fetch_summary': '获取了 {count} 个网页的内容',
@@ -635,6 +648,7 @@ class DatabaseTool(ABC, Generic[TParams, TResult]):
             'dir_list_truncated': '⚠️ Showing first {showing} of {total} items',
             'dir_list_result_summary': '列出 {path} 中的 {count} 个项目',
             'dir_list_total_suffix': ' (共 {total} 个)',
+            'dir_list_scan_limited': '⚠️ Stopped after scanning {count} items; narrow the path or pattern to see the rest',
             
             # ShellTool相关的中文默认文本
             'shell_tool_name': 'Shell执行器',
@@ -666,6 +680,7 @@ class DatabaseTool(ABC, Generic[TParams, TResult]):
             'shell_timeout_message': '执行超时 {timeout}秒',
             'shell_truncated_lines': '中间{truncated}行被省略，共{total}行',
             'shell_stderr_truncated': '错误输出被部分省略',
+            'shell_spilled_to_file': '完整输出（{size}字节）已保存到 {path}',
             'shell_execution_error': '执行异常: {error}',
             'shell_success_title': '✅ Shell命令执行成功',
             'shell_execution_time': '⏱️ 执行时间: {time:.2f}秒',
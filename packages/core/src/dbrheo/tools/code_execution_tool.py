@@ -9,6 +9,7 @@ import os
 import sys
 import subprocess
 import tempfile
+import threading
 import json
 import traceback
 from typing import Dict, Any, Optional, Union, List
@@ -18,6 +19,8 @@ from ..types.core_types import AbortSignal
 from .base import DatabaseTool
 from ..config.base import DatabaseConfig
 from ..utils.debug_logger import log_info, DebugLogger
+from .python_kernel import KernelPool
+from ..utils.data_handoff import HandoffFile, as_result_set, get_result_store, python_loader, write_handoff
 
 
 class CodeExecutionTool(DatabaseTool):
@@ -86,7 +89,11 @@ class CodeExecutionTool(DatabaseTool):
                             "description": "Variables to inject"
                         },
                         "sql_result": {
-                            "description": "SQL query result (auto-converted to appropriate format)"
+                            "description": "SQL query result (auto-converted to appropriate format). Large tabular results are handed to the code through a temp file and exposed as `df` (pandas DataFrame)"
+                        },
+                        "sql_result_handle": {
+                            "type": "string",
+                            "description": "result_handle returned by sql_execute; loads that query's full result as `df` without resending the rows"
                         },
                         "files": {
                             "type": "array",
@@ -107,6 +114,10 @@ class CodeExecutionTool(DatabaseTool):
                 "working_dir": {
                     "type": "string",
                     "description": "Working directory (optional)"
+                },
+                "session_id": {
+                    "type": "string",
+                    "description": "Python only: run in a warm persistent kernel under this session name. Variables and DataFrames from earlier calls with the same session_id stay available; pandas/numpy are preloaded"
                 }
             },
             "required": ["code", "language"]
@@ -114,7 +125,7 @@ class CodeExecutionTool(DatabaseTool):
         
         # 构建描述
         lang_descriptions = [f"{lang}({self.LANGUAGE_CONFIG[lang]['description']})" for lang in supported_languages]
-        description = f"Execute code in multiple languages. Supports: {', '.join(lang_descriptions)}. Each execution runs in a fresh environment - variables don't persist between calls. Consider combining operations when needed. Returns execution results."
+        description = f"Execute code in multiple languages. Supports: {', '.join(lang_descriptions)}. Each execution runs in a fresh environment unless a Python session_id is given - calls sharing a session_id run in a warm kernel and keep their variables. Returns execution results."
         
         super().__init__(
             name="execute_code",
@@ -132,6 +143,13 @@ class CodeExecutionTool(DatabaseTool):
         self.max_output_size = config.get("code_execution_max_output", 1024 * 1024)  # 1MB
         self.allowed_modules = config.get("code_execution_allowed_modules", [])
         self.temp_dir = config.get("code_execution_temp_dir", tempfile.gettempdir())
+        # 达到该行数的表格结果通过交接文件传递，不再嵌入源码
+        self.handoff_min_rows = int(config.get("code_execution_handoff_min_rows", 1000))
+        # 内核模式："kernel" 时未指定 session_id 的Python代码也在默认会话中执行
+        self.execution_mode = config.get("code_execution_mode", "subprocess")
+        # 内核池绑定事件循环（管道、锁、预热任务），按循环各建一个；多个工作线程各有事件循环
+        self._kernel_pools: Dict[asyncio.AbstractEventLoop, KernelPool] = {}
+        self._kernel_pools_lock = threading.Lock()
         
     def validate_tool_params(self, params: Dict[str, Any]) -> Optional[str]:
         """验证参数"""
@@ -213,22 +231,35 @@ class CodeExecutionTool(DatabaseTool):
         context = params.get("context", {})
         timeout = params.get("timeout", 30)
         working_dir = params.get("working_dir", self.temp_dir)
+        handoff_files: List[str] = []
+        
+        handle = context.get("sql_result_handle") if isinstance(context, dict) else None
+        if handle and handle not in get_result_store(self.config):
+            error_msg = self._('code_exec_unknown_handle', default="Unknown or expired SQL result handle: {handle}. Re-run the query or pass sql_result directly.", handle=handle)
+            return ToolResult(error=error_msg, llm_content=error_msg)
         
         try:
             if update_output:
                 update_output(self._('code_exec_running', default="🚀 正在执行{language}代码...\n```{language}\n{code}\n```", language=language, code=code[:300] + ('...' if len(code) > 300 else '')))
                 
+            # 大结果集写入交接文件，源码中只保留加载语句
+            context = await self._stage_sql_result(context, language, handoff_files)
+            
             # 准备执行环境
             prepared_code = self._prepare_code_with_context(code, language, context)
             
-            # 执行代码
-            result = await self._execute_code(
-                prepared_code, 
-                language, 
-                timeout, 
-                working_dir,
-                update_output
-            )
+            # 执行代码：指定会话的Python代码在常驻内核中执行
+            session_id = params.get("session_id") or ("default" if self.execution_mode == "kernel" else None)
+            if language == "python" and session_id:
+                result = await self._get_kernel_pool().run(session_id, prepared_code, timeout, working_dir)
+            else:
+                result = await self._execute_code(
+                    prepared_code, 
+                    language, 
+                    timeout, 
+                    working_dir,
+                    update_output
+                )
             
             # 格式化结果
             if result["success"]:
@@ -236,15 +267,17 @@ class CodeExecutionTool(DatabaseTool):
                 if update_output:
                     update_output(display)
                     
+                llm_content = {
+                    "success": True,
+                    "language": language,
+                    "output": result["output"],
+                    "error": result["error"],
+                    "execution_time": result["execution_time"]
+                }
+                self._add_kernel_info(llm_content, result)
                 return ToolResult(
                     summary=self._('code_exec_success_summary', default="{language}代码执行成功", language=language),
-                    llm_content={
-                        "success": True,
-                        "language": language,
-                        "output": result["output"],
-                        "error": result["error"],
-                        "execution_time": result["execution_time"]
-                    },
+                    llm_content=llm_content,
                     return_display=display
                 )
             else:
@@ -255,17 +288,19 @@ class CodeExecutionTool(DatabaseTool):
                 # 分析错误类型，为Agent提供修复建议
                 error_analysis = self._analyze_error(result["error"], language)
                 
+                llm_content = {
+                    "success": False,
+                    "language": language,
+                    "output": result["output"],
+                    "error": result["error"],
+                    "error_analysis": error_analysis,
+                    "execution_time": result["execution_time"],
+                    "retry_suggestion": error_analysis["suggestion"]
+                }
+                self._add_kernel_info(llm_content, result)
                 return ToolResult(
                     summary=self._('code_exec_failed_summary', default="{language}代码执行失败：{error_type}", language=language, error_type=error_analysis['type']),
-                    llm_content={
-                        "success": False,
-                        "language": language,
-                        "output": result["output"],
-                        "error": result["error"],
-                        "error_analysis": error_analysis,
-                        "execution_time": result["execution_time"],
-                        "retry_suggestion": error_analysis["suggestion"]
-                    },
+                    llm_content=llm_content,
                     return_display=display,
                     error=result["error"]
                 )
@@ -277,7 +312,85 @@ class CodeExecutionTool(DatabaseTool):
                 summary=self._('code_exec_failed', default="代码执行失败"),
                 return_display=self._('code_exec_failed_display', default="❌ 执行失败\n\n{error}", error=error_msg)
             )
+        finally:
+            for path in handoff_files:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+    
+    def _get_kernel_pool(self) -> KernelPool:
+        """
+        当前事件循环的内核池，首次使用时创建（空闲内核在后台预热）
+        新的事件循环出现时，杀掉已关闭循环留下的内核（其管道已无法使用）
+        """
+        loop = asyncio.get_running_loop()
+        with self._kernel_pools_lock:
+            pool = self._kernel_pools.get(loop)
+            if pool is not None:
+                return pool
+            stale = [self._kernel_pools.pop(l) for l in list(self._kernel_pools) if l.is_closed()]
+            pool = self._kernel_pools[loop] = KernelPool(
+                size=int(self.config.get("code_execution_kernel_pool_size", 1)),
+                max_sessions=int(self.config.get("code_execution_kernel_max_sessions", 4)),
+                memory_mb=int(self.config.get("code_execution_kernel_memory_mb", 2048)),
+                output_limit=int(self.max_output_size),
+                preload=self.config.get("code_execution_kernel_preload", ["numpy", "pandas"]),
+                cwd=self.temp_dir
+            )
+        for old_pool in stale:
+            old_pool.terminate()
+        return pool
+
+    
+    def _add_kernel_info(self, llm_content: Dict[str, Any], result: Dict[str, Any]):
+        """内核模式下告知会话名、已有变量以及内核是否重启过"""
+        if "session_id" not in result:
+            return
+        llm_content["session_id"] = result["session_id"]
+        if result.get("variables"):
+            llm_content["session_variables"] = result["variables"]
+        if result.get("kernel_restarted"):
+            llm_content["kernel_restarted"] = True
+    
+    async def _stage_sql_result(self, context: Dict[str, Any], language: str, handoff_files: List[str]) -> Dict[str, Any]:
+        """
+        解析 sql_result / sql_result_handle；表格结果达到阈值（或按句柄引用）时写入交接文件
+        返回的上下文中 sql_result 为 HandoffFile，小结果保持原样内联
+        """
+        if not isinstance(context, dict) or language not in ("python", "javascript"):
+            return context
+        handle = context.get("sql_result_handle")
+        if handle:
+            result_set = get_result_store(self.config).get(handle)
+        elif "sql_result" in context:
+            result_set = as_result_set(context["sql_result"])
+        else:
+            return context
+        if result_set is None:
+            return context
+        
+        staged = {k: v for k, v in context.items() if k != "sql_result_handle"}
+        if len(result_set) < self.handoff_min_rows:
+            # 小结果内联即可；按句柄引用时转为字典行
+            if handle:
+                staged["sql_result"] = result_set.to_dicts()
+            return staged
+        
+        # Node.js 没有内置Arrow读取器，使用JSON
+        handoff_format = None if language == "python" else "json"
+        loop = asyncio.get_running_loop()
+        handoff = await loop.run_in_executor(None, write_handoff, result_set, self.temp_dir, handoff_format)
+        handoff_files.append(handoff.path)
+        log_info("CodeExecution", f"SQL result handed off via {handoff.format} file: {handoff.row_count} rows")
+        staged["sql_result"] = handoff
+        return staged
             
+    @staticmethod
+    def _python_json_literal(value: Any) -> str:
+        """JSON的null/true/false不是合法的Python字面量，通过json.loads还原"""
+        return f"__import__('json').loads({repr(json.dumps(value, ensure_ascii=False, default=str))})"
+    
     def _prepare_code_with_context(self, code: str, language: str, context: Dict[str, Any]) -> str:
         """准备带上下文的代码"""
         if not context:
@@ -293,13 +406,17 @@ class CodeExecutionTool(DatabaseTool):
                     if isinstance(value, str):
                         lines.append(f"{name} = {repr(value)}")
                     else:
-                        lines.append(f"{name} = {json.dumps(value, ensure_ascii=False)}")
+                        lines.append(f"{name} = {self._python_json_literal(value)}")
                         
             # 处理SQL结果
-            if "sql_result" in context:
+            if isinstance(context.get("sql_result"), HandoffFile):
+                handoff = context["sql_result"]
+                lines.append(self._('code_exec_sql_handoff_comment', default="# SQL查询结果（{rows}行），从交接文件加载为 df", rows=handoff.row_count))
+                lines.extend(python_loader(handoff))
+            elif "sql_result" in context:
                 lines.append(self._('code_exec_sql_result_comment', default="# SQL查询结果"))
                 lines.append("import pandas as pd")
-                lines.append(f"sql_result = {json.dumps(context['sql_result'], ensure_ascii=False)}")
+                lines.append(f"sql_result = {self._python_json_literal(context['sql_result'])}")
                 lines.append(self._('code_exec_dataframe_comment', default="# 如果是表格数据，自动转换为DataFrame"))
                 lines.append("if isinstance(sql_result, list) and sql_result and isinstance(sql_result[0], dict):")
                 lines.append("    df = pd.DataFrame(sql_result)")
@@ -313,7 +430,11 @@ class CodeExecutionTool(DatabaseTool):
                 for name, value in context["variables"].items():
                     lines.append(f"const {name} = {json.dumps(value)};")
                     
-            if "sql_result" in context:
+            if isinstance(context.get("sql_result"), HandoffFile):
+                handoff = context["sql_result"]
+                lines.append(self._('code_exec_js_sql_comment', default="// SQL查询结果"))
+                lines.append(f"const sqlResult = (() => {{ const d = JSON.parse(require('fs').readFileSync({json.dumps(handoff.path)}, 'utf8')); return d.rows.map(r => Object.fromEntries(d.columns.map((c, i) => [c, r[i]]))); }})();")
+            elif "sql_result" in context:
                 lines.append(self._('code_exec_js_sql_comment', default="// SQL查询结果"))
                 lines.append(f"const sqlResult = {json.dumps(context['sql_result'])};")
                 
@@ -14,6 +14,8 @@ from ..types.tool_types import ToolResult
 from ..types.core_types import AbortSignal
 from .base import DatabaseTool
 from ..config.base import DatabaseConfig
+from ..adapters.result_set import ResultSet
+from ..utils.file_metadata import get_file_metadata
 
 
 class DatabaseExportTool(DatabaseTool):
@@ -269,9 +271,9 @@ class DatabaseExportTool(DatabaseTool):
         include_headers = options.get("include_headers", True)
         delimiter = options.get("delimiter", ",")
         null_handling = options.get("null_handling", "empty")
-        encoding = self._get_encoding(options)
-        batch_size = min(options.get("batch_size", self.DEFAULT_BATCH_SIZE), self.MAX_BATCH_SIZE)
         append = options.get("append", False)
+        encoding = self._get_encoding(options, output_path if append else None)
+        batch_size = min(options.get("batch_size", self.DEFAULT_BATCH_SIZE), self.MAX_BATCH_SIZE)
         
         null_value = {
             "empty": "",
@@ -294,33 +296,24 @@ class DatabaseExportTool(DatabaseTool):
                     paginated_sql = self._apply_pagination(sql, batch_size, offset)
                     result = await adapter.execute_query(paginated_sql)
                     
-                    rows = result.get('rows', [])
-                    columns = result.get('columns', [])
+                    rows = self._get_result_set(result)
+                    columns = rows.columns
                     
                     if not rows:
                         break
                         
                     # 第一批数据时初始化writer
                     if writer is None:
-                        writer = csv.DictWriter(
-                            csvfile, 
-                            fieldnames=columns,
-                            delimiter=delimiter
-                        )
+                        writer = csv.writer(csvfile, delimiter=delimiter)
                         # 写入表头（如果需要且不是追加模式）
                         if include_headers and not (append and output_path.stat().st_size > 0):
-                            writer.writeheader()
+                            writer.writerow(columns)
                             
-                    # 写入数据
-                    for row in rows:
-                        # 处理NULL值
-                        processed_row = {}
-                        for key, value in row.items():
-                            if value is None:
-                                processed_row[key] = null_value
-                            else:
-                                processed_row[key] = str(value)
-                        writer.writerow(processed_row)
+                    # 直接写入行元组，处理NULL值
+                    writer.writerows(
+                        [null_value if value is None else str(value) for value in row]
+                        for row in rows.tuples()
+                    )
                         
                     total_rows += len(rows)
                     offset += batch_size
@@ -328,8 +321,8 @@ class DatabaseExportTool(DatabaseTool):
                     if update_output and total_rows % (batch_size * 10) == 0:
                         update_output(self._('export_rows_progress', default="Exported {count:,} rows...", count=total_rows))
                         
-                    # 如果返回的行数少于批量大小，说明已经到最后了
-                    if len(rows) < batch_size:
+                    # 返回的行数少于批量大小，或SQL自带LIMIT未分页（一次查询即全部结果），说明已经到最后了
+                    if len(rows) < batch_size or paginated_sql == sql:
                         break
                         
             # 获取文件大小
@@ -367,66 +360,74 @@ class DatabaseExportTool(DatabaseTool):
     ) -> ToolResult:
         """导出为JSON格式"""
         indent = options.get("json_indent", 2)
-        encoding = self._get_encoding(options)
-        batch_size = min(options.get("batch_size", self.DEFAULT_BATCH_SIZE), self.MAX_BATCH_SIZE)
         append = options.get("append", False)
+        encoding = self._get_encoding(options, output_path if append else None)
+        batch_size = min(options.get("batch_size", self.DEFAULT_BATCH_SIZE), self.MAX_BATCH_SIZE)
         date_format = options.get("date_format", "%Y-%m-%d %H:%M:%S")
         
         total_rows = 0
-        all_data = [] if not append else None
+        existing_data = None
+        streaming = append and not output_path.exists()
         
         try:
             # 如果是追加模式，先读取现有数据
             if append and output_path.exists():
                 with open(output_path, 'r', encoding=encoding) as f:
                     try:
-                        all_data = json.load(f)
-                        if not isinstance(all_data, list):
-                            all_data = [all_data]
+                        existing_data = json.load(f)
+                        if not isinstance(existing_data, list):
+                            existing_data = [existing_data]
                     except:
-                        all_data = []
-            elif not append:
-                all_data = []
-                
-            # 流式处理数据
-            offset = 0
-            while True:
-                paginated_sql = self._apply_pagination(sql, batch_size, offset)
-                result = await adapter.execute_query(paginated_sql)
-                
-                rows = result.get('rows', [])
-                if not rows:
-                    break
+                        existing_data = []
+                        
+            # JSON数组逐批写入临时文件，完成后替换目标文件，避免在内存中累积全部行
+            target_path = output_path if streaming else output_path.with_name(output_path.name + '.tmp')
+            with open(target_path, 'a' if streaming else 'w', encoding=encoding) as f:
+                array_writer = None if streaming else _JSONArrayWriter(f, indent)
+                if array_writer and existing_data:
+                    array_writer.write_items(existing_data)
                     
-                # 处理日期时间对象
-                for row in rows:
-                    for key, value in row.items():
-                        if isinstance(value, datetime):
-                            row[key] = value.strftime(date_format)
-                            
-                if all_data is not None:
-                    all_data.extend(rows)
-                else:
-                    # 对于大数据集，使用流式JSON（每行一个JSON对象）
-                    mode = 'a' if append else 'w'
-                    with open(output_path, mode, encoding=encoding) as f:
-                        for row in rows:
+                # 流式处理数据
+                offset = 0
+                while True:
+                    paginated_sql = self._apply_pagination(sql, batch_size, offset)
+                    result = await adapter.execute_query(paginated_sql)
+                    
+                    rows = self._get_result_set(result)
+                    if not rows:
+                        break
+                        
+                    # 按需构造行字典并处理日期时间对象
+                    batch = (
+                        {
+                            key: value.strftime(date_format) if isinstance(value, datetime) else value
+                            for key, value in row.items()
+                        }
+                        for row in rows.iter_dicts()
+                    )
+                    
+                    if array_writer:
+                        array_writer.write_items(batch)
+                    else:
+                        # 对于大数据集，使用流式JSON（每行一个JSON对象）
+                        for row in batch:
                             json.dump(row, f, ensure_ascii=False)
                             f.write('\n')
                             
-                total_rows += len(rows)
-                offset += batch_size
-                
-                if update_output and total_rows % (batch_size * 10) == 0:
-                    update_output(self._('export_rows_progress', default="已导出 {count:,} 行...", count=total_rows))
+                    total_rows += len(rows)
+                    offset += batch_size
                     
-                if len(rows) < batch_size:
-                    break
+                    if update_output and total_rows % (batch_size * 10) == 0:
+                        update_output(self._('export_rows_progress', default="已导出 {count:,} 行...", count=total_rows))
+                        
+                    if len(rows) < batch_size or paginated_sql == sql:
+                        break
+                        
+                if array_writer:
+                    array_writer.close()
                     
-            # 写入完整的JSON数组（如果不是流式）
-            if all_data is not None:
-                with open(output_path, 'w', encoding=encoding) as f:
-                    json.dump(all_data, f, ensure_ascii=False, indent=indent)
+            if not streaming:
+                os.replace(target_path, output_path)
                     
             file_size = output_path.stat().st_size
             
@@ -438,13 +439,17 @@ class DatabaseExportTool(DatabaseTool):
                         'rows_exported': total_rows,
                         'file_path': str(output_path),
                         'file_size': file_size,
-                        'streaming': all_data is None
+                        'streaming': streaming
                     }
                 },
                 return_display=self._('export_json_success_display', default="✅ Export successful\n📄 File: {filename}\n📊 Format: JSON\n📏 Rows: {rows:,}\n💾 Size: {size}", filename=output_path.name, rows=total_rows, size=self._format_size(file_size))
             )
             
         except Exception as e:
+            # 清理未完成的临时文件，原文件保持不变
+            tmp_path = output_path.with_name(output_path.name + '.tmp')
+            if tmp_path.exists():
+                tmp_path.unlink()
             return ToolResult(
                 error=self._('export_json_failed', default="JSON export failed: {error}", error=str(e)),
                 summary=self._('export_json_failed_summary', default="JSON export failed")
@@ -487,8 +492,8 @@ class DatabaseExportTool(DatabaseTool):
                 paginated_sql = self._apply_pagination(sql, batch_size, offset)
                 result = await adapter.execute_query(paginated_sql)
                 
-                rows = result.get('rows', [])
-                columns = result.get('columns', [])
+                rows = self._get_result_set(result)
+                columns = rows.columns
                 
                 if not rows:
                     break
@@ -499,9 +504,8 @@ class DatabaseExportTool(DatabaseTool):
                     headers_written = True
                     
                 # 写入数据
-                for row in rows:
-                    row_data = [row.get(col) for col in columns]
-                    ws.append(row_data)
+                for row in rows.tuples():
+                    ws.append(list(row))
                     
                 total_rows += len(rows)
                 offset += batch_size
@@ -509,7 +513,7 @@ class DatabaseExportTool(DatabaseTool):
                 if update_output and total_rows % (batch_size * 10) == 0:
                     update_output(self._('export_rows_progress', default="已导出 {count:,} 行...", count=total_rows))
                     
-                if len(rows) < batch_size:
+                if len(rows) < batch_size or paginated_sql == sql:
                     break
                     
             # 保存文件
@@ -569,17 +573,16 @@ class DatabaseExportTool(DatabaseTool):
                     paginated_sql = self._apply_pagination(sql, batch_size, offset)
                     result = await adapter.execute_query(paginated_sql)
                     
-                    rows = result.get('rows', [])
-                    columns = result.get('columns', [])
+                    rows = self._get_result_set(result)
+                    columns = rows.columns
                     
                     if not rows:
                         break
                         
                     # 生成INSERT语句
-                    for row in rows:
+                    for row in rows.tuples():
                         values = []
-                        for col in columns:
-                            value = row.get(col)
+                        for value in row:
                             if value is None:
                                 values.append("NULL")
                             elif isinstance(value, (int, float)):
@@ -598,7 +601,7 @@ class DatabaseExportTool(DatabaseTool):
                     if update_output and total_rows % (batch_size * 10) == 0:
                         update_output(self._('export_rows_progress', default="Exported {count:,} rows...", count=total_rows))
                         
-                    if len(rows) < batch_size:
+                    if len(rows) < batch_size or paginated_sql == sql:
                         break
                         
             file_size = output_path.stat().st_size
@@ -623,6 +626,13 @@ class DatabaseExportTool(DatabaseTool):
                 summary=self._('export_sql_failed_summary', default="SQL export failed")
             )
     
+    def _get_result_set(self, result: Dict[str, Any]) -> ResultSet:
+        """获取紧凑结果集，兼容仍返回字典行的适配器"""
+        result_set = result.get('result_set')
+        if result_set is None:
+            result_set = ResultSet.from_dicts(result.get('rows', []), result.get('columns') or None)
+        return result_set
+        
     def _get_system_paths(self, config) -> list:
         """动态检测系统并返回合适的访问路径 - 真正的灵活性"""
         paths = []
@@ -718,10 +728,18 @@ class DatabaseExportTool(DatabaseTool):
             size_bytes /= 1024.0
         return f"{size_bytes:.1f} TB"
     
-    def _get_encoding(self, options: Dict[str, Any]) -> str:
-        """获取编码设置 - 支持自动检测"""
+    def _get_encoding(self, options: Dict[str, Any], existing_path: Optional[Path] = None) -> str:
+        """获取编码设置 - 支持自动检测；追加到已有文件时沿用该文件的编码"""
         encoding_param = options.get("encoding", "auto")
         
+        if encoding_param == "auto" and existing_path is not None and existing_path.is_file():
+            try:
+                metadata = get_file_metadata(str(existing_path))
+                if not metadata.is_binary:
+                    return metadata.encoding
+            except OSError:
+                pass
+        
         if encoding_param == "auto":
             try:
                 from ..utils.encoding_utils import get_system_encoding
@@ -729,4 +747,32 @@ class DatabaseExportTool(DatabaseTool):
             except:
                 return "utf-8"
         else:
-            return encoding_param
\ No newline at end of file
+            return encoding_param
+
+
+class _JSONArrayWriter:
+    """
+    增量写出JSON数组，输出与 json.dump(list, indent=indent) 一致
+    用于大结果集导出时避免在内存中累积全部行
+    """
+    
+    def __init__(self, f, indent: Optional[int]):
+        self.f = f
+        self.indent = indent
+        self.count = 0
+        
+    def write_items(self, items) -> None:
+        for item in items:
+            text = json.dumps(item, ensure_ascii=False, indent=self.indent)
+            if self.indent is None:
+                self.f.write(('[' if self.count == 0 else ', ') + text)
+            else:
+                pad = ' ' * self.indent if isinstance(self.indent, int) else self.indent
+                self.f.write(('[\n' if self.count == 0 else ',\n') + pad + text.replace('\n', '\n' + pad))
+            self.count += 1
+            
+    def close(self) -> None:
+        if self.count == 0:
+            self.f.write('[]')
+        else:
+            self.f.write(']' if self.indent is None else '\n]')
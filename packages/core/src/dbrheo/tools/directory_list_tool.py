@@ -3,14 +3,21 @@ DirectoryListTool - 文件目录浏览工具
 严格参考Gemini CLI的list_directory实现，提供安全的目录浏览能力
 """
 
+import asyncio
+import fnmatch
+import heapq
 import os
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Union, Iterable, Callable
 from datetime import datetime
 from ..types.tool_types import ToolResult
 from ..types.core_types import AbortSignal
 from .base import DatabaseTool
 from ..config.base import DatabaseConfig
+from ..telemetry.metrics import register_cache
+from ..utils.dir_walker import (
+    DirectorySnapshotCache, DEFAULT_SNAPSHOT_TTL, WalkItem, stat_entry, walk_directory
+)
 
 
 class DirectoryListTool(DatabaseTool):
@@ -80,6 +87,15 @@ class DirectoryListTool(DatabaseTool):
         # 动态检测系统并设置灵活的访问权限（与FileReadTool保持一致）
         default_paths = self._get_system_paths(config)
         self.allowed_paths = config.get("directory_allowed_paths", default_paths)
+        # 单次遍历最多检查的项数，超过后提前停止（巨大目录不会卡住Agent）
+        self.max_scan_items = int(config.get("directory_list_max_scan", 200000))
+        # 目录快照缓存：目录mtime变化或超过TTL时重新扫描
+        self._snapshot_cache = None
+        if config.get("directory_snapshot_cache", True):
+            self._snapshot_cache = DirectorySnapshotCache(
+                ttl=float(config.get("directory_snapshot_ttl", DEFAULT_SNAPSHOT_TTL))
+            )
+            register_cache("directory_snapshot", self._snapshot_cache)
         
     def validate_tool_params(self, params: Dict[str, Any]) -> Optional[str]:
         """验证参数"""
@@ -197,10 +213,10 @@ class DirectoryListTool(DatabaseTool):
         path = params.get("path", "")
         pattern = params.get("pattern")
         recursive = params.get("recursive", False)
-        max_depth = params.get("max_depth", 2)
+        max_depth = int(params.get("max_depth", 2))
         sort_by = params.get("sort_by", "name")
         show_hidden = params.get("show_hidden", False)
-        limit = params.get("limit", 100)
+        limit = int(params.get("limit", 100))
         
         try:
             # 解析路径
@@ -227,31 +243,31 @@ class DirectoryListTool(DatabaseTool):
                     error=self._('dir_list_not_directory', default="Path is not a directory: {path}", path=path)
                 )
                 
-            # 收集文件和目录
-            items = []
-            if recursive:
-                items = self._list_recursive(
-                    resolved_path, pattern, max_depth, show_hidden, 0
-                )
-            else:
-                items = self._list_directory(
-                    resolved_path, pattern, show_hidden
-                )
-                
-            # 排序
-            items = self._sort_items(items, sort_by)
-            
-            # 限制数量
-            total_items = len(items)
-            if total_items > limit:
-                items = items[:limit]
-                truncated = True
-            else:
-                truncated = False
+            # 遍历是阻塞的文件系统调用，放到线程池执行，避免阻塞事件循环；
+            # 中止信号在遍历每个目录前检查
+            counter = _CountingWalk(
+                walk_directory(
+                    str(resolved_path),
+                    max_depth=max_depth if recursive else 1,
+                    show_hidden=show_hidden,
+                    # 按名称排序且无快照缓存时只对最终结果stat
+                    with_stat=sort_by != "name",
+                    cache=self._snapshot_cache,
+                    should_stop=(lambda: signal.aborted) if signal is not None else None
+                ),
+                self.max_scan_items,
+                match=(lambda name: self._match_pattern(name, pattern)) if pattern else None
+            )
+            loop = asyncio.get_running_loop()
+            items = await loop.run_in_executor(None, self._collect_items, counter, sort_by, limit)
+
+            total_items = counter.count
+            truncated = total_items > len(items)
+            scan_limited = counter.limited
                 
             # 格式化输出
             return self._format_result(
-                resolved_path, items, total_items, truncated, recursive
+                resolved_path, items, total_items, truncated, recursive, scan_limited, counter.scanned
             )
             
         except Exception as e:
@@ -283,126 +299,61 @@ class DirectoryListTool(DatabaseTool):
                 continue
         return False
         
-    def _list_directory(
-        self, 
-        path: Path, 
-        pattern: Optional[str],
-        show_hidden: bool
-    ) -> List[Dict[str, Any]]:
-        """列出单个目录内容"""
-        items = []
-        
-        try:
-            for item in path.iterdir():
-                # 跳过隐藏文件（如果需要）
-                if not show_hidden and item.name.startswith('.'):
-                    continue
-                    
-                # 应用模式过滤
-                if pattern and not self._match_pattern(item.name, pattern):
-                    continue
-                    
-                items.append(self._get_item_info(item, path))
-        except PermissionError:
-            # 权限不足，静默跳过
-            pass
-            
-        return items
-        
-    def _list_recursive(
-        self,
-        path: Path,
-        pattern: Optional[str],
-        max_depth: int,
-        show_hidden: bool,
-        current_depth: int
-    ) -> List[Dict[str, Any]]:
-        """递归列出目录内容"""
-        if current_depth >= max_depth:
-            return []
-            
-        items = []
-        
-        # 首先添加当前目录的内容
-        items.extend(self._list_directory(path, pattern, show_hidden))
-        
-        # 然后递归子目录
-        try:
-            for item in path.iterdir():
-                if item.is_dir():
-                    # 跳过隐藏目录（如果需要）
-                    if not show_hidden and item.name.startswith('.'):
-                        continue
-                        
-                    sub_items = self._list_recursive(
-                        item, pattern, max_depth, show_hidden, current_depth + 1
-                    )
-                    items.extend(sub_items)
-        except PermissionError:
-            pass
-            
-        return items
-        
-    def _get_item_info(self, item: Path, base_path: Path) -> Dict[str, Any]:
+    def _collect_items(self, walk: Iterable[WalkItem], sort_by: str, limit: int) -> List[Dict[str, Any]]:
+        """遍历时直接做 top-k，不构建完整列表（在线程池中执行）"""
+        return [self._walk_item_info(item) for item in self._select_top(walk, sort_by, limit)]
+
+    def _select_top(self, items: Iterable[WalkItem], sort_by: str, limit: int) -> List[WalkItem]:
+        """按排序方式取前 limit 项（堆，O(n log k)），结果与完整排序后截断一致"""
+        if sort_by == "size":
+            # 按大小降序排序
+            return heapq.nlargest(limit, items, key=lambda x: x.entry.size or 0)
+        elif sort_by == "modified":
+            # 按修改时间降序排序（最新的在前）
+            return heapq.nlargest(
+                limit, items,
+                key=lambda x: x.entry.mtime if x.entry.mtime is not None else float("-inf")
+            )
+        # 目录优先，然后按名称排序
+        return heapq.nsmallest(limit, items, key=lambda x: (not x.entry.is_dir, x.entry.name.lower()))
+
+    def _walk_item_info(self, item: WalkItem) -> Dict[str, Any]:
         """获取文件/目录信息"""
-        try:
-            stat = item.stat()
-            
-            # 计算相对路径
-            try:
-                relative_path = item.relative_to(base_path)
-            except ValueError:
-                relative_path = item
-                
-            return {
-                "name": item.name,
-                "path": str(item),
-                "relative_path": str(relative_path),
-                "type": "directory" if item.is_dir() else "file",
-                "size": stat.st_size if item.is_file() else 0,
-                "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                "extension": item.suffix.lower() if item.is_file() else ""
-            }
-        except (OSError, PermissionError):
+        entry = stat_entry(item.entry)
+        if entry.stat_failed:
             # 无法获取状态，返回基本信息
             return {
-                "name": item.name,
-                "path": str(item),
+                "name": entry.name,
+                "path": entry.path,
+                "relative_path": item.relative_path,
                 "type": "unknown",
                 "size": 0,
                 "modified": None,
                 "extension": ""
             }
+        return {
+            "name": entry.name,
+            "path": entry.path,
+            "relative_path": item.relative_path,
+            "type": "directory" if entry.is_dir else "file",
+            "size": entry.size if entry.is_file else 0,
+            "modified": datetime.fromtimestamp(entry.mtime).isoformat(),
+            "extension": os.path.splitext(entry.name)[1].lower() if entry.is_file else ""
+        }
             
     def _match_pattern(self, name: str, pattern: str) -> bool:
         """简单的模式匹配（支持 * 通配符）"""
-        import fnmatch
         return fnmatch.fnmatch(name.lower(), pattern.lower())
         
-    def _sort_items(self, items: List[Dict[str, Any]], sort_by: str) -> List[Dict[str, Any]]:
-        """排序项目"""
-        if sort_by == "name":
-            # 目录优先，然后按名称排序
-            return sorted(items, key=lambda x: (x["type"] != "directory", x["name"].lower()))
-        elif sort_by == "size":
-            # 按大小降序排序
-            return sorted(items, key=lambda x: -x["size"])
-        elif sort_by == "modified":
-            # 按修改时间降序排序（最新的在前）
-            return sorted(
-                items, 
-                key=lambda x: x["modified"] if x["modified"] else "",
-                reverse=True
-            )
-        return items
-        
     def _format_result(
         self,
         base_path: Path,
         items: List[Dict[str, Any]],
         total_items: int,
         truncated: bool,
-        recursive: bool
+        recursive: bool,
+        scan_limited: bool = False,
+        scanned_items: int = 0
     ) -> ToolResult:
         """格式化结果输出"""
         # 统计信息
@@ -416,7 +367,8 @@ class DirectoryListTool(DatabaseTool):
             "directories": len(dirs),
             "files": len(files),
             "items": items,
-            "truncated": truncated
+            "truncated": truncated,
+            "scan_limited": scan_limited
         }
         
         # 为显示准备格式化输出
@@ -427,6 +379,8 @@ class DirectoryListTool(DatabaseTool):
         
         if truncated:
             display_lines.append(self._('dir_list_truncated', default="⚠️ Showing first {showing} of {total} items", showing=len(items), total=total_items))
+        if scan_limited:
+            display_lines.append(self._('dir_list_scan_limited', default="⚠️ Stopped after scanning {count} items; narrow the path or pattern to see the rest", count=scanned_items))
             
         display_lines.append("")  # 空行
         
@@ -478,4 +432,30 @@ class DirectoryListTool(DatabaseTool):
             if size_bytes < 1024.0:
                 return f"{size_bytes:.1f} {unit}"
             size_bytes /= 1024.0
-        return f"{size_bytes:.1f} TB"
\ No newline at end of file
+        return f"{size_bytes:.1f} TB"
+
+
+class _CountingWalk:
+    """
+    按名称过滤遍历结果并计数
+    scanned 是访问过的项数（不论是否匹配），达到上限后停止；count 是匹配的项数
+    """
+
+    def __init__(self, walk: Iterable[WalkItem], max_items: int,
+                 match: Optional[Callable[[str], bool]] = None):
+        self._walk = walk
+        self._match = match
+        self.max_items = max_items
+        self.scanned = 0
+        self.count = 0
+        self.limited = False
+
+    def __iter__(self):
+        for item in self._walk:
+            if self.scanned >= self.max_items:
+                self.limited = True
+                break
+            self.scanned += 1
+            if self._match is None or self._match(item.entry.name):
+                self.count += 1
+                yield item
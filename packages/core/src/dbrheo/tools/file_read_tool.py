@@ -5,6 +5,7 @@
 
 import os
 import json
+import asyncio
 import yaml
 import base64
 import mimetypes
@@ -16,6 +17,9 @@ from ..types.file_types import FileFormat, FileAnalysisResult
 from .base import DatabaseTool
 from ..config.base import DatabaseConfig
 from ..utils.debug_logger import DebugLogger, log_info
+from ..utils.line_index import read_line_window, supports_line_index
+from ..utils.file_metadata import get_file_metadata
+from ..utils.file_summary import summarize_file, supports_summary
 
 
 class FileReadTool(DatabaseTool):
@@ -40,7 +44,9 @@ class FileReadTool(DatabaseTool):
     }
     
     # 最大文件大小 (50MB for text, 10MB for images)
+    # 可建立行索引的文本文件按窗口读取，不受50MB限制
     MAX_TEXT_FILE_SIZE = 50 * 1024 * 1024
+    MAX_INDEXED_TEXT_FILE_SIZE = 8 * 1024 * 1024 * 1024
     MAX_IMAGE_FILE_SIZE = 10 * 1024 * 1024
     
     # 默认行数限制（借鉴Gemini CLI的2000行）
@@ -80,7 +86,7 @@ class FileReadTool(DatabaseTool):
                     },
                     "analyze": {
                         "type": "boolean",
-                        "description": "Analyze file structure and content (for CSV/JSON)",
+                        "description": "Analyze the whole file's structure in a single streaming pass (CSV/TSV: column types, null counts, sample rows; JSON/JSONL: element count, key frequencies; SQL: statement counts by type). Works on multi-GB files with bounded memory",
                         "default": False
                     }
                 },
@@ -238,7 +244,12 @@ class FileReadTool(DatabaseTool):
             
             # 检查文件大小
             file_size = path.stat().st_size
-            max_size = self.MAX_TEXT_FILE_SIZE if not self._is_image(path) else self.MAX_IMAGE_FILE_SIZE
+            if self._is_image(path):
+                max_size = self.MAX_IMAGE_FILE_SIZE
+            elif supports_line_index(encoding):
+                max_size = self.MAX_INDEXED_TEXT_FILE_SIZE
+            else:
+                max_size = self.MAX_TEXT_FILE_SIZE
             if file_size > max_size:
                 return ToolResult(
                     error=self._('file_read_too_large', default="File too large: {size} bytes (max: {max} bytes)", size=file_size, max=max_size)
@@ -247,13 +258,15 @@ class FileReadTool(DatabaseTool):
             # 智能文件类型检测（借鉴Gemini CLI）
             if self._is_image(path):
                 return await self._read_image(path)
-            elif self._is_binary(path):
+            elif await self._is_binary(path):
                 return self._handle_binary_file(path)
             
             # 分析文件（如果需要）
             analysis = None
             if analyze:
-                analysis = await self._analyze_file(path)
+                if update_output and supports_summary(str(path)):
+                    update_output(self._('file_read_analyzing', default="🔍 Analyzing {filename} ({size})...", filename=path.name, size=self._format_size(file_size)))
+                analysis = await self._analyze_file(path, encoding)
             
             # 读取文件内容（支持分页）
             try:
@@ -270,16 +283,20 @@ class FileReadTool(DatabaseTool):
             
             # 根据文件类型进行特殊处理
             if path.suffix.lower() == '.sql':
-                return self._handle_sql_file(content, path, lines_read, has_more, analysis)
+                result = self._handle_sql_file(content, path, lines_read, has_more, analysis)
             elif path.suffix.lower() in ['.json']:
-                return self._handle_json_file(content, path, lines_read, has_more, analysis)
+                result = self._handle_json_file(content, path, lines_read, has_more, analysis)
             elif path.suffix.lower() in ['.yaml', '.yml']:
-                return self._handle_yaml_file(content, path, lines_read, has_more, analysis)
+                result = self._handle_yaml_file(content, path, lines_read, has_more, analysis)
             elif path.suffix.lower() in ['.csv', '.tsv']:
-                return self._handle_csv_file(content, path, lines_read, has_more, analysis)
+                result = self._handle_csv_file(content, path, lines_read, has_more, analysis)
             else:
                 # 通用文本文件处理
-                return self._handle_text_file(content, path, lines_read, has_more, analysis, offset)
+                result = self._handle_text_file(content, path, lines_read, has_more, analysis, offset)
+            
+            if analysis and analysis.structure:
+                self._append_structure_summary(result, analysis.structure)
+            return result
                 
         except Exception as e:
             return ToolResult(
@@ -298,48 +315,13 @@ class FileReadTool(DatabaseTool):
         return False
     
     async def _detect_encoding(self, file_path: str) -> str:
-        """自动检测文件编码"""
+        """自动检测文件编码（结果按文件版本缓存，见 utils.file_metadata）"""
         try:
-            # 使用新的编码检测工具
-            from ..utils.encoding_utils import get_file_encoding_candidates
-            candidates = get_file_encoding_candidates()
-            
-            # 读取文件前几KB进行检测
             path = Path(file_path)
             if path.exists() and path.is_file():
-                with open(path, 'rb') as f:
-                    sample = f.read(10240)  # 读取前10KB
-                    
-                # 尝试使用chardet（如果可用）
-                try:
-                    import chardet
-                    result = chardet.detect(sample)
-                    if result and result['encoding'] and result['confidence'] > 0.7:
-                        detected = result['encoding'].lower()
-                        # 使用 encoding_utils 的标准化功能
-                        try:
-                            from ..utils.encoding_utils import EncodingDetector
-                            return EncodingDetector.normalize_encoding(detected)
-                        except:
-                            # 后备方案：简单的标准化
-                            if detected in ['shift_jis', 'shift-jis']:
-                                return 'shift_jis'
-                            elif detected in ['euc-jp', 'euc_jp']:
-                                return 'euc_jp'
-                            elif detected in ['gb2312', 'gb18030']:
-                                return 'gbk'
-                            return detected
-                except ImportError:
-                    pass
-                    
-                # 如果chardet不可用或不确定，尝试候选编码
-                for encoding in candidates[:5]:  # 只尝试前5个最可能的
-                    try:
-                        sample.decode(encoding)
-                        return encoding
-                    except:
-                        continue
-                        
+                loop = asyncio.get_running_loop()
+                metadata = await loop.run_in_executor(None, get_file_metadata, str(path))
+                return metadata.encoding
         except Exception as e:
             if DebugLogger.should_log("DEBUG"):
                 log_info("FileReadTool", f"编码检测失败: {str(e)}")
@@ -355,7 +337,7 @@ class FileReadTool(DatabaseTool):
         """检查是否为图片文件"""
         return path.suffix.lower() in self.IMAGE_EXTENSIONS
     
-    def _is_binary(self, path: Path) -> bool:
+    async def _is_binary(self, path: Path) -> bool:
         """检查是否为二进制文件（借鉴Gemini CLI）"""
         if path.suffix.lower() in self.TEXT_EXTENSIONS:
             return False
@@ -365,19 +347,11 @@ class FileReadTool(DatabaseTool):
         if mime_type and mime_type.startswith('text/'):
             return False
         
-        # 读取前4KB检查内容
+        # 检查内容（与编码检测共用一次采样；检测需要读文件，放到线程池中执行）
         try:
-            with open(path, 'rb') as f:
-                chunk = f.read(4096)
-                # 检查是否包含空字节
-                if b'\x00' in chunk:
-                    return True
-                # 尝试解码为UTF-8
-                try:
-                    chunk.decode('utf-8')
-                    return False
-                except UnicodeDecodeError:
-                    return True
+            loop = asyncio.get_running_loop()
+            metadata = await loop.run_in_executor(None, get_file_metadata, str(path))
+            return metadata.is_binary
         except:
             return True
     
@@ -420,17 +394,25 @@ class FileReadTool(DatabaseTool):
     
     async def _read_file_content(self, path: Path, encoding: str, offset: int, limit: int) -> tuple[str, int, bool]:
         """异步读取文件内容，支持分页（借鉴Gemini CLI）"""
-        import aiofiles
-        
         lines_output = []
         lines_read = 0
         has_more = False
         total_lines = 0
         
-        async with aiofiles.open(path, mode='r', encoding=encoding) as f:
-            # 首先读取所有行以获取总行数（参考Gemini CLI的做法）
-            # 对于大文件，这可能不是最优的，但能保证正确性
-            all_lines = await f.readlines()
+        if supports_line_index(encoding):
+            # 稀疏行索引：总行数来自索引，只定位并解码请求的窗口
+            loop = asyncio.get_running_loop()
+            selected_lines, index = await loop.run_in_executor(
+                None, self._read_indexed_window, path, offset, limit, encoding
+            )
+            total_lines = index.total_lines
+            actual_offset = min(offset, total_lines)
+            end_line = actual_offset + len(selected_lines)
+        else:
+            # UTF-16/32 的换行符不是单字节，退回整文件读取
+            import aiofiles
+            async with aiofiles.open(path, mode='r', encoding=encoding) as f:
+                all_lines = await f.readlines()
             total_lines = len(all_lines)
             
             # 参考Gemini CLI：保护offset不超过文件总行数
@@ -442,20 +424,20 @@ class FileReadTool(DatabaseTool):
             # 获取需要的行
             selected_lines = all_lines[actual_offset:end_line]
             
-            # 处理每一行
-            for i, line in enumerate(selected_lines):
-                # 行长度限制（借鉴Gemini CLI）
-                if len(line) > self.MAX_LINE_LENGTH:
-                    line = line[:self.MAX_LINE_LENGTH] + self._('file_read_line_truncated', default='... [truncated]\n')
-                
-                # 添加行号（cat -n 风格，但使用实际的行号）
-                line_number = actual_offset + i + 1
-                # 格式化行号，保证对齐（最多6位数）
-                lines_output.append(f"{line_number:6d}\t{line}")
-                lines_read += 1
+        # 处理每一行
+        for i, line in enumerate(selected_lines):
+            # 行长度限制（借鉴Gemini CLI）
+            if len(line) > self.MAX_LINE_LENGTH:
+                line = line[:self.MAX_LINE_LENGTH] + self._('file_read_line_truncated', default='... [truncated]\n')
             
-            # 检查是否还有更多内容
-            has_more = end_line < total_lines
+            # 添加行号（cat -n 风格，但使用实际的行号）
+            line_number = actual_offset + i + 1
+            # 格式化行号，保证对齐（最多6位数）
+            lines_output.append(f"{line_number:6d}\t{line}")
+            lines_read += 1
+        
+        # 检查是否还有更多内容
+        has_more = end_line < total_lines
         
         # 如果没有读取到任何内容（可能是offset超出范围），返回友好提示
         if not lines_output and offset >= total_lines:
@@ -463,6 +445,16 @@ class FileReadTool(DatabaseTool):
         
         return ''.join(lines_output), lines_read, has_more
     
+    def _read_indexed_window(self, path: Path, offset: int, limit: int, encoding: str):
+        """按行索引读取窗口；索引随文件元数据一起缓存"""
+        try:
+            index = get_file_metadata(str(path)).line_index()
+        except OSError:
+            index = None
+        # 每个字符最多4字节：超长行截取的部分解码后仍超过 MAX_LINE_LENGTH，会被标记为截断
+        max_line_bytes = (self.MAX_LINE_LENGTH + 1) * 4
+        return read_line_window(str(path), offset, limit, encoding, index, max_line_bytes)
+    
     def _handle_sql_file(self, content: str, path: Path, lines_read: int, has_more: bool, analysis: Optional[FileAnalysisResult]) -> ToolResult:
         """处理SQL文件"""
         # 分析SQL内容
@@ -697,32 +689,21 @@ class FileReadTool(DatabaseTool):
             return_display="\n".join(display_lines)
         )
     
-    async def _analyze_file(self, path: Path) -> FileAnalysisResult:
+    async def _analyze_file(self, path: Path, encoding: str = 'utf-8') -> FileAnalysisResult:
         """分析文件结构和内容"""
-        import aiofiles
-        
-        # chardet是可选依赖，优雅降级
-        try:
-            import chardet
-        except ImportError:
-            chardet = None
-        
         result = FileAnalysisResult(
             file_path=str(path),
             file_size=path.stat().st_size
         )
         
-        # 检测编码 - 只有chardet可用时才检测
-        if chardet:
-            try:
-                with open(path, 'rb') as f:
-                    raw_data = f.read(10000)  # 读取前10KB用于编码检测
-                    detected = chardet.detect(raw_data)
-                    result.detected_encoding = detected.get('encoding', 'unknown')
-            except:
-                pass
-        else:
-            result.detected_encoding = 'utf-8'  # 默认假设UTF-8
+        # 检测编码 - 复用缓存的文件元数据
+        try:
+            loop = asyncio.get_running_loop()
+            metadata = await loop.run_in_executor(None, get_file_metadata, str(path))
+            result.detected_encoding = metadata.encoding
+            result.line_ending = metadata.line_ending
+        except OSError:
+            result.detected_encoding = encoding
         
         # 检测格式
         ext = path.suffix.lower()
@@ -736,8 +717,45 @@ class FileReadTool(DatabaseTool):
         elif ext == '.sql':
             result.detected_format = FileFormat.SQL
         
+        # 流式结构摘要：整个文件顺序读一遍，放到工作线程避免阻塞事件循环
+        if supports_summary(str(path)):
+            try:
+                loop = asyncio.get_running_loop()
+                structure = await loop.run_in_executor(None, summarize_file, str(path), encoding)
+            except Exception as e:
+                structure = {"error": str(e)}
+            result.structure = structure
+            
+            if structure and structure.get("format") == "csv" and "columns" in structure:
+                columns = structure["columns"]
+                result.has_header = structure.get("has_header")
+                result.line_count = structure.get("row_count")
+                result.column_count = len(columns)
+                result.column_names = [c["name"] for c in columns]
+                result.data_types = {c["name"]: c["type"] for c in columns}
+                result.null_counts = {c["name"]: c["null_count"] for c in columns}
+                result.sample_rows = structure.get("samples")
+        
         return result
     
+    def _append_structure_summary(self, result: ToolResult, structure: Dict[str, Any]):
+        """把结构摘要附加到读取结果（摘要覆盖整个文件，内容仍是分页窗口）"""
+        if structure.get("error"):
+            summary_line = self._('file_read_structure_failed', default="⚠️ Structure analysis failed: {error}", error=structure["error"])
+        elif structure.get("format") == "csv":
+            summary_line = self._('file_read_structure_csv', default="📊 Whole file: {rows} rows × {cols} columns", rows=structure.get("row_count", 0), cols=structure.get("column_count", 0))
+        elif structure.get("format") == "json":
+            count = structure.get("element_count", structure.get("member_count", '-'))
+            summary_line = self._('file_read_structure_json', default="📊 Whole file: {layout}, {count} elements", layout=structure.get("layout"), count=count)
+        else:
+            summary_line = self._('file_read_structure_sql', default="📊 Whole file: {count} statements", count=structure.get("statement_count", 0))
+        
+        summary_json = json.dumps(structure, indent=2, ensure_ascii=False, default=str)
+        if isinstance(result.llm_content, str):
+            result.llm_content += self._('file_read_structure_llm', default="\n\n[Whole-file structure summary]\n{summary}", summary=summary_json)
+        if isinstance(result.return_display, str):
+            result.return_display += "\n" + summary_line
+    
     def _format_size(self, size_bytes: int) -> str:
         """格式化文件大小"""
         for unit in ['B', 'KB', 'MB', 'GB']:
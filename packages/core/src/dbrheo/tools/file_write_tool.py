@@ -23,6 +23,7 @@ from ..types.file_types import (
 )
 from .base import DatabaseTool
 from ..config.base import DatabaseConfig
+from ..utils.file_metadata import FileMetadata, get_file_metadata
 
 
 class FileWriteTool(DatabaseTool):
@@ -201,7 +202,11 @@ class FileWriteTool(DatabaseTool):
         file_diff = None
         if path.exists() and mode == "overwrite":
             try:
-                existing_content = path.read_text(encoding=params.get("encoding", "utf-8"))
+                existing = self._existing_text_metadata(path)
+                read_encoding = params.get("encoding", "auto")
+                if read_encoding == "auto":
+                    read_encoding = existing.encoding if existing else "utf-8"
+                existing_content = path.read_text(encoding=read_encoding)
                 file_diff = self._generate_diff(existing_content, content, path.name)
             except:
                 file_diff = self._('file_write_cannot_read_existing', default="[无法读取现有文件内容]")
@@ -254,13 +259,19 @@ class FileWriteTool(DatabaseTool):
         encoding_param = params.get("encoding", "auto")
         compression = params.get("compression", "none")
         
+        # 已有文本文件的编码和换行风格：仅追加时沿用，避免同一文件混用编码；覆盖写入与新文件相同
+        existing = self._existing_text_metadata(path) if compression == "none" and mode == "append" else None
+        
         # 处理编码 - 支持自动检测
         if encoding_param == "auto":
-            try:
-                from ..utils.encoding_utils import get_system_encoding
-                encoding = get_system_encoding()
-            except:
-                encoding = "utf-8"
+            if existing:
+                encoding = existing.encoding
+            else:
+                try:
+                    from ..utils.encoding_utils import get_system_encoding
+                    encoding = get_system_encoding()
+                except:
+                    encoding = "utf-8"
         else:
             encoding = encoding_param
         
@@ -286,12 +297,28 @@ class FileWriteTool(DatabaseTool):
             
             # 根据格式处理内容
             formatted_content = await self._format_content(content, format)
+            if existing and existing.line_ending == "\r\n":
+                text = formatted_content.replace("\r\n", "\n").replace("\n", "\r\n")
+            else:
+                # 与文本模式写入一致：\n 按平台换行符写出
+                text = formatted_content.replace("\n", os.linesep) if os.linesep != "\n" else formatted_content
             
             # 写入文件
             if compression != "none":
                 bytes_written = await self._write_compressed(path, formatted_content, compression, mode)
             else:
-                bytes_written = await self._write_normal(path, formatted_content, encoding, mode)
+                # 先编码再打开文件：编码失败时不会截断已有文件
+                try:
+                    data = text.encode(encoding)
+                except UnicodeEncodeError as e:
+                    if encoding_param != "auto" or existing:
+                        # 指定的编码或追加目标文件的编码无法表示内容，改用其他编码会产生错误或混合编码的文件
+                        error_msg = self._('file_write_encoding_error', default="Cannot encode content as {encoding} (existing file encoding or requested encoding): {error}. The file was not modified.", encoding=encoding, error=str(e))
+                        return ToolResult(error=error_msg, llm_content=error_msg)
+                    # 系统编码无法表示内容（如cp936下的表情符号），新文件改用utf-8
+                    encoding = "utf-8"
+                    data = text.encode(encoding)
+                bytes_written = await self._write_normal(path, data, mode)
             
             # 计算执行时间
             duration_ms = (datetime.now() - start_time).total_seconds() * 1000
@@ -494,14 +521,25 @@ class FileWriteTool(DatabaseTool):
         
         return content
     
-    async def _write_normal(self, path: Path, content: str, encoding: str, mode: str) -> int:
-        """普通文件写入"""
-        file_mode = 'a' if mode == "append" else 'w'
+    def _existing_text_metadata(self, path: Path) -> Optional[FileMetadata]:
+        """已存在的文本文件的元数据（缓存），不存在或为二进制时返回None"""
+        try:
+            if path.is_file():
+                metadata = get_file_metadata(str(path))
+                if not metadata.is_binary:
+                    return metadata
+        except OSError:
+            pass
+        return None
+    
+    async def _write_normal(self, path: Path, data: bytes, mode: str) -> int:
+        """普通文件写入（内容已按目标编码编码）"""
+        file_mode = 'ab' if mode == "append" else 'wb'
         
-        async with aiofiles.open(path, mode=file_mode, encoding=encoding) as f:
-            await f.write(content)
+        async with aiofiles.open(path, mode=file_mode) as f:
+            await f.write(data)
         
-        return len(content.encode(encoding))
+        return len(data)
     
     async def _write_compressed(self, path: Path, content: str, compression: str, mode: str) -> int:
         """压缩文件写入"""
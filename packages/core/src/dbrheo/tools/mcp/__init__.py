@@ -9,6 +9,7 @@ Key components:
 - MCPClientManager: Manages MCP client connections
 - MCPToolAdapter: Adapts MCP tools to DbRheo tool interface
 - MCPConverter: Handles format conversion between models
+- MCPCatalogCache: On-disk cache of discovered tool schemas
 """
 
 from .mcp_config import MCPConfig, MCPServerConfig
@@ -16,6 +17,7 @@ from .mcp_client import MCPClientManager, MCPServerStatus, MCP_AVAILABLE
 from .mcp_adapter import MCPToolAdapter
 from .mcp_converter import MCPConverter
 from .mcp_registry import MCPRegistry
+from .mcp_catalog import MCPCatalogCache
 
 __all__ = [
     'MCPConfig',
@@ -26,4 +28,5 @@ __all__ = [
     'MCPToolAdapter',
     'MCPConverter',
     'MCPRegistry',
+    'MCPCatalogCache',
 ]
\ No newline at end of file
@@ -23,6 +23,9 @@ class MCPToolAdapter(DatabaseTool):
     existing features like confirmation, risk assessment, etc.
     """
     
+    # Calls go to an external server over a multiplexed session
+    concurrent_safe = True
+    
     # Static allowlist for trusted servers/tools
     _trusted_servers = set()
     _trusted_tools = set()
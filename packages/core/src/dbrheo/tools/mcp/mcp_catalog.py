@@ -0,0 +1,163 @@
+"""
+On-disk cache of MCP tool catalogs.
+
+Discovering tools requires spawning every configured server and running
+`tools/list`, which can take seconds per server. The catalog cache stores the
+discovered tool schemas keyed by the server launch signature (command, args,
+cwd, env and the modification times of the resolved binary and any file
+arguments), so the next startup can register tools immediately and defer the
+connection until a tool is actually called.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ...telemetry.logger import get_logger
+from .mcp_config import MCPServerConfig
+
+logger = get_logger(__name__)
+
+
+class MCPCatalogCache:
+    """
+    JSON file mapping server signatures to their discovered tools.
+
+    Each entry holds the raw tool definitions (name, description, inputSchema)
+    as returned by the server, so cached and live discovery go through the
+    same conversion path.
+    """
+
+    DEFAULT_PATH = Path.home() / ".dbrheo" / "mcp_catalog.json"
+    # Servers not seen for this long are dropped when the file is rewritten
+    MAX_AGE_SECONDS = 30 * 24 * 3600
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else self.DEFAULT_PATH
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, db_config) -> Optional["MCPCatalogCache"]:
+        """Create the cache from `mcp_catalog_cache` / `mcp_catalog_cache_path` settings."""
+        enabled = db_config.get("mcp_catalog_cache", True) if db_config is not None else True
+        if isinstance(enabled, str):
+            enabled = enabled.lower() not in ("0", "false", "no", "off")
+        if not enabled:
+            return None
+        path = db_config.get("mcp_catalog_cache_path", None) if db_config is not None else None
+        return cls(path)
+
+    @staticmethod
+    def signature(config: MCPServerConfig) -> Optional[str]:
+        """
+        Key identifying one server build.
+
+        Returns None for servers that cannot be cached (non-stdio transports).
+        """
+        if not config.command:
+            return None
+
+        def mtime(path: Optional[str]) -> Optional[float]:
+            try:
+                return os.stat(path).st_mtime if path else None
+            except OSError:
+                return None
+
+        cwd = config.cwd or os.getcwd()
+        binary = shutil.which(config.command) or config.command
+        # Script arguments (e.g. `python server.py`) change as often as the binary does
+        file_args = []
+        for arg in config.args or []:
+            candidate = arg if os.path.isabs(arg) else os.path.join(cwd, arg)
+            if not arg.startswith("-") and os.path.isfile(candidate):
+                file_args.append([arg, mtime(candidate)])
+
+        payload = {
+            "command": config.command,
+            "args": list(config.args or []),
+            "cwd": config.cwd,
+            "env": sorted((config.env or {}).items()),
+            "binary": binary,
+            "binary_mtime": mtime(binary),
+            "file_args": file_args,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._entries = data if isinstance(data, dict) else {}
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable MCP catalog cache {self.path}: {e}")
+                self._entries = {}
+        return self._entries
+
+    def get(self, server_name: str, config: MCPServerConfig) -> Optional[List[Dict[str, Any]]]:
+        """Cached raw tool definitions for a server, or None on a miss."""
+        key = self.signature(config)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None or entry.get("server") != server_name:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.get("tools", [])
+
+    def put(self, server_name: str, config: MCPServerConfig, tools: List[Dict[str, Any]]) -> bool:
+        """
+        Store a server's tools. Returns True when the stored catalog changed.
+        """
+        key = self.signature(config)
+        if key is None:
+            return False
+        with self._lock:
+            entries = self._load()
+            previous = entries.get(key)
+            changed = previous is None or previous.get("tools") != tools
+            now = time.time()
+            # Older builds of the same server are superseded
+            for other_key in [k for k, v in entries.items()
+                              if k != key and (v.get("server") == server_name
+                                               or now - v.get("updated_at", 0) > self.MAX_AGE_SECONDS)]:
+                entries.pop(other_key)
+            entries[key] = {"server": server_name, "tools": tools, "updated_at": now}
+            self._save(entries)
+        return changed
+
+    def invalidate(self, server_name: Optional[str] = None) -> None:
+        """Drop cached catalogs for one server, or all of them."""
+        with self._lock:
+            entries = self._load()
+            for key in [k for k, v in entries.items() if server_name is None or v.get("server") == server_name]:
+                entries.pop(key)
+            self._save(entries)
+
+    def _save(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to write MCP catalog cache {self.path}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            servers = len(self._load())
+        return {"path": str(self.path), "servers": servers, "hits": self.hits, "misses": self.misses}
@@ -10,10 +10,9 @@ import re
 from enum import Enum
 from typing import Dict, List, Optional, Any, Callable
 from dataclasses import dataclass
-from contextlib import AsyncExitStack
 
 from ...telemetry.logger import get_logger
-from .mcp_config import MCPServerConfig
+from .mcp_config import MCPConfig, MCPServerConfig
 
 logger = get_logger(__name__)
 
@@ -36,6 +35,8 @@ class MCPServerStatus(Enum):
     CONNECTING = "connecting"
     CONNECTED = "connected"
     ERROR = "error"
+    # Tools registered from the catalog cache; connects on first call
+    CACHED = "cached"
 
 
 @dataclass
@@ -55,9 +56,13 @@ class MCPServerConnection:
     name: str
     config: MCPServerConfig
     session: Optional[ClientSession] = None
-    exit_stack: Optional[AsyncExitStack] = None
     status: MCPServerStatus = MCPServerStatus.DISCONNECTED
     tools: List[MCPToolInfo] = None
+    # The stdio transport and session contexts are entered and exited by this
+    # task, since anyio cancel scopes must be closed by the task that opened them
+    runner: Optional[asyncio.Task] = None
+    shutdown: Optional[asyncio.Event] = None
+    connect_lock: Optional[asyncio.Lock] = None
     
     def __post_init__(self):
         if self.tools is None:
@@ -69,12 +74,26 @@ class MCPClientManager:
     Manages MCP client connections and tool discovery.
     
     This version is designed for MCP SDK 1.0+ which uses async context managers.
+    
+    Servers whose tools come from the catalog cache are connected lazily on the
+    first call. Requests to one server share a single session; the session
+    matches responses by request id, so concurrent `call_tool` calls are
+    multiplexed over the same stdio pipe instead of queuing behind each other.
     """
     
-    def __init__(self):
-        """Initialize the MCP client manager."""
+    # Seconds to wait for a server process to start and finish `initialize`
+    CONNECT_TIMEOUT = 60
+    
+    def __init__(self, catalog_cache=None):
+        """
+        Initialize the MCP client manager.
+        
+        Args:
+            catalog_cache: Optional MCPCatalogCache updated after each discovery
+        """
         self.servers: Dict[str, MCPServerConnection] = {}
         self.status_listeners: List[Callable[[str, MCPServerStatus], None]] = []
+        self.catalog_cache = catalog_cache
         
         # Check if MCP is available
         if not MCP_AVAILABLE:
@@ -109,7 +128,7 @@ class MCPClientManager:
     
     async def connect_server(self, server_name: str, config: MCPServerConfig) -> bool:
         """
-        Connect to a single MCP server.
+        Connect to a single MCP server and discover its tools.
         
         Args:
             server_name: Name of the server
@@ -128,56 +147,121 @@ class MCPClientManager:
             return False
         
         # Create or update server connection
-        if server_name not in self.servers:
-            self.servers[server_name] = MCPServerConnection(server_name, config)
-        
-        server_conn = self.servers[server_name]
-        
-        # Update status to connecting
-        self._update_status(server_name, MCPServerStatus.CONNECTING)
+        server_conn = self.servers.get(server_name)
+        if server_conn is None or server_conn.config is not config:
+            if server_conn is not None:
+                await self.disconnect_server(server_name)
+            server_conn = MCPServerConnection(server_name, config)
+            self.servers[server_name] = server_conn
+        if server_conn.connect_lock is None:
+            server_conn.connect_lock = asyncio.Lock()
         
-        try:
-            # Create server parameters
-            params = StdioServerParameters(
-                command=config.command,
-                args=config.args or [],
-                env={**os.environ, **(config.env or {})},
-                cwd=config.cwd
-            )
-            
-            # Create exit stack to manage async context
-            server_conn.exit_stack = AsyncExitStack()
+        # Concurrent first calls share one connection attempt
+        async with server_conn.connect_lock:
+            if server_conn.session is not None:
+                return True
             
-            # Enter stdio_client context
-            transport = await server_conn.exit_stack.enter_async_context(
-                stdio_client(params)
-            )
-            read_stream, write_stream = transport
-            
-            # Create and enter session context
-            server_conn.session = await server_conn.exit_stack.enter_async_context(
-                ClientSession(read_stream, write_stream)
-            )
-            
-            # Initialize the session
-            await server_conn.session.initialize()
-            
-            # Update status
-            self._update_status(server_name, MCPServerStatus.CONNECTED)
-            logger.info(f"Connected to MCP server '{server_name}'")
-            
-            # Discover tools
-            await self._discover_tools(server_name)
-            
-            return True
+            # Update status to connecting
+            self._update_status(server_name, MCPServerStatus.CONNECTING)
             
+            try:
+                # Create server parameters
+                params = StdioServerParameters(
+                    command=config.command,
+                    args=config.args or [],
+                    env={**os.environ, **(config.env or {})},
+                    cwd=config.cwd
+                )
+                
+                ready = asyncio.get_running_loop().create_future()
+                server_conn.shutdown = asyncio.Event()
+                server_conn.runner = asyncio.create_task(
+                    self._run_connection(server_conn, params, ready)
+                )
+                await asyncio.wait_for(asyncio.shield(ready), self.CONNECT_TIMEOUT)
+                
+                # Update status
+                self._update_status(server_name, MCPServerStatus.CONNECTED)
+                logger.info(f"Connected to MCP server '{server_name}'")
+                
+                # Discover tools
+                await self._discover_tools(server_name)
+                
+                return True
+                
+            except Exception as e:
+                logger.error(f"Failed to connect to MCP server '{server_name}': {e}")
+                
+                # Clean up on failure
+                await self._stop_runner(server_conn)
+                self._update_status(server_name, MCPServerStatus.ERROR)
+                return False
+    
+    async def _run_connection(
+        self,
+        server_conn: MCPServerConnection,
+        params: StdioServerParameters,
+        ready: asyncio.Future
+    ):
+        """Own the transport and session for the lifetime of the connection."""
+        try:
+            async with stdio_client(params) as (read_stream, write_stream):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    server_conn.session = session
+                    ready.set_result(True)
+                    await server_conn.shutdown.wait()
         except Exception as e:
-            logger.error(f"Failed to connect to MCP server '{server_name}': {e}")
-            self._update_status(server_name, MCPServerStatus.ERROR)
-            
-            # Clean up on failure
-            await self.disconnect_server(server_name)
+            if not ready.done():
+                ready.set_exception(e)
+            elif not server_conn.shutdown.is_set():
+                logger.warning(f"MCP server '{server_conn.name}' connection closed: {e}")
+        finally:
+            server_conn.session = None
+            if not server_conn.shutdown.is_set() and server_conn.status == MCPServerStatus.CONNECTED:
+                # Server exited on its own; the next call reconnects
+                self._update_status(server_conn.name, MCPServerStatus.DISCONNECTED)
+    
+    async def _stop_runner(self, server_conn: MCPServerConnection):
+        """Signal the connection task to close its contexts and wait for it."""
+        runner = server_conn.runner
+        server_conn.runner = None
+        if server_conn.shutdown:
+            server_conn.shutdown.set()
+        if runner and not runner.done():
+            done, _ = await asyncio.wait({runner}, timeout=5)
+            if not done:
+                logger.warning(f"MCP server '{server_conn.name}' did not shut down in time")
+                runner.cancel()
+        server_conn.session = None
+    
+    async def ensure_connected(self, server_name: str) -> bool:
+        """Connect a known server if it is not connected yet (lazy connection)."""
+        server_conn = self.servers.get(server_name)
+        if not server_conn:
+            return False
+        if server_conn.session is not None:
+            return True
+        return await self.connect_server(server_name, server_conn.config)
+    
+    def load_cached_tools(self, server_name: str, config: MCPServerConfig) -> bool:
+        """
+        Register a server's tools from the catalog cache without connecting.
+        
+        Returns:
+            True on a cache hit
+        """
+        if not self.catalog_cache or not config.command:
             return False
+        raw_tools = self.catalog_cache.get(server_name, config)
+        if raw_tools is None:
+            return False
+        server_conn = MCPServerConnection(server_name, config)
+        server_conn.tools = [self._make_tool_info(server_name, raw) for raw in raw_tools]
+        self.servers[server_name] = server_conn
+        self._update_status(server_name, MCPServerStatus.CACHED)
+        logger.info(f"Loaded {len(server_conn.tools)} cached tools for '{server_name}'")
+        return True
     
     async def _discover_tools(self, server_name: str):
         """Discover tools from a connected server."""
@@ -193,25 +277,35 @@ class MCPClientManager:
                 logger.warning(f"No tools found on server '{server_name}'")
                 return
             
-            server_conn.tools = []
+            raw_tools = []
             for tool in response.tools:
-                # Create tool info
-                tool_info = MCPToolInfo(
-                    name=self._sanitize_tool_name(tool.name, server_name),
-                    display_name=f"{tool.name} ({server_name})",
-                    description=tool.description or "",
-                    parameters=self._convert_parameters(tool.inputSchema) if hasattr(tool, 'inputSchema') else {},
-                    server_name=server_name,
-                    original_name=tool.name
-                )
-                server_conn.tools.append(tool_info)
+                raw_tools.append({
+                    "name": tool.name,
+                    "description": tool.description or "",
+                    "inputSchema": self._convert_parameters(getattr(tool, 'inputSchema', None))
+                })
                 logger.debug(f"Discovered tool '{tool.name}' from '{server_name}'")
+            server_conn.tools = [self._make_tool_info(server_name, raw) for raw in raw_tools]
             
             logger.info(f"Discovered {len(server_conn.tools)} tools from '{server_name}'")
             
+            if self.catalog_cache and self.catalog_cache.put(server_name, server_conn.config, raw_tools):
+                logger.debug(f"Updated cached tool catalog for '{server_name}'")
+            
         except Exception as e:
             logger.error(f"Failed to discover tools from '{server_name}': {e}")
     
+    def _make_tool_info(self, server_name: str, raw: Dict[str, Any]) -> MCPToolInfo:
+        """Build tool info from a raw tool definition (live or cached)."""
+        return MCPToolInfo(
+            name=self._sanitize_tool_name(raw["name"], server_name),
+            display_name=f"{raw['name']} ({server_name})",
+            description=raw.get("description") or "",
+            parameters=raw.get("inputSchema") or {"type": "object", "properties": {}},
+            server_name=server_name,
+            original_name=raw["name"]
+        )
+    
     def _sanitize_tool_name(self, name: str, server_name: str) -> str:
         """Sanitize tool name for use in the system."""
         # Replace invalid characters with underscores
@@ -237,31 +331,53 @@ class MCPClientManager:
         
         return schema
     
+    def _call_timeout(self, config: MCPServerConfig) -> float:
+        """Per-call timeout in seconds (server `timeout` is in milliseconds)."""
+        timeout_ms = config.timeout if config.timeout else MCPConfig.DEFAULT_TIMEOUT_MS
+        return timeout_ms / 1000
+    
     async def call_tool(
         self,
         server_name: str,
         tool_name: str,
-        parameters: Dict[str, Any]
+        parameters: Dict[str, Any],
+        timeout: Optional[float] = None
     ) -> Optional[Any]:
         """
-        Call a tool on an MCP server.
+        Call a tool on an MCP server, connecting first if needed.
+        
+        Safe to call concurrently: calls to the same server are multiplexed
+        over one session.
         
         Args:
             server_name: Name of the server
             tool_name: Original tool name
             parameters: Tool parameters
+            timeout: Seconds to wait for this call (default: server timeout)
             
         Returns:
             Tool result or None if failed
+            
+        Raises:
+            asyncio.TimeoutError: The call did not finish within the timeout
         """
-        server_conn = self.servers.get(server_name)
-        if not server_conn or not server_conn.session:
+        if not await self.ensure_connected(server_name):
+            logger.error(f"Server '{server_name}' is not connected")
+            return None
+        server_conn = self.servers[server_name]
+        session = server_conn.session
+        if session is None:
             logger.error(f"Server '{server_name}' is not connected")
             return None
         
+        if timeout is None:
+            timeout = self._call_timeout(server_conn.config)
         try:
-            result = await server_conn.session.call_tool(tool_name, parameters)
-            return result
+            return await asyncio.wait_for(session.call_tool(tool_name, parameters), timeout)
+        except asyncio.TimeoutError:
+            message = f"MCP tool '{tool_name}' on '{server_name}' timed out after {timeout:g}s"
+            logger.error(message)
+            raise asyncio.TimeoutError(message) from None
         except Exception as e:
             logger.error(f"Failed to call tool '{tool_name}' on '{server_name}': {e}")
             return None
@@ -273,19 +389,14 @@ class MCPClientManager:
         
         server_conn = self.servers[server_name]
         
-        # Close the exit stack (this will close session and transport)
-        if server_conn.exit_stack:
-            try:
-                await server_conn.exit_stack.aclose()
-            except Exception as e:
-                logger.error(f"Error closing server '{server_name}': {e}")
+        # Let the connection task close the session and transport
+        await self._stop_runner(server_conn)
         
         # Update status
         self._update_status(server_name, MCPServerStatus.DISCONNECTED)
         
         # Clear connection info
         server_conn.session = None
-        server_conn.exit_stack = None
         server_conn.tools = []
     
     async def disconnect_all(self):
@@ -309,7 +420,7 @@ class MCPClientManager:
     
     async def discover_all_servers(self, servers: Dict[str, MCPServerConfig]):
         """
-        Connect and discover tools from multiple servers.
+        Connect and discover tools from multiple servers concurrently.
         
         Args:
             servers: Dictionary of server configurations
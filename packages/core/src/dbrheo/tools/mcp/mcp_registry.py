@@ -12,6 +12,7 @@ from ...telemetry.logger import get_logger
 from .mcp_config import MCPConfig, MCPServerConfig
 from .mcp_client import MCPClientManager, MCPServerStatus
 from .mcp_adapter import MCPToolAdapter
+from .mcp_catalog import MCPCatalogCache
 
 logger = get_logger(__name__)
 
@@ -37,7 +38,8 @@ class MCPRegistry:
         """
         self.db_config = db_config
         self.mcp_config = MCPConfig(db_config)
-        self.client_manager = MCPClientManager()
+        self.catalog_cache = MCPCatalogCache.from_config(db_config)
+        self.client_manager = MCPClientManager(catalog_cache=self.catalog_cache)
         self.registered_tools: Dict[str, MCPToolAdapter] = {}
         self._initialized = False
     
@@ -45,6 +47,10 @@ class MCPRegistry:
         """
         Initialize the MCP registry and discover tools.
         
+        Servers with a cached tool catalog are registered without starting
+        them (unless `mcp_lazy_connect` is disabled); only servers with no
+        cache entry are connected now.
+        
         Args:
             tool_registry: The main tool registry to register MCP tools with
         """
@@ -63,8 +69,17 @@ class MCPRegistry:
             
             logger.info(f"Initializing {len(servers)} MCP servers...")
             
-            # Connect and discover tools from all servers
-            await self.client_manager.discover_all_servers(servers)
+            # Cached servers connect on first tool call
+            to_connect = {}
+            lazy = self._lazy_connect_enabled()
+            for server_name, server_config in servers.items():
+                if lazy and self.client_manager.load_cached_tools(server_name, server_config):
+                    continue
+                to_connect[server_name] = server_config
+            
+            # Connect and discover tools from the remaining servers
+            if to_connect:
+                await self.client_manager.discover_all_servers(to_connect)
             
             # Register discovered tools
             await self._register_discovered_tools(tool_registry)
@@ -77,6 +92,12 @@ class MCPRegistry:
             # Don't fail the entire system if MCP fails
             self._initialized = True
     
+    def _lazy_connect_enabled(self) -> bool:
+        value = self.db_config.get("mcp_lazy_connect", True)
+        if isinstance(value, str):
+            return value.lower() not in ("0", "false", "no", "off")
+        return bool(value)
+    
     async def _register_discovered_tools(self, tool_registry: DatabaseToolRegistry):
         """
         Register all discovered MCP tools with the main tool registry.
@@ -186,6 +207,11 @@ class MCPRegistry:
         # Unregister existing MCP tools
         self._unregister_all_tools(tool_registry)
         
+        # Force a fresh discovery from every server
+        if self.catalog_cache:
+            self.catalog_cache.invalidate()
+        await self.client_manager.disconnect_all()
+        
         # Re-initialize
         self._initialized = False
         await self.initialize(tool_registry)
@@ -278,6 +304,8 @@ class MCPRegistry:
         
         # Disconnect from server
         await self.client_manager.disconnect_server(name)
+        if self.catalog_cache:
+            self.catalog_cache.invalidate(name)
         
         # Remove from configuration
         self.mcp_config.remove_server(name)
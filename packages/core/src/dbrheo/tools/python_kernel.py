@@ -0,0 +1,380 @@
+"""
+Python内核池 - 为代码执行工具提供预热的常驻Python进程
+- 空闲内核预先启动并导入 numpy/pandas，新会话直接取用，省去解释器启动和导入时间
+- 每个会话绑定一个内核，命名空间跨调用保留（DataFrame 等可直接复用）
+- 单次执行超时先发送中断，宽限期内未结束则杀掉内核；崩溃或被杀后下次调用自动换新内核
+- 内核的管道、锁和后台任务绑定在创建内核池的事件循环上，调用方按事件循环各建一个内核池；
+  事件循环关闭前（asyncio.run 结束时）关闭该循环的内核，进程退出时（atexit）杀掉仍存活的内核
+"""
+
+import asyncio
+import atexit
+import itertools
+import json
+import os
+import signal
+import sys
+import time
+import weakref
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from ..utils.debug_logger import log_info
+from ..utils.loop_hooks import on_loop_shutdown
+
+
+WORKER_SCRIPT = str(Path(__file__).with_name("python_kernel_worker.py"))
+DEFAULT_PRELOAD = ("numpy", "pandas")
+KERNEL_START_TIMEOUT = 60
+INTERRUPT_GRACE_SECONDS = 3
+# 单条响应最大长度（输出上限之外还有JSON转义开销）
+_STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class KernelError(Exception):
+    """内核不可用（超时被杀或进程退出），命名空间已丢失"""
+
+
+class KernelWorker:
+    """一个内核进程及其协议通道"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.pid = process.pid
+        self.started_at = time.time()
+        self._stderr_tail: deque = deque(maxlen=50)
+        self._stderr_task = asyncio.ensure_future(self._drain_stderr())
+
+    @classmethod
+    async def start(
+        cls,
+        preload: Sequence[str] = DEFAULT_PRELOAD,
+        memory_mb: int = 0,
+        output_limit: int = 1024 * 1024,
+        cwd: Optional[str] = None
+    ) -> "KernelWorker":
+        env = dict(os.environ)
+        env.update({
+            "DBRHEO_KERNEL_PRELOAD": ",".join(preload),
+            "DBRHEO_KERNEL_MEMORY_MB": str(memory_mb),
+            "DBRHEO_KERNEL_OUTPUT_LIMIT": str(output_limit),
+            "PYTHONUNBUFFERED": "1"
+        })
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            limit=_STREAM_LIMIT
+        )
+        worker = cls(process)
+        try:
+            line = await asyncio.wait_for(process.stdout.readline(), KERNEL_START_TIMEOUT)
+        except asyncio.TimeoutError:
+            await worker.kill()
+            raise KernelError("Kernel did not start in time")
+        if not line:
+            await worker.kill()
+            raise KernelError(f"Kernel exited during startup: {worker.stderr_tail()}")
+        return worker
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def _drain_stderr(self) -> None:
+        # 必须持续读取stderr，否则管道写满会阻塞内核；只保留最后几行用于崩溃诊断
+        try:
+            async for line in self.process.stderr:
+                self._stderr_tail.append(line.decode("utf-8", errors="replace").rstrip())
+        except Exception:
+            pass
+
+    def stderr_tail(self) -> str:
+        return "\n".join(self._stderr_tail)
+
+    async def request(self, message: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        发送一条请求并等待响应
+        超时后先中断（SIGINT），宽限期内收到响应则返回该响应并标记 timed_out；否则杀掉内核抛出 KernelError
+        """
+        message = dict(message, id=next(self._ids))
+        try:
+            self.process.stdin.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            raise KernelError(self._exit_reason())
+
+        read = asyncio.ensure_future(self._read_response(message["id"]))
+        try:
+            return await asyncio.wait_for(asyncio.shield(read), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        if os.name == "posix":
+            try:
+                self.process.send_signal(signal.SIGINT)
+                response = await asyncio.wait_for(read, INTERRUPT_GRACE_SECONDS)
+                response["timed_out"] = True
+                return response
+            except (asyncio.TimeoutError, ProcessLookupError, KernelError):
+                pass
+        read.cancel()
+        await self.kill()
+        raise KernelError(f"Execution timed out after {timeout}s; kernel was restarted")
+
+    async def _read_response(self, request_id: int) -> Dict[str, Any]:
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                await self.process.wait()
+                raise KernelError(self._exit_reason())
+            response = json.loads(line)
+            # 中断后可能残留上一条请求的响应，按id跳过
+            if response.get("id") == request_id:
+                return response
+
+    def _exit_reason(self) -> str:
+        code = self.process.returncode
+        reason = f"Kernel process exited (code {code})"
+        if code is not None and code < 0:
+            reason += f", killed by signal {-code}"
+        tail = self.stderr_tail()
+        if "MemoryError" in tail or (hasattr(signal, "SIGKILL") and code == -signal.SIGKILL):
+            reason += "; the memory limit may have been exceeded"
+        return reason + (f"\n{tail[-2000:]}" if tail else "")
+
+    async def kill(self) -> None:
+        if self.alive:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+            await self.process.wait()
+        self._stderr_task.cancel()
+
+    def terminate(self) -> None:
+        """同步杀掉内核进程（所属事件循环可能已关闭，无法await）"""
+        if not self.alive:
+            return
+        try:
+            self.process.kill()
+        except ProcessLookupError:
+            pass
+        except RuntimeError:
+            # 传输已随事件循环失效，直接发信号
+            try:
+                os.kill(self.pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+            except OSError:
+                pass
+
+
+class KernelSession:
+    """绑定到一个内核的会话"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.worker: Optional[KernelWorker] = None
+        self.lock = asyncio.Lock()
+        self.calls = 0
+        self.restarts = 0
+        self.last_used = time.time()
+
+
+class KernelPool:
+    """
+    预热内核池
+    空闲内核数保持在 size；会话数超过 max_sessions 时关闭最久未用的空闲会话
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        max_sessions: int = 4,
+        memory_mb: int = 0,
+        output_limit: int = 1024 * 1024,
+        preload: Sequence[str] = DEFAULT_PRELOAD,
+        cwd: Optional[str] = None
+    ):
+        self.size = max(0, int(size))
+        self.max_sessions = max(1, int(max_sessions))
+        self.memory_mb = int(memory_mb)
+        self.output_limit = int(output_limit)
+        self.preload = tuple(preload)
+        self.cwd = cwd
+        self._idle: List[KernelWorker] = []
+        self._sessions: "OrderedDict[str, KernelSession]" = OrderedDict()
+        self._replenishing: Optional[asyncio.Task] = None
+        # 创建时所在的事件循环，内核只能在该循环上使用；循环关闭前关闭所有内核
+        try:
+            self.loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self.loop = None
+        self._shutdown_hook = on_loop_shutdown(self.shutdown) if self.loop is not None else None
+        _live_pools.add(self)
+
+    async def _start_worker(self) -> KernelWorker:
+        return await KernelWorker.start(self.preload, self.memory_mb, self.output_limit, self.cwd)
+
+    async def _take_worker(self) -> KernelWorker:
+        worker = None
+        # 后台正在预热时等它完成，避免同时再启动一个内核
+        if not self._idle and self._replenishing and not self._replenishing.done():
+            await asyncio.shield(self._replenishing)
+        while self._idle:
+            candidate = self._idle.pop()
+            if candidate.alive:
+                worker = candidate
+                break
+        if worker is None:
+            worker = await self._start_worker()
+        self._schedule_replenish()
+        return worker
+
+    def _schedule_replenish(self) -> None:
+        if self._replenishing is None or self._replenishing.done():
+            self._replenishing = asyncio.ensure_future(self._replenish())
+
+    async def _replenish(self) -> None:
+        while len(self._idle) < self.size:
+            try:
+                self._idle.append(await self._start_worker())
+            except Exception as e:
+                log_info("KernelPool", f"Failed to start kernel: {e}")
+                return
+
+    async def warm_up(self) -> None:
+        """预先启动空闲内核"""
+        await self._replenish()
+
+    def _get_session(self, session_id: str) -> KernelSession:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = KernelSession(session_id)
+            self._sessions[session_id] = session
+            self._evict_sessions()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _evict_sessions(self) -> None:
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            session = self._sessions[session_id]
+            if session.lock.locked():
+                continue
+            self._sessions.pop(session_id)
+            if session.worker:
+                log_info("KernelPool", f"Evicting kernel session '{session_id}'")
+                asyncio.ensure_future(session.worker.kill())
+
+    async def run(
+        self,
+        session_id: str,
+        code: str,
+        timeout: Optional[float] = None,
+        cwd: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """在会话的内核中执行代码，返回与子进程模式相同字段的结果"""
+        session = self._get_session(session_id)
+        async with session.lock:
+            restarted = False
+            if session.worker is None or not session.worker.alive:
+                restarted = session.worker is not None or session.restarts > 0
+                session.worker = await self._take_worker()
+            session.calls += 1
+            session.last_used = time.time()
+
+            started = time.perf_counter()
+            try:
+                response = await session.worker.request({"op": "exec", "code": code, "cwd": cwd}, timeout)
+            except KernelError as e:
+                session.worker = None
+                session.restarts += 1
+                return {
+                    "success": False,
+                    "output": "",
+                    "error": f"{e}\nSession '{session_id}' lost its variables; the next call starts a fresh kernel.",
+                    "execution_time": time.perf_counter() - started,
+                    "session_id": session_id,
+                    "kernel_restarted": True
+                }
+
+            response.pop("id", None)
+            response["session_id"] = session_id
+            if restarted:
+                response["kernel_restarted"] = True
+            if response.pop("timed_out", False):
+                response["success"] = False
+                response["error"] = (response.get("error") or "") + f"\nExecution interrupted after {timeout}s (session variables kept)"
+            return response
+
+    async def reset(self, session_id: str) -> bool:
+        session = self._sessions.get(session_id)
+        if not session or not session.worker:
+            return False
+        async with session.lock:
+            try:
+                await session.worker.request({"op": "reset"}, timeout=10)
+                return True
+            except KernelError:
+                session.worker = None
+                return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "idle_kernels": len([w for w in self._idle if w.alive]),
+            "sessions": {
+                sid: {"calls": s.calls, "restarts": s.restarts, "pid": s.worker.pid if s.worker else None}
+                for sid, s in self._sessions.items()
+            }
+        }
+
+    async def shutdown(self) -> None:
+        if self._replenishing and not self._replenishing.done():
+            self._replenishing.cancel()
+        workers = self._idle + [s.worker for s in self._sessions.values() if s.worker]
+        self._idle = []
+        self._sessions.clear()
+        await asyncio.gather(*(w.kill() for w in workers), return_exceptions=True)
+
+    def terminate(self) -> None:
+        """同步杀掉所有内核：用于事件循环已关闭或进程退出时"""
+        if self._replenishing and not self._replenishing.done():
+            try:
+                self._replenishing.cancel()
+            except RuntimeError:
+                pass
+        workers = self._idle + [s.worker for s in self._sessions.values() if s.worker]
+        self._idle = []
+        self._sessions.clear()
+        for worker in workers:
+            worker.terminate()
+
+
+# 所有存活的内核池（弱引用），进程退出时统一清理
+_live_pools: "weakref.WeakSet[KernelPool]" = weakref.WeakSet()
+
+
+def terminate_kernel_pools() -> None:
+    """同步杀掉所有内核池中的内核"""
+    for pool in list(_live_pools):
+        pool.terminate()
+
+
+async def shutdown_kernel_pools() -> None:
+    """关闭所有内核池（应用退出时调用）：当前事件循环的内核池正常关闭，其他循环的同步杀掉"""
+    loop = asyncio.get_running_loop()
+    for pool in list(_live_pools):
+        if pool.loop is loop:
+            await pool.shutdown()
+        else:
+            pool.terminate()
+
+
+atexit.register(terminate_kernel_pools)
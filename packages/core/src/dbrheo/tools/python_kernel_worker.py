@@ -0,0 +1,175 @@
+"""
+Python内核工作进程 - 由 python_kernel.KernelPool 启动的独立脚本（不导入dbrheo）
+协议：stdin/stdout 上每行一个JSON消息；用户代码的输出被捕获后随响应返回
+环境变量：
+    DBRHEO_KERNEL_PRELOAD       启动时预先导入的模块（逗号分隔）
+    DBRHEO_KERNEL_MEMORY_MB     地址空间上限（MB，0表示不限制，仅POSIX）
+    DBRHEO_KERNEL_OUTPUT_LIMIT  每次执行捕获的stdout/stderr最大字符数
+"""
+
+import io
+import json
+import os
+import sys
+import time
+import traceback
+
+
+class _CappedWriter(io.TextIOBase):
+    """只保留前 limit 个字符的输出缓冲"""
+
+    def __init__(self, limit: int):
+        self.parts = []
+        self.size = 0
+        self.limit = limit
+        self.truncated = False
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if self.size < self.limit:
+            chunk = text[:self.limit - self.size]
+            self.parts.append(chunk)
+            self.size += len(chunk)
+            if len(chunk) < len(text):
+                self.truncated = True
+        elif text:
+            self.truncated = True
+        return len(text)
+
+    def getvalue(self):
+        return "".join(self.parts)
+
+
+def _limit_memory(memory_mb: int) -> None:
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _variables(namespace: dict, limit: int = 50) -> list:
+    """会话中用户定义的变量（名称和类型），帮助调用方了解可复用的状态"""
+    result = []
+    for name, value in namespace.items():
+        if name.startswith("_") or type(value).__name__ == "module":
+            continue
+        entry = {"name": name, "type": type(value).__name__}
+        shape = getattr(value, "shape", None)
+        if isinstance(shape, tuple):
+            entry["shape"] = list(shape)
+        result.append(entry)
+        if len(result) >= limit:
+            break
+    return result
+
+
+def _execute(code: str, namespace: dict, output_limit: int, cwd: str = None) -> dict:
+    stdout = _CappedWriter(output_limit)
+    stderr = _CappedWriter(output_limit)
+    success = True
+    error = ""
+    if cwd:
+        try:
+            os.chdir(cwd)
+        except OSError as e:
+            return {"success": False, "output": "", "error": f"Cannot change directory: {e}", "execution_time": 0.0}
+
+    started = time.perf_counter()
+    saved = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        exec(compile(code, "<kernel>", "exec"), namespace)
+    except SystemExit as e:
+        success = e.code in (None, 0)
+        if not success:
+            error = f"SystemExit: {e.code}"
+    except KeyboardInterrupt:
+        success = False
+        error = "KeyboardInterrupt: execution interrupted"
+    except BaseException as e:
+        success = False
+        # 去掉本文件的栈帧，只保留用户代码的调用栈
+        error = "".join(traceback.format_exception(type(e), e, e.__traceback__.tb_next))
+    finally:
+        sys.stdout, sys.stderr = saved
+
+    output = stdout.getvalue()
+    error_output = stderr.getvalue()
+    if stdout.truncated:
+        output += "\n... [output truncated]"
+    if error:
+        error_output = (error_output + "\n" + error) if error_output else error
+    return {
+        "success": success,
+        "output": output,
+        "error": error_output,
+        "execution_time": time.perf_counter() - started
+    }
+
+
+def main() -> None:
+    preload = [name for name in os.environ.get("DBRHEO_KERNEL_PRELOAD", "").split(",") if name]
+    memory_mb = int(os.environ.get("DBRHEO_KERNEL_MEMORY_MB", "0") or 0)
+    output_limit = int(os.environ.get("DBRHEO_KERNEL_OUTPUT_LIMIT", str(1024 * 1024)))
+
+    # 协议通道使用原始 stdin/stdout 的副本；fd 0 指向空设备，fd 1 指向 stderr，
+    # 避免用户代码中的 input()、C扩展或子进程的输出破坏协议
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    protocol = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(2, 1)
+    sys.stdin = io.StringIO("")
+
+    def send(message: dict) -> None:
+        protocol.write(json.dumps(message, ensure_ascii=False, default=str) + "\n")
+        protocol.flush()
+
+    for name in preload:
+        try:
+            __import__(name)
+        except Exception:
+            pass
+    _limit_memory(memory_mb)
+
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    send({"type": "ready", "pid": os.getpid()})
+
+    while True:
+        try:
+            line = requests.readline()
+        except KeyboardInterrupt:
+            # 空闲时收到的中断（执行恰好结束）忽略
+            continue
+        if not line:
+            break
+        try:
+            request = json.loads(line)
+        except ValueError:
+            continue
+
+        op = request.get("op")
+        try:
+            if op == "exec":
+                response = _execute(request.get("code", ""), namespace, output_limit, request.get("cwd"))
+                response["variables"] = _variables(namespace)
+            elif op == "reset":
+                namespace.clear()
+                namespace.update({"__name__": "__main__", "__builtins__": __builtins__})
+                response = {"success": True}
+            else:
+                response = {"success": True, "pid": os.getpid()}
+        except KeyboardInterrupt:
+            response = {"success": False, "output": "", "error": "KeyboardInterrupt: execution interrupted", "execution_time": 0.0}
+        response["id"] = request.get("id")
+        send(response)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ import tempfile
 import shutil
 import re
 import time
+from collections import deque
 from typing import Dict, Any, Optional, Union, Set, List
 from pathlib import Path
 from ..types.tool_types import ToolResult, DatabaseConfirmationDetails
@@ -22,6 +23,109 @@ from ..config.base import DatabaseConfig
 from ..utils.debug_logger import DebugLogger, log_info
 
 
+class _OutputCapture:
+    """
+    单个输出流的有界捕获
+    未超过上限时按块完整保留（最后一次性拼接，避免字符串反复相加）；
+    超过上限后完整输出写入溢出文件，内存中只保留开头和结尾的环形缓冲
+    """
+    
+    def __init__(self, limit: Union[int, float], keep_ratio: float, spill_path_factory):
+        self.limit = limit
+        self.keep = int(limit * keep_ratio) if limit != float('inf') else 0
+        self._spill_path_factory = spill_path_factory
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.total = 0
+        self.newlines = 0
+        self.head = b""
+        self.tail: deque = deque()
+        self.tail_size = 0
+        self.truncated = False
+        self.spill_path: Optional[str] = None
+        self._spill = None
+    
+    def write(self, data: bytes) -> None:
+        self.total += len(data)
+        self.newlines += data.count(b"\n")
+        if not self.truncated:
+            self.chunks.append(data)
+            self.size += len(data)
+            if self.size > self.limit:
+                self._start_truncating()
+            return
+        if self._spill:
+            self._spill.write(data)
+        self._push_tail(data)
+    
+    def _start_truncating(self) -> None:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        self.truncated = True
+        try:
+            self.spill_path = self._spill_path_factory()
+            self._spill = open(self.spill_path, "wb")
+            self._spill.write(data)
+        except OSError:
+            self.spill_path = None
+            self._spill = None
+        self.head = data[:self.keep]
+        self._push_tail(data[-self.keep:] if self.keep else b"")
+    
+    def _push_tail(self, data: bytes) -> None:
+        self.tail.append(data)
+        self.tail_size += len(data)
+        while self.tail and self.tail_size - len(self.tail[0]) >= self.keep:
+            self.tail_size -= len(self.tail.popleft())
+    
+    def recent(self, size: int) -> bytes:
+        """最近 size 字节的输出（用于进度预览）"""
+        parts = []
+        collected = 0
+        source = self.tail if self.truncated else self.chunks
+        for chunk in reversed(source):
+            parts.append(chunk)
+            collected += len(chunk)
+            if collected >= size:
+                break
+        return b"".join(reversed(parts))[-size:]
+    
+    def parts(self):
+        """(开头, 结尾)；未截断时结尾为None，开头即完整输出。截断点对齐到行边界"""
+        if not self.truncated:
+            return b"".join(self.chunks), None
+        head = self.head
+        cut = head.rfind(b"\n")
+        if cut > 0:
+            head = head[:cut]
+        tail = b"".join(self.tail)[-self.keep:] if self.keep else b""
+        cut = tail.find(b"\n")
+        if 0 <= cut < len(tail) - 1:
+            tail = tail[cut + 1:]
+        return head, tail
+    
+    def close(self) -> None:
+        if self._spill:
+            self._spill.close()
+            self._spill = None
+
+
+class _ExitNotifyingProtocol(asyncio.subprocess.SubprocessStreamProtocol):
+    """
+    子进程协议：进程退出时立即完成 exited
+    process.wait() 要等所有管道关闭才返回，后台子进程（如 `cmd &`）继承管道后会让它一直阻塞
+    """
+    
+    def __init__(self, limit: int, loop: asyncio.AbstractEventLoop):
+        super().__init__(limit=limit, loop=loop)
+        self.exited = loop.create_future()
+    
+    def process_exited(self):
+        super().process_exited()
+        if not self.exited.done():
+            self.exited.set_result(None)
+
+
 class ShellExecuteConfirmationDetails(DatabaseConfirmationDetails):
     """Shell执行确认详情 - 扩展现有确认机制"""
     
@@ -62,6 +166,10 @@ class ShellTool(DatabaseTool):
     - 保持灵活性：避免硬编码，支持配置驱动的安全策略
     """
     
+    READ_CHUNK_SIZE = 64 * 1024   # 每次从管道读取的最大字节数
+    PREVIEW_BYTES = 2048          # 进度回调中显示的最近输出
+    DRAIN_TIMEOUT = 0.5           # 进程结束后等待管道读完的秒数（后台子进程可能一直持有管道）
+    
     def __init__(self, config: DatabaseConfig, i18n=None):
         # 先保存i18n实例，以便在初始化时使用
         self._i18n = i18n
@@ -131,6 +239,8 @@ class ShellTool(DatabaseTool):
                     pass
         
         self.max_output_size = config.get("shell_max_output", default_limit)
+        if self.max_output_size != float('inf'):
+            self.max_output_size = int(self.max_output_size)
         
         # 记录配置以便调试
         if DebugLogger.should_log("DEBUG"):
@@ -444,161 +554,174 @@ class ShellTool(DatabaseTool):
         else:
             cmd_args = ["bash", "-c", command]
             
-        stdout = ""
-        stderr = ""
         start_time = time.time()
         process = None
-        exited = False
-        exit_code = None
+        limit = self.max_output_size
+        # stdout 开头和结尾各保留40%，错误信息更重要，stderr 各保留60%
+        stdout_capture = _OutputCapture(limit, 0.4, lambda: self._spill_path("stdout"))
+        stderr_capture = _OutputCapture(limit, 0.6, lambda: self._spill_path("stderr"))
         
         try:
-            # 创建进程
-            process = await asyncio.create_subprocess_exec(
+            # 创建进程（同 asyncio.create_subprocess_exec，换用能通知进程退出的协议）
+            loop = asyncio.get_running_loop()
+            transport, protocol = await loop.subprocess_exec(
+                lambda: _ExitNotifyingProtocol(self.READ_CHUNK_SIZE, loop),
                 *cmd_args,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
                 stdin=asyncio.subprocess.DEVNULL,
                 cwd=str(working_dir)
             )
+            process = asyncio.subprocess.Process(transport, protocol, loop)
             
-            # 流式输出处理
-            async def stream_output():
-                nonlocal stdout, stderr, exited
-                last_update_time = time.time()
-                
-                while not exited and process and process.returncode is None:
-                    try:
-                        # 读取stdout
-                        if process.stdout:
-                            try:
-                                chunk = await asyncio.wait_for(
-                                    process.stdout.read(1024), 
-                                    timeout=0.1
-                                )
-                                if chunk:
-                                    # 智能编码检测 - 适应不同环境
-                                    text = self._decode_output(chunk)
-                                    stdout += text
-                                    
-                                    # 节流更新（1秒间隔）
-                                    if update_output and time.time() - last_update_time > 1.0:
-                                        update_output(self._('shell_stream_output', default="📤 输出:\n```\n{text}\n```", text=text))
-                                        last_update_time = time.time()
-                            except asyncio.TimeoutError:
-                                pass
-                                
-                        # 读取stderr
-                        if process.stderr:
-                            try:
-                                chunk = await asyncio.wait_for(
-                                    process.stderr.read(1024), 
-                                    timeout=0.1
-                                )
-                                if chunk:
-                                    # 智能编码检测 - 适应不同环境
-                                    text = self._decode_output(chunk)
-                                    stderr += text
-                                    
-                                    if update_output and time.time() - last_update_time > 1.0:
-                                        update_output(self._('shell_stream_error', default="📤 错误输出:\n```\n{text}\n```", text=text))
-                                        last_update_time = time.time()
-                            except asyncio.TimeoutError:
-                                pass
-                                
-                        await asyncio.sleep(0.1)
-                        
-                    except Exception:
+            # 两个读取任务各自阻塞在自己的管道上，有数据才唤醒；空闲命令不产生任何轮询
+            changed = asyncio.Event()
+            
+            async def read_stream(stream, capture: "_OutputCapture"):
+                while True:
+                    chunk = await stream.read(self.READ_CHUNK_SIZE)
+                    if not chunk:
                         break
-                        
-            # 启动流式输出任务
-            stream_task = asyncio.create_task(stream_output())
+                    capture.write(chunk)
+                    changed.set()
+            
+            # 节流的进度回调：有新输出时立即推送一次，之后至多每 interval 秒一次（包含最后一段）
+            async def notify_progress():
+                interval = float(self.config.get("shell_update_interval", 1.0))
+                last_stdout = last_stderr = 0
+                while True:
+                    await changed.wait()
+                    changed.clear()
+                    if stdout_capture.total != last_stdout:
+                        last_stdout = stdout_capture.total
+                        text = self._decode_output(stdout_capture.recent(self.PREVIEW_BYTES))
+                        update_output(self._('shell_stream_output', default="📤 输出:\n```\n{text}\n```", text=text))
+                    elif stderr_capture.total != last_stderr:
+                        last_stderr = stderr_capture.total
+                        text = self._decode_output(stderr_capture.recent(self.PREVIEW_BYTES))
+                        update_output(self._('shell_stream_error', default="📤 错误输出:\n```\n{text}\n```", text=text))
+                    await asyncio.sleep(interval)
+            
+            readers = [
+                asyncio.create_task(read_stream(process.stdout, stdout_capture)),
+                asyncio.create_task(read_stream(process.stderr, stderr_capture))
+            ]
+            notifier = asyncio.create_task(notify_progress()) if update_output else None
             
             # 等待进程完成或超时
-            try:
-                exit_code = await asyncio.wait_for(process.wait(), timeout=timeout)
-                exited = True
-            except asyncio.TimeoutError:
-                exited = True
+            exit_code = await self._wait_exit(process, protocol.exited, timeout)
+            timed_out = exit_code is None
+            if timed_out:
+                exit_code = -1
                 # 优雅终止进程
-                if process:
-                    try:
-                        process.terminate()
-                        await asyncio.wait_for(process.wait(), timeout=2.0)
-                    except asyncio.TimeoutError:
-                        if process:
-                            process.kill()
-                            
+                try:
+                    process.terminate()
+                    if await self._wait_exit(process, protocol.exited, 2.0) is None:
+                        process.kill()
+                        await self._wait_exit(process, protocol.exited, 2.0)
+                except ProcessLookupError:
+                    pass
+            
+            # 读完管道中剩余的输出；后台子进程可能继续持有管道，最多再等一会儿
+            done, pending = await asyncio.wait(readers, timeout=self.DRAIN_TIMEOUT)
+            if pending:
+                # 进程已退出，关闭仍被后台子进程持有的管道：读取任务随之收到EOF，process.wait() 也能返回
+                for fd in (1, 2):
+                    pipe = transport.get_pipe_transport(fd)
+                    if pipe is not None:
+                        pipe.close()
+                done, pending = await asyncio.wait(readers, timeout=self.DRAIN_TIMEOUT)
+                for task in pending:
+                    task.cancel()
+            if not pending and process.returncode is not None:
+                await process.wait()
+            if notifier:
+                notifier.cancel()
+            
+            stdout, stdout_truncated = self._render_capture(stdout_capture, is_stderr=False)
+            stderr, stderr_truncated = self._render_capture(stderr_capture, is_stderr=True)
+            
+            if timed_out:
                 return {
                     "success": False,
                     "stdout": stdout,
                     "stderr": stderr + "\n[" + self._('shell_timeout_message', default="执行超时 {timeout}秒", timeout=timeout) + "]",
                     "exit_code": -1,
                     "execution_time": timeout,
-                    "stdout_truncated": False,
-                    "stderr_truncated": False
+                    "stdout_truncated": stdout_truncated,
+                    "stderr_truncated": stderr_truncated,
+                    "stdout_spill_file": stdout_capture.spill_path,
+                    "stderr_spill_file": stderr_capture.spill_path
                 }
-            finally:
-                stream_task.cancel()
-                
-            # 确保所有输出都被读取
-            if process.stdout:
-                remaining_stdout = await process.stdout.read()
-                if remaining_stdout:
-                    stdout += self._decode_output(remaining_stdout)
-                    
-            if process.stderr:
-                remaining_stderr = await process.stderr.read()
-                if remaining_stderr:
-                    stderr += self._decode_output(remaining_stderr)
-                    
-            execution_time = time.time() - start_time
-            
-            # 智能输出处理 - 避免恶性截断，支持无限制模式
-            stdout_truncated = False
-            stderr_truncated = False
-            
-            # 无限制模式：完全不截断
-            if self.max_output_size == float('inf'):
-                pass  # 保留完整输出
-            else:
-                if len(stdout) > self.max_output_size:
-                    # 保留关键信息：开头和结尾各保留40%
-                    keep_size = int(self.max_output_size * 0.4)
-                    stdout_start = stdout[:keep_size]
-                    stdout_end = stdout[-keep_size:]
-                    total_lines = stdout.count('\n') + 1
-                    truncated_lines = stdout[keep_size:-keep_size].count('\n') + 1
-                    stdout = f"{stdout_start}\n\n... [" + self._('shell_truncated_lines', default="中间{truncated}行被省略，共{total}行", truncated=truncated_lines, total=total_lines) + "] ...\n\n{stdout_end}"
-                    stdout_truncated = True
-                    
-                if len(stderr) > self.max_output_size:
-                    # 错误信息更重要，保留更多内容
-                    keep_size = int(self.max_output_size * 0.6)
-                    stderr_start = stderr[:keep_size] 
-                    stderr_end = stderr[-keep_size:]
-                    stderr = f"{stderr_start}\n\n... [" + self._('shell_stderr_truncated', default="错误输出被部分省略") + "] ...\n\n{stderr_end}"
-                    stderr_truncated = True
                 
             return {
                 "success": exit_code == 0,
                 "stdout": stdout,
                 "stderr": stderr,
                 "exit_code": exit_code,
-                "execution_time": execution_time,
+                "execution_time": time.time() - start_time,
                 "stdout_truncated": stdout_truncated,
-                "stderr_truncated": stderr_truncated
+                "stderr_truncated": stderr_truncated,
+                "stdout_spill_file": stdout_capture.spill_path,
+                "stderr_spill_file": stderr_capture.spill_path
             }
             
         except Exception as e:
+            if process is not None and process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+            stdout, stdout_truncated = self._render_capture(stdout_capture, is_stderr=False)
+            stderr, stderr_truncated = self._render_capture(stderr_capture, is_stderr=True)
             return {
                 "success": False,
                 "stdout": stdout,
                 "stderr": stderr + "\n[" + self._('shell_execution_error', default="执行异常: {error}", error=str(e)) + "]",
                 "exit_code": -1,
                 "execution_time": time.time() - start_time,
-                "stdout_truncated": False,
-                "stderr_truncated": False
+                "stdout_truncated": stdout_truncated,
+                "stderr_truncated": stderr_truncated,
+                "stdout_spill_file": stdout_capture.spill_path,
+                "stderr_spill_file": stderr_capture.spill_path
             }
+        finally:
+            stdout_capture.close()
+            stderr_capture.close()
+    
+    async def _wait_exit(self, process, exited: asyncio.Future, timeout: float) -> Optional[int]:
+        """
+        等待进程退出，超时返回None
+        等待协议的退出通知而不是 process.wait()，不受后台子进程持有管道影响，也不轮询
+        """
+        try:
+            await asyncio.wait_for(asyncio.shield(exited), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return process.returncode
+    
+    def _spill_path(self, stream_name: str) -> str:
+        """溢出文件路径：输出超过上限时完整内容写到这里，供后续用 read_file 分页查看"""
+        spill_dir = self.config.get("shell_spill_dir", None) or tempfile.gettempdir()
+        os.makedirs(spill_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix=f"dbrheo_shell_{time.strftime('%Y%m%d_%H%M%S')}_", suffix=f".{stream_name}.log", dir=spill_dir)
+        os.close(fd)
+        return path
+    
+    def _render_capture(self, capture: "_OutputCapture", is_stderr: bool) -> tuple:
+        """解码捕获的输出；超过上限时拼接开头、省略说明和结尾"""
+        head, tail = capture.parts()
+        if tail is None:
+            return self._decode_output(head), False
+        
+        if is_stderr:
+            marker = self._('shell_stderr_truncated', default="错误输出被部分省略")
+        else:
+            shown_lines = head.count(b"\n") + tail.count(b"\n")
+            marker = self._('shell_truncated_lines', default="中间{truncated}行被省略，共{total}行", truncated=max(0, capture.newlines - shown_lines), total=capture.newlines + 1)
+        if capture.spill_path:
+            marker += "; " + self._('shell_spilled_to_file', default="完整输出（{size}字节）已保存到 {path}", size=capture.total, path=capture.spill_path)
+        return f"{self._decode_output(head)}\n\n... [{marker}] ...\n\n{self._decode_output(tail)}", True
             
     def _format_result(self, command: str, working_dir: str, result: Dict[str, Any]) -> ToolResult:
         """格式化执行结果 - 确保Agent能收到原生错误信息进行智能重试"""
@@ -649,6 +772,10 @@ class ShellTool(DatabaseTool):
                 f"- Stderr truncated: {'Yes' if stderr_truncated else 'No'}",
                 f"- Original size preserved where possible"
             ])
+            for stream_name in ("stdout", "stderr"):
+                spill_file = result.get(f"{stream_name}_spill_file")
+                if spill_file:
+                    llm_content_parts.append(f"- Full {stream_name} saved to: {spill_file} (use read_file to page through it)")
         
         # 原生错误信息 - 保持最原始的形式，便于Agent理解和重试
         raw_error = result['stderr'].strip() if result['stderr'] else None
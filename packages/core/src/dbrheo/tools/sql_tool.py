@@ -3,16 +3,31 @@ SQLTool - 核心SQL执行工具
 智能SQL执行和风险评估，支持多数据库方言和流式输出
 """
 
-from typing import Optional, Callable, Union, Dict, Any, List
+from typing import Optional, Callable, Union, Dict, Any, List, Tuple
+from collections import OrderedDict
+import re
 import time
 from .base import DatabaseTool
 from .risk_evaluator import DatabaseRiskEvaluator, RiskLevel
 from ..types.core_types import AbortSignal
 from ..types.tool_types import ToolResult, DatabaseConfirmationDetails, SQLExecuteConfirmationDetails
 from ..config.base import DatabaseConfig
+from ..adapters.result_set import ResultSet
+from ..utils.data_handoff import get_result_store
+from ..adapters.query_plan import QueryPlan
 from ..utils.debug_logger import log_info
 
 
+# 聚合函数（函数参数已被替换为空括号；带 OVER 的是窗口函数，不减少行数）
+_AGGREGATE_CALL_PATTERN = re.compile(
+    r'\b(?:COUNT|SUM|AVG|MIN|MAX|TOTAL|GROUP_CONCAT|STRING_AGG|ARRAY_AGG|JSON_AGG|JSON_GROUP_ARRAY|'
+    r'JSON_GROUP_OBJECT|BOOL_AND|BOOL_OR|STDDEV|VARIANCE)\s*\(\)(?!\s*OVER\b)',
+    re.IGNORECASE
+)
+_SELECT_LIST_PATTERN = re.compile(r'\bSELECT\b(.*?)(?:\bFROM\b|$)', re.IGNORECASE | re.DOTALL)
+_GROUP_BY_PATTERN = re.compile(r'\bGROUP\s+BY\b', re.IGNORECASE)
+
+
 class SQLTool(DatabaseTool):
     """
     核心SQL执行工具 - 智能化数据库操作
@@ -20,8 +35,13 @@ class SQLTool(DatabaseTool):
     - 多数据库方言支持
     - 流式输出和进度更新（can_update_output）
     - 事务管理集成
+    - 基于EXPLAIN的查询代价守卫
     """
     
+    # 执行计划缓存（确认阶段与执行阶段共享）
+    PLAN_CACHE_SIZE = 64
+    PLAN_CACHE_TTL = 60.0
+    
     def __init__(self, config: DatabaseConfig, i18n=None):
         # 先保存i18n实例，以便在初始化时使用
         self._i18n = i18n
@@ -66,6 +86,16 @@ class SQLTool(DatabaseTool):
         self.config = config
         self.risk_evaluator = DatabaseRiskEvaluator(config, i18n)
         
+        # EXPLAIN代价守卫：按估计行数/代价决定自动LIMIT、要求确认或拒绝执行（阈值为0表示不启用）
+        self.cost_guard_enabled = str(config.get("cost_guard_enabled", True)).lower() not in ("false", "0", "no", "off")
+        self.cost_guard_auto_limit_rows = int(config.get("cost_guard_auto_limit_rows", 100000))
+        self.cost_guard_auto_limit = int(config.get("cost_guard_auto_limit", 1000))
+        self.cost_guard_confirm_rows = int(config.get("cost_guard_confirm_rows", 10000000))
+        self.cost_guard_block_rows = int(config.get("cost_guard_block_rows", 1000000000))
+        self.cost_guard_block_cost = float(config.get("cost_guard_block_cost", 0))
+        # 确认阶段和执行阶段共享执行计划，避免重复EXPLAIN
+        self._plan_cache: "OrderedDict[Tuple[Optional[str], str], Tuple[float, Optional[QueryPlan]]]" = OrderedDict()
+        
     def validate_tool_params(self, params: Dict[str, Any]) -> Optional[str]:
         """三层验证：语法 + 安全 + 权限"""
         sql = params.get("sql", "").strip()
@@ -100,9 +130,31 @@ class SQLTool(DatabaseTool):
         # 执行风险评估
         risk_assessment = self.risk_evaluator.evaluate_sql_risk(sql)
 
-        # 如果不需要确认，直接返回False
+        # 风险评估无需确认时，再根据执行计划判断查询代价
         if not risk_assessment.requires_confirmation:
-            return False
+            if not self.cost_guard_enabled or not self.cost_guard_confirm_rows or not self._is_plannable(sql):
+                return False
+            plan = await self._estimate_query_plan(params.get("database"), sql)
+            if plan is None or self._should_block(plan):
+                # 超过拒绝阈值的查询在执行阶段直接拒绝，无需确认
+                return False
+            if (plan.estimated_rows or 0) < self.cost_guard_confirm_rows:
+                return False
+            return SQLExecuteConfirmationDetails(
+                title=self._('sql_cost_confirm_title', default='确认执行高代价查询'),
+                sql_query=sql,
+                root_operation=risk_assessment.operation_type,
+                risk_assessment={
+                    "level": RiskLevel.HIGH.value,
+                    "score": risk_assessment.score,
+                    "reasons": [self._('sql_cost_confirm_reason', default='执行计划估计返回{rows}行', rows=f"{plan.estimated_rows:,.0f}")] + plan.warnings,
+                    "recommendations": [self._('sql_cost_confirm_recommendation', default='添加过滤条件、连接条件或LIMIT以减少扫描量')],
+                    "estimated_impact": plan.estimated_rows,
+                    "affected_tables": risk_assessment.affected_tables,
+                    "query_plan": plan.to_dict()
+                },
+                estimated_impact=int(plan.estimated_rows or 0)
+            )
 
         # 创建确认详情
         return SQLExecuteConfirmationDetails(
@@ -144,94 +196,114 @@ class SQLTool(DatabaseTool):
             update_output(f"{mode_display.get(mode, self._('sql_processing', default='处理中...'))}\n```sql\n{sql[:200]}{'...' if len(sql) > 200 else ''}\n```")
             
         try:
-            # 获取数据库适配器
+            # 获取已连接的数据库适配器
             log_info("SQLTool", f"Getting adapter for database={database}")
-            from ..adapters.adapter_factory import get_adapter
             # Agent调试: database参数 = {database}
-            adapter = await get_adapter(self.config, database)
+            adapter = await self._get_connected_adapter(database)
             log_info("SQLTool", f"Successfully got adapter: {adapter}")
             
-            # 连接数据库
-            await adapter.connect()
-            
-            try:
-                # 如果是验证模式，返回禁用提示
-                if mode == "validate":
-                    # DEPRECATED: validate模式已被禁用 - 2025-07-20
-                    # 原因：基础的语法检查不如大模型智能，且容易给用户错误的安全感
-                    # 建议：使用dry_run模式进行安全的SQL预演，或让Agent直接分析SQL
-                    return ToolResult(
-                        error=self._('sql_validate_disabled_error', default='validate模式已被禁用。建议使用dry_run模式进行安全的SQL预演，或直接执行让数据库引擎验证语法。'),
-                        summary=self._('sql_feature_disabled', default='功能已禁用'),
-                        llm_content=self._('sql_validate_disabled_llm', default='validate模式已禁用。请使用dry_run进行预演。')
-                    )
-                    
-                # 如果是dry_run模式，使用事务但最后回滚
-                if mode == "dry_run":
-                    return await self._dry_run_sql(sql, adapter, update_output, limit)
-                # 执行SQL
-                start_time = time.time()
-                
-                # 让适配器基于数据库方言智能判断SQL类型
-                # 而不是硬编码关键词匹配
-                sql_metadata = await adapter.parse_sql(sql)
-                
-                # 基于解析结果判断操作类型
-                # 查询类型：SELECT、SHOW、DESCRIBE、EXPLAIN、ANALYZE 等返回结果集的命令
-                sql_type = sql_metadata.get('sql_type', 'UNKNOWN')
-                query_types = {'SELECT', 'SHOW', 'DESCRIBE', 'DESC', 'EXPLAIN', 'ANALYZE'}
-                is_query = sql_type in query_types or (
-                    sql_type == 'UNKNOWN' and any(keyword in sql.upper() for keyword in ['SELECT', 'SHOW', 'DESCRIBE', 'EXPLAIN'])
+            # 如果是验证模式，返回禁用提示
+            if mode == "validate":
+                # DEPRECATED: validate模式已被禁用 - 2025-07-20
+                # 原因：基础的语法检查不如大模型智能，且容易给用户错误的安全感
+                # 建议：使用dry_run模式进行安全的SQL预演，或让Agent直接分析SQL
+                return ToolResult(
+                    error=self._('sql_validate_disabled_error', default='validate模式已被禁用。建议使用dry_run模式进行安全的SQL预演，或直接执行让数据库引擎验证语法。'),
+                    summary=self._('sql_feature_disabled', default='功能已禁用'),
+                    llm_content=self._('sql_validate_disabled_llm', default='validate模式已禁用。请使用dry_run进行预演。')
                 )
                 
-                if is_query:
-                    # 查询操作 - 让Agent决定是否需要限制
-                    # 如果Agent提供了limit参数，让适配器智能处理
-                    # 避免硬编码的字符串匹配，让适配器基于SQL解析决定
-                    if limit:
-                        # 让适配器智能地应用limit，而不是硬编码字符串检查
-                        sql = await adapter.apply_limit_if_needed(sql, limit)
-                        
-                    if update_output:
-                        update_output(f"{self._('sql_executing_query', default='执行查询中...')}\n```sql\n{sql}\n```")
+            # 如果是dry_run模式，使用事务但最后回滚
+            if mode == "dry_run":
+                return await self._dry_run_sql(sql, adapter, update_output, limit)
+                
+            # 让适配器基于数据库方言智能判断SQL类型
+            # 而不是硬编码关键词匹配
+            sql_metadata = await adapter.parse_sql(sql)
+            
+            # 基于解析结果判断操作类型
+            # 查询类型：SELECT、SHOW、DESCRIBE、EXPLAIN、ANALYZE 等返回结果集的命令
+            sql_type = sql_metadata.get('sql_type', 'UNKNOWN')
+            query_types = {'SELECT', 'SHOW', 'DESCRIBE', 'DESC', 'EXPLAIN', 'ANALYZE'}
+            is_query = sql_type in query_types or (
+                sql_type == 'UNKNOWN' and any(keyword in sql.upper() for keyword in ['SELECT', 'SHOW', 'DESCRIBE', 'EXPLAIN'])
+            )
+            
+            if is_query:
+                # 执行前基于EXPLAIN估计代价（explain=true时同时把计划返回给Agent）
+                plan = None
+                auto_limited = False
+                if (explain or self.cost_guard_enabled) and self._is_plannable(sql):
+                    plan = await self._get_query_plan(adapter, database, sql)
+                    
+                if plan is not None and self.cost_guard_enabled:
+                    if self._should_block(plan):
+                        return self._blocked_result(plan)
+                    # 估计行数是扫描行数；聚合/GROUP BY查询返回的行数远小于此，不截断
+                    if (not limit and self.cost_guard_auto_limit_rows and self.cost_guard_auto_limit
+                            and (plan.estimated_rows or 0) >= self.cost_guard_auto_limit_rows
+                            and not self._is_aggregate(sql)):
+                        limit = self.cost_guard_auto_limit
+                        auto_limited = True
                         
-                    result = await adapter.execute_query(sql)
-                    execution_time = time.time() - start_time
+                # 查询操作 - 让Agent决定是否需要限制
+                # 如果Agent提供了limit参数，让适配器智能处理
+                # 避免硬编码的字符串匹配，让适配器基于SQL解析决定
+                if limit:
+                    # 让适配器智能地应用limit，而不是硬编码字符串检查
+                    sql = await adapter.apply_limit_if_needed(sql, limit)
                     
-                    # 格式化结果
-                    formatted_result = self._format_query_result(result, execution_time)
+                if update_output:
+                    update_output(f"{self._('sql_executing_query', default='执行查询中...')}\n```sql\n{sql}\n```")
                     
-                    if update_output:
-                        update_output(formatted_result['display'])
-                        
-                    return ToolResult(
-                        summary=self._('sql_query_success', default='查询成功，返回{count}行数据', count=formatted_result['row_count']),
-                        llm_content=formatted_result['llm_content'],
-                        return_display=formatted_result['display']
-                    )
-                else:
-                    # 修改操作（INSERT/UPDATE/DELETE/DDL）
-                    if update_output:
-                        update_output(f"{self._('sql_executing_command', default='执行命令中...')}\n```sql\n{sql}\n```")
-                        
-                    result = await adapter.execute_command(sql)
-                    execution_time = time.time() - start_time
+                # 只计时语句本身（不含EXPLAIN和SQL解析）
+                start_time = time.time()
+                result = await adapter.execute_query(sql)
+                execution_time = time.time() - start_time
+                
+                # 格式化结果
+                formatted_result = self._format_query_result(result, execution_time)
+                if auto_limited:
+                    formatted_result['llm_content']['auto_limit'] = {
+                        'limit': limit,
+                        'estimated_rows': plan.estimated_rows,
+                        'reason': self._('sql_auto_limit_reason', default='执行计划估计返回{rows}行，已自动添加LIMIT {limit}', rows=f"{plan.estimated_rows:,.0f}", limit=limit)
+                    }
+                    formatted_result['display'] += "\n\n⚠️ " + formatted_result['llm_content']['auto_limit']['reason']
+                if explain and plan is not None:
+                    formatted_result['llm_content']['query_plan'] = plan.to_dict()
+                    formatted_result['display'] += f"\n\n{self._('sql_query_plan_label', default='执行计划:')}\n```\n{plan.format_tree()}\n```"
+                
+                if update_output:
+                    update_output(formatted_result['display'])
                     
-                    # 格式化结果
-                    formatted_result = self._format_command_result(result, execution_time, sql_metadata)
+                return ToolResult(
+                    summary=self._('sql_query_success', default='查询成功，返回{count}行数据', count=formatted_result['row_count']),
+                    llm_content=formatted_result['llm_content'],
+                    return_display=formatted_result['display']
+                )
+            else:
+                # 修改操作（INSERT/UPDATE/DELETE/DDL）
+                if update_output:
+                    update_output(f"{self._('sql_executing_command', default='执行命令中...')}\n```sql\n{sql}\n```")
                     
-                    if update_output:
-                        update_output(formatted_result['display'])
-                        
-                    return ToolResult(
-                        summary=formatted_result['summary'],
-                        llm_content=formatted_result['llm_content'],
-                        return_display=formatted_result['display']
-                    )
+                start_time = time.time()
+                result = await adapter.execute_command(sql)
+                execution_time = time.time() - start_time
+                # 数据或表结构可能已变化，丢弃该数据库缓存的执行计划
+                self._invalidate_plans(database)
+                
+                # 格式化结果
+                formatted_result = self._format_command_result(result, execution_time, sql_metadata)
+                
+                if update_output:
+                    update_output(formatted_result['display'])
                     
-            finally:
-                # 确保断开连接
-                await adapter.disconnect()
+                return ToolResult(
+                    summary=formatted_result['summary'],
+                    llm_content=formatted_result['llm_content'],
+                    return_display=formatted_result['display']
+                )
                 
         except Exception as e:
             # 错误处理
@@ -247,19 +319,129 @@ class SQLTool(DatabaseTool):
                 error=str(e)
             )
             
+    @staticmethod
+    def _is_plannable(sql: str) -> bool:
+        """只对普通查询估计代价（EXPLAIN/SHOW/PRAGMA等元数据命令无需估计）"""
+        head = sql.lstrip("( \t\r\n").upper()
+        return head.startswith("SELECT") or head.startswith("WITH")
+        
+    @staticmethod
+    def _is_aggregate(sql: str) -> bool:
+        """
+        最外层查询是否为聚合/GROUP BY查询（返回行数远小于扫描行数，不自动添加LIMIT）
+        只检查括号外的文本：子查询、CTE定义和函数参数中的聚合不算
+        """
+        depth = 0
+        outer = []
+        for char in sql:
+            if char == "(":
+                if depth == 0:
+                    outer.append("(")
+                depth += 1
+            elif char == ")":
+                depth = max(depth - 1, 0)
+                if depth == 0:
+                    outer.append(")")
+            elif depth == 0:
+                outer.append(char)
+        text = "".join(outer)
+        if _GROUP_BY_PATTERN.search(text):
+            return True
+        return any(_AGGREGATE_CALL_PATTERN.search(select_list) for select_list in _SELECT_LIST_PATTERN.findall(text))
+        
+    async def _get_query_plan(self, adapter, database: Optional[str], sql: str) -> Optional[QueryPlan]:
+        """获取执行计划（带短期缓存），失败时返回None，不影响查询执行"""
+        key = (database, sql)
+        cached = self._plan_cache.get(key)
+        if cached and time.time() - cached[0] < self.PLAN_CACHE_TTL:
+            return cached[1]
+            
+        try:
+            plan = await adapter.explain_query(sql)
+        except Exception as e:
+            log_info("SQLTool", f"EXPLAIN failed, skipping cost guard: {e}")
+            plan = None
+            
+        self._plan_cache[key] = (time.time(), plan)
+        self._plan_cache.move_to_end(key)
+        while len(self._plan_cache) > self.PLAN_CACHE_SIZE:
+            self._plan_cache.popitem(last=False)
+        return plan
+        
+    def _invalidate_plans(self, database: Optional[str]) -> None:
+        """丢弃某个数据库的全部缓存执行计划"""
+        for key in [key for key in self._plan_cache if key[0] == database]:
+            del self._plan_cache[key]
+            
+    async def _get_connected_adapter(self, database: Optional[str]):
+        """
+        获取已连接的适配器
+        连接由适配器缓存持有，在确认阶段、执行阶段和多次调用间复用；
+        事件循环关闭或健康检查失败时由适配器工厂断开
+        """
+        from ..adapters.adapter_factory import get_adapter
+        adapter = await get_adapter(self.config, database)
+        await adapter.connect()
+        return adapter
+        
+    async def _estimate_query_plan(self, database: Optional[str], sql: str) -> Optional[QueryPlan]:
+        """确认阶段使用：在执行阶段将复用的连接上获取执行计划"""
+        try:
+            adapter = await self._get_connected_adapter(database)
+            return await self._get_query_plan(adapter, database, sql)
+        except Exception as e:
+            log_info("SQLTool", f"Cost estimation unavailable: {e}")
+            return None
+            
+    def _should_block(self, plan: QueryPlan) -> bool:
+        """估计行数或代价超过拒绝阈值"""
+        if self.cost_guard_block_rows and (plan.estimated_rows or 0) >= self.cost_guard_block_rows:
+            return True
+        if self.cost_guard_block_cost and (plan.estimated_cost or 0) >= self.cost_guard_block_cost:
+            return True
+        return False
+        
+    def _blocked_result(self, plan: QueryPlan) -> ToolResult:
+        """查询代价过高被拒绝时的结果，附带执行计划供Agent改写查询"""
+        error_msg = self._(
+            'sql_cost_blocked',
+            default='查询被代价守卫拒绝：执行计划估计返回{rows}行（阈值{threshold}）。请添加过滤条件、连接条件或LIMIT后重试。',
+            rows=f"{plan.estimated_rows or 0:,.0f}",
+            threshold=f"{self.cost_guard_block_rows:,}"
+        )
+        return ToolResult(
+            summary=self._('sql_cost_blocked_summary', default='查询代价过高，已拒绝执行'),
+            llm_content={
+                'error': error_msg,
+                'query_plan': plan.to_dict()
+            },
+            return_display=f"❌ {error_msg}\n```\n{plan.format_tree()}\n```",
+            error=error_msg
+        )
+        
     def _format_query_result(self, result: Dict[str, Any], execution_time: float) -> Dict[str, Any]:
         """格式化查询结果"""
         columns = result.get('columns', [])
-        rows = result.get('rows', [])
-        row_count = len(rows)
+        # 优先使用适配器返回的紧凑结果集；旧式字典行则转换一次
+        result_set = result.get('result_set')
+        if result_set is None:
+            result_set = ResultSet.from_dicts(result.get('rows', []), columns or None)
+            columns = columns or result_set.columns
+        row_count = len(result_set)
         
         # 为LLM准备完整内容（不截断，让AI看到所有数据）
+        # rows为惰性字典视图，转为文本时与字典列表格式一致
         llm_content = {
             'columns': columns,
             'row_count': row_count,
-            'rows': rows,  # 返回所有行，不截断
+            'rows': result_set,  # 返回所有行，不截断
             'execution_time': f"{execution_time:.2f}s"
         }
+        # 登记结果句柄：execute_code 可通过 context.sql_result_handle 直接引用，无需再传一遍数据
+        if row_count:
+            handle = get_result_store(self.config).register(result_set, row_count=row_count)
+            if handle:
+                llm_content['result_handle'] = handle
         
         # 为显示准备Markdown表格
         if row_count == 0:
@@ -274,13 +456,13 @@ class SQLTool(DatabaseTool):
                 table_lines.append("| " + " | ".join(columns) + " |")
                 table_lines.append("| " + " | ".join(["---"] * len(columns)) + " |")
                 
-                # 数据行（最多显示20行）
-                display_rows = rows[:20]
-                for row in display_rows:
+                # 数据行（最多显示20行），直接读取行元组，不构造字典
+                for row_index in range(min(row_count, 20)):
+                    row = result_set.row(row_index)
                     # 确保每个单元格都转换为字符串并截断过长内容
                     cells = []
                     for i, col in enumerate(columns):
-                        value = str(row.get(col, ''))
+                        value = str(row[i]) if i < len(row) else ''
                         if len(value) > 50:
                             value = value[:47] + '...'
                         cells.append(value)
@@ -3,7 +3,7 @@
 可以获取 URL 的实际内容，并转换为文本
 """
 
-import aiohttp
+import asyncio
 import re
 from typing import Dict, Any, Optional, List
 from urllib.parse import urlparse, quote
@@ -13,6 +13,7 @@ from ..types.core_types import AbortSignal
 from .base import DatabaseTool
 from ..config.base import DatabaseConfig
 from ..utils.retry_with_backoff import retry_with_backoff, RetryOptions
+from ..utils.http_client import get_http_client
 
 
 class WebFetchTool(DatabaseTool):
@@ -20,7 +21,8 @@ class WebFetchTool(DatabaseTool):
     网页内容获取工具
     - 从 URL 获取实际内容
     - 支持 HTML 转文本
-    - 支持多个 URL（最多 20 个）
+    - 支持多个 URL（最多 20 个），并发获取
+    - 共享连接池和磁盘HTTP缓存（utils.http_client）
     - 灵活处理各种网页格式
     """
     
@@ -28,6 +30,7 @@ class WebFetchTool(DatabaseTool):
     URL_FETCH_TIMEOUT = 10  # 秒
     MAX_CONTENT_LENGTH = 100000  # 100KB
     MAX_URLS = 20
+    MAX_CONCURRENT_FETCHES = 8
     
     def __init__(self, config: DatabaseConfig, i18n=None):
         # 先保存i18n实例，以便在初始化时使用
@@ -154,30 +157,40 @@ class WebFetchTool(DatabaseTool):
                 error=self._('web_fetch_no_urls_error', default="No URLs found to fetch")
             )
         
-        results = []
         errors = []
-        
-        # 获取每个 URL 的内容
-        for i, url in enumerate(all_urls):
+        concurrency = max(1, int(self.config.get("web_fetch_concurrency", self.MAX_CONCURRENT_FETCHES)))
+        semaphore = asyncio.Semaphore(concurrency)
+        completed = 0
+        
+        if update_output:
+            update_output(self._('web_fetch_progress_start', default="🌐 并发获取 {total} 个网页...", total=len(all_urls)))
+        
+        async def fetch_one(url: str) -> Dict[str, Any]:
+            nonlocal completed
+            async with semaphore:
+                try:
+                    content = await self._fetch_url(url, extract_text, selector)
+                    result = {
+                        "url": url,
+                        "content": content,
+                        "success": True
+                    }
+                except Exception as e:
+                    # 增强错误信息诊断，提供异常类型和上下文
+                    error_msg = self._format_error_message(e, url)
+                    result = {
+                        "url": url,
+                        "error": error_msg,
+                        "success": False
+                    }
+                    errors.append(f"{url}: {error_msg}")
+            completed += 1
             if update_output:
-                update_output(self._('web_fetch_progress', default="🌐 获取网页 {current}/{total}: {url}", current=i+1, total=len(all_urls), url=url))
-            
-            try:
-                content = await self._fetch_url(url, extract_text, selector)
-                results.append({
-                    "url": url,
-                    "content": content,
-                    "success": True
-                })
-            except Exception as e:
-                # 增强错误信息诊断，提供异常类型和上下文
-                error_msg = self._format_error_message(e, url)
-                results.append({
-                    "url": url,
-                    "error": error_msg,
-                    "success": False
-                })
-                errors.append(f"{url}: {error_msg}")
+                update_output(self._('web_fetch_progress', default="🌐 获取网页 {current}/{total}: {url}", current=completed, total=len(all_urls), url=url))
+            return result
+        
+        # 结果保持输入顺序
+        results = await asyncio.gather(*(fetch_one(url) for url in all_urls))
         
         # 格式化结果
         if not results:
@@ -242,40 +255,45 @@ class WebFetchTool(DatabaseTool):
             max_delay_ms=3000      # 最大3秒延迟
         )
         
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
+        }
+        
         async def fetch_with_session():
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
-                }
-                
-                timeout = aiohttp.ClientTimeout(total=self.URL_FETCH_TIMEOUT)
-                
-                async with session.get(url, headers=headers, timeout=timeout) as response:
-                    if response.status != 200:
-                        raise Exception(f"HTTP {response.status}")
-                    
-                    # 检查内容长度
-                    content_length = response.headers.get('Content-Length')
-                    if content_length and int(content_length) > self.MAX_CONTENT_LENGTH:
-                        raise Exception(f"Content too large: {content_length} bytes")
-                    
-                    # 读取内容
-                    content = await response.text()
-                    
-                    # 限制内容长度
-                    if len(content) > self.MAX_CONTENT_LENGTH:
-                        content = content[:self.MAX_CONTENT_LENGTH]
-                    
-                    # 处理内容
-                    if extract_text and response.content_type and 'html' in response.content_type:
-                        content = self._html_to_text(content, selector)
-                    
-                    return content
+            # 共享连接池：同一主机的后续请求复用 keep-alive 连接；新鲜的缓存直接返回
+            response = await get_http_client(self.config).fetch(
+                url,
+                headers=headers,
+                timeout=self.URL_FETCH_TIMEOUT,
+                # 每个字符最多4字节，读够 MAX_CONTENT_LENGTH 个字符即可
+                max_bytes=self.MAX_CONTENT_LENGTH * 4
+            )
+            if response.status != 200:
+                raise Exception(f"HTTP {response.status}")
+            
+            # 检查内容长度
+            content_length = response.headers.get('content-length')
+            if content_length and int(content_length) > self.MAX_CONTENT_LENGTH:
+                raise Exception(f"Content too large: {content_length} bytes")
+            
+            return response
         
         # 使用重试机制执行请求
-        return await retry_with_backoff(fetch_with_session, retry_options)
+        response = await retry_with_backoff(fetch_with_session, retry_options)
+        content = response.text()
+        
+        # 限制内容长度
+        if len(content) > self.MAX_CONTENT_LENGTH:
+            content = content[:self.MAX_CONTENT_LENGTH]
+        
+        # 处理内容：HTML解析是CPU密集操作，放到线程池，不阻塞其他URL的并发获取
+        if extract_text and 'html' in response.content_type:
+            loop = asyncio.get_running_loop()
+            content = await loop.run_in_executor(None, self._html_to_text, content, selector)
+        
+        return content
     
     def _html_to_text(self, html: str, selector: Optional[str] = None) -> str:
         """将 HTML 转换为纯文本"""
@@ -2,7 +2,6 @@
 网络搜索工具 - 让Agent能够获取最新信息
 """
 
-import aiohttp
 from typing import Dict, Any, Optional, List, Protocol
 from abc import ABC, abstractmethod
 import json
@@ -10,6 +9,7 @@ from ..types.tool_types import ToolResult
 from ..types.core_types import AbortSignal
 from .base import DatabaseTool
 from ..config.base import DatabaseConfig
+from ..utils.http_client import get_http_client
 
 
 class SearchResult:
@@ -38,6 +38,10 @@ class SearchBackend(ABC):
 class DuckDuckGoBackend(SearchBackend):
     """DuckDuckGo搜索后端 - 无需API密钥"""
     
+    def __init__(self, config: Optional[DatabaseConfig] = None):
+        # 共享HTTP客户端首次创建时读取连接池和缓存配置
+        self.config = config
+    
     def get_name(self) -> str:
         return "DuckDuckGo"
     
@@ -53,68 +57,68 @@ class DuckDuckGoBackend(SearchBackend):
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status != 200:
-                        raise Exception(f"Search request failed with status {response.status}")
-                    
-                    html = await response.text()
-                    
-                    # 调试：保存HTML到文件以便分析
-                    import os
-                    if os.getenv('DBRHEO_DEBUG_SEARCH', '').lower() == 'true':
-                        with open('search_debug.html', 'w', encoding='utf-8') as f:
-                            f.write(html)
-                        print(f"[DEBUG] HTML saved to search_debug.html, length: {len(html)}")
-                    
-                    # 改进的HTML解析 - 更灵活的正则表达式
-                    results = []
-                    
-                    # 尝试多种模式匹配结果
-                    patterns = [
-                        # 标准结果模式
-                        r'<a class="result__a"[^>]*href="([^"]+)"[^>]*>(.*?)</a>.*?<a class="result__snippet"[^>]*>(.*?)</a>',
-                        # 备用模式1
-                        r'<h2 class="result__title">.*?<a[^>]*href="([^"]+)"[^>]*>(.*?)</a>.*?</h2>.*?<a class="result__snippet"[^>]*>(.*?)</a>',
-                        # 备用模式2 - 更宽松
-                        r'<a[^>]*class="[^"]*result[^"]*"[^>]*href="([^"]+)"[^>]*>(.*?)</a>'
-                    ]
-                    
-                    for pattern in patterns:
-                        matches = re.findall(pattern, html, re.DOTALL)
-                        if matches:
-                            for match in matches[:max_results]:
-                                if len(match) >= 3:
-                                    url, title, snippet = match[0], match[1], match[2]
-                                elif len(match) == 2:
-                                    url, title = match[0], match[1]
-                                    snippet = "No description available"
-                                else:
-                                    continue
-                                    
-                                # 清理HTML标签
-                                title = re.sub(r'<[^>]+>', '', title).strip()
-                                snippet = re.sub(r'<[^>]+>', '', snippet).strip()
-                                
-                                if title and url:  # 确保有标题和URL
-                                    results.append(SearchResult(
-                                        title=title,
-                                        url=url,
-                                        snippet=snippet,
-                                        source="duckduckgo"
-                                    ))
+            # 共享连接池和HTTP缓存（遵循服务器的缓存头）
+            response = await get_http_client(self.config).fetch(url, headers=headers)
+            if response.status != 200:
+                raise Exception(f"Search request failed with status {response.status}")
+            
+            html = response.text()
+            
+            # 调试：保存HTML到文件以便分析
+            import os
+            if os.getenv('DBRHEO_DEBUG_SEARCH', '').lower() == 'true':
+                with open('search_debug.html', 'w', encoding='utf-8') as f:
+                    f.write(html)
+                print(f"[DEBUG] HTML saved to search_debug.html, length: {len(html)}")
+            
+            # 改进的HTML解析 - 更灵活的正则表达式
+            results = []
+            
+            # 尝试多种模式匹配结果
+            patterns = [
+                # 标准结果模式
+                r'<a class="result__a"[^>]*href="([^"]+)"[^>]*>(.*?)</a>.*?<a class="result__snippet"[^>]*>(.*?)</a>',
+                # 备用模式1
+                r'<h2 class="result__title">.*?<a[^>]*href="([^"]+)"[^>]*>(.*?)</a>.*?</h2>.*?<a class="result__snippet"[^>]*>(.*?)</a>',
+                # 备用模式2 - 更宽松
+                r'<a[^>]*class="[^"]*result[^"]*"[^>]*href="([^"]+)"[^>]*>(.*?)</a>'
+            ]
+            
+            for pattern in patterns:
+                matches = re.findall(pattern, html, re.DOTALL)
+                if matches:
+                    for match in matches[:max_results]:
+                        if len(match) >= 3:
+                            url, title, snippet = match[0], match[1], match[2]
+                        elif len(match) == 2:
+                            url, title = match[0], match[1]
+                            snippet = "No description available"
+                        else:
+                            continue
                             
-                            if results:  # 如果找到结果，停止尝试其他模式
-                                break
-                    
-                    # 调试：打印找到的结果数量
-                    if os.getenv('DBRHEO_DEBUG_SEARCH', '').lower() == 'true':
-                        print(f"[DEBUG] Found {len(results)} results")
-                        for i, r in enumerate(results[:2]):  # 只打印前2个
-                            print(f"[DEBUG] Result {i}: {r.title} - {r.url[:50]}...")
-                    
-                    return results
+                        # 清理HTML标签
+                        title = re.sub(r'<[^>]+>', '', title).strip()
+                        snippet = re.sub(r'<[^>]+>', '', snippet).strip()
+                        
+                        if title and url:  # 确保有标题和URL
+                            results.append(SearchResult(
+                                title=title,
+                                url=url,
+                                snippet=snippet,
+                                source="duckduckgo"
+                            ))
                     
+                    if results:  # 如果找到结果，停止尝试其他模式
+                        break
+            
+            # 调试：打印找到的结果数量
+            if os.getenv('DBRHEO_DEBUG_SEARCH', '').lower() == 'true':
+                print(f"[DEBUG] Found {len(results)} results")
+                for i, r in enumerate(results[:2]):  # 只打印前2个
+                    print(f"[DEBUG] Result {i}: {r.title} - {r.url[:50]}...")
+            
+            return results
+            
         except Exception as e:
             # 返回空结果而不是抛出异常，保持健壮性
             print(f"DuckDuckGo search error: {str(e)}")
@@ -124,8 +128,9 @@ class DuckDuckGoBackend(SearchBackend):
 class BingSearchBackend(SearchBackend):
     """Bing搜索后端 - 需要API密钥（预留接口）"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, config: Optional[DatabaseConfig] = None):
         self.api_key = api_key
+        self.config = config
     
     def get_name(self) -> str:
         return "Bing"
@@ -143,21 +148,22 @@ class BingSearchBackend(SearchBackend):
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        results = []
-                        for item in data.get('webPages', {}).get('value', []):
-                            results.append(SearchResult(
-                                title=item.get('name', ''),
-                                url=item.get('url', ''),
-                                snippet=item.get('snippet', ''),
-                                source="bing"
-                            ))
-                        return results
-                    else:
-                        return []
+            # 共享连接池；API响应带密钥请求，不走磁盘缓存
+            session = get_http_client(self.config).get_session()
+            async with session.get(url, headers=headers, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    results = []
+                    for item in data.get('webPages', {}).get('value', []):
+                        results.append(SearchResult(
+                            title=item.get('name', ''),
+                            url=item.get('url', ''),
+                            snippet=item.get('snippet', ''),
+                            source="bing"
+                        ))
+                    return results
+                else:
+                    return []
         except Exception:
             return []
 
@@ -227,16 +233,16 @@ class WebSearchTool(DatabaseTool):
         backend_type = self.config.get("search_backend", "duckduckgo")
         
         if backend_type == "duckduckgo":
-            return DuckDuckGoBackend()
+            return DuckDuckGoBackend(self.config)
         elif backend_type == "bing":
             api_key = self.config.get("bing_api_key")
             if not api_key:
                 # 如果没有配置Bing API密钥，回退到DuckDuckGo
-                return DuckDuckGoBackend()
-            return BingSearchBackend(api_key)
+                return DuckDuckGoBackend(self.config)
+            return BingSearchBackend(api_key, self.config)
         else:
             # 默认使用DuckDuckGo
-            return DuckDuckGoBackend()
+            return DuckDuckGoBackend(self.config)
     
     async def execute(
         self,
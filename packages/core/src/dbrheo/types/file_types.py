@@ -91,6 +91,7 @@ class FileAnalysisResult:
     # 格式信息
     detected_format: Optional[FileFormat] = None
     detected_encoding: Optional[str] = None
+    line_ending: Optional[str] = None
     has_header: Optional[bool] = None
     
     # CSV/表格特定
@@ -102,3 +103,6 @@ class FileAnalysisResult:
     # 内容摘要
     preview_lines: Optional[List[str]] = None
     sample_rows: Optional[List[Dict[str, Any]]] = None
+
+    # 流式结构摘要（整个文件，见utils.file_summary）
+    structure: Optional[Dict[str, Any]] = None
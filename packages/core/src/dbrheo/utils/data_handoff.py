@@ -0,0 +1,204 @@
+"""
+查询结果交接 - 把SQL结果以文件形式交给代码执行子进程
+大结果集不再作为字面量嵌入生成的源码：写一次临时文件，子进程直接读取。
+安装了 pyarrow 时写 Arrow IPC 文件（未压缩，子进程内存映射读取，零拷贝）；否则写紧凑JSON（columns + rows）。
+sql_execute 的结果登记为句柄，代码执行工具可以按句柄引用，不必经LLM再传一遍数据。
+"""
+
+import json
+import os
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..adapters.result_set import ResultSet
+
+
+DEFAULT_HANDLE_CACHE_SIZE = 8
+# 句柄表中所有结果集的总行数上限：句柄持有结果集本身，按行数限制常驻内存
+DEFAULT_HANDLE_MAX_ROWS = 1_000_000
+
+
+@dataclass
+class HandoffFile:
+    """已写出的交接文件"""
+    path: str
+    format: str          # "arrow" 或 "json"
+    row_count: int
+    columns: List[str]
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def as_result_set(data: Any) -> Optional[ResultSet]:
+    """
+    把各种表格形式的结果统一为ResultSet，非表格数据返回None
+    支持：ResultSet、字典行列表、{"columns": [...], "rows": [...]}（rows为字典或列表）
+    """
+    if isinstance(data, ResultSet):
+        return data
+    if isinstance(data, dict) and isinstance(data.get("columns"), list) and "rows" in data:
+        rows = data["rows"]
+        if isinstance(rows, ResultSet):
+            return rows
+        if isinstance(rows, list) and (not rows or isinstance(rows[0], dict)):
+            return ResultSet.from_dicts(rows, data["columns"] or None)
+        if isinstance(rows, list) and isinstance(rows[0], (list, tuple)):
+            return ResultSet.from_records(data["columns"], [tuple(row) for row in rows])
+        return None
+    if isinstance(data, list) and data and all(isinstance(row, dict) for row in data[:100]):
+        return ResultSet.from_dicts(data)
+    return None
+
+
+def _arrow_column(values: List[Any]):
+    import pyarrow as pa
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, OverflowError):
+        # 混合类型的列退化为字符串列
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def write_handoff(result_set: ResultSet, directory: Optional[str] = None, format: Optional[str] = None) -> HandoffFile:
+    """
+    写出交接文件（同步，调用方应放到线程池）
+    format 为 None 时有 pyarrow 用 arrow，否则用 json
+    """
+    format = format or ("arrow" if arrow_available() else "json")
+    directory = directory or tempfile.gettempdir()
+    columns = list(result_set.columns)
+    rows = result_set.tuples()
+
+    if format == "arrow":
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        # 列名可能重复（如 JOIN 结果），Arrow 表允许重名列，按位置构建
+        arrays = [_arrow_column([row[i] for row in rows]) for i in range(len(columns))]
+        table = pa.Table.from_arrays(arrays, names=columns)
+        path = os.path.join(directory, f"dbrheo_result_{uuid.uuid4().hex}.arrow")
+        # 未压缩的 Feather V2 即 Arrow IPC 文件，可以直接内存映射
+        feather.write_feather(table, path, compression="uncompressed")
+    elif format == "json":
+        path = os.path.join(directory, f"dbrheo_result_{uuid.uuid4().hex}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"columns": columns, "rows": rows}, f, ensure_ascii=False, default=str, separators=(",", ":"))
+    else:
+        raise ValueError(f"Unsupported handoff format: {format}")
+
+    return HandoffFile(path=path, format=format, row_count=len(rows), columns=columns)
+
+
+def python_loader(handoff: HandoffFile) -> List[str]:
+    """
+    生成子进程中加载交接文件的Python代码
+    定义 df（pandas.DataFrame）；arrow 格式另有 sql_table（pyarrow.Table），json 格式另有 sql_result（字典行列表）
+    """
+    path = repr(handoff.path)
+    if handoff.format == "arrow":
+        return [
+            "import pyarrow as _pa",
+            "import pyarrow.ipc as _pa_ipc",
+            f"sql_table = _pa_ipc.open_file(_pa.memory_map({path}, 'r')).read_all()",
+            "try:",
+            "    import pandas as pd",
+            "    df = sql_table.to_pandas()",
+            "except ImportError:",
+            "    pass",
+        ]
+    return [
+        "import json as _json",
+        f"with open({path}, encoding='utf-8') as _f:",
+        "    _sql_data = _json.load(_f)",
+        "sql_result = [dict(zip(_sql_data['columns'], _row)) for _row in _sql_data['rows']]",
+        "try:",
+        "    import pandas as pd",
+        "    df = pd.DataFrame(_sql_data['rows'], columns=_sql_data['columns'])",
+        "except ImportError:",
+        "    pass",
+        "del _sql_data",
+    ]
+
+
+class ResultHandleStore:
+    """
+    查询结果句柄表（进程内LRU）
+    保存最近几个结果集的引用（结果集本身已经是紧凑的元组存储），
+    句柄数不超过 capacity，且所有结果集的总行数不超过 max_rows；
+    单个结果集超过 max_rows 时不登记，调用方不返回句柄
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HANDLE_CACHE_SIZE, max_rows: int = DEFAULT_HANDLE_MAX_ROWS):
+        self.capacity = max(0, int(capacity))
+        self.max_rows = max(0, int(max_rows))
+        self._entries: "OrderedDict[str, Tuple[ResultSet, Dict[str, Any]]]" = OrderedDict()
+        self._total_rows = 0
+        self._lock = threading.Lock()
+
+    def register(self, result_set: ResultSet, **metadata) -> Optional[str]:
+        rows = len(result_set)
+        if not self.capacity or rows > self.max_rows:
+            return None
+        handle = f"sqlres_{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._entries[handle] = (result_set, metadata)
+            self._total_rows += rows
+            while len(self._entries) > self.capacity or self._total_rows > self.max_rows:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._total_rows -= len(evicted)
+        return handle
+
+    def get(self, handle: str) -> Optional[ResultSet]:
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                return None
+            self._entries.move_to_end(handle)
+            return entry[0]
+
+    def metadata(self, handle: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(handle)
+            return dict(entry[1]) if entry else None
+
+    def __contains__(self, handle: str) -> bool:
+        with self._lock:
+            return handle in self._entries
+
+    @property
+    def total_rows(self) -> int:
+        with self._lock:
+            return self._total_rows
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_rows = 0
+
+
+_store: Optional[ResultHandleStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store(config=None) -> ResultHandleStore:
+    """进程级句柄表，句柄数由 result_handle_cache_size、总行数由 result_handle_max_rows 配置"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                get = config.get if config is not None else (lambda key, default=None: default)
+                _store = ResultHandleStore(
+                    int(get("result_handle_cache_size", DEFAULT_HANDLE_CACHE_SIZE)),
+                    int(get("result_handle_max_rows", DEFAULT_HANDLE_MAX_ROWS))
+                )
+    return _store
@@ -0,0 +1,193 @@
+"""
+目录遍历 - 基于 os.scandir 的迭代式遍历，供目录浏览等工具使用
+- DirEntry 自带类型信息（d_type），判断文件/目录通常不需要额外的stat
+- 显式队列代替递归，深层目录不会触发递归限制
+- 生成器逐项产出，调用方可以边遍历边做 top-k，或在达到上限时提前停止
+- 可选的目录快照缓存：按目录 mtime 失效，超过TTL后重新扫描（文件内容变化不会改变目录mtime）
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+
+# 快照缓存的总条目预算，超过时按LRU淘汰；单个目录超过预算则不缓存
+SNAPSHOT_MAX_TOTAL_ENTRIES = 200_000
+DEFAULT_SNAPSHOT_TTL = 30.0
+
+
+class EntryInfo(NamedTuple):
+    """目录中的一项；未stat或stat失败时 size/mtime 为None"""
+    name: str
+    path: str
+    is_dir: bool
+    is_file: bool
+    is_symlink: bool = False
+    size: Optional[int] = None
+    mtime: Optional[float] = None
+    stat_failed: bool = False
+
+
+class WalkItem(NamedTuple):
+    entry: EntryInfo
+    relative_path: str
+    depth: int
+
+
+def _entry_info(entry: os.DirEntry, with_stat: bool) -> EntryInfo:
+    try:
+        is_dir = entry.is_dir()
+        is_file = not is_dir and entry.is_file()
+        is_symlink = entry.is_symlink()
+    except OSError:
+        is_dir = is_file = is_symlink = False
+    if not with_stat:
+        return EntryInfo(entry.name, entry.path, is_dir, is_file, is_symlink)
+    try:
+        # DirEntry 缓存stat结果，同一项不会重复系统调用
+        stat = entry.stat()
+        return EntryInfo(entry.name, entry.path, is_dir, is_file, is_symlink,
+                         stat.st_size if is_file else 0, stat.st_mtime)
+    except OSError:
+        # 如失效的符号链接
+        return EntryInfo(entry.name, entry.path, is_dir, is_file, is_symlink, stat_failed=True)
+
+
+def stat_entry(entry: EntryInfo) -> EntryInfo:
+    """为未stat的项补充大小和修改时间"""
+    if entry.mtime is not None or entry.stat_failed:
+        return entry
+    try:
+        stat = os.stat(entry.path)
+    except OSError:
+        return entry._replace(stat_failed=True)
+    return entry._replace(size=stat.st_size if entry.is_file else 0, mtime=stat.st_mtime)
+
+
+class DirectorySnapshotCache:
+    """
+    目录快照缓存（每项都已stat）
+    命中条件：目录 mtime 未变化且快照未超过TTL
+    """
+
+    def __init__(self, ttl: float = DEFAULT_SNAPSHOT_TTL, max_total_entries: int = SNAPSHOT_MAX_TOTAL_ENTRIES):
+        self.ttl = ttl
+        self.max_total_entries = max_total_entries
+        self._snapshots: "OrderedDict[str, Tuple[int, float, List[EntryInfo]]]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, dir_mtime_ns: int) -> Optional[List[EntryInfo]]:
+        with self._lock:
+            snapshot = self._snapshots.get(path)
+            if snapshot is None or snapshot[0] != dir_mtime_ns or time.monotonic() - snapshot[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._snapshots.move_to_end(path)
+            self.hits += 1
+            return snapshot[2]
+
+    def put(self, path: str, dir_mtime_ns: int, entries: List[EntryInfo]):
+        if len(entries) > self.max_total_entries:
+            return
+        with self._lock:
+            old = self._snapshots.pop(path, None)
+            if old is not None:
+                self._total -= len(old[2])
+            self._snapshots[path] = (dir_mtime_ns, time.monotonic(), entries)
+            self._total += len(entries)
+            while self._total > self.max_total_entries:
+                _, (_, _, evicted) = self._snapshots.popitem(last=False)
+                self._total -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+            self._total = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"directories": len(self._snapshots), "entries": self._total,
+                    "hits": self.hits, "misses": self.misses}
+
+
+def iter_directory(
+    path: str,
+    with_stat: bool = True,
+    cache: Optional[DirectorySnapshotCache] = None
+) -> Iterator[EntryInfo]:
+    """
+    逐项列出单个目录，无权限时不产出任何项
+    提供缓存时总是stat每一项，使快照可用于任意排序方式；调用方中途停止时不写入快照
+    """
+    dir_mtime_ns = None
+    if cache is not None:
+        try:
+            dir_mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        entries = cache.get(path, dir_mtime_ns)
+        if entries is not None:
+            yield from entries
+            return
+        with_stat = True
+
+    collected: Optional[List[EntryInfo]] = [] if cache is not None else None
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                info = _entry_info(entry, with_stat)
+                if collected is not None:
+                    collected.append(info)
+                    if len(collected) > cache.max_total_entries:
+                        collected = None
+                yield info
+    except (PermissionError, FileNotFoundError, NotADirectoryError):
+        return
+
+    if collected is not None:
+        cache.put(path, dir_mtime_ns, collected)
+
+
+def scan_directory(
+    path: str,
+    with_stat: bool = True,
+    cache: Optional[DirectorySnapshotCache] = None
+) -> List[EntryInfo]:
+    """列出单个目录的全部项"""
+    return list(iter_directory(path, with_stat, cache))
+
+
+def walk_directory(
+    root: str,
+    max_depth: int = 1,
+    show_hidden: bool = False,
+    match: Optional[Callable[[str], bool]] = None,
+    with_stat: bool = True,
+    cache: Optional[DirectorySnapshotCache] = None,
+    should_stop: Optional[Callable[[], bool]] = None
+) -> Iterator[WalkItem]:
+    """
+    迭代遍历 root 下深度小于 max_depth 的目录（max_depth=1 只列出 root 本身）
+    先产出一个目录的全部内容，再进入其子目录；match 只过滤产出项，不影响进入子目录；
+    不跟随指向目录的符号链接，避免循环
+    """
+    pending = deque([(root, "", 0)])
+    while pending:
+        if should_stop is not None and should_stop():
+            return
+        path, relative, depth = pending.popleft()
+        subdirs = []
+        for entry in iter_directory(path, with_stat, cache):
+            if not show_hidden and entry.name.startswith('.'):
+                continue
+            relative_path = os.path.join(relative, entry.name) if relative else entry.name
+            if match is None or match(entry.name):
+                yield WalkItem(entry, relative_path, depth)
+            if entry.is_dir and depth + 1 < max_depth and not entry.is_symlink:
+                subdirs.append((entry.path, relative_path, depth + 1))
+        pending.extend(subdirs)
@@ -0,0 +1,243 @@
+"""
+文件元数据缓存 - 文件工具共享的编码检测、BOM、二进制判断、换行风格和行索引
+按 (路径, 大小, 修改时间) 缓存：同一文件反复读取、分页、追加时只采样检测一次。
+检测顺序：BOM → UTF-8 快速路径 → charset-normalizer（可选）→ chardet（可选）→ 候选编码逐个试解码
+检测库对短样本和拉丁语系单字节编码的猜测不可靠（如 latin-1 的 "Genève" 会被猜成 cp1250 的 "Genčve"）：
+非ASCII字节少于 MIN_DETECTION_BYTES 时直接按候选编码试解码（与旧版行为一致）；
+猜测为单字节编码、且能同样干净解码的候选中有本地候选编码时，使用本地候选编码。
+"""
+
+import codecs
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+from .encoding_utils import EncodingDetector
+from .line_index import LineIndex, get_line_index, supports_line_index
+
+
+SAMPLE_SIZE = 64 * 1024
+# 检测库至少需要的非ASCII字节数
+MIN_DETECTION_BYTES = 16
+# 试解码的候选编码个数（系统编码、utf-8、latin-1 等）
+TRIAL_CANDIDATES = 5
+METADATA_CACHE_SIZE = 256
+# 控制字符（除 \t \n \r \f \b \x1b）占比超过该值视为二进制
+_BINARY_CONTROL_RATIO = 0.3
+_TEXT_CONTROL_BYTES = {0x08, 0x09, 0x0A, 0x0C, 0x0D, 0x1B}
+_CONTROL_BYTES = bytes(b for b in range(32) if b not in _TEXT_CONTROL_BYTES) + b"\x7f"
+_ASCII_BYTES = bytes(range(128))
+
+# 顺序重要：UTF-32 LE 的BOM以 UTF-16 LE 的BOM开头
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le", "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32-be", "utf-32"),
+    (codecs.BOM_UTF8, "utf-8", "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16-le", "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16-be", "utf-16"),
+)
+
+
+@dataclass
+class FileMetadata:
+    """一个文件版本的检测结果"""
+    path: str
+    size: int
+    mtime_ns: int
+    encoding: str                      # 可直接用于 open() 的编码（带BOM时为 utf-8-sig / utf-16 / utf-32）
+    is_binary: bool
+    bom: Optional[str] = None          # 检测到的BOM类型，如 "utf-8"、"utf-16-le"
+    line_ending: Optional[str] = None  # "\n"、"\r\n"、"\r"、"mixed"，无换行时为None
+    detector: str = "default"          # 编码来源：bom / utf-8 / charset-normalizer / chardet / trial / default
+    _line_index: Optional[LineIndex] = field(default=None, repr=False)
+
+    def line_index(self) -> Optional[LineIndex]:
+        """稀疏行索引（首次调用时构建）；UTF-16/32 文件不支持，返回None"""
+        if self._line_index is None and not self.is_binary and supports_line_index(self.encoding):
+            self._line_index = get_line_index(self.path)
+        return self._line_index
+
+
+def _read_sample(path: str, size: int) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(size)
+
+
+def _detect_bom(sample: bytes) -> Optional[Tuple[str, str]]:
+    for bom, name, encoding in _BOMS:
+        if sample.startswith(bom):
+            return name, encoding
+    return None
+
+
+def _is_utf8(sample: bytes, complete: bool) -> bool:
+    """样本是否为合法UTF-8；样本截断在多字节字符中间时不算错误"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        decoder.decode(sample, final=complete)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _looks_binary(sample: bytes) -> bool:
+    if not sample:
+        return False
+    if b"\x00" in sample:
+        return True
+    controls = len(sample) - len(sample.translate(None, _CONTROL_BYTES))
+    return controls / len(sample) > _BINARY_CONTROL_RATIO
+
+
+def _non_ascii_bytes(sample: bytes) -> int:
+    return len(sample.translate(None, _ASCII_BYTES))
+
+
+def _codec_name(encoding: str) -> Optional[str]:
+    try:
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return None
+
+
+def _detect_with_charset_normalizer(sample: bytes) -> Optional[str]:
+    try:
+        from charset_normalizer import from_bytes
+        from charset_normalizer.utils import is_multi_byte_encoding
+    except ImportError:
+        return None
+    if _non_ascii_bytes(sample) < MIN_DETECTION_BYTES:
+        return None
+    matches = from_bytes(sample)
+    best = matches.best()
+    if best is None:
+        return None
+    if is_multi_byte_encoding(best.encoding):
+        return best.encoding
+    # 单字节编码：同样干净的结果中包含本地候选编码时优先使用（cp1250/cp1252/latin-1 常常无法区分）
+    clean = set()
+    for match in matches:
+        if match.chaos <= best.chaos:
+            clean.update(filter(None, (_codec_name(name) for name in match.could_be_from_charset)))
+    for candidate in EncodingDetector.get_file_encoding_candidates()[:TRIAL_CANDIDATES]:
+        if _codec_name(candidate) in clean:
+            return candidate
+    return best.encoding
+
+
+def _detect_with_chardet(sample: bytes) -> Optional[str]:
+    try:
+        import chardet
+    except ImportError:
+        return None
+    if _non_ascii_bytes(sample) < MIN_DETECTION_BYTES:
+        return None
+    result = chardet.detect(sample)
+    if result and result.get("encoding") and result.get("confidence", 0) > 0.7:
+        return result["encoding"]
+    return None
+
+
+def _trial_decode(sample: bytes) -> Optional[str]:
+    for encoding in EncodingDetector.get_file_encoding_candidates()[:TRIAL_CANDIDATES]:
+        try:
+            sample.decode(encoding)
+            return encoding
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return None
+
+
+def _detect_line_ending(text_sample: str) -> Optional[str]:
+    crlf = text_sample.count("\r\n")
+    lf = text_sample.count("\n") - crlf
+    cr = text_sample.count("\r") - crlf
+    kinds = [(count, ending) for count, ending in ((crlf, "\r\n"), (lf, "\n"), (cr, "\r")) if count]
+    if not kinds:
+        return None
+    return kinds[0][1] if len(kinds) == 1 else "mixed"
+
+
+def detect_file_metadata(path: str, sample_size: int = SAMPLE_SIZE) -> FileMetadata:
+    """采样文件开头检测编码等信息（不使用缓存）"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    sample = _read_sample(path, sample_size)
+    complete = len(sample) >= stat.st_size
+
+    bom = _detect_bom(sample)
+    is_binary = False
+    if bom:
+        bom_name, encoding = bom
+        detector = "bom"
+    else:
+        bom_name = None
+        is_binary = _looks_binary(sample)
+        encoding, detector = None, "default"
+        if not is_binary:
+            if _is_utf8(sample, complete):
+                encoding, detector = "utf-8", "utf-8"
+            else:
+                for name, detect in (
+                    ("charset-normalizer", _detect_with_charset_normalizer),
+                    ("chardet", _detect_with_chardet),
+                    ("trial", _trial_decode),
+                ):
+                    try:
+                        detected = detect(sample)
+                    except Exception:
+                        detected = None
+                    if detected:
+                        encoding, detector = EncodingDetector.normalize_encoding(detected), name
+                        break
+        if encoding is None:
+            encoding = EncodingDetector.get_system_encoding()
+
+    line_ending = None
+    if not is_binary:
+        try:
+            text_sample = sample.decode(encoding, errors="ignore")
+            line_ending = _detect_line_ending(text_sample)
+        except LookupError:
+            pass
+
+    return FileMetadata(
+        path=path,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        encoding=encoding,
+        is_binary=is_binary,
+        bom=bom_name,
+        line_ending=line_ending,
+        detector=detector
+    )
+
+
+_cache: "OrderedDict[Tuple[str, int, int], FileMetadata]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_file_metadata(path: str) -> FileMetadata:
+    """获取文件元数据，文件大小或修改时间变化时重新检测"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _cache_lock:
+        metadata = _cache.get(key)
+        if metadata is not None:
+            _cache.move_to_end(key)
+            return metadata
+
+    metadata = detect_file_metadata(path)
+    with _cache_lock:
+        _cache[(path, metadata.size, metadata.mtime_ns)] = metadata
+        while len(_cache) > METADATA_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return metadata
+
+
+def clear_file_metadata_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,720 @@
+"""
+大文件结构摘要 - 流式、有界内存的CSV/JSON/SQL分析
+整个文件只顺序读取一次，内存占用与文件大小无关（只保留计数、蓄水池样本和有限的去重集合）；
+函数是同步的，调用方应放在工作线程中执行
+"""
+
+import csv
+import json
+import math
+import random
+import re
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+
+SAMPLE_SIZE = 5
+MAX_VALUE_LENGTH = 200
+MAX_DISTINCT_TRACKED = 1000
+MAX_TRACKED_KEYS = 500
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+def _truncate(value: str, limit: int = MAX_VALUE_LENGTH) -> str:
+    return value if len(value) <= limit else value[:limit] + "..."
+
+
+class _Reservoir:
+    """
+    蓄水池抽样（Algorithm L），固定种子保证结果可复现
+    蓄水池满后直接计算下一个被替换的位置，绝大多数元素只需一次整数比较
+    """
+
+    def __init__(self, size: int = SAMPLE_SIZE, seed: int = 0):
+        self.size = size
+        self.items: List[Any] = []
+        self.seen = 0
+        self._random = random.Random(seed)
+        self._weight = 1.0
+        self._next = size
+
+    def _advance(self) -> None:
+        self._weight *= math.exp(math.log(self._random.random() or 1e-12) / self.size)
+        gap = math.floor(math.log(self._random.random() or 1e-12) / math.log(1 - self._weight)) if self._weight < 1 else 0
+        self._next += gap + 1
+
+    def offer(self, make_item) -> None:
+        """make_item 只在需要保留时才调用，避免为每一行构造样本"""
+        seen = self.seen
+        self.seen = seen + 1
+        if seen < self.size:
+            self.items.append(make_item())
+            if self.seen == self.size:
+                self._advance()
+            return
+        if seen == self._next:
+            self.items[self._random.randrange(self.size)] = make_item()
+            self._advance()
+
+
+# ---- CSV ----
+
+_NULL_TOKENS = frozenset({"", "null", "NULL", "Null", "NA", "N/A", "n/a", "NaN", "nan", "None", "\\N"})
+_BOOL_TOKENS = frozenset({"true", "false", "True", "False", "TRUE", "FALSE"})
+_INT_PATTERN = re.compile(r"[+-]?\d+\Z")
+_FLOAT_PATTERN = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\Z")
+_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}\Z")
+_DATETIME_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?\Z")
+
+# 类型合并：两种类型同时出现时的最小公共类型
+_TYPE_MERGE = {
+    frozenset({"integer", "float"}): "float",
+    frozenset({"date", "datetime"}): "datetime",
+}
+
+
+def _classify(value: str) -> str:
+    if value.isdigit() and value.isascii():
+        return "integer"
+    if _INT_PATTERN.match(value):
+        return "integer"
+    if _FLOAT_PATTERN.match(value):
+        return "float"
+    if value in _BOOL_TOKENS:
+        return "boolean"
+    if _DATE_PATTERN.match(value):
+        return "date"
+    if _DATETIME_PATTERN.match(value):
+        return "datetime"
+    return "string"
+
+
+# 已确定类型时先按该类型匹配，绝大多数值只需一次匹配
+_KIND_MATCHERS = {
+    "integer": _INT_PATTERN.match,
+    "float": _FLOAT_PATTERN.match,
+    "boolean": _BOOL_TOKENS.__contains__,
+    "date": _DATE_PATTERN.match,
+    "datetime": _DATETIME_PATTERN.match,
+}
+_NUMERIC_KINDS = frozenset({"integer", "float"})
+
+
+class _ColumnStats:
+    """单列统计：推断类型、空值数、数值范围、最大长度、有限去重计数"""
+
+    __slots__ = ("name", "kind", "nulls", "minimum", "maximum", "max_length", "distinct", "distinct_overflow")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.kind: Optional[str] = None
+        self.nulls = 0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.max_length = 0
+        self.distinct: Optional[set] = set()
+        self.distinct_overflow = False
+
+    def add(self, raw: str) -> None:
+        value = raw.strip()
+        if value in _NULL_TOKENS:
+            self.nulls += 1
+            return
+        if len(value) > self.max_length:
+            self.max_length = len(value)
+        distinct = self.distinct
+        if distinct is not None:
+            distinct.add(value[:100])
+            if len(distinct) > MAX_DISTINCT_TRACKED:
+                self.distinct = None
+                self.distinct_overflow = True
+
+        # 已经是字符串类型就不再做类型判断
+        kind = self.kind
+        if kind == "string":
+            return
+        if kind is None or not _KIND_MATCHERS[kind](value):
+            new_kind = _classify(value)
+            if kind is None or kind == new_kind:
+                kind = new_kind
+            else:
+                kind = _TYPE_MERGE.get(frozenset({kind, new_kind}), "string")
+            self.kind = kind
+        if kind in _NUMERIC_KINDS:
+            number = float(value)
+            if self.minimum is None or number < self.minimum:
+                self.minimum = number
+            if self.maximum is None or number > self.maximum:
+                self.maximum = number
+
+    def to_dict(self, row_count: int) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "name": self.name,
+            "type": self.kind or "empty",
+            "null_count": self.nulls,
+            "null_ratio": round(self.nulls / row_count, 4) if row_count else 0.0,
+            "max_length": self.max_length,
+            "distinct": f">{MAX_DISTINCT_TRACKED}" if self.distinct_overflow else len(self.distinct or ()),
+        }
+        if self.kind in ("integer", "float") and self.minimum is not None:
+            cast = int if self.kind == "integer" else float
+            result["min"] = cast(self.minimum)
+            result["max"] = cast(self.maximum)
+        return result
+
+
+def _sniff_dialect(f: TextIO, path: str):
+    """基于文件开头嗅探分隔符和表头"""
+    sample = f.read(64 * 1024)
+    f.seek(0)
+    default_delimiter = "\t" if path.lower().endswith(".tsv") else ","
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=[",", "\t", ";", "|"])
+    except csv.Error:
+        dialect = None
+    try:
+        has_header = csv.Sniffer().has_header(sample) if sample else False
+    except csv.Error:
+        has_header = True
+    return dialect, default_delimiter, has_header
+
+
+def _looks_like_header(row: List[str]) -> bool:
+    """Sniffer对全文本列常误判为无表头：首行没有数值/日期时仍视为表头"""
+    return all(_classify(value.strip()) == "string" for value in row if value.strip() not in _NULL_TOKENS)
+
+
+def summarize_csv(path: str, encoding: str = "utf-8", sample_size: int = SAMPLE_SIZE) -> Dict[str, Any]:
+    """流式分析CSV：逐行解析，按列推断类型并统计空值，蓄水池抽样保留样本行"""
+    with open(path, "r", encoding=encoding, newline="") as f:
+        dialect, default_delimiter, has_header = _sniff_dialect(f, path)
+        reader = csv.reader(f, dialect) if dialect else csv.reader(f, delimiter=default_delimiter)
+
+        first = next(reader, None)
+        if first is None:
+            return {"format": "csv", "row_count": 0, "columns": []}
+
+        if has_header or _looks_like_header(first):
+            has_header = True
+            headers = [h.strip() for h in first]
+            pending_rows: List[List[str]] = []
+        else:
+            headers = [f"column_{i + 1}" for i in range(len(first))]
+            pending_rows = [first]
+
+        columns = [_ColumnStats(name) for name in headers]
+        reservoir = _Reservoir(sample_size)
+        row_count = 0
+        ragged_rows = 0
+        width = len(columns)
+
+        def _consume(rows):
+            nonlocal row_count, ragged_rows
+            for row in rows:
+                if not row:
+                    continue
+                row_count += 1
+                if len(row) != width:
+                    ragged_rows += 1
+                for stats, value in zip(columns, row):
+                    stats.add(value)
+                reservoir.offer(lambda: {h: _truncate(v) for h, v in zip(headers, row)})
+
+        _consume(pending_rows)
+        _consume(reader)
+
+    return {
+        "format": "csv",
+        "delimiter": dialect.delimiter if dialect else default_delimiter,
+        "has_header": has_header,
+        "row_count": row_count,
+        "column_count": width,
+        "ragged_rows": ragged_rows,
+        "columns": [stats.to_dict(row_count) for stats in columns],
+        "samples": reservoir.items,
+    }
+
+
+# ---- JSON ----
+
+class _JSONReader:
+    """
+    增量JSON读取器：在滑动缓冲区上用 raw_decode 逐个解析值
+    只有单个元素需要完整驻留内存；解析不完整时按倍增的块大小继续读取
+    """
+
+    def __init__(self, f: TextIO):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.chunk_size = _READ_CHUNK_SIZE
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        data = self.f.read(size or _READ_CHUNK_SIZE)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """跳过空白并返回下一个字符（文件结束返回空串）"""
+        while True:
+            buffer = self.buffer
+            length = len(buffer)
+            pos = self.pos
+            while pos < length and buffer[pos] in " \t\r\n":
+                pos += 1
+            self.pos = pos
+            if pos < length:
+                return buffer[pos]
+            if self.eof or not self._fill():
+                return ""
+
+    def next_char(self) -> str:
+        char = self.peek()
+        if char:
+            self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        """解析下一个完整的JSON值"""
+        self.peek()
+        read_size = self.chunk_size
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                # 值跨越缓冲区边界：继续读取，块大小倍增以避免大元素被反复重新解析
+                self._fill(read_size)
+                read_size *= 2
+                continue
+            # 数字可能在缓冲区末尾被截断（如 "12" | "3"）
+            if end == len(self.buffer) and not self.eof:
+                self._fill(read_size)
+                continue
+            self.pos = end
+            return obj
+
+    def iter_array(self) -> Iterator[Any]:
+        """逐个产出数组元素（当前位置必须是 '['）"""
+        if self.next_char() != "[":
+            raise ValueError("Expected JSON array")
+        if self.peek() == "]":
+            self.next_char()
+            return
+        while True:
+            yield self.value()
+            char = self.next_char()
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Unexpected character in JSON array: {char!r}")
+
+
+_JSON_TYPE_NAMES = {
+    type(None): "null", bool: "boolean", int: "integer", float: "float",
+    str: "string", list: "array", dict: "object",
+}
+
+
+def _json_type(value: Any) -> str:
+    # json模块只产生这几种精确类型
+    return _JSON_TYPE_NAMES.get(type(value), "object")
+
+
+class _JSONElementStats:
+    """数组元素统计：元素类型分布、对象键频率及各键的值类型"""
+
+    def __init__(self, sample_size: int = SAMPLE_SIZE):
+        self.count = 0
+        self.types: Dict[str, int] = {}
+        # (键, 值类型) -> 次数；每个键值对只做一次字典更新
+        self.key_type_counts: Dict[Tuple[str, str], int] = {}
+        self.tracked_keys: set = set()
+        self.untracked_keys = 0
+        self.reservoir = _Reservoir(sample_size)
+
+    def add(self, value: Any) -> None:
+        self.count += 1
+        type_names = _JSON_TYPE_NAMES
+        kind = type_names.get(type(value), "object")
+        self.types[kind] = self.types.get(kind, 0) + 1
+        if kind == "object":
+            counts = self.key_type_counts
+            for key, item in value.items():
+                pair = (key, type_names.get(type(item), "object"))
+                count = counts.get(pair)
+                if count is None:
+                    if key not in self.tracked_keys:
+                        if len(self.tracked_keys) >= MAX_TRACKED_KEYS:
+                            self.untracked_keys += 1
+                            continue
+                        self.tracked_keys.add(key)
+                    count = 0
+                counts[pair] = count + 1
+        self.reservoir.offer(lambda: _truncate(json.dumps(value, ensure_ascii=False, default=str), 500))
+
+    def to_dict(self, top_keys: int = 50) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "element_count": self.count,
+            "element_types": dict(self.types),
+        }
+        if self.key_type_counts:
+            keys: Counter = Counter()
+            key_types: Dict[str, Dict[str, int]] = {}
+            for (key, kind), count in self.key_type_counts.items():
+                keys[key] += count
+                key_types.setdefault(key, {})[kind] = count
+            result["keys"] = [
+                {
+                    "key": key,
+                    "count": count,
+                    "frequency": round(count / self.count, 4),
+                    "types": key_types[key],
+                }
+                for key, count in keys.most_common(top_keys)
+            ]
+            result["distinct_keys"] = len(keys)
+            if self.untracked_keys:
+                result["untracked_key_occurrences"] = self.untracked_keys
+        result["samples"] = self.reservoir.items
+        return result
+
+
+def summarize_json(path: str, encoding: str = "utf-8", sample_size: int = SAMPLE_SIZE) -> Dict[str, Any]:
+    """
+    流式分析JSON：
+    - 顶层数组 / JSON Lines：逐个解析元素，统计键频率和值类型
+    - 顶层对象：逐个解析键值，值为数组时流式统计其元素（常见的 {"data": [...]} 结构）
+    """
+    with open(path, "r", encoding=encoding) as f:
+        reader = _JSONReader(f)
+        first = reader.peek()
+        if first == "\ufeff":
+            reader.pos += 1
+            first = reader.peek()
+
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            stats = _JSONElementStats(sample_size)
+            while reader.peek():
+                stats.add(reader.value())
+            return {"format": "json", "layout": "records", **stats.to_dict()}
+
+        if first == "[":
+            stats = _JSONElementStats(sample_size)
+            for element in reader.iter_array():
+                stats.add(element)
+            return {"format": "json", "layout": "array", **stats.to_dict()}
+
+        if first == "{":
+            reader.next_char()
+            members: List[Dict[str, Any]] = []
+            member_count = 0
+            while reader.peek() != "}":
+                key = reader.value()
+                if reader.next_char() != ":":
+                    raise ValueError("Expected ':' in JSON object")
+                member_count += 1
+                if reader.peek() == "[":
+                    stats = _JSONElementStats(sample_size)
+                    for element in reader.iter_array():
+                        stats.add(element)
+                    member = {"key": key, "type": "array", **stats.to_dict()}
+                else:
+                    value = reader.value()
+                    member = {"key": key, "type": _json_type(value)}
+                    if isinstance(value, dict):
+                        member["keys"] = list(value.keys())[:50]
+                    elif not isinstance(value, (list, dict)):
+                        member["value"] = _truncate(json.dumps(value, ensure_ascii=False, default=str))
+                if len(members) < MAX_TRACKED_KEYS:
+                    members.append(member)
+                if reader.peek() == ",":
+                    reader.next_char()
+            reader.next_char()
+            result = {"format": "json", "layout": "object", "member_count": member_count, "members": members}
+            if reader.peek():
+                result["trailing_data"] = True
+            return result
+
+        if not first:
+            return {"format": "json", "layout": "empty"}
+        value = reader.value()
+        return {"format": "json", "layout": "scalar", "type": _json_type(value)}
+
+
+# ---- SQL ----
+
+_SQL_TOKEN_PATTERNS: Dict[str, "re.Pattern"] = {}
+_SQL_STATEMENT_PATTERN = re.compile(
+    r"\s*(WITH|SELECT|INSERT|REPLACE|UPDATE|DELETE|MERGE|CREATE|ALTER|DROP|TRUNCATE|GRANT|REVOKE|"
+    r"SET|USE|BEGIN|START|COMMIT|ROLLBACK|SAVEPOINT|LOCK|UNLOCK|COPY|CALL|EXPLAIN|SHOW|COMMENT|"
+    r"ANALYZE|VACUUM|DECLARE|DO|PRAGMA)\b",
+    re.IGNORECASE
+)
+_SQL_OBJECT_PATTERN = re.compile(
+    r"\s*(?:OR\s+REPLACE\s+|TEMP(?:ORARY)?\s+|UNIQUE\s+|MATERIALIZED\s+|UNLOGGED\s+|DEFINER\s*=\s*\S+\s+)*"
+    r"(TABLE|VIEW|INDEX|SEQUENCE|FUNCTION|PROCEDURE|TRIGGER|SCHEMA|DATABASE|TYPE|EXTENSION|EVENT|USER|ROLE)\b",
+    re.IGNORECASE
+)
+_SQL_TARGET_PATTERN = re.compile(
+    r"\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM|COPY|TRUNCATE(?:\s+TABLE)?|"
+    r"(?:CREATE|ALTER|DROP)\s+(?:TEMP(?:ORARY)?\s+|UNLOGGED\s+)?TABLE(?:\s+IF\s+(?:NOT\s+)?EXISTS)?)\s+"
+    r"(?:ONLY\s+)?([`\"\[]?[\w.$]+[`\"\]]?(?:\.[`\"\[]?[\w$]+[`\"\]]?)?)",
+    re.IGNORECASE
+)
+_SQL_DELIMITER_PATTERN = re.compile(r"[ \t]*DELIMITER[ \t]+(\S+)[^\n]*\n?", re.IGNORECASE)
+_SQL_HEAD_LENGTH = 160
+
+
+def _sql_token_pattern(delimiter: str) -> "re.Pattern":
+    """普通状态下需要关注的记号：引号、注释、美元引用和语句分隔符"""
+    pattern = _SQL_TOKEN_PATTERNS.get(delimiter)
+    if pattern is None:
+        pattern = re.compile(r"'|\"|`|--|/\*|\$[A-Za-z_]\w*\$|\$\$|" + re.escape(delimiter))
+        _SQL_TOKEN_PATTERNS[delimiter] = pattern
+    return pattern
+
+
+class _SQLStatementScanner:
+    """
+    感知语句边界的SQL扫描器
+    识别字符串（含转义）、标识符引用、行/块注释、PostgreSQL美元引用、
+    MySQL的DELIMITER指令以及pg_dump的 COPY ... FROM stdin 数据块
+    """
+
+    _CLOSERS = {"'": re.compile(r"\\.|'", re.DOTALL), '"': re.compile(r'\\.|"', re.DOTALL), "`": re.compile(r"`")}
+
+    def __init__(self):
+        self.delimiter = ";"
+        self.state = "normal"          # normal / quote / line_comment / block_comment / dollar / copy_data
+        self.closing = ""              # 当前引用的结束记号
+        self.head: List[str] = []
+        self.head_length = 0
+        self.has_content = False
+        self.statements: List[str] = []    # 本次feed完成的语句开头
+        self.copy_rows = 0
+        self.copy_partial = ""
+        self.delimiter_changes = 0
+
+    def _append_head(self, text: str) -> None:
+        if text and self.head_length < _SQL_HEAD_LENGTH:
+            piece = text[:_SQL_HEAD_LENGTH - self.head_length]
+            self.head.append(piece)
+            self.head_length += len(piece)
+        if not self.has_content and text.strip():
+            self.has_content = True
+
+    def _finish_statement(self) -> None:
+        if self.has_content:
+            head = "".join(self.head)
+            self.statements.append(head)
+            upper = head.lstrip().upper()
+            if upper.startswith("COPY") and "FROM STDIN" in " ".join(upper.split()):
+                self.state = "copy_data"
+        self.head = []
+        self.head_length = 0
+        self.has_content = False
+
+    def feed(self, text: str) -> List[str]:
+        """处理一段文本（调用方保证不会在记号中间截断），返回本段内结束的语句开头"""
+        self.statements = []
+        pos = 0
+        length = len(text)
+        while pos < length:
+            if self.state == "copy_data":
+                end = text.find("\n", pos)
+                if end < 0:
+                    # 超长数据行被切开：只保留开头用于识别结束标记
+                    self.copy_partial = (self.copy_partial + text[pos:])[:4]
+                    return self.statements
+                line = self.copy_partial + text[pos:end]
+                self.copy_partial = ""
+                if line.rstrip("\r") == "\\.":
+                    self.state = "normal"
+                elif line:
+                    self.copy_rows += 1
+                pos = end + 1
+                continue
+
+            if self.state == "line_comment":
+                end = text.find("\n", pos)
+                if end < 0:
+                    return self.statements
+                pos = end + 1
+                self.state = "normal"
+                continue
+
+            if self.state == "block_comment":
+                end = text.find("*/", pos)
+                if end < 0:
+                    return self.statements
+                pos = end + 2
+                self.state = "normal"
+                continue
+
+            if self.state == "dollar":
+                end = text.find(self.closing, pos)
+                if end < 0:
+                    self._append_head(text[pos:])
+                    return self.statements
+                self._append_head(text[pos:end + len(self.closing)])
+                pos = end + len(self.closing)
+                self.state = "normal"
+                continue
+
+            if self.state == "quote":
+                closer = self._CLOSERS[self.closing]
+                while True:
+                    match = closer.search(text, pos)
+                    if match is None:
+                        self._append_head(text[pos:])
+                        return self.statements
+                    if match.group(0) == self.closing:
+                        # SQL标准的 '' 转义
+                        if self.closing != "`" and text.startswith(self.closing, match.end()):
+                            self._append_head(text[pos:match.end() + 1])
+                            pos = match.end() + 1
+                            continue
+                        self._append_head(text[pos:match.end()])
+                        pos = match.end()
+                        self.state = "normal"
+                        break
+                    self._append_head(text[pos:match.end()])
+                    pos = match.end()
+                continue
+
+            # 普通状态
+            if not self.has_content:
+                directive = _SQL_DELIMITER_PATTERN.match(text, pos)
+                if directive and text[pos:directive.start(1)].strip().upper() == "DELIMITER":
+                    self.delimiter = directive.group(1)
+                    self.delimiter_changes += 1
+                    pos = directive.end()
+                    continue
+
+            match = _sql_token_pattern(self.delimiter).search(text, pos)
+            if match is None:
+                self._append_head(text[pos:])
+                return self.statements
+            self._append_head(text[pos:match.start()])
+            token = match.group(0)
+            pos = match.end()
+            if token == self.delimiter:
+                self._finish_statement()
+            elif token in ("'", '"', "`"):
+                self._append_head(token)
+                self.state = "quote"
+                self.closing = token
+            elif token == "--":
+                self.state = "line_comment"
+            elif token == "/*":
+                self.state = "block_comment"
+            else:
+                self._append_head(token)
+                self.state = "dollar"
+                self.closing = token
+        return self.statements
+
+    def finish(self) -> Optional[str]:
+        """文件结束：返回未以分隔符结尾的最后一条语句"""
+        if self.state in ("normal", "quote", "dollar") and self.has_content:
+            head = "".join(self.head)
+            self.head = []
+            self.head_length = 0
+            self.has_content = False
+            return head
+        return None
+
+
+def _sql_statement_type(head: str) -> str:
+    match = _SQL_STATEMENT_PATTERN.match(head)
+    if not match:
+        return "OTHER"
+    keyword = match.group(1).upper()
+    if keyword in ("CREATE", "ALTER", "DROP"):
+        obj = _SQL_OBJECT_PATTERN.match(head, match.end())
+        if obj:
+            return f"{keyword} {obj.group(1).upper()}"
+    return keyword
+
+
+def summarize_sql(path: str, encoding: str = "utf-8", sample_size: int = 3) -> Dict[str, Any]:
+    """流式分析SQL脚本：按语句边界切分，统计各语句类型数量和涉及最多的表"""
+    scanner = _SQLStatementScanner()
+    type_counts: Counter = Counter()
+    tables: Counter = Counter()
+    examples: Dict[str, List[str]] = {}
+
+    def _record(head: str) -> None:
+        kind = _sql_statement_type(head)
+        type_counts[kind] += 1
+        target = _SQL_TARGET_PATTERN.match(head)
+        if target and len(tables) < MAX_TRACKED_KEYS * 10:
+            tables[target.group(1).strip('`"[]')] += 1
+        bucket = examples.setdefault(kind, [])
+        if len(bucket) < sample_size:
+            bucket.append(" ".join(head.split())[:120])
+
+    carry = ""
+    with open(path, "r", encoding=encoding) as f:
+        while True:
+            # 按行读取（单行最多1MB）；超长行在最后一个空白处切开，
+            # 记号（注释、美元引用、转义）不含空白，因此不会被截断
+            line = f.readline(_READ_CHUNK_SIZE)
+            if not line:
+                break
+            text = carry + line
+            carry = ""
+            if not text.endswith("\n"):
+                cut = max(text.rfind(" "), text.rfind("\t")) + 1
+                if cut > 0:
+                    text, carry = text[:cut], text[cut:]
+            for head in scanner.feed(text):
+                _record(head)
+        if carry:
+            for head in scanner.feed(carry):
+                _record(head)
+        tail = scanner.finish()
+        if tail is not None:
+            _record(tail)
+
+    result: Dict[str, Any] = {
+        "format": "sql",
+        "statement_count": sum(type_counts.values()),
+        "statement_types": dict(type_counts.most_common()),
+        "top_tables": dict(tables.most_common(20)),
+        "examples": examples,
+        "unterminated_last_statement": tail is not None,
+    }
+    if scanner.copy_rows:
+        result["copy_rows"] = scanner.copy_rows
+    if scanner.delimiter_changes:
+        result["delimiter_changes"] = scanner.delimiter_changes
+    return result
+
+
+_SUMMARIZERS = {
+    "csv": summarize_csv,
+    "tsv": summarize_csv,
+    "json": summarize_json,
+    "jsonl": summarize_json,
+    "ndjson": summarize_json,
+    "sql": summarize_sql,
+}
+
+
+def supports_summary(path: str) -> bool:
+    return path.rsplit(".", 1)[-1].lower() in _SUMMARIZERS
+
+
+def summarize_file(path: str, encoding: str = "utf-8") -> Optional[Dict[str, Any]]:
+    """按扩展名选择流式摘要方法，不支持的格式返回None"""
+    summarizer = _SUMMARIZERS.get(path.rsplit(".", 1)[-1].lower())
+    return summarizer(path, encoding) if summarizer else None
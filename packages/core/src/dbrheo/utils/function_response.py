@@ -334,10 +334,11 @@ def convert_to_function_response(
                 output_text = '. '.join(output_parts)
                 return create_function_response_part(call_id, tool_name, output_text)
         
-        # 其他字典：转换为JSON字符串
+        # 其他字典：转换为JSON字符串（ResultSet等由json_default转换）
         import json
+        from .type_converter import json_default
         try:
-            output_text = json.dumps(content_to_process, ensure_ascii=False, indent=2)
+            output_text = json.dumps(content_to_process, ensure_ascii=False, indent=2, default=json_default)
             return create_function_response_part(call_id, tool_name, output_text)
         except (TypeError, ValueError):
             # JSON序列化失败，转换为字符串
@@ -0,0 +1,493 @@
+"""
+共享HTTP客户端 - 进程级连接池 + 磁盘HTTP缓存
+- 每个事件循环复用一个 aiohttp.ClientSession（keep-alive、按主机限制连接数、DNS缓存），
+  事件循环关闭前（asyncio.run 的 shutdown_asyncgens 阶段）自动关闭
+- GET 响应按 Cache-Control / Expires / ETag / Last-Modified 缓存到磁盘，超过容量时按最久未用淘汰
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from .debug_logger import log_info
+from .loop_hooks import on_loop_shutdown
+from ..telemetry.metrics import register_cache
+
+
+DEFAULT_POOL_LIMIT = 100
+DEFAULT_POOL_LIMIT_PER_HOST = 8
+DEFAULT_KEEPALIVE_TIMEOUT = 30
+DEFAULT_DNS_CACHE_TTL = 300
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# 启发式新鲜度：只有 Last-Modified 时按 (Date - Last-Modified) 的10%计算，最多1天（RFC 9111 4.2.2）
+_HEURISTIC_FRACTION = 0.1
+_HEURISTIC_MAX_SECONDS = 24 * 3600
+
+# 缓存条目里保留的响应头
+_STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control", "expires", "date")
+
+
+@dataclass
+class HTTPResponse:
+    """已读取完毕的HTTP响应"""
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    from_cache: bool = False      # 直接使用了缓存（未发请求）
+    revalidated: bool = False     # 发送了条件请求且服务器返回304
+    truncated: bool = False       # 响应体超过 max_bytes 被截断
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    @property
+    def charset(self) -> Optional[str]:
+        for part in self.headers.get("content-type", "").split(";")[1:]:
+            key, _, value = part.strip().partition("=")
+            if key.lower() == "charset" and value:
+                return value.strip('"\'')
+        return None
+
+    def text(self, errors: str = "replace") -> str:
+        return self.body.decode(self.charset or "utf-8", errors=errors)
+
+    def json(self) -> Any:
+        return json.loads(self.text("strict"))
+
+
+def _parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _freshness_lifetime(headers: Dict[str, str], now: float) -> float:
+    """响应可直接使用的秒数；0 表示每次使用前都必须重新验证"""
+    directives = _parse_cache_control(headers.get("cache-control", ""))
+    if "no-cache" in directives:
+        return 0.0
+    if "max-age" in directives:
+        try:
+            return max(0.0, float(directives["max-age"] or 0))
+        except ValueError:
+            return 0.0
+    if "expires" in headers:
+        expires = _parse_http_date(headers["expires"])
+        date = _parse_http_date(headers.get("date")) or now
+        return max(0.0, expires - date) if expires is not None else 0.0
+    last_modified = _parse_http_date(headers.get("last-modified"))
+    if last_modified is not None:
+        date = _parse_http_date(headers.get("date")) or now
+        return min(_HEURISTIC_MAX_SECONDS, max(0.0, (date - last_modified) * _HEURISTIC_FRACTION))
+    return 0.0
+
+
+def _is_storable(status: int, headers: Dict[str, str]) -> bool:
+    if status != 200:
+        return False
+    directives = _parse_cache_control(headers.get("cache-control", ""))
+    # 这是单用户的私有缓存，private 响应也可以存
+    if "no-store" in directives:
+        return False
+    # 除 Accept-Encoding 外的 Vary 需要按请求头分别缓存，这里不支持
+    vary = {v.strip().lower() for v in headers.get("vary", "").split(",") if v.strip()}
+    if vary - {"accept-encoding"}:
+        return False
+    # 既没有新鲜度信息也没有验证器的响应缓存了也用不上
+    return _freshness_lifetime(headers, time.time()) > 0 or "etag" in headers or "last-modified" in headers
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    headers: Dict[str, str]
+    stored_at: float
+    fresh_until: float
+    size: int = 0
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) < self.fresh_until
+
+    def validators(self) -> Dict[str, str]:
+        """条件请求头"""
+        conditional = {}
+        if "etag" in self.headers:
+            conditional["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            conditional["If-Modified-Since"] = self.headers["last-modified"]
+        return conditional
+
+
+class HTTPCache:
+    """
+    磁盘HTTP缓存
+    每个URL对应 <sha256>.json（元数据）和 <sha256>.body（响应体）；
+    命中时更新文件修改时间，总大小超过 max_bytes 时按修改时间从旧到新淘汰
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        key = self._key(url)
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def get(self, url: str) -> Optional[Tuple[CacheEntry, bytes]]:
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url:
+            return None
+        now = time.time()
+        try:
+            os.utime(meta_path, (now, now))
+        except OSError:
+            pass
+        return CacheEntry(
+            url=url,
+            headers=meta.get("headers", {}),
+            stored_at=meta.get("stored_at", 0.0),
+            fresh_until=meta.get("fresh_until", 0.0),
+            size=len(body)
+        ), body
+
+    def put(self, url: str, headers: Dict[str, str], body: bytes) -> Optional[CacheEntry]:
+        if not self.max_bytes or len(body) > self.max_bytes:
+            return None
+        now = time.time()
+        stored = {k: headers[k] for k in _STORED_HEADERS if k in headers}
+        entry = CacheEntry(
+            url=url,
+            headers=stored,
+            stored_at=now,
+            fresh_until=now + _freshness_lifetime(stored, now),
+            size=len(body)
+        )
+        meta_path, body_path = self._paths(url)
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            old_size = self._entry_size(meta_path, body_path)
+            # 先写响应体再写元数据，元数据存在即表示条目完整
+            tmp_body = body_path.with_suffix(".body.tmp")
+            tmp_meta = meta_path.with_suffix(".json.tmp")
+            tmp_body.write_bytes(body)
+            os.replace(tmp_body, body_path)
+            tmp_meta.write_text(json.dumps({
+                "url": url,
+                "headers": stored,
+                "stored_at": entry.stored_at,
+                "fresh_until": entry.fresh_until
+            }), encoding="utf-8")
+            os.replace(tmp_meta, meta_path)
+            if self._total_bytes is not None:
+                self._total_bytes += self._entry_size(meta_path, body_path) - old_size
+            self._evict_locked()
+        return entry
+
+    def refresh(self, entry: CacheEntry, headers: Dict[str, str]) -> CacheEntry:
+        """304 后用新响应头更新元数据（RFC 9111 4.3.4）"""
+        now = time.time()
+        merged = dict(entry.headers)
+        merged.update({k: headers[k] for k in _STORED_HEADERS if k in headers and k != "content-type"})
+        entry.headers = merged
+        entry.stored_at = now
+        entry.fresh_until = now + _freshness_lifetime(merged, now)
+        meta_path, _ = self._paths(entry.url)
+        with self._lock:
+            try:
+                meta_path.write_text(json.dumps({
+                    "url": entry.url,
+                    "headers": merged,
+                    "stored_at": entry.stored_at,
+                    "fresh_until": entry.fresh_until
+                }), encoding="utf-8")
+            except OSError:
+                pass
+        return entry
+
+    def discard(self, url: str) -> None:
+        meta_path, body_path = self._paths(url)
+        with self._lock:
+            size = self._entry_size(meta_path, body_path)
+            for path in (meta_path, body_path):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            if self.directory.is_dir():
+                for path in self.directory.iterdir():
+                    if path.suffix in (".json", ".body", ".tmp"):
+                        try:
+                            path.unlink()
+                        except OSError:
+                            pass
+            self._total_bytes = 0
+
+    @staticmethod
+    def _entry_size(meta_path: Path, body_path: Path) -> int:
+        size = 0
+        for path in (meta_path, body_path):
+            try:
+                size += path.stat().st_size
+            except OSError:
+                pass
+        return size
+
+    def _scan_locked(self) -> List[Tuple[float, Path, int]]:
+        """(最近使用时间, 元数据路径, 条目大小)"""
+        entries = []
+        if not self.directory.is_dir():
+            return entries
+        for meta_path in self.directory.glob("*.json"):
+            try:
+                used_at = meta_path.stat().st_mtime
+            except OSError:
+                continue
+            entries.append((used_at, meta_path, self._entry_size(meta_path, meta_path.with_suffix(".body"))))
+        return entries
+
+    def _evict_locked(self) -> None:
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, _, size in self._scan_locked())
+        if self._total_bytes <= self.max_bytes:
+            return
+        # 只有超限时才扫描目录排序，淘汰到容量的90%以减少频繁扫描
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._scan_locked())
+        self._total_bytes = sum(size for _, _, size in entries)
+        for _, meta_path, size in entries:
+            if self._total_bytes <= target:
+                break
+            for path in (meta_path, meta_path.with_suffix(".body")):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, _, size in self._scan_locked())
+            total = self._total_bytes
+        return {
+            "directory": str(self.directory),
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+class HTTPClient:
+    """
+    进程级HTTP客户端
+    aiohttp 的会话绑定事件循环，所以按循环各建一个会话；同一循环内所有请求共享连接池。
+    会话在其事件循环关闭前关闭并移出字典，不会让已结束的循环和连接一直留在内存里
+    """
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_POOL_LIMIT,
+        limit_per_host: int = DEFAULT_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+        cache: Optional[HTTPCache] = None
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.cache = cache
+        # 事件循环 -> (会话, 循环关闭钩子句柄)；多个工作线程各有事件循环，访问时持锁
+        self._sessions: Dict[asyncio.AbstractEventLoop, Tuple[aiohttp.ClientSession, AsyncGenerator[None, None]]] = {}
+        self._lock = threading.Lock()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """当前事件循环的共享会话，不存在或已关闭时创建"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            current = self._sessions.get(loop)
+            if current is not None and not current[0].closed:
+                return current[0]
+            # 未经 asyncio.run 关闭的循环不会触发关闭钩子，在这里丢弃其引用
+            for stale in [l for l in self._sessions if l.is_closed()]:
+                self._sessions.pop(stale, None)
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=DEFAULT_DNS_CACHE_TTL
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            # 钩子句柄由字典持有；事件循环关闭前关闭会话
+            self._sessions[loop] = (session, on_loop_shutdown(lambda: self._close_session(loop, session)))
+        return session
+
+    async def _close_session(self, loop: asyncio.AbstractEventLoop, session: aiohttp.ClientSession) -> None:
+        """事件循环关闭前关闭会话并移出字典（此时循环仍在运行，可以正常await）"""
+        with self._lock:
+            current = self._sessions.get(loop)
+            if current is not None and current[0] is session:
+                del self._sessions[loop]
+        if not session.closed:
+            await session.close()
+
+    async def fetch(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        max_bytes: int = DEFAULT_MAX_BODY_BYTES,
+        use_cache: bool = True
+    ) -> HTTPResponse:
+        """
+        GET 请求并读取响应体（最多 max_bytes）
+        缓存新鲜时不发请求；过期但有验证器时发条件请求，304 直接复用缓存的响应体
+        """
+        cache = self.cache if use_cache else None
+        cached = await self._run_cache(cache.get, url) if cache else None
+        request_headers = dict(headers or {})
+        if cached:
+            entry, body = cached
+            if entry.is_fresh():
+                cache.hits += 1
+                return HTTPResponse(url=url, status=200, headers=dict(entry.headers), body=body, from_cache=True)
+            request_headers.update(entry.validators())
+
+        client_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        async with self.get_session().get(url, headers=request_headers, timeout=client_timeout) as response:
+            response_headers = {k.lower(): v for k, v in response.headers.items()}
+            if cached and response.status == 304:
+                entry, body = cached
+                cache.revalidations += 1
+                entry = await self._run_cache(cache.refresh, entry, response_headers)
+                return HTTPResponse(url=url, status=200, headers=dict(entry.headers), body=body, revalidated=True)
+
+            body = await response.content.read(max_bytes + 1) if max_bytes else await response.read()
+            truncated = bool(max_bytes) and len(body) > max_bytes
+            if truncated:
+                body = body[:max_bytes]
+            status = response.status
+
+        if cache:
+            cache.misses += 1
+            if not truncated and _is_storable(status, response_headers):
+                await self._run_cache(cache.put, url, response_headers, body)
+            elif cached:
+                await self._run_cache(cache.discard, url)
+
+        return HTTPResponse(url=url, status=status, headers=response_headers, body=body, truncated=truncated)
+
+    async def fetch_many(
+        self,
+        urls: List[str],
+        concurrency: int = DEFAULT_POOL_LIMIT_PER_HOST,
+        **kwargs
+    ) -> List[Any]:
+        """并发获取多个URL，返回与输入顺序一致的 HTTPResponse 或异常"""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _one(url: str):
+            async with semaphore:
+                return await self.fetch(url, **kwargs)
+
+        return await asyncio.gather(*(_one(url) for url in urls), return_exceptions=True)
+
+    @staticmethod
+    async def _run_cache(func, *args):
+        # 缓存是小文件读写，放到线程池避免阻塞事件循环
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def close(self) -> None:
+        """关闭当前事件循环的会话"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        with self._lock:
+            current = self._sessions.pop(loop, None)
+        if current and not current[0].closed:
+            await current[0].close()
+
+
+_client: Optional[HTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client(config=None) -> HTTPClient:
+    """
+    获取进程级HTTP客户端，首次调用时按配置创建
+    配置项：http_pool_limit、http_pool_limit_per_host、http_keepalive_timeout、
+    http_cache_enabled、http_cache_dir、http_cache_max_mb
+    """
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            get = config.get if config is not None else (lambda key, default=None: default)
+            cache = None
+            if str(get("http_cache_enabled", True)).lower() not in ("false", "0", "no"):
+                cache_dir = get("http_cache_dir", None) or str(Path.home() / ".dbrheo" / "http_cache")
+                cache = HTTPCache(cache_dir, int(float(get("http_cache_max_mb", 64)) * 1024 * 1024))
+                register_cache("http", cache)
+            _client = HTTPClient(
+                limit=int(get("http_pool_limit", DEFAULT_POOL_LIMIT)),
+                limit_per_host=int(get("http_pool_limit_per_host", DEFAULT_POOL_LIMIT_PER_HOST)),
+                keepalive_timeout=float(get("http_keepalive_timeout", DEFAULT_KEEPALIVE_TIMEOUT)),
+                cache=cache
+            )
+            log_info("HTTPClient", f"Shared HTTP client created (per-host limit {_client.limit_per_host}, cache: {cache.directory if cache else 'disabled'})")
+    return _client
+
+
+async def close_http_client() -> None:
+    """关闭当前事件循环上的共享会话（退出前调用）"""
+    if _client is not None:
+        await _client.close()
@@ -0,0 +1,190 @@
+"""
+稀疏行偏移索引 - 大文本文件的按行随机访问
+每隔固定行数记录一次字节偏移，按 (路径, 大小, 修改时间) 缓存；
+分页读取时直接定位到最近的检查点，只解码请求的窗口
+"""
+
+import codecs
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+
+LINE_INDEX_STRIDE = 4096
+LINE_INDEX_CACHE_SIZE = 32
+_SCAN_CHUNK_SIZE = 1024 * 1024
+_COUNT_BLOCK_SIZE = 16 * 1024
+
+# 换行符不是单字节 0x0A 的编码，无法按字节定位行
+_WIDE_ENCODINGS = ("utf-16", "utf_16", "utf16", "utf-32", "utf_32", "utf32")
+
+
+@dataclass
+class LineIndex:
+    """稀疏行索引：checkpoints[k] 是第 k*stride 行（0起）的起始字节偏移"""
+    path: str
+    size: int
+    mtime_ns: int
+    stride: int
+    checkpoints: array
+    total_lines: int
+
+    def checkpoint_for(self, line: int) -> Tuple[int, int]:
+        """返回不超过 line 的最近检查点 (行号, 字节偏移)"""
+        k = min(line // self.stride, len(self.checkpoints) - 1)
+        return k * self.stride, self.checkpoints[k]
+
+
+def supports_line_index(encoding: str) -> bool:
+    """换行符在该编码下是否为单字节 0x0A（UTF-16/32 不是）"""
+    return not encoding.lower().replace(" ", "").startswith(_WIDE_ENCODINGS)
+
+
+def build_line_index(path: str, stride: int = LINE_INDEX_STRIDE) -> LineIndex:
+    """顺序扫描一次文件，记录每 stride 行的字节偏移并统计总行数"""
+    stat = os.stat(path)
+    checkpoints = array("Q", [0])
+    newlines = 0
+    next_checkpoint = stride
+    last_byte = b""
+
+    with open(path, "rb") as f:
+        position = 0
+        while True:
+            chunk = f.read(_SCAN_CHUNK_SIZE)
+            if not chunk:
+                break
+            # 按小块计数换行符（C层实现），只在跨越检查点的小块内逐个定位
+            for block_start in range(0, len(chunk), _COUNT_BLOCK_SIZE):
+                block_end = block_start + _COUNT_BLOCK_SIZE
+                count = chunk.count(b"\n", block_start, block_end)
+                if newlines + count < next_checkpoint:
+                    newlines += count
+                    continue
+                start = block_start
+                while True:
+                    pos = chunk.find(b"\n", start, block_end)
+                    if pos < 0:
+                        break
+                    newlines += 1
+                    if newlines == next_checkpoint:
+                        checkpoints.append(position + pos + 1)
+                        next_checkpoint += stride
+                    start = pos + 1
+            position += len(chunk)
+            last_byte = chunk[-1:]
+
+    # 与 readlines() 一致：末尾没有换行符的最后一行也算一行
+    total_lines = newlines + (1 if last_byte and last_byte != b"\n" else 0)
+    # 文件恰好以检查点行结束时，去掉指向文件末尾的空检查点
+    if len(checkpoints) > 1 and checkpoints[-1] >= stat.st_size:
+        checkpoints.pop()
+
+    return LineIndex(
+        path=path,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        stride=stride,
+        checkpoints=checkpoints,
+        total_lines=total_lines
+    )
+
+
+_cache: "OrderedDict[Tuple[str, int, int], LineIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_line_index(path: str, stride: int = LINE_INDEX_STRIDE) -> LineIndex:
+    """获取行索引，文件大小或修改时间变化时重建"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _cache_lock:
+        index = _cache.get(key)
+        if index is not None and index.stride == stride:
+            _cache.move_to_end(key)
+            return index
+
+    index = build_line_index(path, stride)
+    with _cache_lock:
+        _cache[(path, index.size, index.mtime_ns)] = index
+        while len(_cache) > LINE_INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+
+def clear_line_index_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def _split_lines(text: str) -> List[str]:
+    """
+    按 \\n 切分并保留行尾，\\r\\n 统一为 \\n
+    单独的 \\r（旧式Mac换行）不视为行尾：索引只按 0x0A 计数，窗口切分必须与之一致
+    """
+    if "\r" in text:
+        text = text.replace("\r\n", "\n")
+    parts = text.split("\n")
+    lines = [part + "\n" for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines
+
+
+def read_line_window(
+    path: str,
+    offset: int,
+    limit: int,
+    encoding: str,
+    index: Optional[LineIndex] = None,
+    max_line_bytes: Optional[int] = None
+) -> Tuple[List[str], LineIndex]:
+    """
+    读取 [offset, offset+limit) 行，只解码该窗口的字节
+    max_line_bytes: 超过该字节数的行只读取并解码开头部分（不含行尾），
+    避免没有换行符的超大文件被整体读入内存
+    返回 (行列表, 使用的索引)
+    """
+    index = index or get_line_index(path)
+    if limit <= 0 or offset >= index.total_lines or index.size == 0:
+        return [], index
+
+    checkpoint_line, start = index.checkpoint_for(offset)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # 从检查点跳过至多 stride-1 行
+        for _ in range(offset - checkpoint_line):
+            start = mm.find(b"\n", start) + 1
+        end = start
+        for _ in range(limit):
+            pos = mm.find(b"\n", end)
+            if pos < 0:
+                end = index.size
+                break
+            end = pos + 1
+        if max_line_bytes is None or end - start <= max_line_bytes:
+            data = mm[start:end]
+        else:
+            return _read_capped_lines(mm, start, end, encoding, max_line_bytes), index
+
+    # utf-8-sig 只在文件开头有BOM，窗口中间解码时效果与utf-8相同
+    return _split_lines(data.decode(encoding)), index
+
+
+def _read_capped_lines(mm: mmap.mmap, start: int, end: int, encoding: str, max_line_bytes: int) -> List[str]:
+    """逐行读取 [start, end)，超长行截取前 max_line_bytes 字节，丢弃末尾不完整的字符"""
+    lines = []
+    while start < end:
+        pos = mm.find(b"\n", start, end)
+        line_end = end if pos < 0 else pos + 1
+        if line_end - start <= max_line_bytes:
+            lines.extend(_split_lines(mm[start:line_end].decode(encoding)))
+        else:
+            decoder = codecs.getincrementaldecoder(encoding)()
+            lines.append(decoder.decode(mm[start:start + max_line_bytes]))
+        start = line_end
+    return lines
@@ -0,0 +1,27 @@
+"""
+事件循环关闭钩子
+asyncio.run 在关闭事件循环前调用 loop.shutdown_asyncgens()，对所有未结束的异步生成器执行 aclose。
+on_loop_shutdown 启动一个停在 yield 处的异步生成器，在其 finally 中执行回调：此时事件循环仍在运行，
+回调可以正常 await（关闭会话、等待子进程退出等）。
+事件循环只弱引用异步生成器，调用方必须持有返回的句柄；句柄在循环运行期间被回收时回调同样会执行
+"""
+
+from typing import AsyncGenerator, Awaitable, Callable
+
+
+async def _run_on_shutdown(callback: Callable[[], Awaitable[None]]) -> AsyncGenerator[None, None]:
+    try:
+        yield
+    finally:
+        await callback()
+
+
+def on_loop_shutdown(callback: Callable[[], Awaitable[None]]) -> AsyncGenerator[None, None]:
+    """在当前运行的事件循环关闭前执行 callback（必须在事件循环中调用），返回需要持有的句柄"""
+    handle = _run_on_shutdown(callback)
+    # 同步推进到 yield：首次迭代时事件循环登记该异步生成器
+    try:
+        handle.asend(None).send(None)
+    except StopIteration:
+        pass
+    return handle
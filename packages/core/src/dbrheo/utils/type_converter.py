@@ -3,6 +3,7 @@
 确保所有数据都能被 Gemini API 序列化
 """
 
+from dataclasses import asdict, is_dataclass
 from decimal import Decimal
 from datetime import datetime, date, time
 from typing import Any, Dict, List, Union
@@ -18,6 +19,7 @@ def convert_to_serializable(value: Any) -> Any:
     - datetime/date/time -> ISO格式字符串
     - bytes -> base64字符串（如果需要）
     - 嵌套的字典和列表递归处理
+    - 查询结果集 ResultSet -> 字典列表（值已在构建时转换）
     """
     if value is None:
         return None
@@ -54,6 +56,10 @@ def convert_to_serializable(value: Any) -> Any:
         
     # 其他类型尝试直接返回
     else:
+        # ResultSet 引用本模块，在此延迟导入
+        from ..adapters.result_set import ResultSet
+        if isinstance(value, ResultSet):
+            return value.to_dicts()
         # 检查是否可以被 JSON 序列化
         try:
             json.dumps(value)
@@ -74,4 +80,14 @@ def convert_rows_to_serializable(rows: List[Dict[str, Any]]) -> List[Dict[str, A
     """
     转换数据库查询结果的多行数据
     """
-    return [convert_row_to_serializable(row) for row in rows]
\ No newline at end of file
+    return [convert_row_to_serializable(row) for row in rows]
+
+
+def json_default(value: Any) -> Any:
+    """
+    json.dumps 的 default 参数：dataclass（如流事件中的 ToolCallRequestInfo）转为字典，
+    其余不可序列化的类型按 convert_to_serializable 处理
+    """
+    if is_dataclass(value) and not isinstance(value, type):
+        return convert_to_serializable(asdict(value))
+    return convert_to_serializable(value)
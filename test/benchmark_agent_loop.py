@@ -0,0 +1,254 @@
+"""
+Agent循环基准测试 - 使用 MockLLMService 和本地SQLite，不访问网络
+测量完整链路 DatabaseClient → DatabaseTurn → DatabaseToolScheduler → 工具 的开销：
+- 每轮开销：一条用户消息从发送到流结束的耗时（mock延迟为0时即纯框架开销）
+- 工具调度延迟：scheduler.schedule 的耗时减去工具自身执行时间
+- 内存增长：随会话轮数增长的Python堆内存（tracemalloc，单独一遍运行，不影响计时）
+
+用法:
+    python benchmark_agent_loop.py                      # 10/50/100/500 轮
+    python benchmark_agent_loop.py --turns 10 100 --tool-every 3 --token-delay 0.001
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+# 日志输出本身会主导耗时，默认关闭（--verbose 打开）
+if "--verbose" not in sys.argv:
+    os.environ.setdefault("DBRHEO_DEBUG_LEVEL", "ERROR")
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "packages" / "core" / "src"))
+
+from dbrheo.config.test_config import TestDatabaseConfig
+from dbrheo.core.client import DatabaseClient
+from dbrheo.types.core_types import SimpleAbortSignal
+
+RESULT_DIR = Path(__file__).parent / "result"
+
+FIXTURE_QUERIES = [
+    "SELECT COUNT(*) AS n FROM sales",
+    "SELECT brand, SUM(units) AS units FROM sales GROUP BY brand ORDER BY units DESC LIMIT 5",
+    "SELECT month, SUM(units) AS units FROM sales WHERE brand = 'brand_3' GROUP BY month",
+    "SELECT * FROM sales ORDER BY units DESC LIMIT 20",
+]
+
+
+def create_fixture(db_path: str, rows: int = 5000):
+    """生成销量表：brand × month × units"""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE sales (id INTEGER PRIMARY KEY, brand TEXT, model TEXT, month TEXT, units INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO sales (brand, model, month, units) VALUES (?, ?, ?, ?)",
+        [
+            (f"brand_{i % 20}", f"model_{i % 137}", f"2023-{i % 12 + 1:02d}", (i * 7919) % 5000)
+            for i in range(rows)
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+
+def build_script(turns: int, tool_every: int) -> dict:
+    """
+    每 tool_every 轮中有一轮先调用 sql_execute 再回答，其余直接回答
+    响应顺序与 send_message_stream 的调用顺序一一对应
+    """
+    responses = []
+    for turn in range(turns):
+        if tool_every and turn % tool_every == 0:
+            responses.append({
+                "text": "让我查询一下数据库。",
+                "function_calls": [{
+                    "name": "sql_execute",
+                    "args": {"sql": FIXTURE_QUERIES[turn % len(FIXTURE_QUERIES)]}
+                }]
+            })
+        responses.append({"text": f"第{turn + 1}轮的分析结果：销量数据已汇总完成，请查看上面的查询结果。"})
+    return {
+        "responses": responses,
+        "json_responses": [{"next_speaker": "user", "reasoning": "answer complete"}]
+    }
+
+
+def create_client(db_path: str, turns: int, tool_every: int, token_delay: float) -> DatabaseClient:
+    config = TestDatabaseConfig(test_overrides={
+        "model": "mock",
+        "mock_llm_script": build_script(turns, tool_every),
+        "mock_llm_token_delay": token_delay,
+        "auto_execute_mode": True,
+        "max_session_turns": 0,
+        "auto_compress_history": False,
+        "usage_ledger_enabled": False,
+    })
+    config.set_test_database("default", {"type": "sqlite", "database": db_path})
+    return DatabaseClient(config)
+
+
+def _instrument_scheduler(client: DatabaseClient, samples: list):
+    """记录 schedule 耗时和工具自身执行时间"""
+    scheduler = client.tool_scheduler
+    original = scheduler.schedule
+
+    async def timed_schedule(requests, signal):
+        started = time.perf_counter()
+        await original(requests, signal)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        tool_ms = sum(getattr(call, "duration_ms", 0) or 0 for call in client.completed_tool_calls)
+        samples.append((elapsed_ms, tool_ms))
+
+    scheduler.schedule = timed_schedule
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(values):
+    return {
+        "mean": round(statistics.fmean(values), 3) if values else 0.0,
+        "p50": round(_percentile(values, 50), 3),
+        "p95": round(_percentile(values, 95), 3),
+        "max": round(max(values), 3) if values else 0.0,
+    }
+
+
+async def _run_session(client: DatabaseClient, turns: int, on_turn=None):
+    turn_ms = []
+    events = 0
+    for turn in range(turns):
+        signal = SimpleAbortSignal()
+        started = time.perf_counter()
+        async for _ in client.send_message_stream([{"text": f"问题{turn + 1}：各品牌销量如何？"}], signal, f"bench-{turn}"):
+            events += 1
+        turn_ms.append((time.perf_counter() - started) * 1000)
+        if on_turn:
+            on_turn(turn)
+    return turn_ms, events
+
+
+def benchmark_timing(db_path: str, turns: int, tool_every: int, token_delay: float) -> dict:
+    client = create_client(db_path, turns, tool_every, token_delay)
+    dispatch = []
+    _instrument_scheduler(client, dispatch)
+
+    started = time.perf_counter()
+    turn_ms, events = asyncio.run(_run_session(client, turns))
+    total_s = time.perf_counter() - started
+
+    overhead_ms = [elapsed - tool for elapsed, tool in dispatch]
+    return {
+        "turns": turns,
+        "total_s": round(total_s, 3),
+        "events": events,
+        "history_messages": len(client.chat.get_history()),
+        "turn_ms": _summary(turn_ms),
+        "first_10_turns_ms": round(statistics.fmean(turn_ms[:10]), 3),
+        "last_10_turns_ms": round(statistics.fmean(turn_ms[-10:]), 3),
+        "tool_calls": len(dispatch),
+        "tool_exec_ms": _summary([tool for _, tool in dispatch]),
+        "tool_dispatch_overhead_ms": _summary(overhead_ms),
+    }
+
+
+def benchmark_memory(db_path: str, turns: int, tool_every: int) -> dict:
+    client = create_client(db_path, turns, tool_every, 0)
+    checkpoints = []
+    step = max(1, turns // 10)
+
+    def on_turn(turn):
+        if (turn + 1) % step == 0 or turn + 1 == turns:
+            gc.collect()
+            current, _ = tracemalloc.get_traced_memory()
+            checkpoints.append((turn + 1, current))
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        asyncio.run(_run_session(client, turns, on_turn))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    final = checkpoints[-1][1] if checkpoints else baseline
+    return {
+        "turns": turns,
+        "growth_kb": round((final - baseline) / 1024, 1),
+        "growth_per_turn_kb": round((final - baseline) / 1024 / turns, 2),
+        "peak_kb": round((peak - baseline) / 1024, 1),
+        "checkpoints_kb": [[turn, round((current - baseline) / 1024, 1)] for turn, current in checkpoints],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent循环基准测试（Mock LLM + 本地SQLite）")
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 50, 100, 500], help="每个会话的用户轮数")
+    parser.add_argument("--tool-every", type=int, default=2, help="每N轮中有一轮调用sql_execute（0为不调用工具）")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="mock LLM 相邻chunk间隔（秒）")
+    parser.add_argument("--rows", type=int, default=5000, help="SQLite fixture 行数")
+    parser.add_argument("--skip-memory", action="store_true", help="跳过内存增长测量")
+    parser.add_argument("--output", help="结果JSON路径（默认 result/agent_loop_benchmark_时间戳.json）")
+    parser.add_argument("--verbose", action="store_true", help="保留框架日志输出")
+    args = parser.parse_args()
+
+    results = {
+        "generated_at": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "tool_every": args.tool_every,
+        "token_delay": args.token_delay,
+        "rows": args.rows,
+        "timing": [],
+        "memory": [],
+    }
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "bench.db")
+        create_fixture(db_path, args.rows)
+
+        print("=" * 80)
+        print(f"Agent循环基准测试：tool_every={args.tool_every}, token_delay={args.token_delay}s, rows={args.rows}")
+        print("=" * 80)
+        print(f"{'轮数':>6} {'总耗时s':>9} {'每轮p50ms':>10} {'每轮p95ms':>10} {'前10轮ms':>9} {'后10轮ms':>9} "
+              f"{'工具数':>6} {'调度开销p50ms':>13}")
+        for turns in args.turns:
+            timing = benchmark_timing(db_path, turns, args.tool_every, args.token_delay)
+            results["timing"].append(timing)
+            print(f"{turns:>6} {timing['total_s']:>9.2f} {timing['turn_ms']['p50']:>10.2f} {timing['turn_ms']['p95']:>10.2f} "
+                  f"{timing['first_10_turns_ms']:>9.2f} {timing['last_10_turns_ms']:>9.2f} {timing['tool_calls']:>6} "
+                  f"{timing['tool_dispatch_overhead_ms']['p50']:>13.2f}")
+
+        if not args.skip_memory:
+            print("\n内存增长（tracemalloc）:")
+            for turns in args.turns:
+                memory = benchmark_memory(db_path, turns, args.tool_every)
+                results["memory"].append(memory)
+                print(f"   {turns:>4} 轮: 增长 {memory['growth_kb']:.1f} KB（{memory['growth_per_turn_kb']:.2f} KB/轮），"
+                      f"峰值 {memory['peak_kb']:.1f} KB")
+
+    output = Path(args.output) if args.output else RESULT_DIR / f"agent_loop_benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+伪MCP服务器 - 用于测试MCP客户端，不依赖MCP SDK和外部服务
+通过 stdio 按行收发 JSON-RPC 消息，实现 initialize / tools/list / tools/call；
+tools/call 在线程中处理，响应可以乱序返回，用于验证同一会话上的并发调用。
+
+工具:
+    echo(text)        原样返回文本
+    sleep(seconds)    等待指定秒数后返回
+    fail(message)     返回 isError=true 的结果
+
+环境变量:
+    FAKE_MCP_START_LOG  每次启动时向该文件追加一行（统计启动次数）
+    FAKE_MCP_TOOLS      逗号分隔的工具子集（默认全部）
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+
+TOOLS = {
+    "echo": {
+        "description": "Echo the given text",
+        "inputSchema": {"type": "object", "properties": {"text": {"type": "string"}}, "required": ["text"]},
+    },
+    "sleep": {
+        "description": "Sleep for the given number of seconds",
+        "inputSchema": {"type": "object", "properties": {"seconds": {"type": "number"}}, "required": ["seconds"]},
+    },
+    "fail": {
+        "description": "Return an error result",
+        "inputSchema": {"type": "object", "properties": {"message": {"type": "string"}}},
+    },
+}
+
+_write_lock = threading.Lock()
+
+
+def send(message: dict) -> None:
+    with _write_lock:
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+
+def call_tool(request_id, name: str, arguments: dict) -> None:
+    if name == "echo":
+        result = {"content": [{"type": "text", "text": arguments.get("text", "")}], "isError": False}
+    elif name == "sleep":
+        time.sleep(float(arguments.get("seconds", 0)))
+        result = {"content": [{"type": "text", "text": f"slept {arguments.get('seconds', 0)}"}], "isError": False}
+    elif name == "fail":
+        result = {"content": [{"type": "text", "text": arguments.get("message", "failed")}], "isError": True}
+    else:
+        send({"jsonrpc": "2.0", "id": request_id, "error": {"code": -32602, "message": f"Unknown tool: {name}"}})
+        return
+    send({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+
+def main() -> None:
+    start_log = os.environ.get("FAKE_MCP_START_LOG")
+    if start_log:
+        with open(start_log, "a", encoding="utf-8") as f:
+            f.write(f"{os.getpid()}\n")
+
+    enabled = os.environ.get("FAKE_MCP_TOOLS")
+    tools = {name: spec for name, spec in TOOLS.items() if not enabled or name in enabled.split(",")}
+
+    for line in sys.stdin:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        method = message.get("method")
+        request_id = message.get("id")
+        if request_id is None:
+            # 通知（如 notifications/initialized）无需响应
+            continue
+
+        if method == "initialize":
+            send({"jsonrpc": "2.0", "id": request_id, "result": {
+                "protocolVersion": message.get("params", {}).get("protocolVersion", "2024-11-05"),
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": "fake-mcp", "version": "1.0"},
+            }})
+        elif method == "tools/list":
+            send({"jsonrpc": "2.0", "id": request_id, "result": {
+                "tools": [dict(spec, name=name) for name, spec in tools.items()]
+            }})
+        elif method == "tools/call":
+            params = message.get("params", {})
+            threading.Thread(
+                target=call_tool,
+                args=(request_id, params.get("name"), params.get("arguments") or {}),
+                daemon=True,
+            ).start()
+        elif method == "ping":
+            send({"jsonrpc": "2.0", "id": request_id, "result": {}})
+        else:
+            send({"jsonrpc": "2.0", "id": request_id, "error": {"code": -32601, "message": f"Unknown method: {method}"}})
+
+
+if __name__ == "__main__":
+    main()
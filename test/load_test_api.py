@@ -0,0 +1,424 @@
+"""
+API负载测试 - 对 /api/chat/stream/{session_id}（SSE）和 /ws/chat/{session_id}（WebSocket）并发打开会话
+服务端在子进程中运行（uvicorn + create_app，MockLLMService + 本地SQLite，不访问网络），
+每个会话按脚本进行多轮带工具调用（sql_execute）的对话。报告：
+- 吞吐：每秒完成的消息数和事件数
+- 延迟：消息总耗时、首个事件耗时、相邻事件间隔（p50/p95/p99/max）
+- 服务端事件循环延迟：10ms 定时器的超时量（同步的 LLM 流和工具执行会阻塞所有会话）
+- 内存：服务端空闲RSS、压测期间峰值RSS、平均每会话增量
+
+--client-mode shared 与线上一致，所有会话共用 app 的同一个 DatabaseClient（共享历史和调用计数）；
+per-session 为每个 session_id 创建独立的 DatabaseClient，用于评估按会话隔离后的容量。
+
+用法:
+    python load_test_api.py                                        # SSE和WebSocket，10/50 并发
+    python load_test_api.py --sessions 100 --messages 5 --transport ws --token-delay 0.002
+    python load_test_api.py --client-mode per-session --tool-every 1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 日志输出本身会主导耗时，默认关闭（--verbose 打开）
+if "--verbose" not in sys.argv:
+    os.environ.setdefault("DBRHEO_DEBUG_LEVEL", "ERROR")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "packages" / "core" / "src"))
+
+from benchmark_agent_loop import build_script, create_fixture
+
+RESULT_DIR = Path(__file__).parent / "result"
+LAG_INTERVAL = 0.01
+
+
+def current_rss_mb() -> Optional[float]:
+    """当前进程RSS（MB）；Linux读 /proc，其他平台需要psutil"""
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        "p50": round(_percentile(ordered, 50), 3),
+        "p95": round(_percentile(ordered, 95), 3),
+        "p99": round(_percentile(ordered, 99), 3),
+        "max": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+# ---------------------------------------------------------------- 服务端（子进程）
+
+def _make_client(db_path: str, messages: int, tool_every: int, token_delay: float):
+    from dbrheo.config.test_config import TestDatabaseConfig
+    from dbrheo.core.client import DatabaseClient
+
+    script = build_script(messages, tool_every)
+    script["loop"] = True
+    config = TestDatabaseConfig(test_overrides={
+        "model": "mock",
+        "mock_llm_script": script,
+        "mock_llm_token_delay": token_delay,
+        "auto_execute_mode": True,
+        "max_session_turns": 0,
+        "auto_compress_history": False,
+        "usage_ledger_enabled": False,
+    })
+    config.set_test_database("default", {"type": "sqlite", "database": db_path})
+    return config, DatabaseClient(config)
+
+
+async def _serve(args):
+    import uvicorn
+    from dbrheo.api.app import create_app
+    from dbrheo.api.dependencies import get_client, set_app_state
+
+    config, shared_client = _make_client(args.db, args.messages, args.tool_every, args.token_delay)
+    clients = {}
+    app = create_app()
+    # 不运行 lifespan（它会按环境变量创建真实的配置和客户端）
+    set_app_state("config", config)
+    set_app_state("client", shared_client)
+
+    if args.client_mode == "per-session":
+        def session_client(session_id: str):
+            if session_id not in clients:
+                clients[session_id] = _make_client(args.db, args.messages, args.tool_every, args.token_delay)[1]
+            return clients[session_id]
+        app.dependency_overrides[get_client] = session_client
+
+    state = {"lag_ms": [], "peak_rss_mb": current_rss_mb()}
+
+    async def probe():
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            state["lag_ms"].append(max(0.0, loop.time() - started - LAG_INTERVAL) * 1000)
+            if len(state["lag_ms"]) % 10 == 0:
+                rss = current_rss_mb()
+                if rss is not None and rss > (state["peak_rss_mb"] or 0):
+                    state["peak_rss_mb"] = rss
+
+    @app.post("/_loadtest/reset")
+    async def reset():
+        state["lag_ms"] = []
+        state["peak_rss_mb"] = current_rss_mb()
+        return {"rss_mb": state["peak_rss_mb"]}
+
+    @app.get("/_loadtest/stats")
+    async def stats():
+        all_clients = list(clients.values()) or [shared_client]
+        return {
+            "rss_mb": current_rss_mb(),
+            "peak_rss_mb": state["peak_rss_mb"],
+            "loop_lag_ms": _summary(state["lag_ms"]),
+            "clients": len(clients) if clients else 1,
+            "history_messages": sum(len(c.chat.get_history()) for c in all_clients),
+        }
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(
+        app, lifespan="off", log_level="warning", access_log=False, ws_max_queue=1024
+    ))
+    print(f"READY {sock.getsockname()[1]}", flush=True)
+    probe_task = asyncio.create_task(probe())
+    try:
+        await server.serve(sockets=[sock])
+    finally:
+        probe_task.cancel()
+
+
+# ---------------------------------------------------------------- 客户端
+
+class SessionStats:
+    def __init__(self):
+        self.message_ms: List[float] = []
+        self.first_event_ms: List[float] = []
+        self.event_gap_ms: List[float] = []
+        self.events = 0
+        self.tool_calls = 0
+        self.errors: List[str] = []
+
+    def record_event(self, event: Dict[str, Any], sent_at: float, last_at: Optional[float]) -> float:
+        now = time.perf_counter()
+        self.events += 1
+        if last_at is None:
+            self.first_event_ms.append((now - sent_at) * 1000)
+        else:
+            self.event_gap_ms.append((now - last_at) * 1000)
+        if event.get("type") == "ToolCallRequest":
+            self.tool_calls += 1
+        elif event.get("type") == "Error":
+            self.errors.append(str(event.get("value"))[:200])
+        return now
+
+
+def _question(session: int, turn: int) -> str:
+    return f"会话{session} 问题{turn + 1}：各品牌销量如何？"
+
+
+async def _run_sse_session(http, index: int, messages: int, think_time: float, timeout: float,
+                           stats: SessionStats):
+    session_id = f"load-sse-{index}-{uuid.uuid4().hex[:6]}"
+    for turn in range(messages):
+        sent_at = time.perf_counter()
+        last_at = None
+        done = False
+        errors_before = len(stats.errors)
+        try:
+            async with http.stream("GET", f"/api/chat/stream/{session_id}",
+                                   params={"message": _question(index, turn)}, timeout=timeout) as response:
+                if response.status_code != 200:
+                    stats.errors.append(f"HTTP {response.status_code}")
+                    continue
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    data = line[6:]
+                    if data == "[DONE]":
+                        done = True
+                        break
+                    event = json.loads(data)
+                    if "error" in event:
+                        stats.errors.append(str(event["error"])[:200])
+                        continue
+                    last_at = stats.record_event(event, sent_at, last_at)
+        except Exception as e:
+            stats.errors.append(f"{type(e).__name__}: {e}"[:200])
+        if done:
+            stats.message_ms.append((time.perf_counter() - sent_at) * 1000)
+        elif len(stats.errors) == errors_before:
+            stats.errors.append("stream ended without [DONE]")
+        if think_time:
+            await asyncio.sleep(think_time)
+
+
+async def _run_ws_session(port: int, index: int, messages: int, think_time: float, timeout: float,
+                          stats: SessionStats):
+    import websockets
+
+    session_id = f"load-ws-{index}-{uuid.uuid4().hex[:6]}"
+    try:
+        async with websockets.connect(f"ws://127.0.0.1:{port}/ws/chat/{session_id}", max_size=None,
+                                      open_timeout=timeout) as ws:
+            await asyncio.wait_for(ws.recv(), timeout)  # 连接确认
+            for turn in range(messages):
+                sent_at = time.perf_counter()
+                last_at = None
+                await ws.send(json.dumps({"type": "chat", "message": _question(index, turn)}, ensure_ascii=False))
+                while True:
+                    message = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+                    kind = message.get("type")
+                    if kind == "stream":
+                        last_at = stats.record_event(message.get("chunk") or {}, sent_at, last_at)
+                    elif kind == "complete":
+                        stats.message_ms.append((time.perf_counter() - sent_at) * 1000)
+                        break
+                    elif kind == "error":
+                        stats.errors.append(str(message.get("error"))[:200])
+                        break
+                if think_time:
+                    await asyncio.sleep(think_time)
+    except Exception as e:
+        stats.errors.append(f"{type(e).__name__}: {e}"[:200])
+
+
+class ServerProcess:
+    """在子进程中启动服务端，读取 READY 行获得端口"""
+
+    def __init__(self, args, db_path: str):
+        command = [
+            sys.executable, str(Path(__file__).resolve()), "--serve",
+            "--db", db_path,
+            "--messages", str(args.messages),
+            "--tool-every", str(args.tool_every),
+            "--token-delay", str(args.token_delay),
+            "--client-mode", args.client_mode,
+        ]
+        if args.verbose:
+            command.append("--verbose")
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        self.port = None
+        for line in self.process.stdout:
+            if line.startswith("READY "):
+                self.port = int(line.split()[1])
+                break
+        if self.port is None:
+            self.process.kill()
+            raise RuntimeError(f"服务端启动失败（退出码 {self.process.wait()}）")
+
+    def close(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+async def run_level(args, db_path: str, transport: str, sessions: int) -> Dict[str, Any]:
+    import httpx
+
+    server = ServerProcess(args, db_path)
+    try:
+        limits = httpx.Limits(max_connections=sessions + 4, max_keepalive_connections=sessions + 4)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.port}", limits=limits) as http:
+            # 预热一个会话（导入、连接池、首次schema加载），不计入结果
+            await (_run_sse_session(http, -1, 1, 0, args.timeout, SessionStats()) if transport == "sse"
+                   else _run_ws_session(server.port, -1, 1, 0, args.timeout, SessionStats()))
+            idle_rss = (await http.post("/_loadtest/reset")).json()["rss_mb"]
+
+            all_stats = [SessionStats() for _ in range(sessions)]
+
+            async def start(index: int):
+                if args.ramp:
+                    await asyncio.sleep(args.ramp * index / sessions)
+                if transport == "sse":
+                    await _run_sse_session(http, index, args.messages, args.think_time, args.timeout, all_stats[index])
+                else:
+                    await _run_ws_session(server.port, index, args.messages, args.think_time, args.timeout,
+                                          all_stats[index])
+
+            started = time.perf_counter()
+            await asyncio.gather(*(start(i) for i in range(sessions)))
+            wall = time.perf_counter() - started
+            server_stats = (await http.get("/_loadtest/stats")).json()
+    finally:
+        server.close()
+
+    completed = sum(len(s.message_ms) for s in all_stats)
+    events = sum(s.events for s in all_stats)
+    errors = [e for s in all_stats for e in s.errors]
+    peak_rss = server_stats["peak_rss_mb"]
+    return {
+        "transport": transport,
+        "sessions": sessions,
+        "messages_per_session": args.messages,
+        "wall_s": round(wall, 3),
+        "messages_completed": completed,
+        "messages_per_s": round(completed / wall, 2) if wall else 0.0,
+        "events": events,
+        "events_per_s": round(events / wall, 1) if wall else 0.0,
+        "tool_calls": sum(s.tool_calls for s in all_stats),
+        "message_ms": _summary([v for s in all_stats for v in s.message_ms]),
+        "first_event_ms": _summary([v for s in all_stats for v in s.first_event_ms]),
+        "event_gap_ms": _summary([v for s in all_stats for v in s.event_gap_ms]),
+        "loop_lag_ms": server_stats["loop_lag_ms"],
+        "idle_rss_mb": idle_rss,
+        "peak_rss_mb": peak_rss,
+        "rss_per_session_mb": round((peak_rss - idle_rss) / sessions, 3) if peak_rss and idle_rss else None,
+        "server_clients": server_stats["clients"],
+        "server_history_messages": server_stats["history_messages"],
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+    }
+
+
+def _print_result(result: Dict[str, Any]):
+    lag = result["loop_lag_ms"]
+    print(f"  {result['transport']:<4} {result['sessions']:>4} 会话  "
+          f"{result['messages_per_s']:>8.2f} msg/s  {result['events_per_s']:>9.1f} evt/s  "
+          f"消息 p50 {result['message_ms']['p50']:>9.1f} / p99 {result['message_ms']['p99']:>9.1f} ms  "
+          f"首事件 p99 {result['first_event_ms']['p99']:>8.1f} ms  "
+          f"事件间隔 p99 {result['event_gap_ms']['p99']:>7.1f} ms  "
+          f"循环延迟 p99 {lag['p99']:>7.1f} / max {lag['max']:>7.1f} ms  "
+          f"RSS/会话 {result['rss_per_session_mb']} MB  错误 {result['errors']}")
+    for sample in result["error_samples"]:
+        print(f"      ! {sample}")
+
+
+async def run_load_test(args) -> Dict[str, Any]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="dbrheo_load_") as tmp:
+        db_path = str(Path(tmp) / "load.db")
+        create_fixture(db_path, args.rows)
+        for transport in args.transport:
+            for sessions in args.sessions:
+                result = await run_level(args, db_path, transport, sessions)
+                _print_result(result)
+                results.append(result)
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "messages": args.messages,
+            "tool_every": args.tool_every,
+            "token_delay": args.token_delay,
+            "think_time": args.think_time,
+            "ramp": args.ramp,
+            "rows": args.rows,
+            "client_mode": args.client_mode,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DbRheo API负载测试（SSE / WebSocket，Mock LLM + SQLite）")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10, 50], help="并发会话数（可多个）")
+    parser.add_argument("--transport", nargs="+", choices=["sse", "ws"], default=["sse", "ws"])
+    parser.add_argument("--messages", type=int, default=3, help="每个会话发送的消息数")
+    parser.add_argument("--tool-every", type=int, default=2, help="每N条消息中有一条触发sql_execute（0为不调用工具）")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Mock LLM相邻chunk的间隔秒数")
+    parser.add_argument("--think-time", type=float, default=0.0, help="会话内两条消息之间的等待秒数")
+    parser.add_argument("--ramp", type=float, default=0.0, help="在该秒数内均匀启动所有会话（0为同时启动）")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单条消息的超时秒数")
+    parser.add_argument("--rows", type=int, default=5000, help="SQLite fixture行数")
+    parser.add_argument("--client-mode", choices=["shared", "per-session"], default="shared",
+                        help="shared：所有会话共用一个DatabaseClient（与线上一致）；per-session：每个会话一个")
+    parser.add_argument("--output", type=Path, help="结果JSON路径（默认 result/api_load_test_时间戳.json）")
+    parser.add_argument("--verbose", action="store_true", help="显示DbRheo调试日志")
+    # 内部使用：以服务端模式运行
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        asyncio.run(_serve(args))
+        return 0
+
+    print("=" * 100)
+    print(f"API负载测试：{', '.join(args.transport)} × 并发 {args.sessions}，每会话 {args.messages} 条消息，"
+          f"client-mode={args.client_mode}")
+    print("=" * 100)
+    report = asyncio.run(run_load_test(args))
+
+    output = args.output or RESULT_DIR / f"api_load_test_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+    return 1 if any(r["errors"] for r in report["results"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
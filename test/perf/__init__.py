@@ -0,0 +1,25 @@
+"""
+适配器和工具的性能基准测试（离线，只用本地SQLite和临时文件）
+
+覆盖 SQLiteAdapter.execute_query / get_schema_info、DatabaseExportTool 各导出格式、
+convert_to_serializable、FileReadTool 分页读取和 DatabaseRiskEvaluator。
+fixture 按规模（表数 × 行数 × 列宽）生成；每个用例在独立子进程中运行，
+报告 ops/s、p50/p99 延迟和峰值RSS，可保存为JSON基线并在回归超过阈值时以非零状态退出。
+
+用法（在 test/ 目录下）:
+    python -m perf                                  # 全部用例，small 和 medium 规模
+    python -m perf --scales small --filter adapter  # 只跑名称包含 adapter 的用例
+    python -m perf --save-baseline                  # 结果另存为 perf/baselines/default.json
+    python -m perf --compare default --threshold 0.2
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# 框架日志会主导耗时
+os.environ.setdefault("DBRHEO_DEBUG_LEVEL", "ERROR")
+
+_CORE_SRC = str(Path(__file__).resolve().parent.parent.parent / "packages" / "core" / "src")
+if _CORE_SRC not in sys.path:
+    sys.path.insert(0, _CORE_SRC)
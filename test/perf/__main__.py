@@ -0,0 +1,106 @@
+"""
+命令行入口：python -m perf（在 test/ 目录下运行），说明见 perf/__init__.py
+
+退出状态：0 正常；1 与基线对比有回归；2 有用例运行失败
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from .cases import CASES
+from .fixtures import SCALES
+from .runner import (
+    RESULT_DIR, baseline_path, compare, load_report, make_report, run_suite, save_report, select_cases
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m perf", description="适配器和工具性能基准测试")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["small", "medium"],
+                        help="数据规模（默认 small medium；large 生成约 500k 行 × 32 列）")
+    parser.add_argument("--filter", nargs="+", help="只运行名称包含任一子串的用例")
+    parser.add_argument("--list", action="store_true", help="列出用例和规模")
+    parser.add_argument("--min-time", type=float, default=1.0, help="每个用例最少计时秒数")
+    parser.add_argument("--min-iters", type=int, default=5, help="每个用例最少迭代次数")
+    parser.add_argument("--max-iters", type=int, default=100_000, help="每个用例最多迭代次数")
+    parser.add_argument("--warmup", type=float, default=0.2, help="预热秒数")
+    parser.add_argument("--fixture-dir", type=Path, help="fixture目录（默认系统临时目录下 dbrheo_perf_fixtures）")
+    parser.add_argument("--no-isolate", action="store_true", help="在当前进程中运行（更快，但峰值RSS会累计）")
+    parser.add_argument("--output", type=Path, help="结果JSON路径（默认 result/perf_benchmark_时间戳.json）")
+    parser.add_argument("--save-baseline", nargs="?", const="default", metavar="NAME",
+                        help="把结果保存为基线 perf/baselines/NAME.json（默认 default）")
+    parser.add_argument("--compare", nargs="?", const="default", metavar="NAME",
+                        help="与基线对比（名称或JSON路径，默认 default），有回归时退出状态为1")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p50 回归阈值（比例，默认0.2）")
+    parser.add_argument("--rss-threshold", type=float, default=0.25, help="峰值RSS回归阈值（比例，默认0.25）")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, scale in SCALES.items():
+            print(f"{name:<8} tables={scale.tables} rows={scale.rows} width={scale.width} "
+                  f"batch_rows={scale.batch_rows} file_lines={scale.file_lines}")
+        print()
+        for name in sorted(CASES):
+            case = CASES[name]
+            extra = "" if case.available() else f"  (需要 {case.requires})"
+            print(f"{name:<28} {case.description}{extra}")
+        return 0
+
+    baseline = None
+    if args.compare:
+        path = baseline_path(args.compare)
+        if not path.exists():
+            print(f"基线不存在: {path}")
+            return 2
+        baseline = load_report(path)
+
+    case_names = select_cases(args.filter)
+    if not case_names:
+        print("没有匹配的用例")
+        return 2
+
+    print("=" * 100)
+    print(f"性能基准测试：{len(case_names)} 个用例 × 规模 {', '.join(args.scales)}")
+    print("=" * 100)
+    results = run_suite(case_names, args.scales, args.fixture_dir, args.min_time, args.min_iters,
+                        args.max_iters, args.warmup, isolate=not args.no_isolate)
+    report = make_report(results, args.scales)
+
+    output = args.output or RESULT_DIR / f"perf_benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    print(f"\n结果已保存: {save_report(report, output)}")
+    if args.save_baseline:
+        print(f"基线已保存: {save_report(report, baseline_path(args.save_baseline))}")
+
+    failed = [r for r in results if "error" in r]
+    exit_code = 2 if failed else 0
+
+    if baseline is not None:
+        rows, warnings = compare(report, baseline, args.threshold, args.rss_threshold)
+        print(f"\n与基线对比（p50 阈值 {args.threshold:.0%}，RSS 阈值 {args.rss_threshold:.0%}）:")
+        for warning in warnings:
+            print(f"  ⚠️ {warning}")
+        for row in rows:
+            label = f"{row['case']} [{row['scale']}]"
+            if row["status"] == "new":
+                print(f"  {label:<40} 新用例（基线中没有）")
+                continue
+            icon = {"ok": "  ", "improved": "✅", "regressed": "❌"}[row["status"]]
+            detail = "; ".join(row["reasons"])
+            rss = f"{row['rss_delta_mb']:+.1f} MB" if row["rss_delta_mb"] is not None else "-"
+            print(f"  {icon} {label:<40} p50 ×{row['p50_ratio']:<6} RSS {rss:>9}  {detail}")
+        regressed = [row for row in rows if row["status"] == "regressed"]
+        if regressed:
+            print(f"\n❌ {len(regressed)} 项回归超过阈值")
+            exit_code = exit_code or 1
+        else:
+            print("\n✅ 没有超过阈值的回归")
+
+    if failed:
+        print(f"\n❌ {len(failed)} 个用例运行失败: {', '.join(r['case'] for r in failed)}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
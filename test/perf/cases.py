@@ -0,0 +1,234 @@
+"""
+基准用例
+
+每个用例的 setup(ctx) 在计时前执行一次，返回被计时的操作（同步函数或协程函数）。
+scaled=False 的用例与数据规模无关，只在第一个规模下运行。
+"""
+
+import importlib.util
+import itertools
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .fixtures import Scale, column_defs
+
+
+@dataclass
+class Context:
+    scale: Scale
+    database: str
+    text_file: str
+    work_dir: Path
+    config: Any = None
+    cleanups: List[Callable[[], Awaitable[None]]] = None
+
+    def __post_init__(self):
+        self.cleanups = []
+        from dbrheo.config.test_config import TestDatabaseConfig
+        self.config = TestDatabaseConfig(test_overrides={
+            "export_allowed_paths": [str(self.work_dir)],
+            "file_allowed_paths": [str(Path(self.text_file).parent)],
+            "usage_ledger_enabled": False,
+        })
+        self.config.set_test_database("default", {"type": "sqlite", "database": self.database})
+
+    async def adapter(self):
+        from dbrheo.adapters.sqlite_adapter import SQLiteAdapter
+        adapter = SQLiteAdapter({"type": "sqlite", "database": self.database})
+        await adapter.connect()
+        self.cleanups.append(adapter.disconnect)
+        return adapter
+
+    async def close(self):
+        for cleanup in reversed(self.cleanups):
+            await cleanup()
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    setup: Callable[[Context], Awaitable[Callable[[], Any]]]
+    description: str
+    scaled: bool = True
+    requires: Optional[str] = None
+
+    def available(self) -> bool:
+        return self.requires is None or importlib.util.find_spec(self.requires) is not None
+
+
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str, description: str, scaled: bool = True, requires: Optional[str] = None):
+    def register(setup):
+        CASES[name] = Case(name, setup, description, scaled, requires)
+        return setup
+    return register
+
+
+# ---- SQLiteAdapter ----
+
+@case("adapter.query_point", "主键点查 SELECT * WHERE id = ?")
+async def _query_point(ctx: Context):
+    adapter = await ctx.adapter()
+    ids = itertools.cycle(random.Random(1).sample(range(1, ctx.scale.rows + 1), min(1000, ctx.scale.rows)))
+
+    async def op():
+        result = await adapter.execute_query("SELECT * FROM t0 WHERE id = :id", {"id": next(ids)})
+        assert result["success"], result.get("error")
+    return op
+
+
+@case("adapter.query_page", "分页读取 1000 行（宽表全部列）")
+async def _query_page(ctx: Context):
+    adapter = await ctx.adapter()
+    offsets = itertools.cycle(range(0, max(1, ctx.scale.rows - 1000), 1000))
+
+    async def op():
+        result = await adapter.execute_query("SELECT * FROM t0 LIMIT 1000 OFFSET :o", {"o": next(offsets)})
+        assert result["success"], result.get("error")
+    return op
+
+
+@case("adapter.query_aggregate", "全表 GROUP BY 聚合")
+async def _query_aggregate(ctx: Context):
+    adapter = await ctx.adapter()
+
+    async def op():
+        result = await adapter.execute_query("SELECT c2, COUNT(*) AS n, AVG(c1) AS avg_c1 FROM t0 GROUP BY c2")
+        assert result["success"], result.get("error")
+    return op
+
+
+@case("adapter.schema_info", "get_schema_info（成本取决于表数和列数）")
+async def _schema_info(ctx: Context):
+    adapter = await ctx.adapter()
+
+    async def op():
+        info = await adapter.get_schema_info()
+        assert info
+    return op
+
+
+# ---- DatabaseExportTool ----
+
+def _export_case(format_type: str, suffix: str):
+    async def setup(ctx: Context):
+        from dbrheo.tools.database_export_tool import DatabaseExportTool
+        from dbrheo.types.core_types import SimpleAbortSignal
+        tool = DatabaseExportTool(ctx.config)
+        params = {
+            "sql": f"SELECT * FROM t0 LIMIT {ctx.scale.batch_rows}",
+            "output_path": str(ctx.work_dir / f"export{suffix}"),
+            "format": format_type,
+        }
+
+        async def op():
+            result = await tool.execute(params, SimpleAbortSignal())
+            assert not result.error, result.error
+        return op
+    return setup
+
+
+for _format, _suffix, _requires in (
+    ("csv", ".csv", None),
+    ("json", ".json", None),
+    ("sql", ".sql", None),
+    ("excel", ".xlsx", "openpyxl"),
+):
+    case(f"export.{_format}", f"导出 batch_rows 行为 {_format}（含连接/断开）", requires=_requires)(
+        _export_case(_format, _suffix)
+    )
+
+
+# ---- convert_to_serializable ----
+
+@case("serialize.convert_rows", "convert_to_serializable 处理 batch_rows 行混合类型字典")
+async def _convert_rows(ctx: Context):
+    from dbrheo.utils.type_converter import convert_to_serializable
+    base = datetime(2024, 1, 1, 8, 30)
+    columns = column_defs(min(ctx.scale.width, 16))
+    rows = []
+    for i in range(ctx.scale.batch_rows):
+        row = {}
+        for j, (name, type_) in enumerate(columns):
+            if j % 8 == 1:
+                row[name] = Decimal(f"{i}.{j:02d}")
+            elif j % 8 == 3:
+                row[name] = base + timedelta(minutes=i)
+            elif j % 8 == 5:
+                row[name] = date(2024, i % 12 + 1, j % 28 + 1)
+            elif j % 8 == 7:
+                row[name] = f"payload-{i}".encode()
+            else:
+                row[name] = i * j if type_ == "INTEGER" else f"v{i}"
+        rows.append(row)
+
+    def op():
+        convert_to_serializable(rows)
+    return op
+
+
+# ---- FileReadTool ----
+
+def _file_read_case(position: str, cold: bool = False):
+    async def setup(ctx: Context):
+        from dbrheo.tools.file_read_tool import FileReadTool
+        from dbrheo.types.core_types import SimpleAbortSignal
+        from dbrheo.utils.line_index import clear_line_index_cache
+        tool = FileReadTool(ctx.config)
+        limit = 500
+        offset = {
+            "first": 0,
+            "middle": ctx.scale.file_lines // 2,
+            "last": max(0, ctx.scale.file_lines - limit),
+        }[position]
+        params = {"path": ctx.text_file, "offset": offset, "limit": limit}
+
+        async def op():
+            if cold:
+                clear_line_index_cache()
+            result = await tool.execute(params, SimpleAbortSignal())
+            assert not result.error, result.error
+        return op
+    return setup
+
+
+for _position in ("first", "middle", "last"):
+    case(f"file_read.page_{_position}", f"读取文件{_position}处500行（行索引已缓存）")(_file_read_case(_position))
+case("file_read.page_last_cold", "读取文件末尾500行（每次重建行索引）")(_file_read_case("last", cold=True))
+
+
+# ---- DatabaseRiskEvaluator ----
+
+RISK_CORPUS = [
+    "SELECT * FROM orders WHERE id = 42",
+    "SELECT o.id, c.name, SUM(i.amount) FROM orders o JOIN customers c ON o.customer_id = c.id "
+    "JOIN items i ON i.order_id = o.id WHERE o.created_at > '2024-01-01' GROUP BY o.id, c.name ORDER BY 3 DESC LIMIT 50",
+    "INSERT INTO audit_log (user_id, action) VALUES (1, 'login')",
+    "UPDATE accounts SET balance = balance - 100 WHERE id = 7",
+    "UPDATE accounts SET status = 'inactive'",
+    "DELETE FROM sessions WHERE expires_at < CURRENT_TIMESTAMP",
+    "DELETE FROM sessions",
+    "CREATE TABLE tmp_report AS SELECT * FROM sales WHERE month = '2024-03'",
+    "ALTER TABLE customers DROP COLUMN legacy_code",
+    "DROP TABLE tmp_report",
+    "TRUNCATE TABLE staging_events",
+    "SELECT * FROM users WHERE name = '' OR '1'='1' --",
+    "WITH recent AS (SELECT * FROM events WHERE ts > now() - interval '1 day') SELECT type, COUNT(*) FROM recent GROUP BY type",
+]
+
+
+@case("risk.evaluate_corpus", f"evaluate_sql_risk 评估 {len(RISK_CORPUS)} 条混合语句", scaled=False)
+async def _risk_corpus(ctx: Context):
+    from dbrheo.tools.risk_evaluator import DatabaseRiskEvaluator
+    evaluator = DatabaseRiskEvaluator(ctx.config)
+
+    def op():
+        for sql in RISK_CORPUS:
+            evaluator.evaluate_sql_risk(sql)
+    return op
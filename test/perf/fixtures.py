@@ -0,0 +1,114 @@
+"""
+基准测试fixture：按规模生成的SQLite数据库和大文本文件
+
+数据库结构：
+- t0 为主表，rows 行 × width 列（列类型按 INTEGER / REAL / 低基数TEXT / 日期TEXT 轮换，约5%为NULL）
+- t1..t{tables-1} 与 t0 同宽但只有少量行，用于结构查询（get_schema_info 的成本主要取决于表数和列数）
+同一规模的文件生成一次后复用（按 FIXTURE_VERSION 和规模参数命名），内容是确定性的。
+"""
+
+import random
+import sqlite3
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+FIXTURE_VERSION = 1
+DEFAULT_FIXTURE_DIR = Path(tempfile.gettempdir()) / "dbrheo_perf_fixtures"
+SIDE_TABLE_ROWS = 50
+
+
+@dataclass(frozen=True)
+class Scale:
+    name: str
+    tables: int
+    rows: int
+    width: int
+    # 导出/序列化用例处理的行数（不超过 rows）
+    batch_rows: int
+    # FileReadTool 用例的文本文件行数
+    file_lines: int
+
+
+SCALES: Dict[str, Scale] = {
+    "small": Scale("small", tables=10, rows=2_000, width=8, batch_rows=1_000, file_lines=20_000),
+    "medium": Scale("medium", tables=50, rows=50_000, width=16, batch_rows=10_000, file_lines=200_000),
+    "large": Scale("large", tables=200, rows=500_000, width=32, batch_rows=50_000, file_lines=2_000_000),
+}
+
+_BRANDS = [f"brand_{i}" for i in range(20)]
+
+
+def column_defs(width: int) -> List[Tuple[str, str]]:
+    types = ("INTEGER", "REAL", "TEXT", "TEXT")
+    return [(f"c{j}", types[j % 4]) for j in range(width)]
+
+
+def _row(rng: random.Random, width: int, i: int) -> tuple:
+    values = []
+    for j in range(width):
+        if rng.random() < 0.05:
+            values.append(None)
+        elif j % 4 == 0:
+            values.append(rng.randrange(1_000_000))
+        elif j % 4 == 1:
+            values.append(round(rng.random() * 10_000, 2))
+        elif j % 4 == 2:
+            values.append(_BRANDS[(i + j) % len(_BRANDS)])
+        else:
+            values.append(f"2024-{(i + j) % 12 + 1:02d}-{(i * 7 + j) % 28 + 1:02d}")
+    return tuple(values)
+
+
+def _create_database(path: Path, scale: Scale) -> None:
+    rng = random.Random(42)
+    columns = column_defs(scale.width)
+    column_sql = ", ".join(f"{name} {type_}" for name, type_ in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    tmp = path.with_suffix(".tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        for t in range(scale.tables):
+            conn.execute(f"CREATE TABLE t{t} (id INTEGER PRIMARY KEY, {column_sql})")
+            if t % 5 == 0:
+                conn.execute(f"CREATE INDEX idx_t{t}_c2 ON t{t}(c2)")
+            rows = scale.rows if t == 0 else SIDE_TABLE_ROWS
+            chunk = 10_000
+            for start in range(0, rows, chunk):
+                conn.executemany(
+                    f"INSERT INTO t{t} ({', '.join(name for name, _ in columns)}) VALUES ({placeholders})",
+                    [_row(rng, scale.width, i) for i in range(start, min(start + chunk, rows))]
+                )
+        conn.execute(f"PRAGMA user_version = {FIXTURE_VERSION}")
+        conn.commit()
+    finally:
+        conn.close()
+    tmp.replace(path)
+
+
+def _create_text_file(path: Path, lines: int) -> None:
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            f.write(f"{i:>9} | 2024-01-{i % 28 + 1:02d} INFO worker-{i % 16} processed batch {i * 7919 % 100_000} 处理完成\n")
+    tmp.replace(path)
+
+
+def ensure_fixtures(scale: Scale, fixture_dir: Optional[Path] = None) -> Dict[str, str]:
+    """生成（或复用）该规模的fixture，返回 {"database": 路径, "text_file": 路径}"""
+    directory = Path(fixture_dir or DEFAULT_FIXTURE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = f"v{FIXTURE_VERSION}_{scale.name}_{scale.tables}x{scale.rows}x{scale.width}"
+    db_path = directory / f"{stem}.db"
+    text_path = directory / f"v{FIXTURE_VERSION}_{scale.file_lines}_lines.log"
+    if not db_path.exists():
+        print(f"生成fixture: {db_path.name} ...", flush=True)
+        _create_database(db_path, scale)
+    if not text_path.exists():
+        print(f"生成fixture: {text_path.name} ...", flush=True)
+        _create_text_file(text_path, scale.file_lines)
+    return {"database": str(db_path), "text_file": str(text_path)}
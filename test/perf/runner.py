@@ -0,0 +1,160 @@
+"""
+运行用例、保存/对比基线
+
+回归判定（只比较两边都有的 用例×规模）：
+- 耗时：p50 比基线慢超过 threshold（默认20%）。p99 受偶发抖动影响大，只报告不判定
+- 内存：峰值RSS比基线多超过 rss_threshold（默认25%）且至少多 RSS_FLOOR_MB
+基线与当前结果的Python版本或平台不同时给出警告（仍然对比）。
+"""
+
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cases import CASES
+from .fixtures import SCALES, ensure_fixtures
+
+PERF_DIR = Path(__file__).resolve().parent
+BASELINE_DIR = PERF_DIR / "baselines"
+RESULT_DIR = PERF_DIR.parent / "result"
+RSS_FLOOR_MB = 5.0
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": f"{platform.system()}-{platform.machine()}",
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def select_cases(patterns: Optional[List[str]] = None) -> List[str]:
+    names = sorted(CASES)
+    if patterns:
+        names = [name for name in names if any(pattern in name for pattern in patterns)]
+    return names
+
+
+def run_suite(case_names: List[str], scale_names: List[str], fixture_dir: Optional[Path] = None,
+              min_time: float = 1.0, min_iters: int = 5, max_iters: int = 100_000,
+              warmup: float = 0.2, isolate: bool = True) -> List[Dict[str, Any]]:
+    """按规模运行用例；isolate 时每个用例一个子进程（峰值RSS互不影响）"""
+    results = []
+    unscaled_done = set()
+    for scale_name in scale_names:
+        fixtures = ensure_fixtures(SCALES[scale_name], fixture_dir)
+        for name in case_names:
+            case = CASES[name]
+            if not case.available():
+                print(f"  跳过 {name}（未安装 {case.requires}）")
+                continue
+            if not case.scaled:
+                if name in unscaled_done:
+                    continue
+                unscaled_done.add(name)
+            label = f"{name} [{scale_name if case.scaled else '-'}]"
+            print(f"  {label:<40}", end="", flush=True)
+            try:
+                if isolate:
+                    result = _run_isolated(name, scale_name, fixtures, min_time, min_iters, max_iters, warmup)
+                else:
+                    import asyncio
+                    from .worker import run_case
+                    result = asyncio.run(run_case(name, scale_name, fixtures["database"], fixtures["text_file"],
+                                                  min_time, min_iters, max_iters, warmup))
+            except Exception as e:
+                print(f" 失败: {e}")
+                results.append({"case": name, "scale": scale_name if case.scaled else "-", "error": str(e)})
+                continue
+            print(f" {result['ops_per_s']:>12,.1f} ops/s  p50 {result['p50_ms']:>10.3f} ms  "
+                  f"p99 {result['p99_ms']:>10.3f} ms  RSS {result['peak_rss_mb']} MB")
+            results.append(result)
+    return results
+
+
+def _run_isolated(name: str, scale_name: str, fixtures: Dict[str, str], min_time: float,
+                  min_iters: int, max_iters: int, warmup: float) -> Dict[str, Any]:
+    command = [
+        sys.executable, "-m", "perf.worker",
+        "--case", name, "--scale", scale_name,
+        "--database", fixtures["database"], "--text-file", fixtures["text_file"],
+        "--min-time", str(min_time), "--min-iters", str(min_iters),
+        "--max-iters", str(max_iters), "--warmup", str(warmup),
+    ]
+    completed = subprocess.run(command, cwd=PERF_DIR.parent, capture_output=True, text=True)
+    if completed.returncode != 0:
+        lines = (completed.stderr or completed.stdout).strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"exit code {completed.returncode}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def make_report(results: List[Dict[str, Any]], scale_names: List[str]) -> Dict[str, Any]:
+    return {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "scales": {name: SCALES[name].__dict__ for name in scale_names},
+        "results": results,
+    }
+
+
+def save_report(report: Dict[str, Any], path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def baseline_path(name: str) -> Path:
+    path = Path(name)
+    return path if path.suffix == ".json" else BASELINE_DIR / f"{name}.json"
+
+
+def load_report(path: Path) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2,
+            rss_threshold: float = 0.25) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """返回 (逐项对比, 警告)；逐项的 status 为 ok / regressed / improved / new"""
+    warnings = []
+    if current.get("environment") != baseline.get("environment"):
+        warnings.append(f"环境不同：基线 {baseline.get('environment')}，当前 {current.get('environment')}")
+
+    def key(result):
+        return result["case"], result["scale"]
+
+    base_index = {key(r): r for r in baseline.get("results", []) if "error" not in r}
+    rows = []
+    for result in current["results"]:
+        if "error" in result:
+            continue
+        base = base_index.get(key(result))
+        if base is None:
+            rows.append({"case": result["case"], "scale": result["scale"], "status": "new"})
+            continue
+        time_ratio = result["p50_ms"] / base["p50_ms"] if base["p50_ms"] else 1.0
+        status, reasons = "ok", []
+        if time_ratio > 1 + threshold:
+            status = "regressed"
+            reasons.append(f"p50 {base['p50_ms']:.3f} → {result['p50_ms']:.3f} ms")
+        elif time_ratio < 1 - threshold:
+            status = "improved"
+        rss, base_rss = result.get("peak_rss_mb"), base.get("peak_rss_mb")
+        if rss and base_rss and rss > base_rss * (1 + rss_threshold) and rss - base_rss >= RSS_FLOOR_MB:
+            status = "regressed"
+            reasons.append(f"RSS {base_rss} → {rss} MB")
+        rows.append({
+            "case": result["case"],
+            "scale": result["scale"],
+            "status": status,
+            "p50_ratio": round(time_ratio, 3),
+            "ops_ratio": round(result["ops_per_s"] / base["ops_per_s"], 3) if base.get("ops_per_s") else None,
+            "rss_delta_mb": round(rss - base_rss, 1) if rss and base_rss else None,
+            "reasons": reasons,
+        })
+    return rows, warnings
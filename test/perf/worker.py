@@ -0,0 +1,125 @@
+"""
+在当前进程中运行单个用例并输出JSON（由 runner 在子进程中调用，使峰值RSS只反映该用例）
+
+    python -m perf.worker --case adapter.query_point --scale small --database ... --text-file ...
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .cases import CASES, Context
+from .fixtures import SCALES
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程峰值RSS（MB）；既没有 resource 也没有 psutil 时返回None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为KB，macOS 为字节
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+async def measure(op: Callable[[], Any], min_time: float, min_iters: int, max_iters: int,
+                  warmup: float) -> Dict[str, Any]:
+    """重复执行 op 直到同时满足最少时间和最少次数（或达到最多次数），返回延迟统计"""
+    is_async = asyncio.iscoroutinefunction(op)
+
+    async def call():
+        if is_async:
+            await op()
+        else:
+            op()
+
+    warmup_end = time.perf_counter() + warmup
+    await call()
+    while time.perf_counter() < warmup_end:
+        await call()
+
+    gc.collect()
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < max_iters and (len(samples) < min_iters or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - t0)
+
+    samples.sort()
+    total = sum(samples)
+    return {
+        "iterations": len(samples),
+        "ops_per_s": round(len(samples) / total, 2) if total else None,
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "p50_ms": round(_percentile(samples, 50) * 1000, 4),
+        "p99_ms": round(_percentile(samples, 99) * 1000, 4),
+        "min_ms": round(samples[0] * 1000, 4),
+    }
+
+
+async def run_case(name: str, scale_name: str, database: str, text_file: str,
+                   min_time: float = 1.0, min_iters: int = 5, max_iters: int = 100_000,
+                   warmup: float = 0.2) -> Dict[str, Any]:
+    case = CASES[name]
+    scale = SCALES[scale_name]
+    rss_start = peak_rss_mb()
+    with tempfile.TemporaryDirectory(prefix="dbrheo_perf_") as work_dir:
+        ctx = Context(scale=scale, database=database, text_file=text_file, work_dir=Path(work_dir))
+        try:
+            op = await case.setup(ctx)
+            stats = await measure(op, min_time, min_iters, max_iters, warmup)
+        finally:
+            await ctx.close()
+    return {
+        "case": name,
+        "scale": scale_name if case.scaled else "-",
+        **stats,
+        "startup_rss_mb": rss_start,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运行单个基准用例（内部使用）")
+    parser.add_argument("--case", required=True, choices=sorted(CASES))
+    parser.add_argument("--scale", required=True, choices=sorted(SCALES))
+    parser.add_argument("--database", required=True)
+    parser.add_argument("--text-file", required=True)
+    parser.add_argument("--min-time", type=float, default=1.0)
+    parser.add_argument("--min-iters", type=int, default=5)
+    parser.add_argument("--max-iters", type=int, default=100_000)
+    parser.add_argument("--warmup", type=float, default=0.2)
+    args = parser.parse_args()
+
+    result = asyncio.run(run_case(
+        args.case, args.scale, args.database, args.text_file,
+        args.min_time, args.min_iters, args.max_iters, args.warmup
+    ))
+    # 最后一行为结果，之前的输出（如有）由 runner 忽略
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+本地HTTP桩服务器 - 用于测试 web_fetch / HTTP 客户端，不依赖外网
+在后台线程运行 ThreadingHTTPServer，按路径返回预设响应，支持 ETag / Last-Modified 条件请求，
+并记录每个路径的请求次数、条件请求次数和新建连接数
+"""
+
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+@dataclass
+class StubRoute:
+    """一个路径的预设响应"""
+    body: bytes = b"<html><body><p>hello</p></body></html>"
+    status: int = 200
+    content_type: str = "text/html; charset=utf-8"
+    headers: Dict[str, str] = field(default_factory=dict)
+    etag: Optional[str] = None
+    last_modified: Optional[float] = None   # 时间戳
+    delay: float = 0.0                       # 响应前等待的秒数（测试并发）
+
+
+class StubHTTPServer:
+    """
+    用法:
+        with StubHTTPServer() as server:
+            server.add_route("/page", StubRoute(body=b"...", etag='"v1"'))
+            url = server.url("/page")
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.routes: Dict[str, StubRoute] = {}
+        self.requests: Counter = Counter()
+        self.conditional_requests: Counter = Counter()
+        self.not_modified: Counter = Counter()
+        self.connections = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def add_route(self, path: str, route: StubRoute) -> None:
+        self.routes[path] = route
+
+    def start(self) -> "StubHTTPServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubHTTPServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 才能保持连接，用于验证连接复用
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                route = server.routes.get(path)
+                with server._lock:
+                    server.requests[path] += 1
+                    server._in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server._in_flight)
+                try:
+                    if route is None:
+                        self._send(404, b"not found", "text/plain", {})
+                        return
+                    if route.delay:
+                        time.sleep(route.delay)
+
+                    headers = dict(route.headers)
+                    if route.etag:
+                        headers["ETag"] = route.etag
+                    if route.last_modified is not None:
+                        headers["Last-Modified"] = formatdate(route.last_modified, usegmt=True)
+
+                    if_none_match = self.headers.get("If-None-Match")
+                    if_modified_since = self.headers.get("If-Modified-Since")
+                    if if_none_match or if_modified_since:
+                        with server._lock:
+                            server.conditional_requests[path] += 1
+                        if (route.etag and if_none_match == route.etag) or (
+                            not if_none_match and route.last_modified is not None
+                            and if_modified_since == headers.get("Last-Modified")
+                        ):
+                            with server._lock:
+                                server.not_modified[path] += 1
+                            self._send(304, b"", None, headers)
+                            return
+
+                    self._send(route.status, route.body, route.content_type, headers)
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+
+            def _send(self, status: int, body: bytes, content_type: Optional[str], headers: Dict[str, str]):
+                self.send_response(status)
+                if content_type:
+                    self.send_header("Content-Type", content_type)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,148 @@
+"""
+测试评估记录的SQLite存储（EvaluationStore）
+
+在临时目录中运行，不影响 test/result/evaluations.db：
+1. 增删改后，触发器维护的统计/最新记录与逐条重新计算的结果一致
+2. 旧 evaluations.jsonl 只导入一次
+3. 大量记录时看板各操作的耗时
+
+用法: python test/test_evaluation_store.py [记录数，默认30000]
+"""
+
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from gradio_app import EvaluationManager
+
+
+def brute_force(records):
+    """逐条计算：按Agent的总数/正确数，以及每个 问题×Agent 的最新记录ID"""
+    totals, latest = {}, {}
+    for record in records:
+        agent = totals.setdefault(record['agent_type'], {'total': 0, 'correct': 0})
+        agent['total'] += 1
+        agent['correct'] += int(record['is_correct'])
+        key = (record['question_fingerprint'], record['agent_type'])
+        if key not in latest or (record['timestamp'], record['id']) > (latest[key]['timestamp'], latest[key]['id']):
+            latest[key] = record
+    return totals, {record['id'] for record in latest.values()}
+
+
+def check(mgr, label):
+    records = mgr.evaluations
+    totals, latest_ids = brute_force(records)
+    assert mgr.store.totals() == totals, f"{label}: 统计不一致"
+    assert {record['id'] for record in mgr.store.latest()} == latest_ids, f"{label}: 最新记录不一致"
+    df = mgr.get_evaluation_dataframe()
+    assert list(df['id']) == [record['id'] for record in records], f"{label}: 表格不一致"
+    print(f"  ✓ {label}: {len(records)} 条记录，统计/最新记录/表格一致")
+
+
+def add_random(mgr, rng, count, questions):
+    for _ in range(count):
+        standard = str(rng.randrange(1000, 2000))
+        actual = standard if rng.random() < 0.6 else str(rng.randrange(0, 5000))
+        mgr.add_evaluation(rng.choice(questions), standard, f"【答案：{actual}】",
+                           rng.choice(['NL2SQL', 'Baseline']))
+
+
+def test_consistency():
+    print("1. 增删改后的一致性:")
+    rng = random.Random(7)
+    questions = [f"2023-{i % 12 + 1:02d}，品牌{i}的销量是多少？" for i in range(40)]
+    mgr = EvaluationManager(evaluation_dir=tempfile.mkdtemp(prefix="dbrheo_eval_"))
+
+    add_random(mgr, rng, 400, questions)
+    check(mgr, "新增")
+
+    ids = [record['id'] for record in mgr.evaluations]
+    deleted, _, count = mgr.delete_evaluations(rng.sample(ids, 80))
+    assert deleted and count == 80
+    check(mgr, "批量删除")
+
+    for evaluation_id in rng.sample([record['id'] for record in mgr.evaluations], 30):
+        success, _ = mgr.update_evaluation(evaluation_id, standard_answer=str(rng.randrange(1000, 2000)))
+        assert success
+    check(mgr, "修改标准答案")
+
+    mgr.get_evaluation_dataframe()
+    add_random(mgr, rng, 25, questions)
+    check(mgr, "缓存后追加")
+
+    assert mgr.delete_evaluation(10 ** 9)[0] is False
+    mgr.clear()
+    assert mgr.get_statistics()['total'] == 0
+    assert mgr.store.path.with_suffix('.db.bak').exists()
+    print("  ✓ 清空（已备份）")
+    print()
+
+
+def test_legacy_import():
+    print("2. 导入旧的 evaluations.jsonl:")
+    evaluation_dir = Path(tempfile.mkdtemp(prefix="dbrheo_eval_"))
+    with open(evaluation_dir / "evaluations.jsonl", 'w', encoding='utf-8') as f:
+        for i in range(1, 6):
+            f.write(json.dumps({
+                'id': i, 'timestamp': f"2024-01-0{i}T10:00:00", 'question': f"问题{i % 2}",
+                'question_fingerprint': f"fp{i % 2}", 'run_number': i, 'standard_answer': "1",
+                'actual_answer': "1", 'is_correct': i % 2 == 0, 'comparison_reason': "",
+                'agent_type': 'NL2SQL', 'full_response': "【答案：1】"
+            }, ensure_ascii=False) + "\n")
+
+    mgr = EvaluationManager(evaluation_dir=evaluation_dir)
+    assert mgr.store.count() == 5
+    assert mgr.get_evaluation(5)['full_response'] == "【答案：1】"
+    mgr.store.close()
+    # 再次启动不重复导入
+    mgr = EvaluationManager(evaluation_dir=evaluation_dir)
+    assert mgr.store.count() == 5
+    check(mgr, "导入")
+    print()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def test_performance(total: int):
+    print(f"3. {total} 条记录时的耗时:")
+    rng = random.Random(1)
+    questions = [f"问题{i}" for i in range(max(1, total // 10))]
+    mgr = EvaluationManager(evaluation_dir=tempfile.mkdtemp(prefix="dbrheo_eval_"))
+
+    start = time.perf_counter()
+    add_random(mgr, rng, total, questions)
+    print(f"  新增:           {(time.perf_counter() - start) * 1000 / total:8.3f} ms/条")
+    print(f"  统计:           {timed(mgr.get_statistics):8.2f} ms")
+    print(f"  最新100题统计:  {timed(mgr.get_statistics_by_agent_latest):8.2f} ms")
+    print(f"  失败分析:       {timed(mgr.analyze_nl2sql_failures):8.2f} ms")
+    print(f"  问题详情:       {timed(lambda: mgr.get_question_details(mgr._generate_fingerprint('问题5'))):8.2f} ms")
+    print(f"  表格（首次）:   {timed(mgr.get_evaluation_dataframe):8.2f} ms")
+    print(f"  表格（缓存）:   {timed(mgr.get_evaluation_dataframe):8.2f} ms")
+    add_random(mgr, rng, 1, questions)
+    print(f"  表格（追加后）: {timed(mgr.get_evaluation_dataframe):8.2f} ms")
+    print(f"  搜索问题:       {timed(lambda: mgr.search_questions('问题12')):8.2f} ms")
+    print(f"  修改一条:       {timed(lambda: mgr.update_evaluation(total // 2, standard_answer='7')):8.2f} ms")
+    print(f"  删除一条:       {timed(lambda: mgr.delete_evaluation(total // 3)):8.2f} ms")
+    print()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("测试 EvaluationStore")
+    print("=" * 60 + "\n")
+    test_consistency()
+    test_legacy_import()
+    test_performance(int(sys.argv[1]) if len(sys.argv) > 1 else 30000)
+    print("=" * 60)
+    print("测试完成！")
+    print("=" * 60)
@@ -0,0 +1,67 @@
+"""
+测试FileWriteTool写入非UTF-8文件：覆盖写入不沿用旧文件编码，追加沿用；
+内容无法按目标编码表示时返回错误且不截断原文件
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "packages" / "core" / "src"))
+
+from dbrheo.config.test_config import TestDatabaseConfig
+from dbrheo.tools.file_write_tool import FileWriteTool
+from dbrheo.types.core_types import SimpleAbortSignal
+
+LATIN1_TEXT = "name,city\nJosé,Málaga\nRenée,Besançon\nJürgen,Köln\n"
+
+
+async def check_write(work_dir: str):
+    config = TestDatabaseConfig(test_overrides={"usage_ledger_enabled": False, "file_allowed_paths": [work_dir]})
+    tool = FileWriteTool(config)
+
+    async def write(path: Path, content: str, **params):
+        return await tool.execute({"path": str(path), "content": content, "format": "text", **params}, SimpleAbortSignal())
+
+    print("1. 覆盖写入Latin-1文件（中文内容）:")
+    target = Path(work_dir) / "latin1.txt"
+    target.write_bytes(LATIN1_TEXT.encode("latin-1"))
+    result = await write(target, "你好 world")
+    print(f"   error={result.error}, 文件内容={target.read_bytes()!r}")
+    assert not result.error, result.error
+    assert target.read_text(encoding="utf-8") == "你好 world"
+
+    print("2. 追加到Latin-1文件（可编码内容）:")
+    target.write_bytes(LATIN1_TEXT.encode("latin-1"))
+    result = await write(target, "Zoë,Zürich\n", mode="append")
+    assert not result.error, result.error
+    print(f"   追加后按latin-1解码的末行: {target.read_bytes().decode('latin-1').splitlines()[-1]}")
+    assert target.read_bytes() == (LATIN1_TEXT + "Zoë,Zürich\n").encode("latin-1")
+
+    print("3. 追加无法编码的内容:")
+    before = target.read_bytes()
+    result = await write(target, "王,北京\n", mode="append")
+    print(f"   error={result.error}")
+    assert result.error and target.read_bytes() == before
+
+    print("4. 指定编码无法表示内容时不截断文件:")
+    result = await write(target, "你好", encoding="latin-1")
+    print(f"   error={result.error}，文件大小 {target.stat().st_size} 字节")
+    assert result.error and target.read_bytes() == before
+
+
+def test_file_write_encoding():
+    print("=" * 60)
+    print("测试文件写入编码")
+    print("=" * 60 + "\n")
+    with tempfile.TemporaryDirectory() as work_dir:
+        asyncio.run(check_write(str(Path(work_dir).resolve())))
+    print("\n" + "=" * 60)
+    print("测试完成！")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    test_file_write_encoding()
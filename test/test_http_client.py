@@ -0,0 +1,124 @@
+"""
+测试共享HTTP客户端：连接复用、磁盘缓存（Cache-Control / ETag / Last-Modified）、容量淘汰、并发获取，
+以及事件循环结束时关闭会话
+使用本地桩服务器，不访问外网
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "packages" / "core" / "src"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dbrheo.utils.http_client import HTTPCache, HTTPClient
+from stub_http_server import StubHTTPServer, StubRoute
+
+
+async def _run_checks(server: StubHTTPServer, cache_dir: str):
+    client = HTTPClient(cache=HTTPCache(cache_dir, max_bytes=64 * 1024))
+    try:
+        print("1. 连接复用:")
+        for _ in range(5):
+            response = await client.fetch(server.url("/plain"), use_cache=False)
+            assert response.status == 200
+        print(f"   5次请求，新建连接 {server.connections} 个")
+        assert server.connections == 1
+
+        print("2. Cache-Control: max-age 命中缓存:")
+        first = await client.fetch(server.url("/fresh"))
+        second = await client.fetch(server.url("/fresh"))
+        assert not first.from_cache and second.from_cache
+        assert second.text() == first.text()
+        assert server.requests["/fresh"] == 1
+        print("   第二次请求未访问服务器 ✓")
+
+        print("3. ETag 条件请求返回304:")
+        await client.fetch(server.url("/etag"))
+        revalidated = await client.fetch(server.url("/etag"))
+        assert revalidated.revalidated and revalidated.body == b"etag body"
+        assert server.not_modified["/etag"] == 1
+        print("   If-None-Match -> 304，复用缓存的响应体 ✓")
+
+        print("4. Last-Modified 条件请求:")
+        await client.fetch(server.url("/last-modified"))
+        revalidated = await client.fetch(server.url("/last-modified"))
+        assert revalidated.revalidated
+        assert server.conditional_requests["/last-modified"] == 1
+        print("   If-Modified-Since -> 304 ✓")
+
+        print("5. no-store 不缓存:")
+        await client.fetch(server.url("/no-store"))
+        await client.fetch(server.url("/no-store"))
+        assert server.requests["/no-store"] == 2
+        assert server.conditional_requests["/no-store"] == 0
+        print("   每次都请求服务器 ✓")
+
+        print("6. 容量淘汰:")
+        for i in range(8):
+            await client.fetch(server.url(f"/big/{i}"))
+        stats = client.cache.stats()
+        print(f"   缓存 {stats['bytes']} 字节 / 上限 {stats['max_bytes']}，淘汰 {stats['evictions']} 个")
+        assert stats["bytes"] <= stats["max_bytes"] and stats["evictions"] > 0
+
+        print("7. 并发获取:")
+        urls = [server.url(f"/slow/{i}") for i in range(8)]
+        started = time.perf_counter()
+        results = await client.fetch_many(urls, concurrency=4, use_cache=False)
+        elapsed = time.perf_counter() - started
+        print(f"   8个URL（每个0.2秒），耗时 {elapsed:.2f}秒，最大并发 {server.max_in_flight}")
+        assert all(r.status == 200 for r in results)
+        assert [r.url for r in results] == urls
+        assert server.max_in_flight <= 4 and elapsed < 1.2
+    finally:
+        await client.close()
+
+
+def _check_session_lifecycle(server: StubHTTPServer):
+    print("8. 事件循环结束时关闭会话:")
+    client = HTTPClient()
+    sessions = []
+
+    async def fetch_once():
+        response = await client.fetch(server.url("/plain"), use_cache=False)
+        assert response.status == 200
+        sessions.append(client.get_session())
+
+    # 每次 asyncio.run 都是新的事件循环（如 Gradio 每次请求），不调用 client.close()
+    for _ in range(3):
+        asyncio.run(fetch_once())
+    print(f"   3个事件循环，剩余会话 {len(client._sessions)} 个，已关闭 {sum(s.closed for s in sessions)} 个")
+    assert not client._sessions
+    assert all(session.closed for session in sessions)
+
+
+def test_http_client():
+    """测试共享HTTP客户端"""
+    print("=" * 60)
+    print("测试共享HTTP客户端")
+    print("=" * 60 + "\n")
+
+    with StubHTTPServer() as server, tempfile.TemporaryDirectory() as cache_dir:
+        server.add_route("/plain", StubRoute(body=b"plain"))
+        server.add_route("/fresh", StubRoute(body=b"fresh body", headers={"Cache-Control": "max-age=60"}))
+        server.add_route("/etag", StubRoute(body=b"etag body", etag='"v1"', headers={"Cache-Control": "no-cache"}))
+        server.add_route("/last-modified", StubRoute(
+            body=b"lm body", last_modified=time.time() - 3600, headers={"Cache-Control": "max-age=0"}
+        ))
+        server.add_route("/no-store", StubRoute(body=b"secret", etag='"x"', headers={"Cache-Control": "no-store"}))
+        for i in range(8):
+            server.add_route(f"/big/{i}", StubRoute(body=b"x" * 12 * 1024, headers={"Cache-Control": "max-age=60"}))
+        for i in range(8):
+            server.add_route(f"/slow/{i}", StubRoute(body=b"slow", delay=0.2))
+
+        asyncio.run(_run_checks(server, cache_dir))
+        _check_session_lifecycle(server)
+
+    print("\n✅ 全部通过")
+
+
+if __name__ == "__main__":
+    test_http_client()
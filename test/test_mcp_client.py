@@ -0,0 +1,145 @@
+"""
+测试MCP工具目录缓存和并发调用：冷启动写缓存、热启动不启动服务器、首次调用时延迟连接、
+同一服务器上的并发调用、单次调用超时、服务器脚本修改后缓存失效
+使用 fake_mcp_server.py，需要安装 MCP SDK（pip install mcp）
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "packages" / "core" / "src"))
+
+from dbrheo.tools.mcp import MCPRegistry, MCP_AVAILABLE
+from dbrheo.tools.mcp.mcp_client import MCPServerStatus
+
+FAKE_SERVER = str(Path(__file__).with_name("fake_mcp_server.py"))
+
+
+class _Config:
+    """只提供MCP注册表用到的配置项"""
+
+    def __init__(self, values):
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def get_test_config(self, key):
+        return self.values.get(key)
+
+
+class _ToolRegistry:
+    def __init__(self):
+        self.tools = {}
+
+    def register_tool(self, tool, **kwargs):
+        self.tools[tool.name] = tool
+
+    def unregister_tool(self, name):
+        self.tools.pop(name, None)
+
+
+def _starts(start_log: str) -> int:
+    if not os.path.exists(start_log):
+        return 0
+    with open(start_log, encoding="utf-8") as f:
+        return len(f.read().split())
+
+
+async def _run_checks(work_dir: str):
+    server_script = os.path.join(work_dir, "server.py")
+    with open(FAKE_SERVER, encoding="utf-8") as src, open(server_script, "w", encoding="utf-8") as dst:
+        dst.write(src.read())
+    start_log = os.path.join(work_dir, "starts.log")
+    values = {
+        "mcp_catalog_cache_path": os.path.join(work_dir, "catalog.json"),
+        "mcp_servers": {
+            "fake": {
+                "command": sys.executable,
+                "args": [server_script],
+                "env": {"FAKE_MCP_START_LOG": start_log},
+                "timeout": 500,
+                "trust": True,
+            }
+        },
+    }
+
+    print("1. 冷启动：连接服务器并写入目录缓存:")
+    registry = MCPRegistry(_Config(values))
+    tools = _ToolRegistry()
+    started = time.perf_counter()
+    await registry.initialize(tools)
+    print(f"   注册 {len(tools.tools)} 个工具，耗时 {time.perf_counter() - started:.2f}秒，服务器启动 {_starts(start_log)} 次")
+    assert set(tools.tools) == {"fake__echo", "fake__sleep", "fake__fail"}
+    assert registry.get_server_status("fake") == MCPServerStatus.CONNECTED
+    await registry.cleanup()
+
+    print("2. 热启动：从缓存注册，不启动服务器:")
+    registry = MCPRegistry(_Config(values))
+    tools = _ToolRegistry()
+    started = time.perf_counter()
+    await registry.initialize(tools)
+    print(f"   注册 {len(tools.tools)} 个工具，耗时 {time.perf_counter() - started:.3f}秒，服务器启动 {_starts(start_log)} 次")
+    assert len(tools.tools) == 3 and _starts(start_log) == 1
+    assert registry.get_server_status("fake") == MCPServerStatus.CACHED
+
+    try:
+        print("3. 首次调用时延迟连接:")
+        result = await tools.tools["fake__echo"].execute({"text": "hello"}, None)
+        print(f"   结果: {result.llm_content}，服务器启动 {_starts(start_log)} 次")
+        assert result.llm_content == "hello" and _starts(start_log) == 2
+
+        print("4. 同一服务器上的并发调用:")
+        client = registry.client_manager
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            client.call_tool("fake", "sleep", {"seconds": 0.3}) for _ in range(5)
+        ))
+        elapsed = time.perf_counter() - started
+        print(f"   5个0.3秒的调用，耗时 {elapsed:.2f}秒")
+        assert all(r is not None and not r.isError for r in results)
+        assert elapsed < 1.0
+
+        print("5. 单次调用超时（服务器 timeout=500ms）:")
+        result = await tools.tools["fake__sleep"].execute({"seconds": 2}, None)
+        print(f"   错误: {result.error}")
+        assert result.error and "timed out" in result.error
+        result = await tools.tools["fake__echo"].execute({"text": "still alive"}, None)
+        assert result.llm_content == "still alive"
+        print("   超时后会话仍可用 ✓")
+    finally:
+        await registry.cleanup()
+
+    print("6. 服务器脚本修改后缓存失效:")
+    os.utime(server_script, (time.time() + 10, time.time() + 10))
+    registry = MCPRegistry(_Config(values))
+    await registry.initialize(_ToolRegistry())
+    print(f"   服务器启动 {_starts(start_log)} 次，缓存统计 {registry.catalog_cache.stats()}")
+    assert _starts(start_log) == 3
+    assert registry.get_server_status("fake") == MCPServerStatus.CONNECTED
+    await registry.cleanup()
+
+
+def test_mcp_client():
+    """测试MCP目录缓存和并发调用"""
+    print("=" * 60)
+    print("测试MCP目录缓存和并发调用")
+    print("=" * 60 + "\n")
+
+    if not MCP_AVAILABLE:
+        print("MCP SDK 未安装，跳过")
+        return
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        asyncio.run(_run_checks(work_dir))
+
+    print("\n✅ 全部通过")
+
+
+if __name__ == "__main__":
+    test_mcp_client()
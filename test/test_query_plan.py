@@ -0,0 +1,144 @@
+"""
+测试SQLite执行计划的行数估计和SQLTool的代价守卫
+使用临时SQLite数据库（orders 30k行，customers 20k行），不依赖外部服务
+"""
+
+import asyncio
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "packages" / "core" / "src"))
+
+from dbrheo.adapters.query_plan import sqlite_table_aliases
+from dbrheo.adapters.sqlite_adapter import SQLiteAdapter
+from dbrheo.config.test_config import TestDatabaseConfig
+from dbrheo.tools.sql_tool import SQLTool
+from dbrheo.types.core_types import SimpleAbortSignal
+
+ORDERS = 30000
+CUSTOMERS = 20000
+
+
+def _create_database(path: str):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT, email TEXT UNIQUE, region TEXT);
+        CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER REFERENCES customers(id),
+                             amount REAL, email TEXT, region TEXT);
+        CREATE INDEX idx_orders_region ON orders(region);
+    """)
+    conn.executemany("INSERT INTO customers VALUES (?, ?, ?, ?)",
+                     ((i, f"c{i}", f"c{i}@example.com", f"r{i % 50}") for i in range(1, CUSTOMERS + 1)))
+    conn.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?)",
+                     ((i, i % CUSTOMERS + 1, i * 1.5, f"c{i % CUSTOMERS + 1}@example.com", f"r{i % 50}")
+                      for i in range(1, ORDERS + 1)))
+    conn.commit()
+    conn.close()
+
+
+def check_aliases():
+    print("1. 表别名解析（只解析FROM子句）:")
+    aliases = sqlite_table_aliases("select o.id, c.name from orders o join customers c on o.customer_id = c.id")
+    print(f"   JOIN: {aliases}")
+    assert aliases == {"o": "orders", "c": "customers"}
+
+    aliases = sqlite_table_aliases("SELECT a.id, b.id FROM orders a, customers b")
+    print(f"   逗号连接: {aliases}")
+    assert aliases == {"a": "orders", "b": "customers"}
+
+    aliases = sqlite_table_aliases(
+        "SELECT x.id FROM (SELECT id FROM orders AS inner_o WHERE amount > 1) x WHERE x.id < 10"
+    )
+    print(f"   子查询: {aliases}")
+    assert aliases.get("inner_o") == "orders" and "x" not in aliases.values()
+
+
+async def check_estimates(database: str):
+    print("2. 行数估计:")
+    adapter = SQLiteAdapter({"type": "sqlite", "database": database})
+    await adapter.connect()
+    try:
+        cases = [
+            # (SQL, 最小估计, 最大估计)
+            ("SELECT a.id, b.id FROM orders a, customers b", ORDERS * CUSTOMERS, ORDERS * CUSTOMERS),
+            ("select o.id, c.name from orders o join customers c on o.customer_id = c.id", ORDERS, ORDERS),
+            ("SELECT * FROM orders o JOIN customers c ON c.email = o.email", ORDERS, ORDERS),
+            ("SELECT * FROM customers WHERE id = 42", 1, 1),
+            # 普通索引等值查找仍按固定选择性估计
+            ("SELECT * FROM customers c JOIN orders o ON o.region = c.region", CUSTOMERS * 10, CUSTOMERS * 10),
+        ]
+        for sql, low, high in cases:
+            plan = await adapter.explain_query(sql)
+            print(f"   {plan.estimated_rows:>14,.0f}  {sql}")
+            assert low <= (plan.estimated_rows or 0) <= high, plan.format_tree()
+    finally:
+        await adapter.disconnect()
+
+
+async def check_cost_guard(database: str):
+    print("3. 自动LIMIT:")
+    config = TestDatabaseConfig(test_overrides={
+        "cost_guard_auto_limit_rows": 10000,
+        "cost_guard_auto_limit": 100,
+        "usage_ledger_enabled": False,
+    })
+    config.set_test_database("default", {"type": "sqlite", "database": database})
+    tool = SQLTool(config)
+
+    async def run(sql):
+        result = await tool.execute({"sql": sql}, SimpleAbortSignal())
+        assert not result.error, result.error
+        return result.llm_content
+
+    content = await run("SELECT * FROM orders")
+    print(f"   全表查询: 返回 {content['row_count']} 行，auto_limit={'auto_limit' in content}")
+    assert content["row_count"] == 100 and "auto_limit" in content
+
+    # 默认阈值（100000行）下，外键连接按主键查找估计为30k行，不截断
+    default_config = TestDatabaseConfig(test_overrides={"usage_ledger_enabled": False})
+    default_config.set_test_database("default", {"type": "sqlite", "database": database})
+    result = await SQLTool(default_config).execute(
+        {"sql": "select o.id, c.name from orders o join customers c on o.customer_id = c.id"}, SimpleAbortSignal()
+    )
+    content = result.llm_content
+    print(f"   外键连接（默认阈值）: 返回 {content['row_count']} 行，auto_limit={'auto_limit' in content}")
+    assert content["row_count"] == ORDERS and "auto_limit" not in content
+
+    content = await run("SELECT region, COUNT(*) AS n, SUM(amount) FROM orders GROUP BY region")
+    print(f"   GROUP BY: 返回 {content['row_count']} 行，auto_limit={'auto_limit' in content}")
+    assert content["row_count"] == 50 and "auto_limit" not in content
+
+    content = await run("SELECT customer_id, COUNT(*) FROM orders GROUP BY customer_id")
+    print(f"   GROUP BY（{CUSTOMERS}组）: 返回 {content['row_count']} 行")
+    assert content["row_count"] == CUSTOMERS and "auto_limit" not in content
+
+    content = await run("SELECT COUNT(*) AS n, MAX(amount) AS top FROM orders o JOIN customers c ON c.id = o.customer_id")
+    print(f"   聚合: 返回 {content['row_count']} 行，n={content['rows'][0]['n']}")
+    assert content["row_count"] == 1 and content["rows"][0]["n"] == ORDERS and "auto_limit" not in content
+
+    # 子查询中的聚合不影响外层查询的自动LIMIT
+    content = await run("SELECT * FROM orders WHERE amount > (SELECT AVG(amount) FROM orders)")
+    print(f"   子查询聚合: 返回 {content['row_count']} 行，auto_limit={'auto_limit' in content}")
+    assert "auto_limit" in content
+
+
+def test_query_plan():
+    print("=" * 60)
+    print("测试执行计划估计和代价守卫")
+    print("=" * 60 + "\n")
+    with tempfile.TemporaryDirectory() as work_dir:
+        database = str(Path(work_dir) / "plan.db")
+        _create_database(database)
+        check_aliases()
+        asyncio.run(check_estimates(database))
+        asyncio.run(check_cost_guard(database))
+    print("\n" + "=" * 60)
+    print("测试完成！")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    test_query_plan()
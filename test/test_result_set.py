@@ -0,0 +1,89 @@
+"""
+测试 ResultSet 的序列化：json_default / convert_to_serializable 输出JSON数组，
+SSE/WebSocket、functionResponse 和SQLTool结果中的行与旧的字典列表格式一致
+"""
+
+import asyncio
+import json
+import sqlite3
+import sys
+import tempfile
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "packages" / "core" / "src"))
+
+from dbrheo.adapters.result_set import ResultSet
+from dbrheo.config.test_config import TestDatabaseConfig
+from dbrheo.tools.sql_tool import SQLTool
+from dbrheo.types.core_types import SimpleAbortSignal
+from dbrheo.utils.function_response import convert_to_function_response
+from dbrheo.utils.type_converter import convert_to_serializable, json_default
+
+
+def check_serialization():
+    print("1. json_default / convert_to_serializable:")
+    rows = ResultSet.from_records(["a", "b", "d", "p"], [(1, "x", date(2024, 1, 2), Decimal("1.5")), (2, "y", None, None)])
+    expected = [
+        {"a": 1, "b": "x", "d": "2024-01-02", "p": 1.5},
+        {"a": 2, "b": "y", "d": None, "p": None},
+    ]
+    assert convert_to_serializable(rows) == expected
+    assert convert_to_serializable({"rows": rows}) == {"rows": expected}
+
+    text = json.dumps({"rows": rows}, ensure_ascii=False, default=json_default)
+    print(f"   {text}")
+    assert json.loads(text) == {"rows": expected}
+    # 与旧的字典列表序列化结果完全一致
+    assert text == json.dumps({"rows": expected}, ensure_ascii=False)
+    assert json.loads(json.dumps(rows[:1], default=json_default)) == expected[:1]
+
+    empty = ResultSet(["a"])
+    assert json.dumps(empty, default=json_default) == "[]"
+
+    print("2. functionResponse（字典内容）:")
+    # 没有SQL结果专用格式的字典（如表详情）走JSON序列化
+    part = convert_to_function_response("table_details", "call-1", {"indexes": ResultSet(["a"], [(1,), (2,)])})
+    output = part["functionResponse"]["response"]["output"]
+    print(f"   {output.replace(chr(10), ' ')}")
+    assert json.loads(output) == {"indexes": [{"a": 1}, {"a": 2}]}
+
+
+async def check_sql_tool():
+    print("3. SQLTool结果经流式事件序列化:")
+    with tempfile.TemporaryDirectory() as work_dir:
+        database = str(Path(work_dir) / "rs.db")
+        conn = sqlite3.connect(database)
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?, ?)", [(1, "甲"), (2, "乙")])
+        conn.commit()
+        conn.close()
+
+        config = TestDatabaseConfig(test_overrides={"usage_ledger_enabled": False})
+        config.set_test_database("default", {"type": "sqlite", "database": database})
+        result = await SQLTool(config).execute({"sql": "SELECT id, name FROM t ORDER BY id"}, SimpleAbortSignal())
+        assert not result.error, result.error
+        assert isinstance(result.llm_content["rows"], ResultSet)
+
+        event = {"type": "tool_result", "value": {"llm_content": result.llm_content}}
+        decoded = json.loads(json.dumps(event, ensure_ascii=False, default=json_default))
+        rows = decoded["value"]["llm_content"]["rows"]
+        print(f"   rows = {rows}")
+        assert rows == [{"id": 1, "name": "甲"}, {"id": 2, "name": "乙"}]
+
+
+def test_result_set():
+    print("=" * 60)
+    print("测试 ResultSet 序列化")
+    print("=" * 60 + "\n")
+    check_serialization()
+    asyncio.run(check_sql_tool())
+    print("\n" + "=" * 60)
+    print("测试完成！")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    test_result_set()
@@ -0,0 +1,93 @@
+"""
+测试预编译语句缓存跨SQLTool调用命中：
+SQLTool在调用间复用缓存适配器的连接，第二次执行同一查询时直接使用已准备的语句；
+事件循环关闭前连接被断开。使用伪asyncpg连接，不需要PostgreSQL服务器
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent / "packages" / "core" / "src"))
+
+from dbrheo.adapters import postgresql_adapter
+from dbrheo.adapters.adapter_factory import get_adapter
+from dbrheo.config.test_config import TestDatabaseConfig
+from dbrheo.tools.sql_tool import SQLTool
+from dbrheo.types.core_types import SimpleAbortSignal
+
+
+class FakeAttribute:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class FakeStatement:
+    """伪asyncpg.PreparedStatement：固定返回两行"""
+
+    def get_attributes(self):
+        return [FakeAttribute("id"), FakeAttribute("name")]
+
+    async def fetch(self, *args):
+        return [(1, "a"), (2, "b")]
+
+
+class FakeConnection:
+    """伪asyncpg连接：统计prepare次数和是否已关闭"""
+
+    def __init__(self):
+        self.prepares = 0
+        self.closed = False
+
+    async def prepare(self, sql: str):
+        self.prepares += 1
+        return FakeStatement()
+
+    async def close(self):
+        self.closed = True
+
+
+connections = []
+
+
+async def fake_connect(**params):
+    connection = FakeConnection()
+    connections.append(connection)
+    return connection
+
+
+async def run_queries(config):
+    tool = SQLTool(config)
+    for i in range(2):
+        result = await tool.execute({"sql": "SELECT id, name FROM users"}, SimpleAbortSignal())
+        assert not result.error, result.error
+        adapter = await get_adapter(config, None)
+        stats = adapter.get_statement_cache_stats()
+        print(f"   第{i + 1}次调用: hits={stats['hits']}, misses={stats['misses']}, 连接数={len(connections)}")
+    assert stats["hits"] == 1 and stats["misses"] == 1, stats
+    assert len(connections) == 1 and connections[0].prepares == 1
+
+
+def test_statement_cache():
+    print("=" * 60)
+    print("测试预编译语句缓存跨调用命中")
+    print("=" * 60 + "\n")
+    postgresql_adapter.asyncpg.connect = fake_connect
+    config = TestDatabaseConfig(test_overrides={"usage_ledger_enabled": False, "cost_guard_enabled": False})
+    config.set_test_database("default", {"type": "postgresql", "host": "localhost", "database": "stub", "user": "stub"})
+
+    print("1. 同一事件循环中两次执行相同查询:")
+    asyncio.run(run_queries(config))
+
+    print("2. 事件循环关闭前断开连接:")
+    print(f"   连接已关闭: {connections[0].closed}")
+    assert connections[0].closed
+
+    print("\n" + "=" * 60)
+    print("测试完成！")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    test_statement_cache()